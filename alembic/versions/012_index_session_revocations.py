@@ -0,0 +1,36 @@
+"""Index user_sessions.revoked_at
+
+Workers poll user_sessions for sessions revoked since their last check so a
+logout on one worker is honoured by all of them. The index keeps that poll
+cheap as the table grows.
+
+Revision ID: 012_index_session_revocations
+Revises: 011_add_email_settings
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers
+revision = "012_index_session_revocations"
+down_revision = "011_add_email_settings"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        op.execute(text("CREATE INDEX IF NOT EXISTS ix_user_sessions_revoked_at ON user_sessions (revoked_at)"))
+    else:
+        try:
+            op.create_index("ix_user_sessions_revoked_at", "user_sessions", ["revoked_at"])
+        except Exception:
+            pass
+
+
+def downgrade():
+    try:
+        op.drop_index("ix_user_sessions_revoked_at", table_name="user_sessions")
+    except Exception:
+        pass
@@ -0,0 +1,42 @@
+"""Composite indexes for audit log queries
+
+The audit log endpoints filter and paginate in the database, newest first,
+by organization, user or action. These indexes are declared on the model but
+are only created by create_all for a new table; create them for existing
+deployments.
+
+Revision ID: 013_index_audit_log_queries
+Revises: 012_index_session_revocations
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers
+revision = "013_index_audit_log_queries"
+down_revision = "012_index_session_revocations"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("idx_audit_org_time", "org_id"),
+    ("idx_audit_user_time", "user_id"),
+    ("idx_audit_action_time", "action"),
+]
+
+
+def upgrade():
+    conn = op.get_bind()
+    for name, column in INDEXES:
+        if conn.dialect.name == "postgresql":
+            op.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON audit_logs ({column}, timestamp DESC)"))
+        else:
+            try:
+                op.create_index(name, "audit_logs", [column, text("timestamp DESC")])
+            except Exception:
+                pass
+
+
+def downgrade():
+    # The indexes are declared on the AuditLog model; leave them in place
+    pass
@@ -0,0 +1,63 @@
+"""Add process_webhook_deliveries (webhook ingestion queue)
+
+Process webhooks are stored here and acknowledged with 202 before the
+execution starts; workers drain the table with bounded concurrency per agent.
+The unique (agent_id, idempotency_key) index deduplicates retried deliveries.
+
+Revision ID: 014_add_webhook_deliveries
+Revises: 013_index_audit_log_queries
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.column_types import UUID, JSON
+
+# revision identifiers
+revision = "014_add_webhook_deliveries"
+down_revision = "013_index_audit_log_queries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    if sa.inspect(conn).has_table("process_webhook_deliveries"):
+        return
+    op.create_table(
+        "process_webhook_deliveries",
+        sa.Column("id", UUID, primary_key=True),
+        sa.Column("org_id", UUID, nullable=False),
+        sa.Column("agent_id", UUID, sa.ForeignKey("agents.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("idempotency_key", sa.String(255), nullable=True),
+        sa.Column("correlation_id", sa.String(100), nullable=True),
+        sa.Column("payload", JSON, nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=True, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "uq_webhook_delivery_idempotency",
+        "process_webhook_deliveries",
+        ["agent_id", "idempotency_key"],
+        unique=True,
+    )
+    op.create_index(
+        "idx_webhook_delivery_agent_status",
+        "process_webhook_deliveries",
+        ["agent_id", "status"],
+    )
+    op.create_index(
+        "idx_webhook_delivery_status_created",
+        "process_webhook_deliveries",
+        ["status", "created_at"],
+    )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if sa.inspect(conn).has_table("process_webhook_deliveries"):
+        op.drop_table("process_webhook_deliveries")
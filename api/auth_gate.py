@@ -26,13 +26,18 @@ Design principles:
   ENABLE_DEBUG_ENDPOINTS=true.
 
 Non-/api routes (the SPA, /chat, static assets, /docs) are never touched.
+
+Implemented as a plain ASGI middleware (not BaseHTTPMiddleware): allowed
+requests are handed to the app with the original receive/send, so SSE chat
+streams and large assets are not copied through an extra task and memory
+stream, and streaming backpressure is preserved. The allowlist prefixes are
+compiled into one regex at import time.
 """
 
 import os
+import re
 import logging
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 logger = logging.getLogger("agentforge.auth_gate")
@@ -72,22 +77,31 @@ PUBLIC_API_PREFIXES = (
 )
 
 
+# One anchored alternation: "<prefix>..." or exactly "<prefix without trailing slash>"
+_PUBLIC_PREFIX_RE = re.compile("|".join(
+    f"{re.escape(prefix)}|{re.escape(prefix.rstrip('/'))}$" for prefix in PUBLIC_API_PREFIXES
+))
+
+
 def _is_public(path: str) -> bool:
-    if path in PUBLIC_API_PATHS:
-        return True
-    for prefix in PUBLIC_API_PREFIXES:
-        if path == prefix.rstrip("/") or path.startswith(prefix):
-            return True
-    return False
+    return path in PUBLIC_API_PATHS or _PUBLIC_PREFIX_RE.match(path) is not None
+
 
+def _bearer_token(headers) -> str:
+    """Bearer token from raw ASGI headers ("" when absent)"""
+    for key, value in headers:
+        if key == b"authorization":
+            auth = value.decode("latin-1")
+            if auth[:7].lower() != "bearer ":
+                return ""
+            return auth[7:].strip()
+    return ""
 
-def _has_valid_token(request: Request) -> bool:
+
+def _has_valid_token(scope) -> bool:
     if not _TOKEN_LAYER_OK or TokenService is None:
         return False
-    auth = request.headers.get("authorization")
-    if not auth or not auth.lower().startswith("bearer "):
-        return False
-    token = auth.split(" ", 1)[1].strip()
+    token = _bearer_token(scope["headers"])
     if not token:
         return False
     try:
@@ -96,45 +110,47 @@ def _has_valid_token(request: Request) -> bool:
         return False
 
 
-class AuthGateMiddleware(BaseHTTPMiddleware):
+class AuthGateMiddleware:
     def __init__(self, app):
-        super().__init__(app)
+        self.app = app
         self.mode = (os.environ.get("AUTH_GATE_MODE", "monitor") or "monitor").strip().lower()
+        self.enforce = self.mode == "enforce"
         self.debug_enabled = (os.environ.get("ENABLE_DEBUG_ENDPOINTS", "false") or "false").strip().lower() == "true"
         logger.warning(
             "auth_gate active: mode=%s debug_endpoints=%s token_layer_ok=%s",
             self.mode, self.debug_enabled, _TOKEN_LAYER_OK,
         )
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        method = request.method.upper()
-
+    async def __call__(self, scope, receive, send):
         # Only guard the API surface. SPA, /chat, static assets, /docs pass through.
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
         if not path.startswith("/api/"):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Always allow CORS preflight.
+        method = scope["method"].upper()
         if method == "OPTIONS":
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Debug endpoints are a production liability - hide them unless explicitly enabled.
         if path.startswith("/api/debug/") and not self.debug_enabled:
-            if self.mode == "enforce":
-                return JSONResponse({"detail": "Not found"}, status_code=404)
+            if self.enforce:
+                return await JSONResponse({"detail": "Not found"}, status_code=404)(scope, receive, send)
             logger.warning("auth_gate[monitor]: would BLOCK debug endpoint %s %s", method, path)
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Public login/health/channel endpoints.
         if _is_public(path):
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
         # Everything else under /api/* requires a valid bearer token.
-        if _has_valid_token(request):
-            return await call_next(request)
+        if _has_valid_token(scope):
+            return await self.app(scope, receive, send)
 
-        if self.mode == "enforce":
-            return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+        if self.enforce:
+            return await JSONResponse({"detail": "Not authenticated"}, status_code=401)(scope, receive, send)
 
         logger.warning("auth_gate[monitor]: would BLOCK %s %s (no valid bearer token)", method, path)
-        return await call_next(request)
+        return await self.app(scope, receive, send)
@@ -0,0 +1,220 @@
+"""
+Document Files - Word/Excel/PowerPoint files for the create_document tool
+
+Kept out of api/main.py so the renderer can be imported (and pickled) by
+document pool worker processes without loading the whole API application.
+"""
+import os
+import re
+import uuid
+
+from core.process.services.document_writers import STREAMING_LINE_THRESHOLD, write_xlsx_rows
+
+
+def _docx_add_runs(paragraph, line):
+    """Add text to a docx paragraph, honouring inline **bold**, *italic*, `code`."""
+    for part in re.split(r'(\*\*.+?\*\*|`.+?`|\*.+?\*)', line):
+        if not part:
+            continue
+        if len(part) >= 4 and part.startswith('**') and part.endswith('**'):
+            paragraph.add_run(part[2:-2]).bold = True
+        elif len(part) >= 2 and part.startswith('`') and part.endswith('`'):
+            r = paragraph.add_run(part[1:-1]); r.font.name = 'Consolas'
+        elif len(part) >= 2 and part.startswith('*') and part.endswith('*'):
+            paragraph.add_run(part[1:-1]).italic = True
+        else:
+            paragraph.add_run(part)
+
+
+def _shade_docx_cell(cell, hex_color):
+    """Fill a Word table cell with a background colour (python-docx has no API for this)."""
+    from docx.oxml.ns import qn
+    from docx.oxml import OxmlElement
+    tcPr = cell._tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), hex_color)
+    tcPr.append(shd)
+
+
+def _coerce_cell(v):
+    """Store numbers as real numbers so Excel can sum/sort them."""
+    s = str(v).strip()
+    if re.fullmatch(r'-?\d+', s):
+        try:
+            return int(s)
+        except Exception:
+            return s
+    if re.fullmatch(r'-?\d*\.\d+', s):
+        try:
+            return float(s)
+        except Exception:
+            return s
+    return s
+
+
+def generate_document_file(fmt: str, title: str, content: str, rows=None):
+    """Generate a formatted Word/Excel/PowerPoint file from agent-provided content.
+    Returns (filename, filepath). Uses python-docx / openpyxl / python-pptx.
+
+    Runs in the document process pool (see core.process.services.document_pool),
+    so it must stay a module-level function with picklable arguments."""
+    fmt = (fmt or 'docx').lower().strip()
+    if fmt in ('word', 'doc', 'document'):
+        fmt = 'docx'
+    elif fmt in ('excel', 'spreadsheet', 'sheet', 'xls'):
+        fmt = 'xlsx'
+    elif fmt in ('powerpoint', 'ppt', 'slides', 'deck', 'presentation'):
+        fmt = 'pptx'
+    out_dir = os.path.join(os.environ.get('UPLOAD_PATH', 'data/uploads'), 'generated')
+    os.makedirs(out_dir, exist_ok=True)
+    safe_title = re.sub(r'[^A-Za-z0-9_\- ]', '', (title or 'document')).strip() or 'document'
+    # Full 32-char token => the download link is an unguessable capability URL,
+    # so the file can be served without a bearer token (browser-clickable) safely.
+    fname = f"{safe_title[:40].replace(' ', '_')}_{uuid.uuid4().hex}.{fmt}"
+    fpath = os.path.join(out_dir, fname)
+    text = str(content or '')
+
+    if fmt == 'docx':
+        from docx import Document as _Docx
+        from docx.shared import Pt, RGBColor
+        doc = _Docx()
+        normal = doc.styles['Normal']
+        normal.font.name = 'Calibri'
+        normal.font.size = Pt(11)
+        if title:
+            doc.add_heading(title, level=0)  # Word "Title" style
+        lines = text.split('\n')
+        i = 0
+        while i < len(lines):
+            raw = lines[i]
+            s = raw.strip()
+            if not s:
+                i += 1
+                continue
+            # Markdown table: a row of pipes followed by a |---|--- separator.
+            if (s.startswith('|') and i + 1 < len(lines)
+                    and lines[i + 1].strip() and set(lines[i + 1].strip()) <= set('|-: ')):
+                block = []
+                while i < len(lines) and lines[i].strip().startswith('|'):
+                    block.append(lines[i].strip())
+                    i += 1
+                rows_cells = []
+                for tl in block:
+                    if tl and set(tl) <= set('|-: '):
+                        continue  # separator row
+                    rows_cells.append([c.strip() for c in tl.strip('|').split('|')])
+                if rows_cells:
+                    ncol = max(len(r) for r in rows_cells)
+                    table = doc.add_table(rows=0, cols=ncol)
+                    try:
+                        table.style = 'Table Grid'
+                    except Exception:
+                        pass
+                    for ri, rc in enumerate(rows_cells):
+                        cells = table.add_row().cells
+                        for ci in range(ncol):
+                            val = rc[ci] if ci < len(rc) else ''
+                            cell = cells[ci]
+                            p = cell.paragraphs[0]
+                            if ri == 0:
+                                # Coloured header: indigo fill, white bold text.
+                                run = p.add_run(val)
+                                run.bold = True
+                                run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+                                _shade_docx_cell(cell, '4F46E5')
+                            else:
+                                _docx_add_runs(p, val)
+                                if ri % 2 == 0:
+                                    _shade_docx_cell(cell, 'EEF0FB')  # subtle row banding
+                continue
+            if s.startswith('### '):
+                doc.add_heading(s[4:].strip(), level=3)
+            elif s.startswith('## '):
+                doc.add_heading(s[3:].strip(), level=2)
+            elif s.startswith('# '):
+                doc.add_heading(s[2:].strip(), level=1)
+            elif s.startswith(('- ', '* ')):
+                _docx_add_runs(doc.add_paragraph(style='List Bullet'), s[2:].strip())
+            elif re.match(r'^\d+\.\s', s):
+                _docx_add_runs(doc.add_paragraph(style='List Number'), re.sub(r'^\d+\.\s', '', s))
+            else:
+                _docx_add_runs(doc.add_paragraph(), raw.rstrip())
+            i += 1
+        doc.save(fpath)
+
+    elif fmt == 'xlsx':
+        import openpyxl as _oxl
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        data_rows = rows if isinstance(rows, list) and rows else [
+            (ln.split('\t') if '\t' in ln else ln.split(','))
+            for ln in text.split('\n') if ln.strip()
+        ]
+        if len(data_rows) >= STREAMING_LINE_THRESHOLD:
+            # Large exports: write-only workbook, rows streamed straight to disk
+            write_xlsx_rows(fpath, title, data_rows, header=True, coerce=_coerce_cell)
+            return fname, fpath
+        wb = _oxl.Workbook()
+        ws = wb.active
+        ws.title = (title or 'Sheet')[:31]
+        thin = Side(style='thin', color='D9D9D9')
+        border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        header_fill = PatternFill('solid', fgColor='4F46E5')
+        for ri, r in enumerate(data_rows):
+            cells = r if isinstance(r, list) else [r]
+            for ci, val in enumerate(cells):
+                cell = ws.cell(row=ri + 1, column=ci + 1, value=_coerce_cell(val))
+                cell.border = border
+                if ri == 0:
+                    cell.font = Font(bold=True, color='FFFFFF')
+                    cell.fill = header_fill
+                    cell.alignment = Alignment(horizontal='center', vertical='center')
+        for col_cells in ws.columns:
+            length = max((len(str(c.value)) for c in col_cells if c.value is not None), default=10)
+            ws.column_dimensions[col_cells[0].column_letter].width = min(max(length + 2, 10), 60)
+        if len(data_rows) > 1:
+            ws.freeze_panes = 'A2'
+        wb.save(fpath)
+
+    elif fmt == 'pptx':
+        from pptx import Presentation as _Prs
+        from pptx.util import Pt
+        prs = _Prs()
+        ts = prs.slides.add_slide(prs.slide_layouts[0])
+        try:
+            ts.shapes.title.text = title or 'Presentation'
+        except Exception:
+            pass
+        blocks = re.split(r'\n\s*\n|\n(?=#{1,3}\s)', text.strip())
+        for b in blocks:
+            lines = [ln.strip() for ln in b.split('\n') if ln.strip()]
+            if not lines:
+                continue
+            slide = prs.slides.add_slide(prs.slide_layouts[1])
+            try:
+                slide.shapes.title.text = lines[0].lstrip('#').strip()
+            except Exception:
+                pass
+            bullets = lines[1:] if len(lines) > 1 else []
+            try:
+                tf = slide.placeholders[1].text_frame
+                tf.clear()
+                for i, ln in enumerate(bullets):
+                    ln = ln.lstrip('-*').strip()
+                    para = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
+                    para.text = ln
+                    try:
+                        para.font.size = Pt(18)
+                    except Exception:
+                        pass
+            except Exception:
+                pass
+        prs.save(fpath)
+
+    else:
+        fname = fname.rsplit('.', 1)[0] + '.txt'
+        fpath = os.path.join(out_dir, fname)
+        with open(fpath, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return fname, fpath
@@ -0,0 +1,690 @@
+"""
+Lab Document Files - Word/PDF/Excel/PowerPoint renderers for the Lab module
+
+Kept out of api.modules.lab so document pool worker processes can import (and
+unpickle) the renderers without loading the lab router, api.security and the
+security state. Every create_* function is a module-level function taking
+picklable arguments (a file path and plain data) and returns the file size.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict
+
+# Document generation libraries
+try:
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+try:
+    from pptx import Presentation
+    from pptx.util import Inches as PptxInches
+    PPTX_AVAILABLE = True
+except ImportError:
+    PPTX_AVAILABLE = False
+
+
+def _money(data, val):
+    """Format a monetary value using the document's currency (symbol or ISO code)."""
+    cur = (str(data.get('currency') or '$')).strip()
+    try:
+        v = float(val or 0)
+    except Exception:
+        v = 0.0
+    # No space after a 1-char symbol ($, £, €); a space after a code (AED, USD).
+    return f"{cur}{v:,.2f}" if len(cur) == 1 else f"{cur} {v:,.2f}"
+
+
+def create_financial_docx(filepath: str, data: Dict[str, Any]) -> int:
+    """Create a professional Word invoice/receipt with tables."""
+    doc = Document()
+
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = Pt(11)
+
+    # Company header
+    header = doc.add_paragraph()
+    run = header.add_run(data.get("company", ""))
+    run.bold = True
+    run.font.size = Pt(22)
+
+    addr_lines = (data.get("company_address") or "").split('\n')
+    for line in addr_lines:
+        doc.add_paragraph(line)
+    phone = data.get("company_phone", "")
+    email = data.get("company_email", "")
+    if phone or email:
+        doc.add_paragraph(f"Phone: {phone}   |   Email: {email}")
+
+    doc.add_paragraph()
+
+    # Title (INVOICE / RECEIPT)
+    title_p = doc.add_paragraph()
+    title_p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    title_run = title_p.add_run("INVOICE")
+    title_run.bold = True
+    title_run.font.size = Pt(26)
+
+    # Metadata
+    meta_items = [
+        ("Invoice #:", data.get("document_number", "")),
+        ("Date:", data.get("document_date", "")),
+        ("Due Date:", data.get("due_date", "")),
+    ]
+    for label, val in meta_items:
+        p = doc.add_paragraph()
+        p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        p.add_run(f"{label} ").bold = True
+        p.add_run(val)
+
+    doc.add_paragraph()
+
+    # Bill To
+    bt = doc.add_paragraph()
+    bt.add_run("BILL TO:").bold = True
+    cust = doc.add_paragraph()
+    cust.add_run(data.get("customer_name", "")).bold = True
+    for line in (data.get("customer_address") or "").split('\n'):
+        doc.add_paragraph(line)
+    cust_email = data.get("customer_email", "")
+    if cust_email:
+        doc.add_paragraph(f"Email: {cust_email}")
+
+    doc.add_paragraph()
+
+    # Items table
+    items = data.get("items", [])
+    table = doc.add_table(rows=1 + len(items) + 3, cols=4)
+    table.style = 'Table Grid'
+
+    from docx.shared import RGBColor as _RGB
+    headers = ["Description", "Quantity", "Unit Price", "Amount"]
+    for i, h in enumerate(headers):
+        cell = table.rows[0].cells[i]
+        cell.text = h
+        _shade_cell(cell, _TABLE_HEADER_FILL)
+        for p in cell.paragraphs:
+            for r in p.runs:
+                r.bold = True
+                r.font.color.rgb = _RGB(0xFF, 0xFF, 0xFF)
+
+    for idx, item in enumerate(items):
+        row = table.rows[idx + 1].cells
+        row[0].text = item.get("description", "")
+        row[1].text = str(item.get("qty", 0))
+        row[2].text = _money(data, item.get('price', 0))
+        row[3].text = _money(data, item.get('qty', 0) * item.get('price', 0))
+
+    # Totals
+    st_row = len(items) + 1
+    table.rows[st_row].cells[2].text = "Subtotal:"
+    table.rows[st_row].cells[3].text = _money(data, data.get('subtotal', 0))
+    table.rows[st_row + 1].cells[2].text = f"{data.get('tax_label') or 'Tax'} ({data.get('tax_rate', '8%')}):"
+    table.rows[st_row + 1].cells[3].text = _money(data, data.get('tax', 0))
+    total_cell = table.rows[st_row + 2].cells[2]
+    total_cell.text = "TOTAL:"
+    for p in total_cell.paragraphs:
+        for r in p.runs:
+            r.bold = True
+    total_val = table.rows[st_row + 2].cells[3]
+    total_val.text = _money(data, data.get('total', 0))
+    for p in total_val.paragraphs:
+        for r in p.runs:
+            r.bold = True
+
+    doc.add_paragraph()
+    terms = doc.add_paragraph()
+    terms.add_run(f"Payment Terms: {data.get('payment_terms', 'Net 30')}").bold = True
+    doc.add_paragraph()
+    notes = doc.add_paragraph(data.get("notes", ""))
+    notes.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.save(filepath)
+    return os.path.getsize(filepath)
+
+
+def create_financial_pdf(filepath: str, data: Dict[str, Any]) -> int:
+    """Create a professional PDF invoice/receipt with tables."""
+    doc = SimpleDocTemplate(filepath, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    company_style = ParagraphStyle('Company', parent=styles['Heading1'], fontSize=22, textColor=colors.HexColor('#003366'), spaceAfter=6)
+    subtitle_style = ParagraphStyle('Sub', parent=styles['Normal'], fontSize=10, textColor=colors.grey)
+    title_style = ParagraphStyle('InvTitle', parent=styles['Heading1'], fontSize=28, textColor=colors.grey, alignment=2)
+    meta_style = ParagraphStyle('Meta', parent=styles['Normal'], fontSize=10, alignment=2)
+    bold_style = ParagraphStyle('Bold', parent=styles['Normal'], fontSize=10, fontName='Helvetica-Bold')
+
+    story.append(Paragraph(data.get("company", ""), company_style))
+    for line in (data.get("company_address") or "").split('\n'):
+        story.append(Paragraph(line, subtitle_style))
+    phone = data.get("company_phone", "")
+    email = data.get("company_email", "")
+    if phone or email:
+        story.append(Paragraph(f"Phone: {phone}  |  Email: {email}", subtitle_style))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("INVOICE", title_style))
+    story.append(Paragraph(f"Invoice #: {data.get('document_number', '')}", meta_style))
+    story.append(Paragraph(f"Date: {data.get('document_date', '')}", meta_style))
+    story.append(Paragraph(f"Due: {data.get('due_date', '')}", meta_style))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("<b>BILL TO:</b>", bold_style))
+    story.append(Paragraph(f"<b>{data.get('customer_name', '')}</b>", styles['Normal']))
+    for line in (data.get("customer_address") or "").split('\n'):
+        story.append(Paragraph(line, styles['Normal']))
+    cust_email = data.get("customer_email", "")
+    if cust_email:
+        story.append(Paragraph(f"Email: {cust_email}", styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    # Items table
+    items = data.get("items", [])
+    table_data = [["Description", "Qty", "Unit Price", "Amount"]]
+    for item in items:
+        table_data.append([
+            item.get("description", ""),
+            str(item.get("qty", 0)),
+            _money(data, item.get('price', 0)),
+            _money(data, item.get('qty', 0) * item.get('price', 0)),
+        ])
+    table_data.append(["", "", "Subtotal:", _money(data, data.get('subtotal', 0))])
+    table_data.append(["", "", f"{data.get('tax_label') or 'Tax'} ({data.get('tax_rate', '8%')}):", _money(data, data.get('tax', 0))])
+    table_data.append(["", "", "TOTAL:", _money(data, data.get('total', 0))])
+
+    t = Table(table_data, colWidths=[250, 50, 80, 80])
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#003366')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -4), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.white, colors.HexColor('#f5f5f5')]),
+        ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 30))
+
+    story.append(Paragraph(f"<b>Payment Terms:</b> {data.get('payment_terms', 'Net 30')}", styles['Normal']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(data.get("notes", ""), ParagraphStyle('Notes', parent=styles['Normal'], alignment=1, textColor=colors.grey)))
+
+    doc.build(story)
+    return os.path.getsize(filepath)
+
+
+def create_financial_xlsx(filepath: str, data: Dict[str, Any]) -> int:
+    """Create a professional Excel invoice/receipt."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Invoice"
+
+    header_font = Font(bold=True, size=12, color="FFFFFF")
+    header_fill = PatternFill(start_color="003366", end_color="003366", fill_type="solid")
+    bold_font = Font(bold=True)
+    thin_border = Border(
+        left=Side(style='thin'), right=Side(style='thin'),
+        top=Side(style='thin'), bottom=Side(style='thin')
+    )
+
+    ws['A1'] = data.get("company", "")
+    ws['A1'].font = Font(bold=True, size=18, color="003366")
+    ws.merge_cells('A1:D1')
+
+    ws['A2'] = (data.get("company_address") or "").replace('\n', ', ')
+    ws['A3'] = f"Phone: {data.get('company_phone', '')}  |  Email: {data.get('company_email', '')}"
+
+    ws['C5'] = "INVOICE"
+    ws['C5'].font = Font(bold=True, size=16)
+    ws['A6'] = "Invoice #:"
+    ws['A6'].font = bold_font
+    ws['B6'] = data.get("document_number", "")
+    ws['A7'] = "Date:"
+    ws['A7'].font = bold_font
+    ws['B7'] = data.get("document_date", "")
+    ws['A8'] = "Due Date:"
+    ws['A8'].font = bold_font
+    ws['B8'] = data.get("due_date", "")
+
+    ws['A10'] = "Bill To:"
+    ws['A10'].font = bold_font
+    ws['A11'] = data.get("customer_name", "")
+    ws['A11'].font = bold_font
+    ws['A12'] = (data.get("customer_address") or "").replace('\n', ', ')
+
+    headers = ["Description", "Qty", "Unit Price", "Amount"]
+    for col, h in enumerate(headers, 1):
+        cell = ws.cell(row=14, column=col, value=h)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = thin_border
+
+    items = data.get("items", [])
+    for idx, item in enumerate(items):
+        r = 15 + idx
+        ws.cell(row=r, column=1, value=item.get("description", "")).border = thin_border
+        ws.cell(row=r, column=2, value=item.get("qty", 0)).border = thin_border
+        ws.cell(row=r, column=3, value=_money(data, item.get('price', 0))).border = thin_border
+        ws.cell(row=r, column=4, value=_money(data, item.get('qty', 0) * item.get('price', 0))).border = thin_border
+
+    tr = 15 + len(items) + 1
+    ws.cell(row=tr, column=3, value="Subtotal:").font = bold_font
+    ws.cell(row=tr, column=4, value=_money(data, data.get('subtotal', 0)))
+    ws.cell(row=tr + 1, column=3, value=f"{data.get('tax_label') or 'Tax'} ({data.get('tax_rate', '8%')}):").font = bold_font
+    ws.cell(row=tr + 1, column=4, value=_money(data, data.get('tax', 0)))
+    ws.cell(row=tr + 2, column=3, value="TOTAL:").font = Font(bold=True, size=12)
+    ws.cell(row=tr + 2, column=4, value=_money(data, data.get('total', 0))).font = Font(bold=True, size=12)
+
+    ws.column_dimensions['A'].width = 45
+    ws.column_dimensions['B'].width = 10
+    ws.column_dimensions['C'].width = 15
+    ws.column_dimensions['D'].width = 15
+
+    wb.save(filepath)
+    return os.path.getsize(filepath)
+
+# ------------------------------------------------------------------
+# Markdown-based renderers (for general/non-financial docs)
+# ------------------------------------------------------------------
+
+# ---- Markdown rendering helpers (shared by docx/pptx) ----
+
+
+def _md_runs(paragraph, text):
+    """Add text to a docx paragraph, rendering **bold**, *italic*, `code`."""
+    text = re.sub(r'\[([^\]]+)\]\([^)]*\)', r'\1', text or '')  # [label](url) -> label
+    for tok in re.split(r'(\*\*.+?\*\*|\*.+?\*|`.+?`)', text or ''):
+        if not tok:
+            continue
+        if tok.startswith('**') and tok.endswith('**'):
+            paragraph.add_run(tok[2:-2]).bold = True
+        elif tok.startswith('*') and tok.endswith('*'):
+            paragraph.add_run(tok[1:-1]).italic = True
+        elif tok.startswith('`') and tok.endswith('`'):
+            paragraph.add_run(tok[1:-1])
+        else:
+            paragraph.add_run(tok)
+
+
+def _md_strip(text):
+    t = re.sub(r'\[([^\]]+)\]\([^)]*\)', r'\1', text or '')  # [label](url) -> label
+    t = re.sub(r'\*\*(.+?)\*\*', r'\1', t)
+    t = re.sub(r'`(.+?)`', r'\1', t)
+    return t.replace('*', '').strip()
+
+
+def _is_md_table_sep(line):
+    s = (line or '').strip()
+    return bool(re.match(r'^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)+\|?$', s))
+
+
+def _md_table_cells(line):
+    s = (line or '').strip()
+    if s.startswith('|'):
+        s = s[1:]
+    if s.endswith('|'):
+        s = s[:-1]
+    return [c.strip() for c in s.split('|')]
+
+
+def _shade_cell(cell, hex_fill):
+    """Apply a solid background fill to a table cell (python-docx has no direct API)."""
+    from docx.oxml.ns import qn
+    from docx.oxml import OxmlElement
+    tcPr = cell._tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), hex_fill)
+    tcPr.append(shd)
+
+# Header fill + zebra stripe used for all generated tables.
+
+
+_TABLE_HEADER_FILL = '1F3A5F'
+_TABLE_ZEBRA_FILL = 'EEF2F9'
+
+
+def _docx_table(doc, header, rows):
+    from docx.shared import RGBColor
+    ncols = max(len(header), max((len(r) for r in rows), default=0)) or 1
+    table = doc.add_table(rows=1, cols=ncols)
+    try:
+        table.style = 'Table Grid'  # clean thin borders; we colour cells ourselves
+    except Exception:
+        pass
+    # Header row: navy fill + white bold text (readable, professional).
+    hdr = table.rows[0].cells
+    for c in range(ncols):
+        hdr[c].text = ''
+        _shade_cell(hdr[c], _TABLE_HEADER_FILL)
+        _md_runs(hdr[c].paragraphs[0], header[c] if c < len(header) else '')
+        for run in hdr[c].paragraphs[0].runs:
+            run.bold = True
+            run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+    # Body rows: zebra striping for readability.
+    for ri, r in enumerate(rows):
+        cells = table.add_row().cells
+        for c in range(ncols):
+            cells[c].text = ''
+            if ri % 2 == 1:
+                _shade_cell(cells[c], _TABLE_ZEBRA_FILL)
+            _md_runs(cells[c].paragraphs[0], r[c] if c < len(r) else '')
+    return table
+
+
+def create_docx(filepath: str, title: str, content: str) -> int:
+    """Create a Word document from markdown content (native tables + bold)."""
+    doc = Document()
+    doc.add_heading(title, 0)
+
+    lines = content.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+
+        # Skip markdown horizontal rules (---, ***, ___) — they otherwise print literally.
+        if re.match(r'^(-{3,}|\*{3,}|_{3,})$', line):
+            i += 1
+            continue
+
+        if line.startswith('|') and i + 1 < len(lines) and _is_md_table_sep(lines[i + 1]):
+            header = _md_table_cells(line)
+            body = []
+            j = i + 2
+            while j < len(lines) and lines[j].strip().startswith('|'):
+                body.append(_md_table_cells(lines[j]))
+                j += 1
+            _docx_table(doc, header, body)
+            i = j
+            continue
+
+        if line.startswith('### '):
+            doc.add_heading(line[4:], 3)
+        elif line.startswith('## '):
+            doc.add_heading(line[3:], 2)
+        elif line.startswith('# '):
+            doc.add_heading(line[2:], 1)
+        elif line.startswith('- ') or line.startswith('* '):
+            _md_runs(doc.add_paragraph(style='List Bullet'), line[2:])
+        elif re.match(r'^\d+\.\s', line):
+            _md_runs(doc.add_paragraph(style='List Number'), re.sub(r'^\d+\.\s', '', line))
+        else:
+            _md_runs(doc.add_paragraph(), line)
+        i += 1
+
+    doc.save(filepath)
+    return os.path.getsize(filepath)
+
+
+def _md_to_rl(text):
+    """Convert inline markdown to ReportLab markup (escapes &<> then **bold**, *italic*, `code`)."""
+    import html as _html
+    t = _html.escape(text or '')
+    t = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', t)
+    t = re.sub(r'`(.+?)`', r'<font face="Courier">\1</font>', t)
+    t = re.sub(r'(?<!\*)\*(?!\*)([^*]+?)\*(?!\*)', r'<i>\1</i>', t)
+    return t
+
+
+def create_pdf(filepath: str, title: str, content: str) -> int:
+    """Create a PDF document from markdown (renders bold, bullets and tables)."""
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib import colors
+    from core.process.services.document_writers import is_large_document, write_pdf_lines
+    if is_large_document(content):
+        return write_pdf_lines(filepath, title, content.split('\n'))
+    doc = SimpleDocTemplate(filepath, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=24)
+    story.append(Paragraph(_md_to_rl(title), title_style))
+    story.append(Spacer(1, 12))
+
+    lines = content.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            story.append(Spacer(1, 8)); i += 1; continue
+        # Skip horizontal rules
+        if re.match(r'^(-{3,}|\*{3,}|_{3,})$', line):
+            i += 1; continue
+        # Markdown table -> ReportLab Table
+        if line.startswith('|') and i + 1 < len(lines) and _is_md_table_sep(lines[i + 1]):
+            header = _md_table_cells(line)
+            rows = []
+            j = i + 2
+            while j < len(lines) and lines[j].strip().startswith('|'):
+                rows.append(_md_table_cells(lines[j])); j += 1
+            cell = ParagraphStyle('cell', parent=styles['Normal'], fontSize=9, leading=12)
+            data = [[Paragraph(_md_to_rl(c), cell) for c in header]] + \
+                   [[Paragraph(_md_to_rl(c), cell) for c in r] for r in rows]
+            tbl = Table(data, hAlign='LEFT')
+            tbl.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f3a5f')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f3f6fb')]),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+                ('LEFTPADDING', (0, 0), (-1, -1), 6), ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+                ('TOPPADDING', (0, 0), (-1, -1), 4), ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ]))
+            story.append(tbl); story.append(Spacer(1, 10)); i = j; continue
+
+        if line.startswith('### '):
+            story.append(Paragraph(_md_to_rl(line[4:]), styles['Heading3']))
+        elif line.startswith('## '):
+            story.append(Paragraph(_md_to_rl(line[3:]), styles['Heading2']))
+        elif line.startswith('# '):
+            story.append(Paragraph(_md_to_rl(line[2:]), styles['Heading1']))
+        elif line.startswith('- ') or line.startswith('* '):
+            story.append(Paragraph(_md_to_rl(line[2:]), styles['Normal'], bulletText='•'))
+        elif re.match(r'^\d+\.\s', line):
+            story.append(Paragraph(_md_to_rl(re.sub(r'^\d+\.\s', '', line)), styles['Normal'], bulletText='•'))
+        else:
+            story.append(Paragraph(_md_to_rl(line), styles['Normal']))
+        i += 1
+
+    doc.build(story)
+    return os.path.getsize(filepath)
+
+
+def create_xlsx(filepath: str, title: str, content: str) -> int:
+    """Create an Excel document"""
+    from core.process.services.document_writers import is_large_document, markdown_rows, write_xlsx_rows
+    if is_large_document(content):
+        return write_xlsx_rows(filepath, title, markdown_rows(content), header=False)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title[:31]  # Excel sheet names limited to 31 chars
+    
+    # Style
+    header_font = Font(bold=True, size=14)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    
+    # Title
+    ws['A1'] = title
+    ws['A1'].font = Font(bold=True, size=18)
+    ws.merge_cells('A1:E1')
+    
+    # Parse content and try to create table-like structure
+    row = 3
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        
+        if line.startswith('|'):
+            # Table row
+            cells = [c.strip() for c in line.split('|')[1:-1]]
+            # Skip markdown table separator rows (|---|---|) so they don't become a row of dashes.
+            if cells and all(re.fullmatch(r':?-{2,}:?', c or '') for c in cells):
+                continue
+            for col, cell in enumerate(cells, 1):
+                ws.cell(row=row, column=col, value=cell)
+            row += 1
+        elif line.startswith('#'):
+            # Header
+            ws.cell(row=row, column=1, value=line.lstrip('#').strip())
+            ws.cell(row=row, column=1).font = header_font
+            row += 1
+        else:
+            ws.cell(row=row, column=1, value=line)
+            row += 1
+    
+    wb.save(filepath)
+    return os.path.getsize(filepath)
+
+
+def _pptx_runs(paragraph, text):
+    text = re.sub(r'\[([^\]]+)\]\([^)]*\)', r'\1', text or '')  # [label](url) -> label
+    for tok in re.split(r'(\*\*.+?\*\*|\*.+?\*|`.+?`)', text or ''):
+        if not tok:
+            continue
+        run = paragraph.add_run()
+        if tok.startswith('**') and tok.endswith('**'):
+            run.text = tok[2:-2]; run.font.bold = True
+        elif tok.startswith('*') and tok.endswith('*'):
+            run.text = tok[1:-1]; run.font.italic = True
+        elif tok.startswith('`') and tok.endswith('`'):
+            run.text = tok[1:-1]
+        else:
+            run.text = tok
+
+
+def _pptx_table_slide(prs, title, header, rows):
+    try:
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+    except Exception:
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+    try:
+        if slide.shapes.title:
+            slide.shapes.title.text = _md_strip(title) or 'Details'
+    except Exception:
+        pass
+    ncols = max(len(header), max((len(r) for r in rows), default=1)) or 1
+    nrows = 1 + len(rows)
+    left = PptxInches(0.5); top = PptxInches(1.6)
+    width = PptxInches(9); height = PptxInches(min(0.4 * nrows + 0.3, 5))
+    tbl = slide.shapes.add_table(nrows, ncols, left, top, width, height).table
+    for c in range(ncols):
+        tbl.cell(0, c).text = _md_strip(header[c]) if c < len(header) else ''
+    for ri, r in enumerate(rows, start=1):
+        for c in range(ncols):
+            tbl.cell(ri, c).text = _md_strip(r[c]) if c < len(r) else ''
+    return tbl
+
+
+def create_pptx(filepath: str, title: str, content: str) -> int:
+    """Create a PowerPoint from markdown (native tables + bold bullets)."""
+    prs = Presentation()
+
+    slide = prs.slides.add_slide(prs.slide_layouts[0])
+    slide.shapes.title.text = title
+    try:
+        slide.placeholders[1].text = datetime.utcnow().strftime("%B %Y")
+    except Exception:
+        pass
+
+    bullet_layout = prs.slide_layouts[1]
+    state = {'slide': None, 'points': []}
+
+    def flush():
+        if state['slide'] and state['points']:
+            tf = state['slide'].shapes.placeholders[1].text_frame
+            tf.clear()
+            for idx, point in enumerate(state['points']):
+                p = tf.paragraphs[0] if idx == 0 else tf.add_paragraph()
+                _pptx_runs(p, point)
+        state['points'] = []
+
+    def ensure_slide():
+        if not state['slide']:
+            state['slide'] = prs.slides.add_slide(bullet_layout)
+            state['slide'].shapes.title.text = title
+
+    lines = content.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+        # Skip markdown horizontal rules (---, ***, ___) so they don't become bullets/slides.
+        if re.fullmatch(r'[-*_]{3,}', line):
+            i += 1
+            continue
+        if line.startswith('|') and i + 1 < len(lines) and _is_md_table_sep(lines[i + 1]):
+            flush()
+            header = _md_table_cells(line)
+            body = []
+            j = i + 2
+            while j < len(lines) and lines[j].strip().startswith('|'):
+                body.append(_md_table_cells(lines[j]))
+                j += 1
+            ttl = state['slide'].shapes.title.text if state['slide'] else title
+            _pptx_table_slide(prs, ttl, header, body)
+            i = j
+            continue
+        if line.startswith('|'):
+            # Stray table row without a separator: render cells inline, drop pure separators.
+            _cells = _md_table_cells(line)
+            if not _cells or all(re.fullmatch(r':?-{2,}:?', c or '') for c in _cells):
+                i += 1
+                continue
+            ensure_slide()
+            state['points'].append(' | '.join(_cells))
+            i += 1
+            continue
+        if line.startswith('# ') or line.startswith('## '):
+            flush()
+            state['slide'] = prs.slides.add_slide(bullet_layout)
+            state['slide'].shapes.title.text = _md_strip(line.lstrip('#').strip())
+        elif line.startswith('### '):
+            ensure_slide()
+            state['points'].append(_md_strip(line[4:]))
+        elif line.startswith('- ') or line.startswith('* '):
+            ensure_slide()
+            state['points'].append(line[2:])
+        else:
+            ensure_slide()
+            state['points'].append(line)
+        i += 1
+
+    flush()
+    prs.save(filepath)
+    return os.path.getsize(filepath)
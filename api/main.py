@@ -2969,208 +2969,6 @@ def build_tool_definitions(tools: List['ToolConfiguration']) -> List[Dict]:
     return tool_defs
 
 
-def _docx_add_runs(paragraph, line):
-    """Add text to a docx paragraph, honouring inline **bold**, *italic*, `code`."""
-    for part in re.split(r'(\*\*.+?\*\*|`.+?`|\*.+?\*)', line):
-        if not part:
-            continue
-        if len(part) >= 4 and part.startswith('**') and part.endswith('**'):
-            paragraph.add_run(part[2:-2]).bold = True
-        elif len(part) >= 2 and part.startswith('`') and part.endswith('`'):
-            r = paragraph.add_run(part[1:-1]); r.font.name = 'Consolas'
-        elif len(part) >= 2 and part.startswith('*') and part.endswith('*'):
-            paragraph.add_run(part[1:-1]).italic = True
-        else:
-            paragraph.add_run(part)
-
-
-def _shade_docx_cell(cell, hex_color):
-    """Fill a Word table cell with a background colour (python-docx has no API for this)."""
-    from docx.oxml.ns import qn
-    from docx.oxml import OxmlElement
-    tcPr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:val'), 'clear')
-    shd.set(qn('w:color'), 'auto')
-    shd.set(qn('w:fill'), hex_color)
-    tcPr.append(shd)
-
-
-def _coerce_cell(v):
-    """Store numbers as real numbers so Excel can sum/sort them."""
-    s = str(v).strip()
-    if re.fullmatch(r'-?\d+', s):
-        try:
-            return int(s)
-        except Exception:
-            return s
-    if re.fullmatch(r'-?\d*\.\d+', s):
-        try:
-            return float(s)
-        except Exception:
-            return s
-    return s
-
-
-def _generate_document_file(fmt: str, title: str, content: str, rows=None):
-    """Generate a formatted Word/Excel/PowerPoint file from agent-provided content.
-    Returns (filename, filepath). Uses python-docx / openpyxl / python-pptx."""
-    fmt = (fmt or 'docx').lower().strip()
-    if fmt in ('word', 'doc', 'document'):
-        fmt = 'docx'
-    elif fmt in ('excel', 'spreadsheet', 'sheet', 'xls'):
-        fmt = 'xlsx'
-    elif fmt in ('powerpoint', 'ppt', 'slides', 'deck', 'presentation'):
-        fmt = 'pptx'
-    out_dir = os.path.join(os.environ.get('UPLOAD_PATH', 'data/uploads'), 'generated')
-    os.makedirs(out_dir, exist_ok=True)
-    safe_title = re.sub(r'[^A-Za-z0-9_\- ]', '', (title or 'document')).strip() or 'document'
-    # Full 32-char token => the download link is an unguessable capability URL,
-    # so the file can be served without a bearer token (browser-clickable) safely.
-    fname = f"{safe_title[:40].replace(' ', '_')}_{uuid.uuid4().hex}.{fmt}"
-    fpath = os.path.join(out_dir, fname)
-    text = str(content or '')
-
-    if fmt == 'docx':
-        from docx import Document as _Docx
-        from docx.shared import Pt, RGBColor
-        doc = _Docx()
-        normal = doc.styles['Normal']
-        normal.font.name = 'Calibri'
-        normal.font.size = Pt(11)
-        if title:
-            doc.add_heading(title, level=0)  # Word "Title" style
-        lines = text.split('\n')
-        i = 0
-        while i < len(lines):
-            raw = lines[i]
-            s = raw.strip()
-            if not s:
-                i += 1
-                continue
-            # Markdown table: a row of pipes followed by a |---|--- separator.
-            if (s.startswith('|') and i + 1 < len(lines)
-                    and lines[i + 1].strip() and set(lines[i + 1].strip()) <= set('|-: ')):
-                block = []
-                while i < len(lines) and lines[i].strip().startswith('|'):
-                    block.append(lines[i].strip())
-                    i += 1
-                rows_cells = []
-                for tl in block:
-                    if tl and set(tl) <= set('|-: '):
-                        continue  # separator row
-                    rows_cells.append([c.strip() for c in tl.strip('|').split('|')])
-                if rows_cells:
-                    ncol = max(len(r) for r in rows_cells)
-                    table = doc.add_table(rows=0, cols=ncol)
-                    try:
-                        table.style = 'Table Grid'
-                    except Exception:
-                        pass
-                    for ri, rc in enumerate(rows_cells):
-                        cells = table.add_row().cells
-                        for ci in range(ncol):
-                            val = rc[ci] if ci < len(rc) else ''
-                            cell = cells[ci]
-                            p = cell.paragraphs[0]
-                            if ri == 0:
-                                # Coloured header: indigo fill, white bold text.
-                                run = p.add_run(val)
-                                run.bold = True
-                                run.font.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
-                                _shade_docx_cell(cell, '4F46E5')
-                            else:
-                                _docx_add_runs(p, val)
-                                if ri % 2 == 0:
-                                    _shade_docx_cell(cell, 'EEF0FB')  # subtle row banding
-                continue
-            if s.startswith('### '):
-                doc.add_heading(s[4:].strip(), level=3)
-            elif s.startswith('## '):
-                doc.add_heading(s[3:].strip(), level=2)
-            elif s.startswith('# '):
-                doc.add_heading(s[2:].strip(), level=1)
-            elif s.startswith(('- ', '* ')):
-                _docx_add_runs(doc.add_paragraph(style='List Bullet'), s[2:].strip())
-            elif re.match(r'^\d+\.\s', s):
-                _docx_add_runs(doc.add_paragraph(style='List Number'), re.sub(r'^\d+\.\s', '', s))
-            else:
-                _docx_add_runs(doc.add_paragraph(), raw.rstrip())
-            i += 1
-        doc.save(fpath)
-
-    elif fmt == 'xlsx':
-        import openpyxl as _oxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        wb = _oxl.Workbook()
-        ws = wb.active
-        ws.title = (title or 'Sheet')[:31]
-        data_rows = rows if isinstance(rows, list) and rows else [
-            (ln.split('\t') if '\t' in ln else ln.split(','))
-            for ln in text.split('\n') if ln.strip()
-        ]
-        thin = Side(style='thin', color='D9D9D9')
-        border = Border(left=thin, right=thin, top=thin, bottom=thin)
-        header_fill = PatternFill('solid', fgColor='4F46E5')
-        for ri, r in enumerate(data_rows):
-            cells = r if isinstance(r, list) else [r]
-            for ci, val in enumerate(cells):
-                cell = ws.cell(row=ri + 1, column=ci + 1, value=_coerce_cell(val))
-                cell.border = border
-                if ri == 0:
-                    cell.font = Font(bold=True, color='FFFFFF')
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-        for col_cells in ws.columns:
-            length = max((len(str(c.value)) for c in col_cells if c.value is not None), default=10)
-            ws.column_dimensions[col_cells[0].column_letter].width = min(max(length + 2, 10), 60)
-        if len(data_rows) > 1:
-            ws.freeze_panes = 'A2'
-        wb.save(fpath)
-
-    elif fmt == 'pptx':
-        from pptx import Presentation as _Prs
-        from pptx.util import Pt
-        prs = _Prs()
-        ts = prs.slides.add_slide(prs.slide_layouts[0])
-        try:
-            ts.shapes.title.text = title or 'Presentation'
-        except Exception:
-            pass
-        blocks = re.split(r'\n\s*\n|\n(?=#{1,3}\s)', text.strip())
-        for b in blocks:
-            lines = [ln.strip() for ln in b.split('\n') if ln.strip()]
-            if not lines:
-                continue
-            slide = prs.slides.add_slide(prs.slide_layouts[1])
-            try:
-                slide.shapes.title.text = lines[0].lstrip('#').strip()
-            except Exception:
-                pass
-            bullets = lines[1:] if len(lines) > 1 else []
-            try:
-                tf = slide.placeholders[1].text_frame
-                tf.clear()
-                for i, ln in enumerate(bullets):
-                    ln = ln.lstrip('-*').strip()
-                    para = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
-                    para.text = ln
-                    try:
-                        para.font.size = Pt(18)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-        prs.save(fpath)
-
-    else:
-        fname = fname.rsplit('.', 1)[0] + '.txt'
-        fpath = os.path.join(out_dir, fname)
-        with open(fpath, 'w', encoding='utf-8') as f:
-            f.write(text)
-    return fname, fpath
-
-
 async def execute_tool(tool_id: str, tool_type: str, arguments: Dict) -> Dict:
     """Execute a tool and return the result"""
     print(f"\n🔧 EXECUTING TOOL")
@@ -3479,7 +3277,9 @@ async def execute_tool(tool_id: str, tool_type: str, arguments: Dict) -> Dict:
             if not content and not rows:
                 return {"success": False, "error": "No content provided. Pass 'content' (text/CSV/slides) to put in the document."}
             try:
-                fname, fpath = _generate_document_file(fmt, title, content, rows)
+                from api.document_files import generate_document_file
+                from core.process.services.document_pool import run_document_job
+                fname, fpath = await run_document_job(generate_document_file, fmt, title, content, rows)
                 size = os.path.getsize(fpath)
                 return {
                     "success": True,
@@ -4965,6 +4765,18 @@ async def lifespan(app: FastAPI):
         if SECURITY_AVAILABLE:
             security_state.load_from_disk()
             print(f"✅ Security module loaded - {len(security_state.users)} users, {len(security_state.roles)} roles")
+            # Mirror LDAP directories into the local user tables in the background
+            security_state.ldap_sync.start()
+            # Expire sessions, MFA codes and reset tokens in the background
+            security_state.expiry_sweeper.track_all()
+            security_state.expiry_sweeper.start()
+        
+        # Start executions for queued process webhooks
+        try:
+            from api.modules.process.webhook_queue import get_webhook_queue
+            get_webhook_queue().start()
+        except Exception as queue_err:
+            print(f"⚠️ Webhook queue not started: {queue_err}")
         
         # Test endpoints to catch any import/runtime errors
         print("🧪 Testing endpoints...")
@@ -4984,8 +4796,67 @@ async def lifespan(app: FastAPI):
         
         # Save Security State
         if SECURITY_AVAILABLE:
+            # Each stop is guarded so a failure cannot skip saving the state
+            try:
+                await security_state.ldap_sync.stop()
+            except Exception as stop_err:
+                print(f"⚠️ LDAP sync shutdown warning: {stop_err}")
+            try:
+                await security_state.expiry_sweeper.stop()
+            except Exception as stop_err:
+                print(f"⚠️ Expiry sweeper shutdown warning: {stop_err}")
+            try:
+                security_state.audit_writer.shutdown()
+            except Exception as stop_err:
+                print(f"⚠️ Audit writer shutdown warning: {stop_err}")
             security_state.save_to_disk()
             print("✅ Security state saved")
+
+        # Stop draining process webhooks (queued ones stay in the table)
+        try:
+            from api.modules.process.webhook_queue import get_webhook_queue
+            await get_webhook_queue().stop()
+        except Exception as queue_err:
+            print(f"⚠️ Webhook queue shutdown warning: {queue_err}")
+
+        # Close pooled HTTP sessions and queue clients used by process integration nodes
+        try:
+            from core.process.services.http_pool import get_http_session_pool
+            from core.process.services.queue_clients import get_queue_client_pool
+            from core.process.services.notification_outbox import get_notification_outbox
+            from core.process.services.smtp_pool import get_smtp_pool
+            # Deliver queued notifications before their SMTP connections close
+            await get_notification_outbox().stop()
+            await get_http_session_pool().close_all()
+            await get_queue_client_pool().close_all()
+            await get_smtp_pool().close_all()
+        except Exception as pool_err:
+            print(f"⚠️ Integration client pool shutdown warning: {pool_err}")
+
+        # Stop document generation worker processes
+        try:
+            from core.process.services.document_pool import get_document_pool
+            get_document_pool().shutdown(wait=False)
+        except Exception as pool_err:
+            print(f"⚠️ Document pool shutdown warning: {pool_err}")
+        # Stop password hashing worker processes
+        try:
+            from core.security.services import get_password_hash_pool
+            get_password_hash_pool().shutdown(wait=False)
+        except Exception as pool_err:
+            print(f"⚠️ Password hash pool shutdown warning: {pool_err}")
+        # Close pooled LDAP connections
+        try:
+            from core.security.ldap_directory import close_ldap_pools
+            close_ldap_pools()
+        except Exception as pool_err:
+            print(f"⚠️ LDAP pool shutdown warning: {pool_err}")
+        # Close pooled HR API connections
+        try:
+            from core.identity.hr_client import get_hr_api_client
+            get_hr_api_client().close()
+        except Exception as pool_err:
+            print(f"⚠️ HR API client shutdown warning: {pool_err}")
     except Exception as e:
         print(f"❌❌❌ STARTUP ERROR: {e}")
         import traceback
@@ -8733,8 +8604,18 @@ def _af_cors():
         "Access-Control-Allow-Methods": "POST, OPTIONS",
         "Access-Control-Allow-Headers": "Content-Type, X-API-Key, Authorization",
         "Access-Control-Max-Age": "86400",
+        "Access-Control-Expose-Headers": "Retry-After, X-RateLimit-Limit, X-RateLimit-Remaining, X-RateLimit-Reset",
     }
 
+from api.rate_limit import (
+    get_rate_limiter as _af_rate_limiter, client_ip as _af_client_ip, RateLimitExceeded as _AFRateLimitExceeded,
+    PUBLIC_API_PER_IP as _AF_LIMIT_IP, PUBLIC_API_PER_KEY as _AF_LIMIT_KEY,
+    PUBLIC_API_PER_AGENT as _AF_LIMIT_AGENT, PUBLIC_API_MAX_CONCURRENT_PER_KEY as _AF_MAX_CONCURRENT,
+)
+
+def _af_rate_limited(headers, message="Too many requests. Please slow down and retry later."):
+    return _AFJSONResponse({"error": message}, status_code=429, headers={**_af_cors(), **headers})
+
 def _af_integration_view(agent_id, cfg, base):
     agent = app_state.agents.get(agent_id)
     atype = getattr(agent, "agent_type", None) or (cfg or {}).get("agent_type") or "conversational"
@@ -8845,11 +8726,22 @@ async def public_agent_chat(agent_id: str, request: _AFRequest):
     api_key = (request.headers.get("x-api-key") or request.headers.get("X-API-Key")
                or (body or {}).get("api_key") or request.query_params.get("key"))
 
+    limiter = _af_rate_limiter()
+    try:
+        # Per-IP limit first, so invalid keys are throttled too
+        await limiter.check(((_AF_LIMIT_IP, _af_client_ip(request)),))
+    except _AFRateLimitExceeded as e:
+        return _af_rate_limited(e.headers)
+
     cfg = _af_load_integrations().get(agent_id)
     if not cfg or not cfg.get("enabled") or not cfg.get("api_key"):
         return _AFJSONResponse({"error": "This agent is not publicly available."}, status_code=403, headers=_af_cors())
     if not api_key or api_key != cfg.get("api_key"):
         return _AFJSONResponse({"error": "Invalid API key."}, status_code=401, headers=_af_cors())
+    try:
+        rl_headers = await limiter.check(((_AF_LIMIT_KEY, api_key), (_AF_LIMIT_AGENT, agent_id)))
+    except _AFRateLimitExceeded as e:
+        return _af_rate_limited(e.headers)
     atts_in = (body or {}).get("attachments") or []
     if not message and not atts_in:
         return _AFJSONResponse({"error": "message is required"}, status_code=400, headers=_af_cors())
@@ -8903,6 +8795,12 @@ async def public_agent_chat(agent_id: str, request: _AFRequest):
         )
         app_state.conversations[new_id] = conv
 
+    if not await limiter.acquire_slot("public_key", api_key, _AF_MAX_CONCURRENT):
+        for _p in _tmp_paths:
+            try: os.remove(_p)
+            except Exception: pass
+        return _af_rate_limited({**rl_headers, "Retry-After": "1"},
+                                "Too many concurrent requests for this API key. Please retry shortly.")
     try:
         result = await process_test_agent_chat(agent, message, conv, attachments=attachments or None)
         reply = result.get("content", "") if isinstance(result, dict) else str(result)
@@ -8913,12 +8811,14 @@ async def public_agent_chat(agent_id: str, request: _AFRequest):
             conv.messages = conv.messages[-20:]
         except Exception:
             pass
-        return _AFJSONResponse({"response": reply, "sources": sources, "conversation_id": conv.id}, headers=_af_cors())
+        return _AFJSONResponse({"response": reply, "sources": sources, "conversation_id": conv.id},
+                               headers={**_af_cors(), **rl_headers})
     except Exception as e:
         print(f"[Public chat] error: {e}")
         import traceback; traceback.print_exc()
         return _AFJSONResponse({"error": "Agent failed to respond. Please try again."}, status_code=500, headers=_af_cors())
     finally:
+        await limiter.release_slot("public_key", api_key, _AF_MAX_CONCURRENT)
         for _p in _tmp_paths:
             try: os.remove(_p)
             except Exception: pass
@@ -8941,14 +8841,28 @@ async def public_agent_run(agent_id: str, request: _AFRequest, background_tasks:
         body = {}
     api_key = (request.headers.get("x-api-key") or request.headers.get("X-API-Key")
                or (body or {}).get("api_key") or request.query_params.get("key"))
+    limiter = _af_rate_limiter()
+    try:
+        # Per-IP limit first, so invalid keys are throttled too
+        await limiter.check(((_AF_LIMIT_IP, _af_client_ip(request)),))
+    except _AFRateLimitExceeded as e:
+        return _af_rate_limited(e.headers)
+
     cfg = _af_load_integrations().get(agent_id)
     if not cfg or not cfg.get("enabled") or not cfg.get("api_key"):
         return _AFJSONResponse({"error": "This agent is not publicly available."}, status_code=403, headers=_af_cors())
     if not api_key or api_key != cfg.get("api_key"):
         return _AFJSONResponse({"error": "Invalid API key."}, status_code=401, headers=_af_cors())
+    try:
+        rl_headers = await limiter.check(((_AF_LIMIT_KEY, api_key), (_AF_LIMIT_AGENT, agent_id)))
+    except _AFRateLimitExceeded as e:
+        return _af_rate_limited(e.headers)
     trigger_input = (body or {}).get("input")
     if trigger_input is None:
         trigger_input = (body or {}).get("trigger_input") or {}
+    if not await limiter.acquire_slot("public_key", api_key, _AF_MAX_CONCURRENT):
+        return _af_rate_limited({**rl_headers, "Retry-After": "1"},
+                                "Too many concurrent requests for this API key. Please retry shortly.")
     try:
         from api.modules.process.router import _run_engine_background, _get_llm_registry
         from api.modules.process.service import ProcessAPIService
@@ -8970,11 +8884,14 @@ async def public_agent_run(agent_id: str, request: _AFRequest, background_tasks:
         if should_run:
             background_tasks.add_task(_run_engine_background, str(response.id), _get_llm_registry())
         return _AFJSONResponse({"execution_id": str(getattr(response, "id", "")),
-                                "status": getattr(response, "status", "running")}, headers=_af_cors())
+                                "status": getattr(response, "status", "running")},
+                               headers={**_af_cors(), **rl_headers})
     except Exception as e:
         print(f"[Public run] error: {e}")
         import traceback; traceback.print_exc()
         return _AFJSONResponse({"error": "Failed to start the process. Please try again."}, status_code=500, headers=_af_cors())
+    finally:
+        await limiter.release_slot("public_key", api_key, _AF_MAX_CONCURRENT)
 
 @app.get("/api/public/agents/{agent_id}/runs/{execution_id}")
 async def public_agent_run_status(agent_id: str, execution_id: str, request: _AFRequest):
@@ -9278,31 +9195,10 @@ def get_user_group_ids(user_id: str) -> List[str]:
     This is the source of truth since user.group_ids may not be in sync.
     """
     if not user_id or not SECURITY_AVAILABLE:
-        print(f"   👥 [GET_GROUPS] No user_id or security not available")
         return []
     
     try:
-        group_ids = []
-        total_groups = len(security_state.groups)
-        print(f"   👥 [GET_GROUPS] Checking {total_groups} groups for user {user_id[:8]}...")
-        
-        for group in security_state.groups.values():
-            member_ids = getattr(group, 'member_ids', []) or []
-            user_ids = getattr(group, 'user_ids', []) or []
-            all_members = list(set(member_ids + user_ids))
-            
-            # Convert all to strings for comparison
-            all_members_str = [str(m) for m in all_members]
-            user_id_str = str(user_id)
-            
-            print(f"      📁 Group '{group.name}' (id={group.id[:8]}...): members={all_members_str}")
-            
-            if user_id_str in all_members_str:
-                print(f"      ✅ User IS in group '{group.name}'!")
-                group_ids.append(group.id)
-        
-        print(f"   👥 [GET_GROUPS] Found {len(group_ids)} groups for user")
-        return group_ids
+        return security_state.get_user_group_ids(user_id)
     except Exception as e:
         print(f"⚠️ Error getting user groups: {e}")
         import traceback
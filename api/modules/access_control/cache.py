@@ -0,0 +1,262 @@
+"""
+Access Control Cache
+Compiled per-agent access policies and short-lived access decisions
+
+check_user_access runs on every chat message. Instead of querying and
+JSON-parsing the agent's policy rows each time, the rows are compiled once
+per agent into sets and tuples, and each (user, agent) decision is cached for
+a few seconds. A steady chat session then needs no DB queries for
+authorization.
+
+Invalidation:
+- Every agent has a policy version. Updates made through AccessControlService
+  bump it immediately (invalidate()), which discards the compiled policies
+  and every cached decision for that agent on this worker
+- Other workers learn about changes by polling the policy tables for rows
+  updated since their last poll (one small query every
+  ACCESS_POLICY_POLL_SECONDS, not per request)
+- Compiled policies also expire after ACCESS_POLICY_CACHE_TTL_SECONDS, which
+  bounds staleness for changes the poll cannot see (rows deleted without
+  replacement)
+
+Configuration (environment variables):
+- ACCESS_POLICY_CACHE_TTL_SECONDS: compiled policy lifetime (default 300)
+- ACCESS_DECISION_CACHE_TTL_SECONDS: decision lifetime (default 30)
+- ACCESS_DECISION_CACHE_MAX: cached decisions before the cache is reset (default 10000)
+- ACCESS_POLICY_POLL_SECONDS: interval between change polls (default 5)
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .schemas import AccessCheckResult
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+ACCESS_POLICY_CACHE_TTL = _env_float('ACCESS_POLICY_CACHE_TTL_SECONDS', 300)
+ACCESS_DECISION_CACHE_TTL = _env_float('ACCESS_DECISION_CACHE_TTL_SECONDS', 30)
+ACCESS_DECISION_CACHE_MAX = int(_env_float('ACCESS_DECISION_CACHE_MAX', 10000))
+ACCESS_POLICY_POLL_SECONDS = _env_float('ACCESS_POLICY_POLL_SECONDS', 5)
+
+# Re-read changes this far behind the last poll, to tolerate clock skew between workers
+_POLL_OVERLAP = timedelta(seconds=30)
+
+NO_ACCESS_REASON = "This assistant is not available for your account. Please contact the owner to request access."
+
+
+class CompiledActionPolicy:
+    """One AgentActionPolicy row with its targets as sets and description parsed"""
+
+    __slots__ = ('applies_to_all', 'user_ids', 'role_ids', 'denied_task_names',
+                 'allowed_task_ids', 'denied_tool_ids', 'allowed_tool_ids')
+
+    def __init__(self, policy: Any):
+        self.applies_to_all = policy.applies_to == 'all'
+        # Groups are stored in user_ids
+        self.user_ids: FrozenSet[str] = frozenset(policy.user_ids or [])
+        self.role_ids: FrozenSet[str] = frozenset(policy.role_ids or [])
+        # Denied tasks are matched by NAME (task IDs change on each wizard load)
+        try:
+            desc_data = json.loads(policy.description) if policy.description else {}
+            names = tuple(desc_data.get('denied_task_names', []))
+        except Exception:
+            names = ()
+        self.denied_task_names: Tuple[str, ...] = names
+        self.allowed_task_ids: Tuple[str, ...] = tuple(policy.allowed_task_ids or [])
+        self.denied_tool_ids: Tuple[str, ...] = tuple(policy.denied_tool_ids or [])
+        self.allowed_tool_ids: Tuple[str, ...] = tuple(policy.allowed_tool_ids or [])
+
+    def applies_to(self, user_id: str, role_ids: Iterable[str], group_ids: Iterable[str]) -> bool:
+        return (
+            self.applies_to_all or
+            user_id in self.user_ids or
+            any(r in self.role_ids for r in role_ids) or
+            any(g in self.user_ids for g in group_ids)
+        )
+
+
+class CompiledAgentAccess:
+    """An agent's access policy and action policies, ready to evaluate without the DB"""
+
+    def __init__(self, access_policy: Optional[Any], action_policies: List[Any]):
+        self.access_type: Optional[str] = access_policy.access_type if access_policy else None
+        self.explicit_authenticated = False
+        self.user_ids: FrozenSet[str] = frozenset()
+        self.role_ids: FrozenSet[str] = frozenset()
+        self.group_ids: FrozenSet[str] = frozenset()
+        if access_policy is not None:
+            if self.access_type == 'authenticated':
+                # Require explicit confirmation marker to avoid accidental global sharing.
+                try:
+                    desc = json.loads(access_policy.description) if access_policy.description else {}
+                    self.explicit_authenticated = bool(
+                        isinstance(desc, dict) and isinstance(desc.get("__meta"), dict) and
+                        desc.get("__meta", {}).get("explicit_access_type") == "authenticated"
+                    )
+                except Exception:
+                    self.explicit_authenticated = False
+            self.user_ids = frozenset(access_policy.user_ids or [])
+            self.role_ids = frozenset(access_policy.role_ids or [])
+            self.group_ids = frozenset(access_policy.group_ids or [])
+        self.action_policies = [CompiledActionPolicy(p) for p in action_policies]
+
+    def evaluate(self, user_id: str, role_ids: List[str], group_ids: List[str]) -> AccessCheckResult:
+        # Level 1: Agent Access (private by default - no policy means no access)
+        has_access = False
+        reason = NO_ACCESS_REASON
+        if self.access_type == 'public':
+            has_access = True
+            reason = None
+        elif self.access_type == 'authenticated':
+            has_access = bool(user_id) and self.explicit_authenticated
+            if not user_id:
+                reason = "Please log in to access this assistant."
+            elif not self.explicit_authenticated:
+                reason = "This assistant has not been shared with your account yet. Please contact the owner to request access."
+        elif self.access_type == 'specific':
+            has_access = (
+                user_id in self.user_ids or
+                any(r in self.role_ids for r in role_ids) or
+                any(g in self.group_ids for g in group_ids)
+            )
+            reason = None if has_access else (
+                "This assistant is not available for your account. Please contact your administrator if you need access."
+            )
+
+        if not has_access:
+            return AccessCheckResult(
+                has_access=False,
+                reason=reason or "This assistant is not available. Please contact your administrator."
+            )
+
+        # Level 2 & 3: Task and Tool access
+        allowed_tasks: List[str] = []
+        denied_tasks: List[str] = []
+        allowed_tools: List[str] = []
+        denied_tools: List[str] = []
+        for policy in self.action_policies:
+            if not policy.applies_to(user_id, role_ids, group_ids):
+                continue
+            for task_name in policy.denied_task_names:
+                if task_name and task_name not in denied_tasks:
+                    denied_tasks.append(task_name)
+            for task_id in policy.allowed_task_ids:
+                if task_id not in allowed_tasks:
+                    allowed_tasks.append(task_id)
+            for tool_id in policy.denied_tool_ids:
+                if tool_id not in denied_tools:
+                    denied_tools.append(tool_id)
+            for tool_id in policy.allowed_tool_ids:
+                if tool_id not in allowed_tools:
+                    allowed_tools.append(tool_id)
+
+        return AccessCheckResult(
+            has_access=True,
+            allowed_tasks=allowed_tasks,
+            denied_tasks=denied_tasks,
+            allowed_tools=allowed_tools,
+            denied_tools=denied_tools
+        )
+
+
+class AccessPolicyCache:
+    """Versioned per-agent compiled policies plus a TTL cache of decisions"""
+
+    def __init__(
+        self,
+        loader: Callable[[str, str], CompiledAgentAccess],
+        change_feed: Optional[Callable[[datetime], List[Tuple[str, str, Optional[datetime]]]]] = None
+    ):
+        # loader(agent_id, org_id) -> CompiledAgentAccess
+        # change_feed(since) -> [(org_id, agent_id, updated_at)] of policy rows changed since
+        self._loader = loader
+        self._change_feed = change_feed
+        self._lock = threading.Lock()
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._compiled: Dict[Tuple[str, str], Tuple[int, float, CompiledAgentAccess]] = {}
+        self._decisions: Dict[tuple, Tuple[int, float, AccessCheckResult]] = {}
+        self._poll_stamp = datetime.utcnow()
+        self._seen_updates: Dict[Tuple[str, str], datetime] = {}
+        self._next_poll = time.monotonic() + ACCESS_POLICY_POLL_SECONDS
+
+    def check(
+        self,
+        user_id: str,
+        role_ids: List[str],
+        group_ids: List[str],
+        agent_id: str,
+        org_id: str
+    ) -> AccessCheckResult:
+        self._sync_changes()
+        key = (org_id, agent_id)
+        now = time.monotonic()
+        version = self._versions.get(key, 0)
+
+        decision_key = (org_id, agent_id, user_id, frozenset(role_ids), frozenset(group_ids))
+        cached = self._decisions.get(decision_key)
+        if cached is not None and cached[0] == version and cached[1] > now:
+            return cached[2].model_copy(deep=True)
+
+        entry = self._compiled.get(key)
+        if entry is None or entry[0] != version or entry[1] <= now:
+            # Compiled under the version read above: an invalidation during the
+            # load leaves it stale, so the next check reloads
+            entry = (version, now + ACCESS_POLICY_CACHE_TTL, self._loader(agent_id, org_id))
+            self._compiled[key] = entry
+
+        result = entry[2].evaluate(user_id, role_ids, group_ids)
+        if len(self._decisions) >= ACCESS_DECISION_CACHE_MAX:
+            self._decisions.clear()
+        self._decisions[decision_key] = (version, now + ACCESS_DECISION_CACHE_TTL, result)
+        return result.model_copy(deep=True)
+
+    def invalidate(self, agent_id: str, org_id: str) -> None:
+        """Discard compiled policies and decisions for an agent (call after policy changes)"""
+        key = (org_id, agent_id)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._compiled.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._versions):
+                self._versions[key] += 1
+            self._compiled.clear()
+            self._decisions.clear()
+
+    def _sync_changes(self) -> None:
+        """Invalidate agents whose policies were changed by any worker since the last poll"""
+        if self._change_feed is None or time.monotonic() < self._next_poll:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_poll:
+                return
+            self._next_poll = time.monotonic() + ACCESS_POLICY_POLL_SECONDS
+            since = self._poll_stamp - _POLL_OVERLAP
+        try:
+            changes = self._change_feed(since)
+        except Exception as e:
+            print(f"⚠️ [ACCESS CACHE] Failed to poll policy changes: {e}")
+            return
+        newest = self._poll_stamp
+        for org_id, agent_id, updated_at in changes:
+            key = (org_id, agent_id)
+            # Rows in the overlap window come back on every poll; act on each change once
+            seen = self._seen_updates.get(key)
+            if updated_at is not None and seen is not None and updated_at <= seen:
+                continue
+            if updated_at is not None:
+                self._seen_updates[key] = updated_at
+                newest = max(newest, updated_at)
+            self.invalidate(agent_id, org_id)
+        self._poll_stamp = newest
@@ -21,6 +21,7 @@ from .schemas import (
     TaskPermission, ToolPermission, AccessCheckResult,
     FullAccessConfig, UserAccessPreview
 )
+from .cache import AccessPolicyCache, CompiledAgentAccess
 
 
 # Default org UUID for "org_default" fallback
@@ -190,6 +191,7 @@ class AccessControlService:
                 print(f"✅ [ACCESS CONTROL] Saved entity task permissions: {entity_config}")
             
             session.commit()
+            _access_cache.invalidate(agent_id, org_id)
             
             return AccessControlService.get_agent_access(agent_id, org_id)
     
@@ -380,6 +382,7 @@ class AccessControlService:
                     session.add(default_policy)
             
             session.commit()
+            _access_cache.invalidate(agent_id, org_id)
             print(f"✅ Saved task permissions: {len(entity_denied_tasks)} entity-specific policies")
             for entity_id, denied_tasks in entity_denied_tasks.items():
                 print(f"   📋 Entity {entity_id[:8]}...: denied_tasks={denied_tasks}")
@@ -485,6 +488,7 @@ class AccessControlService:
             policy.updated_at = datetime.utcnow()
             
             session.commit()
+            _access_cache.invalidate(agent_id, org_id)
             
             return AccessControlService.get_tool_access(agent_id, org_id)
     
@@ -511,8 +515,19 @@ class AccessControlService:
         They only have access based on what the owner grants them.
         """
         org_id = normalize_org_id(org_id)
+        # Served from the compiled per-agent policy cache (see cache.py)
+        return _access_cache.check(
+            user_id or "",
+            list(user_role_ids or []),
+            list(user_group_ids or []),
+            agent_id,
+            org_id
+        )
+    
+    @staticmethod
+    def _load_compiled_access(agent_id: str, org_id: str) -> CompiledAgentAccess:
+        """Load an agent's access and action policies and compile them for check_user_access"""
         with get_session() as session:
-            # Check Level 1: Agent Access
             access_policy = session.query(AgentAccessPolicy).filter(
                 AgentAccessPolicy.agent_id == agent_id,
                 AgentAccessPolicy.org_id == org_id,
@@ -520,153 +535,26 @@ class AccessControlService:
                 AgentAccessPolicy.access_type != 'agent_admin'  # Exclude admin policies from access check
             ).first()
             
-            # PRIVATE BY DEFAULT: No policy means no access (only owner can access)
-            has_access = False
-            reason = "This assistant is not available for your account. Please contact the owner to request access."
-            
-            if access_policy:
-                if access_policy.access_type == 'public':
-                    has_access = True
-                    reason = None
-                elif access_policy.access_type == 'authenticated':
-                    # Require explicit confirmation marker to avoid accidental global sharing.
-                    explicit = False
-                    try:
-                        import json as json_lib
-                        desc = json_lib.loads(access_policy.description) if access_policy.description else {}
-                        explicit = bool(isinstance(desc, dict) and isinstance(desc.get("__meta"), dict) and desc.get("__meta", {}).get("explicit_access_type") == "authenticated")
-                    except Exception:
-                        explicit = False
-
-                    has_access = bool(user_id) and explicit
-                    if not user_id:
-                        reason = "Please log in to access this assistant."
-                    elif not explicit:
-                        reason = "This assistant has not been shared with your account yet. Please contact the owner to request access."
-                elif access_policy.access_type == 'specific':
-                    # Check if user or their role/group has access
-                    user_has_access = user_id in (access_policy.user_ids or [])
-                    role_has_access = any(r in (access_policy.role_ids or []) for r in user_role_ids)
-                    group_has_access = any(g in (access_policy.group_ids or []) for g in user_group_ids)
-                    
-                    has_access = user_has_access or role_has_access or group_has_access
-                    
-                    if has_access:
-                        reason = None
-                    else:
-                        reason = "This assistant is not available for your account. Please contact your administrator if you need access."
-            
-            if not has_access:
-                return AccessCheckResult(
-                    has_access=False,
-                    reason=reason or "This assistant is not available. Please contact your administrator."
-                )
-            
-            # Check Level 2 & 3: Task and Tool access
-            # Get ALL action policies for this agent (we now have per-entity policies)
             action_policies = session.query(AgentActionPolicy).filter(
                 AgentActionPolicy.agent_id == agent_id,
                 AgentActionPolicy.org_id == org_id,
                 AgentActionPolicy.is_active == True
-            ).all()
+            ).all() if access_policy else []
             
-            print(f"🔍 [ACCESS CHECK] Found {len(action_policies)} action policies for agent {agent_id[:8]}...")
-            for i, pol in enumerate(action_policies):
-                print(f"   Policy {i+1}: applies_to={pol.applies_to}, user_ids={pol.user_ids}, description={pol.description[:100] if pol.description else 'None'}...")
-            
-            # Get current agent tasks to match by NAME
-            agent = session.query(Agent).filter(Agent.id == agent_id).first()
-            current_tasks = []
-            if agent and agent.tasks:
-                import json as json_lib
-                if isinstance(agent.tasks, str):
-                    try:
-                        current_tasks = json_lib.loads(agent.tasks)
-                    except:
-                        current_tasks = []
-                else:
-                    current_tasks = agent.tasks
-            
-            # Build task_name -> current_task_id mapping
-            task_name_to_current_id = {}
-            for task in current_tasks:
-                if isinstance(task, dict):
-                    name = task.get('name', '')
-                    tid = task.get('id', '')
-                    if name and tid:
-                        task_name_to_current_id[name] = tid
-            
-            print(f"📋 Current agent tasks: {list(task_name_to_current_id.keys())}")
-            
-            allowed_tasks = []
-            denied_tasks = []  # Will store TASK NAMES for matching (IDs change)
-            allowed_tools = []
-            denied_tools = []
-            
-            # Check each policy to see if it applies to this user
-            print(f"🔍 [ACCESS CHECK] Checking {len(action_policies)} policies for user {user_id[:8]}...")
-            print(f"   User role_ids: {user_role_ids}")
-            print(f"   User group_ids: {user_group_ids}")
-            
-            for policy in action_policies:
-                applies_to_user = False
-                
-                # Check if policy applies to all users
-                if policy.applies_to == 'all':
-                    applies_to_user = True
-                    print(f"   ✓ Policy applies to ALL users")
-                else:
-                    # Check if user is specifically in this policy
-                    user_in_policy = user_id in (policy.user_ids or [])
-                    role_in_policy = any(r in (policy.role_ids or []) for r in user_role_ids)
-                    group_in_policy = any(g in (policy.user_ids or []) for g in user_group_ids)  # Groups stored in user_ids
-                    
-                    applies_to_user = user_in_policy or role_in_policy or group_in_policy
-                    
-                    print(f"   Policy check: user_in={user_in_policy}, role_in={role_in_policy}, group_in={group_in_policy}, applies={applies_to_user}")
-                    print(f"     Policy user_ids: {policy.user_ids}")
-                
-                if applies_to_user:
-                    # Try to get denied task NAMES from description (JSON)
-                    try:
-                        import json as json_lib
-                        desc_data = json_lib.loads(policy.description) if policy.description else {}
-                        policy_denied_names = desc_data.get('denied_task_names', [])
-                        
-                        # Use task NAMES for matching (IDs change on each wizard load)
-                        for task_name in policy_denied_names:
-                            if task_name and task_name not in denied_tasks:
-                                denied_tasks.append(task_name)
-                                print(f"   ❌ Task '{task_name}' DENIED for user {user_id[:8]}...")
-                    except Exception as e:
-                        print(f"   ⚠️ Failed to parse policy description: {e}")
-                        # Fallback: try to get task names from current task list
-                        pass
-                    
-                    # Add allowed tasks from this policy
-                    for task_id in (policy.allowed_task_ids or []):
-                        if task_id not in allowed_tasks:
-                            allowed_tasks.append(task_id)
-                    
-                    # Add denied tools from this policy
-                    for tool_id in (policy.denied_tool_ids or []):
-                        if tool_id not in denied_tools:
-                            denied_tools.append(tool_id)
-                    
-                    # Add allowed tools from this policy
-                    for tool_id in (policy.allowed_tool_ids or []):
-                        if tool_id not in allowed_tools:
-                            allowed_tools.append(tool_id)
-            
-            print(f"🔐 Access check for user {user_id[:8]}...: denied_tasks={denied_tasks}, denied_tools={denied_tools}")
-            
-            return AccessCheckResult(
-                has_access=True,
-                allowed_tasks=allowed_tasks,
-                denied_tasks=denied_tasks,
-                allowed_tools=allowed_tools,
-                denied_tools=denied_tools
-            )
+            print(f"🔍 [ACCESS CHECK] Compiled {len(action_policies)} action policies for agent {agent_id[:8]}...")
+            return CompiledAgentAccess(access_policy, action_policies)
+    
+    @staticmethod
+    def _changed_access_policies(since: datetime) -> List[tuple]:
+        """(org_id, agent_id, updated_at) of access/action policy rows changed since a time"""
+        changes = []
+        with get_session() as session:
+            for model in (AgentAccessPolicy, AgentActionPolicy):
+                rows = session.query(model.org_id, model.agent_id, model.updated_at).filter(
+                    model.updated_at > since
+                ).all()
+                changes.extend((str(org), str(agent), updated) for org, agent, updated in rows)
+        return changes
     
     # ========================================================================
     # FULL CONFIG (for UI)
@@ -1114,3 +1002,9 @@ class AccessControlService:
                 "is_admin": True
             }
 
+
+# Compiled per-agent access policies and cached decisions for check_user_access
+_access_cache = AccessPolicyCache(
+    loader=AccessControlService._load_compiled_access,
+    change_feed=AccessControlService._changed_access_policies
+)
@@ -579,6 +579,10 @@ async def update_directory_config(body: DirectorySourceConfig, user: User = Depe
         org.updated_at = datetime.utcnow()
         session.commit()
     
+    # The directory source decides how every cached user was resolved
+    from core.identity.service import get_directory_cache
+    get_directory_cache().clear()
+    
     return body
 
 
@@ -800,8 +804,7 @@ async def resolve_process_assignees(body: ResolveAssigneeRequest, user: User = D
     
     # Optionally resolve full user attributes
     resolved_users = []
-    for uid in user_ids:
-        attrs = service.get_user(uid, ctx["org_id"])
+    for attrs in service.get_users(user_ids, ctx["org_id"]):
         if attrs:
             resolved_users.append(UserAttributesResponse(**attrs.model_dump()))
     
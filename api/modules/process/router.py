@@ -15,9 +15,10 @@ Endpoints:
 """
 
 from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response, BackgroundTasks, UploadFile, File
 from fastapi.responses import FileResponse
 import os
+import asyncio
 import re
 import uuid
 import json
@@ -456,19 +457,24 @@ async def test_resolve_approvers(
         else:
             ids = [str(x) for x in raw_ids if x] if isinstance(raw_ids, list) else []
 
-        for uid in ids:
-            try:
-                attrs = ud.get_user(str(uid), org_id)
-                if attrs:
-                    resolved.append({
-                        "id": str(uid),
-                        "name": attrs.display_name or f"{attrs.first_name or ''} {attrs.last_name or ''}".strip() or "(unknown)",
-                        "email": attrs.email or "(no email)",
-                    })
-                else:
-                    resolved.append({"id": str(uid), "name": "(not found)", "email": "(not found)"})
-            except Exception:
+        try:
+            # One batch (concurrent for HR API sources), same order as ids
+            users = ud.get_users([str(uid) for uid in ids], org_id)
+        except Exception:
+            users = None
+        for i, uid in enumerate(ids):
+            if users is None:
                 resolved.append({"id": str(uid), "name": "(error)", "email": "(error)"})
+                continue
+            attrs = users[i]
+            if attrs:
+                resolved.append({
+                    "id": str(uid),
+                    "name": attrs.display_name or f"{attrs.first_name or ''} {attrs.last_name or ''}".strip() or "(unknown)",
+                    "email": attrs.email or "(no email)",
+                })
+            else:
+                resolved.append({"id": str(uid), "name": "(not found)", "email": "(not found)"})
 
     except Exception as exc:
         _logger.warning("[resolve-approvers] Resolution failed: %s", exc)
@@ -1801,12 +1807,14 @@ async def get_workflow_stats(
 # WEBHOOK ENDPOINT
 # =============================================================================
 
-@router.post("/webhook/{agent_id}")
+@router.post("/webhook/{agent_id}", status_code=202)
 async def process_webhook(
     agent_id: str,
     payload: Dict[str, Any],
     background_tasks: BackgroundTasks,
+    response: Response,
     correlation_id: Optional[str] = Query(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     service: ProcessAPIService = Depends(get_service),
     db: Session = Depends(get_db)
 ):
@@ -1814,14 +1822,25 @@ async def process_webhook(
     Webhook to start a workflow
     
     External systems can call this URL to start a workflow.
-    The workflow runs in the background and the response is immediate.
+    The payload is stored and acknowledged with 202 and the execution ID;
+    the webhook queue starts the execution in the background.
+    
+    - Idempotency-Key header: a retried delivery with the same key returns
+      the original execution ID (200, duplicate=true) and starts nothing
+    - 429 with Retry-After when too many webhooks are already queued
     """
     from database.models import Agent
+    from .webhook_queue import get_webhook_queue, WebhookQueueFull
     import uuid as uuid_module
     
+    try:
+        agent_uuid = uuid_module.UUID(agent_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Workflow not found or not published.")
+    
     # Get agent
     agent = db.query(Agent).filter(
-        Agent.id == uuid_module.UUID(agent_id),
+        Agent.id == agent_uuid,
         Agent.agent_type == "process",
         Agent.is_published == True
     ).first()
@@ -1832,27 +1851,58 @@ async def process_webhook(
             detail="Workflow not found or not published."
         )
     
-    # Create execution ID
-    execution_id = str(uuid_module.uuid4())
+    queue = get_webhook_queue()
+    if not queue.enabled:
+        # Queue disabled: start the execution in the background of this request
+        execution_id = str(uuid_module.uuid4())
+        
+        async def run_execution():
+            await service.start_execution(
+                agent_id=agent_id,
+                org_id=str(agent.org_id),
+                user_id=str(agent.owner_id),  # Use agent owner as trigger user
+                trigger_input=payload,
+                trigger_type="http_webhook",
+                correlation_id=correlation_id,
+                execution_id=execution_id
+            )
+        
+        background_tasks.add_task(run_execution)
+        
+        return {
+            "status": "accepted",
+            "message": "Process execution started",
+            "agent_id": agent_id,
+            "execution_id": execution_id,
+            "correlation_id": correlation_id
+        }
     
-    # Start execution in background
-    async def run_execution():
-        await service.start_execution(
-            agent_id=agent_id,
-            org_id=str(agent.org_id),
-            user_id=str(agent.owner_id),  # Use agent owner as trigger user
-            trigger_input=payload,
-            trigger_type="http_webhook",
+    try:
+        delivery, duplicate = queue.accept(
+            db,
+            agent,
+            payload,
+            idempotency_key=idempotency_key,
             correlation_id=correlation_id
         )
+    except WebhookQueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     
-    background_tasks.add_task(run_execution)
+    if duplicate:
+        response.status_code = 200
     
     return {
         "status": "accepted",
-        "message": "Process execution started",
+        "message": "Duplicate delivery; execution already queued" if duplicate else "Process execution queued",
         "agent_id": agent_id,
-        "correlation_id": correlation_id
+        "execution_id": str(delivery.id),
+        "correlation_id": delivery.correlation_id,
+        "queue_status": delivery.status,
+        "duplicate": duplicate
     }
 
 
@@ -3546,15 +3596,98 @@ async def generate_workflow_from_goal(
     Supports two modes:
     - Structured: provide goal + tasks (each with name, type, instructions) for precise generation
     - Classic: provide goal only (AI infers the full structure)
+    
+    The same goal and context return the earlier workflow from the wizard cache;
+    send regenerate=true for a fresh one. /wizard/generate/stream reports progress.
     """
-    from core.process.wizard import ProcessWizard
-    from database.services.process_settings_service import ProcessSettingsService
+    params = _parse_wizard_request(request)
+    org_settings, llm, user_perms = _prepare_wizard_generation(user, params["context"], db)
     
-    user_dict = _user_to_dict(user)
+    try:
+        return await _run_wizard_generation(params, user_perms, llm, org_settings)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail="We couldn't create the workflow. Please try describing it differently."
+        )
+
+
+@router.post("/wizard/generate/stream")
+async def stream_workflow_from_goal(
+    request: Dict[str, Any],
+    user: User = Depends(require_auth)
+):
+    """
+    Create a workflow from your description, reporting progress as Server-Sent Events.
+    
+    Accepts the same body as /wizard/generate. Events (JSON in `data:`):
+    - {"type": "stage", "stage": ...} for preparing, checking, analyzing, generating,
+      reviewing, validating, finalizing, cached
+    - {"type": "draft", "workflow": {...}} as soon as a validated draft graph exists
+    - {"type": "result", ...} with the /wizard/generate response body
+    - {"type": "error", "content": ...}, then {"type": "done"}
+    """
+    from fastapi.responses import StreamingResponse
+    
+    params = _parse_wizard_request(request)
+    events: "asyncio.Queue" = asyncio.Queue()
+    
+    def progress(stage: str, data: Dict[str, Any]):
+        if stage == "draft":
+            events.put_nowait({"type": "draft", "workflow": data.get("workflow")})
+        else:
+            events.put_nowait({"type": "stage", "stage": stage})
+    
+    async def generate():
+        # Request-scoped sessions are closed before a streaming body runs; use our own
+        db = get_db_session()
+        try:
+            progress("preparing", {})
+            org_settings, llm, user_perms = _prepare_wizard_generation(user, params["context"], db)
+            return await _run_wizard_generation(params, user_perms, llm, org_settings, progress=progress)
+        finally:
+            db.close()
+    
+    async def event_generator():
+        task = asyncio.create_task(generate())
+        try:
+            while True:
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield f"data: {json.dumps(getter.result(), default=str)}\n\n"
+                    continue
+                getter.cancel()
+                while not events.empty():
+                    yield f"data: {json.dumps(events.get_nowait(), default=str)}\n\n"
+                break
+            try:
+                result = task.result()
+                yield f"data: {json.dumps({'type': 'result', **result}, default=str)}\n\n"
+            except Exception as e:
+                _logger.error("[Wizard] streamed generation failed: %s", e)
+                message = "We couldn't create the workflow. Please try describing it differently."
+                yield f"data: {json.dumps({'type': 'error', 'content': message})}\n\n"
+            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        finally:
+            # Client disconnected: stop the LLM calls
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # Disable nginx buffering
+        }
+    )
+
+
+def _parse_wizard_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Read and check the /wizard/generate request body (400 on a missing goal)"""
     goal = (request.get('goal') or '').strip()
-    tasks = request.get('tasks')  # Optional: structured task list
-    output_format = request.get('output_format') or request.get('format') or 'visual_builder'
-    skip_prerequisites = bool(request.get('skip_prerequisites'))
     context = request.get('context') or {}
     if not isinstance(context, dict):
         context = {}
@@ -3569,6 +3702,28 @@ async def generate_workflow_from_goal(
             detail="Please describe what you want the workflow to do."
         )
     
+    return {
+        "goal": goal,
+        "tasks": request.get('tasks'),  # Optional: structured task list
+        "output_format": request.get('output_format') or request.get('format') or 'visual_builder',
+        "skip_prerequisites": bool(request.get('skip_prerequisites')),
+        "use_cache": not bool(request.get('regenerate')),
+        "context": context,
+    }
+
+
+def _prepare_wizard_generation(user: User, context: Dict[str, Any], db: Session):
+    """
+    Load org settings and the LLM, and add what the AI should know about the
+    platform (user attributes, identity, departments, groups, roles, tools,
+    published processes) to `context` in place.
+    
+    Returns (org_settings, llm, user_perms).
+    """
+    from database.services.process_settings_service import ProcessSettingsService
+    
+    user_dict = _user_to_dict(user)
+    
     # Get org settings
     settings_service = ProcessSettingsService(db)
     org_settings = settings_service.get_org_settings(user_dict["org_id"])
@@ -3825,6 +3980,32 @@ async def generate_workflow_from_goal(
     except Exception:
         user_perms = []
 
+    return org_settings, llm, user_perms
+
+
+async def _run_wizard_generation(
+    params: Dict[str, Any],
+    user_perms: List[str],
+    llm,
+    org_settings: Dict[str, Any],
+    progress=None,
+) -> Dict[str, Any]:
+    """
+    Pre-check, generate and post-check a wizard workflow.
+    
+    Returns the /wizard/generate response body; raises if generation fails.
+    `progress(stage, data)` (sync) receives router and wizard stages.
+    """
+    from core.process.wizard import ProcessWizard
+    
+    goal = params["goal"]
+    tasks = params["tasks"]
+    context = params["context"]
+    
+    def _report(stage: str):
+        if progress is not None:
+            progress(stage, {})
+    
     # ═══════════════════════════════════════════════════════════════════
     # PRE-GENERATION CHECK — runs BEFORE the expensive AI call.
     # Analyzes the goal text against platform state to catch critical
@@ -3832,7 +4013,8 @@ async def generate_workflow_from_goal(
     # no tools, etc.).  If issues are found, we return immediately
     # WITHOUT generating the workflow — unless the user chose to skip.
     # ═══════════════════════════════════════════════════════════════════
-    if not skip_prerequisites:
+    if not params["skip_prerequisites"]:
+        _report("checking")
         try:
             pre_issues = await _pre_check_platform_readiness(
                 goal, context, user_perms, llm,
@@ -3853,51 +4035,51 @@ async def generate_workflow_from_goal(
                 ),
             }
 
+
     # ═══════════════════════════════════════════════════════════════════
     # GENERATE — platform is ready, proceed with AI generation
     # ═══════════════════════════════════════════════════════════════════
     wizard = ProcessWizard(llm=llm, org_settings=org_settings)
 
-    try:
-        # Structured mode: process owner explicitly defined tasks with per-task instructions
-        if tasks and isinstance(tasks, list) and len(tasks) > 0:
-            process_def = await wizard.generate_from_structured_goal(
-                goal=goal,
-                tasks=tasks,
-                additional_context=context,
-            )
-        else:
-            # Classic mode: AI infers the full structure from the goal alone
-            process_def = await wizard.generate_from_goal(
-                goal=goal,
-                additional_context=context,
-                output_format=output_format
-            )
-
-        # Post-generation: thorough node-by-node validation for edge
-        # cases the pre-check couldn't catch (hallucinated IDs, stale
-        # references, missing dept managers, empty departments, etc.)
-        post_issues: List[Dict[str, Any]] = []
-        try:
-            post_issues = _validate_process_prerequisites(
-                process_def, context, user_perms
-            )
-        except Exception as e:
-            print(f"⚠️  [Wizard] Post-generation validation error (non-blocking): {e}")
+    # Structured mode: process owner explicitly defined tasks with per-task instructions
+    if tasks and isinstance(tasks, list) and len(tasks) > 0:
+        process_def = await wizard.generate_from_structured_goal(
+            goal=goal,
+            tasks=tasks,
+            additional_context=context,
+            progress=progress,
+            use_cache=params["use_cache"],
+        )
+    else:
+        # Classic mode: AI infers the full structure from the goal alone
+        process_def = await wizard.generate_from_goal(
+            goal=goal,
+            additional_context=context,
+            output_format=params["output_format"],
+            progress=progress,
+            use_cache=params["use_cache"],
+        )
 
-        result: Dict[str, Any] = {
-            "success": True,
-            "workflow": process_def,
-            "message": "Your workflow has been created! You can now customize it or run it.",
-        }
-        if post_issues:
-            result["setup_required"] = post_issues
-        return result
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail="We couldn't create the workflow. Please try describing it differently."
+    # Post-generation: thorough node-by-node validation for edge
+    # cases the pre-check couldn't catch (hallucinated IDs, stale
+    # references, missing dept managers, empty departments, etc.)
+    _report("finalizing")
+    post_issues: List[Dict[str, Any]] = []
+    try:
+        post_issues = _validate_process_prerequisites(
+            process_def, context, user_perms
         )
+    except Exception as e:
+        print(f"⚠️  [Wizard] Post-generation validation error (non-blocking): {e}")
+
+    result: Dict[str, Any] = {
+        "success": True,
+        "workflow": process_def,
+        "message": "Your workflow has been created! You can now customize it or run it.",
+    }
+    if post_issues:
+        result["setup_required"] = post_issues
+    return result
 
 
 @router.post("/wizard/suggest-settings")
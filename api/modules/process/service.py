@@ -174,7 +174,8 @@ class ProcessAPIService:
         trigger_type: str = "manual",
         conversation_id: str = None,
         correlation_id: str = None,
-        user_info: Dict[str, Any] = None
+        user_info: Dict[str, Any] = None,
+        execution_id: str = None
     ) -> ProcessExecutionResponse:
         """
         Start a new process execution
@@ -193,6 +194,7 @@ class ProcessAPIService:
             conversation_id: Optional conversation link
             correlation_id: Optional correlation ID
             user_info: Optional user info for context
+            execution_id: Optional pre-assigned execution ID
             
         Returns:
             ProcessExecutionResponse with execution details
@@ -333,6 +335,7 @@ class ProcessAPIService:
             conversation_id=conversation_id,
             correlation_id=correlation_id,
             process_definition_snapshot=definition_data,
+            execution_id=execution_id,
         )
         logger.info("[ProcessDebug] Created execution_id=%s", str(execution.id))
 
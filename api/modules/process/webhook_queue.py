@@ -0,0 +1,437 @@
+"""
+Process Webhook Queue
+Ingestion buffer between /process/webhook/{agent_id} and the process engine
+
+The webhook endpoint used to validate the request, create the execution and
+run it on the request path, so a partner sending thousands of webhooks at
+once had every one of them compete for the same worker. Now the endpoint
+only stores the payload in process_webhook_deliveries and answers 202 with
+the delivery ID (which becomes the execution ID); this queue drains the
+table in the background:
+- at most WEBHOOK_AGENT_CONCURRENCY executions per process start at once
+  (counted across workers from the 'running' rows), and at most
+  WEBHOOK_MAX_CONCURRENCY per worker in total
+- deliveries are claimed oldest first with a conditional UPDATE, so several
+  workers can drain the same table without starting a delivery twice
+- an Idempotency-Key header is unique per process (indexed); a retried
+  delivery gets the original execution ID back and starts nothing
+- rows left 'running' by a worker that died are requeued after
+  WEBHOOK_QUEUE_STALE_SECONDS unless their execution was already created
+
+Overflow policy: once a process has WEBHOOK_QUEUE_MAX_PENDING_PER_AGENT
+queued deliveries, or the table has WEBHOOK_QUEUE_MAX_PENDING in total, new
+webhooks are rejected with 429 and a Retry-After header instead of being
+stored. Nothing already accepted is dropped.
+
+Tuning (environment variables):
+- WEBHOOK_QUEUE_ENABLED: set to false to start executions on the request path (default true)
+- WEBHOOK_QUEUE_MAX_PENDING_PER_AGENT: queued deliveries per process before 429 (default 1000)
+- WEBHOOK_QUEUE_MAX_PENDING: queued deliveries in total before 429 (default 20000)
+- WEBHOOK_AGENT_CONCURRENCY: executions per process starting at once (default 4)
+- WEBHOOK_MAX_CONCURRENCY: executions per worker starting at once (default 16)
+- WEBHOOK_QUEUE_POLL_SECONDS: how often the table is checked for work from other workers (default 1)
+- WEBHOOK_QUEUE_STALE_SECONDS: age of a 'running' delivery treated as abandoned (default 900)
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.config import get_db_session
+
+logger = logging.getLogger(__name__)
+
+_CLAIM_SCAN_LIMIT = 500
+_RECOVER_INTERVAL_SECONDS = 60
+_DRAIN_SECONDS = 10
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class WebhookQueueFull(Exception):
+    """The process (or the whole queue) has too many queued webhooks"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WebhookQueue:
+    """Stores process webhooks and starts their executions with bounded concurrency"""
+
+    def __init__(
+        self,
+        max_pending_per_agent: int = None,
+        max_pending: int = None,
+        agent_concurrency: int = None,
+        max_concurrency: int = None,
+        poll_seconds: float = None,
+        stale_seconds: int = None,
+    ):
+        self.enabled = os.environ.get('WEBHOOK_QUEUE_ENABLED', 'true').strip().lower() not in ('0', 'false', 'no', 'off')
+        self.max_pending_per_agent = (
+            max_pending_per_agent if max_pending_per_agent is not None
+            else _env_int('WEBHOOK_QUEUE_MAX_PENDING_PER_AGENT', 1000)
+        )
+        self.max_pending = max_pending if max_pending is not None else _env_int('WEBHOOK_QUEUE_MAX_PENDING', 20000)
+        self.agent_concurrency = max(1, agent_concurrency if agent_concurrency is not None
+                                     else _env_int('WEBHOOK_AGENT_CONCURRENCY', 4))
+        self.max_concurrency = max(1, max_concurrency if max_concurrency is not None
+                                   else _env_int('WEBHOOK_MAX_CONCURRENCY', 16))
+        self.poll_seconds = poll_seconds if poll_seconds is not None else _env_float('WEBHOOK_QUEUE_POLL_SECONDS', 1)
+        self.stale_seconds = stale_seconds if stale_seconds is not None else _env_int('WEBHOOK_QUEUE_STALE_SECONDS', 900)
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._running: Dict[str, asyncio.Task] = {}
+        self._last_recover = 0.0
+
+        # Counters
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.started = 0
+        self.failed = 0
+        self.recovered = 0
+        self.last_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def accept(
+        self,
+        db: Session,
+        agent,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        Store a webhook for the given process agent.
+
+        Returns (delivery, duplicate). duplicate is True when a delivery with
+        the same idempotency key already exists; that delivery is returned
+        and nothing new is queued. Raises WebhookQueueFull when the overflow
+        limits are reached.
+        """
+        from database.models import ProcessWebhookDelivery
+
+        key = (idempotency_key or '').strip()[:255] or None
+        if key:
+            existing = self._find_duplicate(db, agent.id, key)
+            if existing is not None:
+                self.duplicates += 1
+                return existing, True
+
+        agent_pending = db.query(func.count(ProcessWebhookDelivery.id)).filter(
+            ProcessWebhookDelivery.agent_id == agent.id,
+            ProcessWebhookDelivery.status == 'queued',
+        ).scalar() or 0
+        if agent_pending >= self.max_pending_per_agent:
+            self.rejected += 1
+            raise WebhookQueueFull(
+                f"Too many queued webhooks for this workflow ({agent_pending})",
+                self._retry_after(agent_pending, self.agent_concurrency),
+            )
+        total_pending = db.query(func.count(ProcessWebhookDelivery.id)).filter(
+            ProcessWebhookDelivery.status == 'queued'
+        ).scalar() or 0
+        if total_pending >= self.max_pending:
+            self.rejected += 1
+            raise WebhookQueueFull(
+                f"Too many queued webhooks ({total_pending})",
+                self._retry_after(total_pending, self.max_concurrency),
+            )
+
+        delivery = ProcessWebhookDelivery(
+            org_id=agent.org_id,
+            agent_id=agent.id,
+            idempotency_key=key,
+            correlation_id=correlation_id,
+            payload=payload or {},
+            status='queued',
+            attempts=0,
+        )
+        db.add(delivery)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Same key sent twice at the same moment; the other request won
+            db.rollback()
+            existing = self._find_duplicate(db, agent.id, key) if key else None
+            if existing is None:
+                raise
+            self.duplicates += 1
+            return existing, True
+        db.refresh(delivery)
+
+        self.accepted += 1
+        self.wake()
+        return delivery, False
+
+    def wake(self) -> None:
+        """Ask the drain loop to look for work now (no-op when not started)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the drain loop on the running event loop (call on startup)"""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="process-webhook-queue")
+
+    async def stop(self) -> None:
+        """Stop draining; executions already starting get a few seconds to finish"""
+        if self._task is not None:
+            # Stop by flag: a cancel that lands as the wakeup fires can be lost in wait_for
+            self._stopping = True
+            self.wake()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        running = list(self._running.values())
+        if running:
+            _, pending = await asyncio.wait(running, timeout=_DRAIN_SECONDS)
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Left 'running'; recovered by the next worker after stale_seconds
+                logger.warning("Webhook queue stopped with %d execution(s) still starting", len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+        self._wakeup = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'running': len(self._running),
+            'accepted': self.accepted,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'started': self.started,
+            'failed': self.failed,
+            'recovered': self.recovered,
+            'last_error': self.last_error,
+            'agent_concurrency': self.agent_concurrency,
+            'max_concurrency': self.max_concurrency,
+        }
+
+    # ------------------------------------------------------------------
+    # Drain loop
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                if time.monotonic() - self._last_recover >= _RECOVER_INTERVAL_SECONDS:
+                    self._last_recover = time.monotonic()
+                    await asyncio.to_thread(self._recover_stale)
+                await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{datetime.utcnow().isoformat()} {e}"
+                logger.error("[WebhookQueue] drain failed: %s", e)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Claim and start as many queued deliveries as the limits allow; returns the count"""
+        free = self.max_concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        claimed = await asyncio.to_thread(self._claim, free)
+        for delivery_id in claimed:
+            task = asyncio.create_task(self._execute(delivery_id), name=f"process-webhook-{delivery_id}")
+            self._running[delivery_id] = task
+        return len(claimed)
+
+    def _claim(self, free: int) -> list:
+        from database.models import ProcessWebhookDelivery
+
+        db = get_db_session()
+        try:
+            running = Counter({
+                agent_id: count for agent_id, count in db.query(
+                    ProcessWebhookDelivery.agent_id, func.count(ProcessWebhookDelivery.id)
+                ).filter(
+                    ProcessWebhookDelivery.status == 'running'
+                ).group_by(ProcessWebhookDelivery.agent_id).all()
+            })
+            candidates = db.query(ProcessWebhookDelivery.id, ProcessWebhookDelivery.agent_id).filter(
+                ProcessWebhookDelivery.status == 'queued'
+            ).order_by(ProcessWebhookDelivery.created_at).limit(_CLAIM_SCAN_LIMIT).all()
+
+            claimed = []
+            now = datetime.utcnow()
+            for delivery_id, agent_id in candidates:
+                if len(claimed) >= free:
+                    break
+                if running[agent_id] >= self.agent_concurrency:
+                    continue
+                # Conditional update: another worker may have claimed it first
+                updated = db.query(ProcessWebhookDelivery).filter(
+                    ProcessWebhookDelivery.id == delivery_id,
+                    ProcessWebhookDelivery.status == 'queued',
+                ).update({
+                    ProcessWebhookDelivery.status: 'running',
+                    ProcessWebhookDelivery.started_at: now,
+                    ProcessWebhookDelivery.attempts: func.coalesce(ProcessWebhookDelivery.attempts, 0) + 1,
+                }, synchronize_session=False)
+                db.commit()
+                if updated:
+                    running[agent_id] += 1
+                    claimed.append(str(delivery_id))
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _execute(self, delivery_id: str) -> None:
+        from database.models import Agent, ProcessWebhookDelivery
+        from .router import get_service
+
+        db = get_db_session()
+        try:
+            delivery = db.query(ProcessWebhookDelivery).filter(
+                ProcessWebhookDelivery.id == uuid.UUID(delivery_id)
+            ).first()
+            if delivery is None:
+                return
+            agent = db.query(Agent).filter(
+                Agent.id == delivery.agent_id,
+                Agent.agent_type == "process",
+                Agent.is_published == True
+            ).first()
+            error = None
+            if agent is None:
+                error = "Workflow not found or not published."
+            else:
+                try:
+                    await get_service(db).start_execution(
+                        agent_id=str(agent.id),
+                        org_id=str(agent.org_id),
+                        user_id=str(agent.owner_id),  # Use agent owner as trigger user
+                        trigger_input=delivery.payload or {},
+                        trigger_type="http_webhook",
+                        correlation_id=delivery.correlation_id,
+                        execution_id=delivery_id,
+                    )
+                except Exception as e:
+                    db.rollback()
+                    error = str(e) or type(e).__name__
+
+            delivery.status = 'failed' if error else 'completed'
+            delivery.error = error[:2000] if error else None
+            delivery.finished_at = datetime.utcnow()
+            db.commit()
+            if error:
+                self.failed += 1
+                self.last_error = f"{datetime.utcnow().isoformat()} {error}"
+                logger.warning("[WebhookQueue] delivery %s failed: %s", delivery_id, error)
+            else:
+                self.started += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            db.rollback()
+            self.failed += 1
+            self.last_error = f"{datetime.utcnow().isoformat()} {e}"
+            logger.error("[WebhookQueue] delivery %s could not be recorded: %s", delivery_id, e)
+        finally:
+            db.close()
+            self._running.pop(delivery_id, None)
+            self.wake()
+
+    def _recover_stale(self) -> int:
+        """Requeue deliveries left 'running' by a worker that stopped"""
+        from database.models import ProcessExecution, ProcessWebhookDelivery
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        db = get_db_session()
+        try:
+            stale = db.query(ProcessWebhookDelivery).filter(
+                ProcessWebhookDelivery.status == 'running',
+                ProcessWebhookDelivery.started_at < cutoff,
+            ).limit(_CLAIM_SCAN_LIMIT).all()
+            recovered = 0
+            for delivery in stale:
+                if str(delivery.id) in self._running:
+                    continue
+                started = db.query(ProcessExecution.id).filter(ProcessExecution.id == delivery.id).first()
+                if started:
+                    # The execution exists; the engine owns it from here
+                    delivery.status = 'completed'
+                    delivery.finished_at = datetime.utcnow()
+                else:
+                    delivery.status = 'queued'
+                    delivery.started_at = None
+                    recovered += 1
+            db.commit()
+            if recovered:
+                self.recovered += recovered
+                logger.info("[WebhookQueue] requeued %d abandoned delivery(ies)", recovered)
+            return recovered
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _find_duplicate(db: Session, agent_id, key: str):
+        from database.models import ProcessWebhookDelivery
+
+        return db.query(ProcessWebhookDelivery).filter(
+            ProcessWebhookDelivery.agent_id == agent_id,
+            ProcessWebhookDelivery.idempotency_key == key,
+        ).first()
+
+    def _retry_after(self, pending: int, concurrency: int) -> int:
+        # Rough time for the backlog to drain, assuming ~1s per execution start
+        return max(1, min(300, int(pending / max(1, concurrency))))
+
+
+_webhook_queue: WebhookQueue = None
+
+
+def get_webhook_queue() -> WebhookQueue:
+    """Get the worker-wide process webhook queue"""
+    global _webhook_queue
+    if _webhook_queue is None:
+        _webhook_queue = WebhookQueue()
+    return _webhook_queue
@@ -0,0 +1,400 @@
+"""
+Rate Limiting
+Token-bucket request limits and concurrency caps for public and login endpoints
+
+The public agent API (/api/public/agents/{id}/chat and /run) and the login
+endpoint are reachable without a session. Each request is checked against
+token buckets keyed by API key, client IP and agent (or login account), and
+public calls also hold one of a limited number of concurrent slots per API key.
+
+Backends:
+- memory (default): per-worker buckets. Buckets are created once per key and
+  updated in place, so a check does not allocate bucket or key objects
+- redis: buckets and slot counters shared by every worker, via a Lua script
+  (set RATE_LIMIT_BACKEND=redis and RATE_LIMIT_REDIS_URL). If Redis is
+  unreachable, checks fall back to the in-memory backend
+
+A request is checked against all of its buckets before any token is spent:
+when one bucket rejects it, the others are left untouched. Rejected requests
+get 429 with Retry-After; every checked response carries X-RateLimit-Limit /
+X-RateLimit-Remaining / X-RateLimit-Reset for the tightest limit.
+
+The client IP is the TCP peer address. X-Forwarded-For is only honoured when
+the peer is a trusted proxy (RATE_LIMIT_TRUSTED_PROXIES); otherwise any client
+could pick its own IP bucket by sending the header.
+
+Configuration (environment variables, requests per minute unless noted):
+- RATE_LIMIT_ENABLED: set to "false" to disable all checks (default true)
+- PUBLIC_API_RATE_PER_KEY (default 60), PUBLIC_API_RATE_PER_IP (default 120),
+  PUBLIC_API_RATE_PER_AGENT (default 300)
+- PUBLIC_API_MAX_CONCURRENT_PER_KEY: in-flight requests per API key (default 4)
+- LOGIN_RATE_PER_IP (default 20), LOGIN_RATE_PER_ACCOUNT (default 10)
+- RATE_LIMIT_TRUSTED_PROXIES: comma-separated proxy IPs or CIDR ranges whose
+  X-Forwarded-For header is trusted (default none)
+"""
+
+import ipaddress
+import logging
+import math
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+
+# Idle buckets are pruned once a scope holds this many keys
+_MAX_KEYS_PER_SCOPE = 100_000
+
+
+class RateLimit:
+    """A named token-bucket limit: `requests` per `per_seconds`, bursting up to `burst`"""
+
+    __slots__ = ('scope', 'requests', 'per_seconds', 'burst', 'rate')
+
+    def __init__(self, scope: str, requests: int, per_seconds: float = 60.0, burst: Optional[int] = None):
+        self.scope = scope
+        self.requests = max(1, requests)
+        self.per_seconds = per_seconds
+        self.burst = max(1, burst or requests)
+        self.rate = self.requests / per_seconds  # tokens per second
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is over a limit"""
+
+    def __init__(self, limit: RateLimit, retry_after: float, headers: Dict[str, str]):
+        super().__init__(f"Rate limit exceeded ({limit.scope})")
+        self.limit = limit
+        self.retry_after = retry_after
+        self.headers = headers
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class InMemoryRateLimitBackend:
+    """Per-worker buckets and slot counters"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[str, _Bucket]] = {}
+        self._slots: Dict[str, Dict[str, int]] = {}
+
+    async def take_all(self, checks: List[Tuple[RateLimit, str]]) -> List[Tuple[bool, float, float]]:
+        """
+        Take one token from every bucket, or from none of them.
+        Returns (allowed, tokens remaining, seconds until a token is available)
+        per bucket; tokens are only spent when every bucket allows the request.
+        """
+        now = time.monotonic()
+        buckets = [self._bucket(limit, key, now) for limit, key in checks]
+        allowed = all(bucket.tokens >= 1 for bucket in buckets)
+        results = []
+        for (limit, _), bucket in zip(checks, buckets):
+            if allowed:
+                bucket.tokens -= 1
+                results.append((True, bucket.tokens, 0.0))
+            elif bucket.tokens >= 1:
+                results.append((True, bucket.tokens, 0.0))
+            else:
+                results.append((False, bucket.tokens, (1 - bucket.tokens) / limit.rate))
+        return results
+
+    def _bucket(self, limit: RateLimit, key: str, now: float) -> _Bucket:
+        """The refilled bucket for (scope, key)"""
+        buckets = self._buckets.get(limit.scope)
+        if buckets is None:
+            buckets = self._buckets[limit.scope] = {}
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= _MAX_KEYS_PER_SCOPE:
+                self._prune(buckets, limit, now)
+            bucket = buckets[key] = _Bucket(limit.burst, now)
+        else:
+            bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.stamp) * limit.rate)
+            bucket.stamp = now
+        return bucket
+
+    async def acquire_slot(self, scope: str, key: str, limit: int) -> bool:
+        counts = self._slots.get(scope)
+        if counts is None:
+            counts = self._slots[scope] = {}
+        current = counts.get(key, 0)
+        if current >= limit:
+            return False
+        counts[key] = current + 1
+        return True
+
+    async def release_slot(self, scope: str, key: str) -> None:
+        counts = self._slots.get(scope)
+        if counts is None:
+            return
+        current = counts.get(key, 0)
+        if current <= 1:
+            counts.pop(key, None)
+        else:
+            counts[key] = current - 1
+
+    @staticmethod
+    def _prune(buckets: Dict[str, _Bucket], limit: RateLimit, now: float) -> None:
+        # A bucket idle long enough to refill completely carries no state
+        refill = limit.burst / limit.rate
+        for key in [k for k, b in buckets.items() if now - b.stamp >= refill]:
+            del buckets[key]
+
+
+# KEYS: one bucket per check; ARGV: now, then rate and burst per check.
+# Every bucket is refilled and checked first; tokens are only spent if all allow.
+_REDIS_TAKE = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local all_allowed = true
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local data = redis.call('HMGET', KEYS[i], 't', 's')
+  local t = tonumber(data[1]) or burst
+  local stamp = tonumber(data[2]) or now
+  t = math.min(burst, t + math.max(0, now - stamp) * rate)
+  tokens[i] = t
+  if t < 1 then
+    all_allowed = false
+  end
+end
+local result = {}
+for i = 1, #KEYS do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local t = tokens[i]
+  local allowed = 0
+  local retry = 0
+  if t >= 1 then
+    allowed = 1
+    if all_allowed then
+      t = t - 1
+    end
+  else
+    retry = (1 - t) / rate
+  end
+  redis.call('HSET', KEYS[i], 't', t, 's', now)
+  redis.call('EXPIRE', KEYS[i], math.ceil(burst / rate) + 1)
+  table.insert(result, allowed)
+  table.insert(result, tostring(t))
+  table.insert(result, tostring(retry))
+end
+return result
+"""
+
+
+class RedisRateLimitBackend:
+    """Buckets and slot counters shared through Redis (falls back to memory on errors)"""
+
+    # Slot counters expire in case a worker dies while holding slots
+    SLOT_TTL_SECONDS = 600
+
+    def __init__(self, url: str, prefix: str = "agentforge:ratelimit"):
+        self.url = url
+        self.prefix = prefix
+        self._fallback = InMemoryRateLimitBackend()
+        self._take_script = None
+
+    async def _script(self):
+        if self._take_script is None:
+            from core.process.services.queue_clients import get_queue_client_pool
+            client = await get_queue_client_pool().get_redis(self.url)
+            self._take_script = client.register_script(_REDIS_TAKE)
+        return self._take_script
+
+    async def take_all(self, checks: List[Tuple[RateLimit, str]]) -> List[Tuple[bool, float, float]]:
+        args = [time.time()]
+        for limit, _ in checks:
+            args += [limit.rate, limit.burst]
+        try:
+            script = await self._script()
+            flat = await script(
+                keys=[f"{self.prefix}:{limit.scope}:{key}" for limit, key in checks],
+                args=args,
+            )
+            return [
+                (bool(int(flat[i])), float(flat[i + 1]), float(flat[i + 2]))
+                for i in range(0, len(flat), 3)
+            ]
+        except Exception as e:
+            logger.warning("Redis rate limit check failed, using in-memory limits: %s", e)
+            self._take_script = None
+            return await self._fallback.take_all(checks)
+
+    async def acquire_slot(self, scope: str, key: str, limit: int) -> bool:
+        try:
+            from core.process.services.queue_clients import get_queue_client_pool
+            client = await get_queue_client_pool().get_redis(self.url)
+            slot_key = f"{self.prefix}:slots:{scope}:{key}"
+            current = await client.incr(slot_key)
+            await client.expire(slot_key, self.SLOT_TTL_SECONDS)
+            if current > limit:
+                await client.decr(slot_key)
+                return False
+            return True
+        except Exception as e:
+            logger.warning("Redis concurrency check failed, using in-memory limits: %s", e)
+            return await self._fallback.acquire_slot(scope, key, limit)
+
+    async def release_slot(self, scope: str, key: str) -> None:
+        try:
+            from core.process.services.queue_clients import get_queue_client_pool
+            client = await get_queue_client_pool().get_redis(self.url)
+            await client.decr(f"{self.prefix}:slots:{scope}:{key}")
+        except Exception:
+            await self._fallback.release_slot(scope, key)
+
+
+# ============================================================================
+# LIMITER
+# ============================================================================
+
+class RateLimiter:
+    """Applies several limits to one request and builds the X-RateLimit-* headers"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or InMemoryRateLimitBackend()
+
+    async def check(self, checks: Iterable[Tuple[RateLimit, Optional[str]]]) -> Dict[str, str]:
+        """
+        Take a token from each (limit, key) bucket; keys that are None are skipped.
+        Either every bucket is charged or none is, so a request rejected by one
+        limit does not use up the others. Returns the rate-limit headers, or
+        raises RateLimitExceeded for the limit with the longest wait.
+        """
+        if not RATE_LIMIT_ENABLED:
+            return {}
+        checks = [(limit, key) for limit, key in checks if key]
+        if not checks:
+            return {}
+        results = await self.backend.take_all(checks)
+        rejected = [
+            (retry_after, limit)
+            for (limit, _), (allowed, _, retry_after) in zip(checks, results)
+            if not allowed
+        ]
+        if rejected:
+            retry_after, limit = max(rejected, key=lambda r: r[0])
+            retry_after = max(1, math.ceil(retry_after))
+            headers = self._headers(limit, 0, retry_after)
+            headers["Retry-After"] = str(retry_after)
+            raise RateLimitExceeded(limit, retry_after, headers)
+        tightest: Optional[RateLimit] = None
+        tightest_remaining = 0.0
+        for (limit, _), (_, remaining, _) in zip(checks, results):
+            if tightest is None or remaining / limit.burst < tightest_remaining / tightest.burst:
+                tightest, tightest_remaining = limit, remaining
+        reset = math.ceil((tightest.burst - tightest_remaining) / tightest.rate)
+        return self._headers(tightest, int(tightest_remaining), reset)
+
+    async def acquire_slot(self, scope: str, key: str, limit: int) -> bool:
+        if not RATE_LIMIT_ENABLED or limit <= 0:
+            return True
+        return await self.backend.acquire_slot(scope, key, limit)
+
+    async def release_slot(self, scope: str, key: str, limit: int) -> None:
+        if not RATE_LIMIT_ENABLED or limit <= 0:
+            return
+        await self.backend.release_slot(scope, key)
+
+    @staticmethod
+    def _headers(limit: RateLimit, remaining: int, reset: int) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(limit.requests),
+            "X-RateLimit-Remaining": str(max(0, remaining)),
+            "X-RateLimit-Reset": str(max(0, reset)),
+        }
+
+
+def _parse_trusted_proxies(value: str) -> list:
+    networks = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning("Ignoring invalid RATE_LIMIT_TRUSTED_PROXIES entry: %s", item)
+    return networks
+
+
+TRUSTED_PROXIES = _parse_trusted_proxies(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', ''))
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    if not TRUSTED_PROXIES or not host:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request) -> str:
+    """
+    Client IP: the TCP peer, unless the peer is a trusted proxy. Then the
+    X-Forwarded-For chain is walked from the right, skipping trusted proxies,
+    and the first untrusted hop is the client (hops further left were written
+    by the client and cannot be trusted).
+    """
+    peer = request.client.host if request.client else ""
+    if not _is_trusted_proxy(peer):
+        return peer
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded:
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+# Limits used by the public agent API and login
+PUBLIC_API_PER_KEY = RateLimit("public_key", _env_int('PUBLIC_API_RATE_PER_KEY', 60))
+PUBLIC_API_PER_IP = RateLimit("public_ip", _env_int('PUBLIC_API_RATE_PER_IP', 120))
+PUBLIC_API_PER_AGENT = RateLimit("public_agent", _env_int('PUBLIC_API_RATE_PER_AGENT', 300))
+PUBLIC_API_MAX_CONCURRENT_PER_KEY = _env_int('PUBLIC_API_MAX_CONCURRENT_PER_KEY', 4)
+LOGIN_PER_IP = RateLimit("login_ip", _env_int('LOGIN_RATE_PER_IP', 20))
+LOGIN_PER_ACCOUNT = RateLimit("login_account", _env_int('LOGIN_RATE_PER_ACCOUNT', 10))
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter; backend chosen by RATE_LIMIT_BACKEND"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        backend = None
+        if os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower() == 'redis':
+            url = os.environ.get('RATE_LIMIT_REDIS_URL') or os.environ.get('REDIS_URL')
+            if url:
+                backend = RedisRateLimitBackend(url)
+            else:
+                logger.warning("RATE_LIMIT_BACKEND=redis but no RATE_LIMIT_REDIS_URL/REDIS_URL; using memory")
+        _rate_limiter = RateLimiter(backend)
+    return _rate_limiter
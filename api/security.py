@@ -20,6 +20,8 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from enum import Enum
+import asyncio
+import base64
 import secrets
 import json
 import csv
@@ -34,10 +36,12 @@ from core.security import (
     Organization, Department, UserGroup, Role, Policy, PolicyRule, PolicyCondition,
     ToolPermission, KnowledgeBasePermission, DatabasePermission,
     Session, Invitation, AuditLog, LDAPConfig, SecuritySettings,
-    PasswordService, MFAService, TokenService, EmailService, LDAPService, OAuthService,
+    PasswordService, PasswordHashBusyError, MFAService, TokenService, EmailService, LDAPService, OAuthService,
     ActionType, ResourceType, Permission, DataClassification, TenancyMode,
     DEFAULT_ROLES
 )
+from core.security.ldap_directory import discard_ldap_pool
+from api.rate_limit import get_rate_limiter, client_ip, RateLimitExceeded, LOGIN_PER_IP, LOGIN_PER_ACCOUNT
 
 router = APIRouter(prefix="/api/security", tags=["Security"])
 security_bearer = HTTPBearer(auto_error=False)
@@ -82,6 +86,47 @@ def save_audit_log_to_db(log: AuditLog):
         traceback.print_exc()
         security_state.save_to_disk()
 
+def _password_busy(e: PasswordHashBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many authentication requests. Please try again shortly.",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop; 429 when the hashing pool is saturated"""
+    try:
+        return await PasswordService.hash_password_async(password)
+    except PasswordHashBusyError as e:
+        raise _password_busy(e)
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash several passwords as one hashing pool job; 429 when the pool is saturated"""
+    try:
+        return await PasswordService.hash_passwords_async(passwords)
+    except PasswordHashBusyError as e:
+        raise _password_busy(e)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Verify a password off the event loop; 429 when the hashing pool is saturated"""
+    try:
+        return await PasswordService.verify_password_async(password, password_hash)
+    except PasswordHashBusyError as e:
+        raise _password_busy(e)
+
+async def verify_mfa_code(user: User, code: str) -> bool:
+    """Verify an MFA code, hashing backup codes off the event loop; 429 when the hashing pool is saturated"""
+    try:
+        return await MFAService.verify_code_async(user, code)
+    except PasswordHashBusyError as e:
+        raise _password_busy(e)
+
+async def is_password_in_history(password: str, user: User) -> bool:
+    try:
+        return await PasswordService.is_password_in_history_async(password, user)
+    except PasswordHashBusyError as e:
+        raise _password_busy(e)
+
 # ============================================================================
 # REQUEST/RESPONSE MODELS
 # ============================================================================
@@ -358,6 +403,7 @@ class LDAPConfigRequest(BaseModel):
     group_role_mapping: Dict[str, str] = {}
     sync_enabled: bool = True
     sync_interval_hours: int = 24
+    sync_cursor_attribute: str = "modifyTimestamp"
 
 # OAuth Requests
 class OAuthConfigRequest(BaseModel):
@@ -400,21 +446,22 @@ async def get_current_user(
     session_id = payload.get("session_id")
     token_org_id = payload.get("org_id")
     
-    # Verify session is still active
-    session = security_state.sessions.get(session_id)
+    # Verify session is still active. Sessions live in the user_sessions table
+    # behind a per-worker cache, so logout/revoke on any worker is honoured here.
+    session = security_state.session_store.get(session_id)
     if not session:
-        # Sessions are kept only in memory, and the server restarts often (every repo
-        # redeploy — e.g. the auto-sync push triggers a Railway deploy). Without this,
-        # a restart silently logs every user out mid-use ("Not authenticated" 401s).
-        # The JWT was already cryptographically verified above (verify_token) and carries
-        # the identity, so rehydrate the session from the token instead of failing.
-        # NOTE: this means a logged-out token can be re-accepted if a restart happens
-        # before its own JWT expiry. Proper fix (Phase 2): persist sessions in the DB.
+        # Tokens issued before sessions were persisted (or while the DB was
+        # unreachable) have no row. The JWT was already cryptographically verified
+        # above (verify_token) and carries the identity, so rehydrate the session
+        # from the token and persist it, instead of logging the user out.
         try:
-            session = Session(id=session_id, user_id=user_id, org_id=token_org_id or "")
-            security_state.sessions[session_id] = session
+            session = security_state.session_store.create(
+                Session(id=session_id, user_id=user_id, org_id=token_org_id or "")
+            )
         except Exception:
             return None
+    if session.user_id != user_id:
+        return None
     if not session.is_active:
         return None
     
@@ -426,7 +473,7 @@ async def get_current_user(
         try:
             last_activity = datetime.fromisoformat(session.last_activity)
             if datetime.utcnow() - last_activity > timedelta(minutes=settings.session_timeout_minutes):
-                session.is_active = False
+                security_state.session_store.revoke(session.id)
                 return None
         except (TypeError, ValueError):
             try:
@@ -445,7 +492,7 @@ async def get_current_user(
                 user = UserService.get_user_by_id(user_id, org_id)
                 if user:
                     # Add to security_state cache
-                    security_state.users[user.id] = user
+                    security_state.cache_db_user(user)
         except Exception as e:
             print(f"⚠️  [AUTH] Failed to load user from database: {e}")
             import traceback
@@ -455,7 +502,7 @@ async def get_current_user(
         return None
     
     # Update last activity
-    session.last_activity = datetime.utcnow().isoformat()
+    security_state.session_store.record_activity(session)
     prev_last_active = getattr(user, "last_active", None)
     user.last_active = datetime.utcnow().isoformat()
     
@@ -688,7 +735,7 @@ async def register(request: RegisterRequest, req: Request):
         org_id=org_id,
         username=username,
         email=request.email.lower(),
-        password_hash=PasswordService.hash_password(request.password),
+        password_hash=await hash_password(request.password),
         profile=UserProfile(
             first_name=request.first_name,
             last_name=request.last_name
@@ -751,6 +798,19 @@ async def login(request: LoginRequest, req: Request):
     if not username or "@" in username:
         raise HTTPException(status_code=400, detail="Please sign in using your username")
 
+    # Throttle password guessing per client IP and per account
+    try:
+        await get_rate_limiter().check((
+            (LOGIN_PER_IP, client_ip(req)),
+            (LOGIN_PER_ACCOUNT, f"{request.org_id or ''}:{username}"),
+        ))
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many login attempts. Try again in {e.retry_after} seconds",
+            headers=e.headers
+        )
+
     user = security_state.get_user_by_username(username, request.org_id)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
@@ -790,7 +850,7 @@ async def login(request: LoginRequest, req: Request):
         raise HTTPException(status_code=403, detail="Please verify your email first")
     
     # Verify password
-    if not PasswordService.verify_password(request.password, user.password_hash):
+    if not await verify_password(request.password, user.password_hash):
         user.failed_login_attempts += 1
         
         # Check lockout
@@ -825,6 +885,14 @@ async def login(request: LoginRequest, req: Request):
         
         raise HTTPException(status_code=401, detail="Invalid username or password")
     
+    # Upgrade the stored hash if the work factor was raised since it was created
+    if PasswordService.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await PasswordService.hash_password_async(request.password)
+            save_user_to_db(user)
+        except PasswordHashBusyError:
+            pass  # Retried on the next login
+    
     # Check MFA requirement based on settings
     mfa_required = False
     
@@ -846,6 +914,7 @@ async def login(request: LoginRequest, req: Request):
         code = MFAService.generate_email_code()
         user.mfa.email_code = code
         user.mfa.email_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+        security_state.expiry_sweeper.track("mfa_code", user.id)
         
         # Save to database
         try:
@@ -899,7 +968,7 @@ async def login(request: LoginRequest, req: Request):
         if not user.mfa:
             print(f"⚠️  [LOGIN MFA] User {user.email} has no MFA object!")
 
-        if not MFAService.verify_code(user, request.mfa_code):
+        if not await verify_mfa_code(user, request.mfa_code):
             print(f"❌ [LOGIN] MFA code verification failed for {user.email}")
             # Brute-force protection: lock the code step after repeated failures (fail-open on errors).
             try:
@@ -943,7 +1012,7 @@ async def login(request: LoginRequest, req: Request):
         if len(active_sessions) >= settings.max_concurrent_sessions:
             # Invalidate oldest session
             oldest = min(active_sessions, key=lambda s: s.created_at)
-            oldest.is_active = False
+            security_state.session_store.revoke(oldest.id)
     
     # Create session
     session = Session(
@@ -953,7 +1022,7 @@ async def login(request: LoginRequest, req: Request):
         user_agent=req.headers.get("user-agent", ""),
         remember_me=request.remember_me
     )
-    security_state.sessions[session.id] = session
+    security_state.session_store.create(session)
     
     # Create tokens
     access_token = TokenService.create_access_token(user.id, user.org_id, session.id)
@@ -1016,8 +1085,8 @@ async def logout(user: User = Depends(require_auth), credentials: HTTPAuthorizat
         payload = TokenService.verify_token(credentials.credentials)
         if payload:
             session_id = payload.get("session_id")
-            if session_id in security_state.sessions:
-                security_state.sessions[session_id].is_active = False
+            if session_id:
+                security_state.session_store.revoke(session_id)
     
     security_state.add_audit_log(
         user=user,
@@ -1040,7 +1109,7 @@ async def refresh_token(refresh_token: str):
     session_id = payload.get("session_id")
     
     user = security_state.users.get(user_id)
-    session = security_state.sessions.get(session_id)
+    session = security_state.session_store.get(session_id)
     
     if not user or not session or not session.is_active:
         raise HTTPException(status_code=401, detail="Session expired")
@@ -1154,7 +1223,7 @@ async def change_password(request: ChangePasswordRequest, user: User = Depends(r
     settings = security_state.get_settings()
     
     # Verify current password
-    if not PasswordService.verify_password(request.current_password, user.password_hash):
+    if not await verify_password(request.current_password, user.password_hash):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
     
     # Validate new password
@@ -1164,12 +1233,12 @@ async def change_password(request: ChangePasswordRequest, user: User = Depends(r
     
     # Check password history
     if settings.password_history_count > 0:
-        if PasswordService.is_password_in_history(request.new_password, user):
+        if await is_password_in_history(request.new_password, user):
             raise HTTPException(status_code=400, detail=f"Cannot reuse last {settings.password_history_count} passwords")
     
     # Update password
     old_hash = user.password_hash
-    user.password_hash = PasswordService.hash_password(request.new_password)
+    user.password_hash = await hash_password(request.new_password)
     user.password_changed_at = datetime.utcnow().isoformat()
     user.must_change_password = False
     
@@ -1182,9 +1251,7 @@ async def change_password(request: ChangePasswordRequest, user: User = Depends(r
     
     # Force logout if setting enabled
     if settings.force_logout_on_password_change:
-        for session in security_state.sessions.values():
-            if session.user_id == user.id:
-                session.is_active = False
+        security_state.invalidate_user_sessions(user.id)
     
     security_state.save_to_disk()
     
@@ -1229,9 +1296,9 @@ async def first_login_password_change(
     is_valid, errors = PasswordService.validate_password(request.new_password, settings)
     if not is_valid:
         raise HTTPException(status_code=400, detail={"message": "Password does not meet requirements", "errors": errors})
-    if PasswordService.verify_password(request.new_password, user.password_hash):
+    if await verify_password(request.new_password, user.password_hash):
         raise HTTPException(status_code=400, detail="New password must be different from temporary password")
-    user.password_hash = PasswordService.hash_password(request.new_password)
+    user.password_hash = await hash_password(request.new_password)
     user.password_changed_at = datetime.utcnow().isoformat()
     user.must_change_password = False
     security_state.save_to_disk()
@@ -1259,6 +1326,7 @@ async def forgot_password(request: ResetPasswordRequest):
             token = secrets.token_urlsafe(32)
             user.reset_password_token = token
             user.reset_password_expires = (datetime.utcnow() + timedelta(hours=24)).isoformat()
+            security_state.expiry_sweeper.track("reset_token", user.id)
         # Persist tokens (DB first, disk fallback)
         try:
             from database.services import UserService
@@ -1303,7 +1371,7 @@ async def reset_password(request: ConfirmResetPasswordRequest):
     
     # Update password
     old_hash = getattr(user, "password_hash", None)
-    user.password_hash = PasswordService.hash_password(request.new_password)
+    user.password_hash = await hash_password(request.new_password)
     user.password_changed_at = datetime.utcnow().isoformat()
     # User already chose a new password via email reset; do not force an additional change.
     user.must_change_password = False
@@ -1314,9 +1382,7 @@ async def reset_password(request: ConfirmResetPasswordRequest):
         user.status = UserStatus.ACTIVE
 
     # Invalidate all sessions for safety
-    for session in security_state.sessions.values():
-        if session.user_id == user.id:
-            session.is_active = False
+    security_state.invalidate_user_sessions(user.id)
 
     security_state.users[user.id] = user
 
@@ -1390,7 +1456,7 @@ async def accept_invitation(request: AcceptInvitationRequest, req: Request):
         org_id=invitation.org_id,
         username=username,
         email=invitation.email.lower(),
-        password_hash=PasswordService.hash_password(request.password),
+        password_hash=await hash_password(request.password),
         profile=UserProfile(
             first_name=request.first_name,
             last_name=request.last_name
@@ -1522,6 +1588,7 @@ async def admin_send_password_reset_link(user_id: str, admin: User = Depends(req
     token = secrets.token_urlsafe(32)
     target_user.reset_password_token = token
     target_user.reset_password_expires = (datetime.utcnow() + timedelta(hours=24)).isoformat()
+    security_state.expiry_sweeper.track("reset_token", target_user.id)
     security_state.users[target_user.id] = target_user
 
     # Persist token before sending the email
@@ -1585,7 +1652,7 @@ async def admin_reset_user_password(
             raise HTTPException(status_code=500, detail={"message": "Failed to generate a temporary password", "errors": last_errors or []})
 
     old_hash = getattr(target_user, "password_hash", None)
-    target_user.password_hash = PasswordService.hash_password(new_password)
+    target_user.password_hash = await hash_password(new_password)
     target_user.password_changed_at = datetime.utcnow().isoformat()
     target_user.must_change_password = True
     target_user.failed_login_attempts = 0
@@ -1610,9 +1677,7 @@ async def admin_reset_user_password(
         pass
 
     # Invalidate all sessions for the user
-    for session in security_state.sessions.values():
-        if session.user_id == target_user.id:
-            session.is_active = False
+    security_state.invalidate_user_sessions(target_user.id)
 
     security_state.users[target_user.id] = target_user
 
@@ -1677,6 +1742,7 @@ async def enable_mfa(request: EnableMFARequest, user: User = Depends(require_aut
         code = MFAService.generate_email_code()
         user.mfa.email_code = code
         user.mfa.email_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+        security_state.expiry_sweeper.track("mfa_code", user.id)
         security_state.users[user.id] = user  # Update in-memory state
         
         # Save to database
@@ -1702,6 +1768,7 @@ async def enable_mfa(request: EnableMFARequest, user: User = Depends(require_aut
         code = MFAService.generate_sms_code()
         user.mfa.sms_code = code
         user.mfa.sms_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+        security_state.expiry_sweeper.track("mfa_code", user.id)
         security_state.users[user.id] = user  # Update in-memory state
         
         # Save to database
@@ -1737,7 +1804,7 @@ async def verify_mfa_setup(request: VerifyMFARequest, user: User = Depends(requi
             
             # Generate backup codes
             backup_codes = MFAService.generate_backup_codes()
-            user.mfa.backup_codes = [PasswordService.hash_password(c) for c in backup_codes]
+            user.mfa.backup_codes = await hash_passwords(backup_codes)
             
             security_state.users[user.id] = user  # Update in-memory state
             
@@ -1786,7 +1853,7 @@ async def verify_mfa_setup(request: VerifyMFARequest, user: User = Depends(requi
             
             # Generate backup codes
             backup_codes = MFAService.generate_backup_codes()
-            user.mfa.backup_codes = [PasswordService.hash_password(c) for c in backup_codes]
+            user.mfa.backup_codes = await hash_passwords(backup_codes)
             
             security_state.users[user.id] = user  # Update in-memory state
             
@@ -1849,13 +1916,14 @@ async def send_mfa_login_code(request: LoginRequest, req: Request):
         raise HTTPException(status_code=400, detail="Email MFA not enabled for this account")
     
     # Verify password first
-    if not PasswordService.verify_password(request.password, user.password_hash):
+    if not await verify_password(request.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Generate and send code
     code = MFAService.generate_email_code()
     user.mfa.email_code = code
     user.mfa.email_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+    security_state.expiry_sweeper.track("mfa_code", user.id)
     security_state.save_to_disk()
     
     await EmailService.send_mfa_code(user, code)
@@ -1911,13 +1979,13 @@ async def toggle_user_mfa(request: dict, user: User = Depends(require_auth)):
 async def disable_mfa(request: DisableMFARequest, user: User = Depends(require_auth)):
     """Disable MFA - requires password confirmation only (user is already authenticated)"""
     # Verify password
-    if not PasswordService.verify_password(request.password, user.password_hash):
+    if not await verify_password(request.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid password")
     
     # MFA code verification is optional - password is enough since user is already logged in
     # If code is provided, verify it for extra security
     if request.code:
-        if not MFAService.verify_code(user, request.code):
+        if not await verify_mfa_code(user, request.code):
             raise HTTPException(status_code=401, detail="Invalid MFA code")
     
     user.mfa.enabled = False
@@ -1956,7 +2024,7 @@ async def regenerate_backup_codes(user: User = Depends(require_auth)):
         raise HTTPException(status_code=400, detail="MFA is not enabled")
     
     backup_codes = MFAService.generate_backup_codes()
-    user.mfa.backup_codes = [PasswordService.hash_password(c) for c in backup_codes]
+    user.mfa.backup_codes = await hash_passwords(backup_codes)
     
     security_state.users[user.id] = user  # Update in-memory state
     
@@ -2138,7 +2206,7 @@ async def create_user(request: CreateUserRequest, user: User = Depends(require_a
         org_id=user.org_id,
         username=username,
         email=request.email.lower(),
-        password_hash=PasswordService.hash_password(password),
+        password_hash=await hash_password(password),
         profile=UserProfile(
             first_name=request.first_name,
             last_name=request.last_name,
@@ -2372,9 +2440,7 @@ async def delete_user(user_id: str, user: User = Depends(require_admin)):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Invalidate all sessions
-    for session in security_state.sessions.values():
-        if session.user_id == user_id:
-            session.is_active = False
+    security_state.invalidate_user_sessions(user_id)
     
     del security_state.users[user_id]
     
@@ -2516,11 +2582,11 @@ async def revoke_session(user_id: str, session_id: str, user: User = Depends(req
     if user.id != user_id and not security_state.check_permission(user, Permission.USERS_EDIT.value):
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    session = security_state.sessions.get(session_id)
+    session = security_state.session_store.get(session_id)
     if not session or session.user_id != user_id:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session.is_active = False
+    security_state.session_store.revoke(session_id)
     security_state.save_to_disk()
     
     return {"status": "success"}
@@ -2783,6 +2849,7 @@ async def update_role(role_id: str, request: UpdateRoleRequest, user: User = Dep
         role.parent_id = request.parent_id
     
     role.updated_at = datetime.utcnow().isoformat()
+    security_state.roles.touch()  # Role edited in place - refresh cached permissions
     print(f"🔧 [API] Updating role {role.name}: {len(role.permissions)} permissions")
     
     # Save to database (primary storage)
@@ -2820,6 +2887,7 @@ async def reset_default_roles(user: User = Depends(require_super_admin)):
             role = security_state.roles[role_id]
             role.permissions = default_role["permissions"]
             role.description = default_role["description"]
+            security_state.roles.touch()
             
             # Save to database
             print(f"💾 [API] Resetting role to defaults in database: {role.name} (ID: {role_id[:8]}...)")
@@ -3046,6 +3114,7 @@ async def update_policy(policy_id: str, request: UpdatePolicyRequest, user: User
         policy.is_active = request.is_active
     
     policy.updated_at = datetime.utcnow().isoformat()
+    security_state.policies.touch()  # Recompile ABAC policies
     security_state.save_to_disk()
     
     security_state.add_audit_log(
@@ -3335,6 +3404,7 @@ async def update_group(group_id: str, request: CreateGroupRequest, user: User =
         group.member_ids = members
     
     group.updated_at = datetime.utcnow().isoformat()
+    security_state.groups.touch()
     
     # Save to database
     try:
@@ -3478,6 +3548,7 @@ async def delete_ldap_config(config_id: str, user: User = Depends(require_super_
         raise HTTPException(status_code=404, detail="LDAP config not found")
     
     del security_state.ldap_configs[config_id]
+    discard_ldap_pool(config_id)
     security_state.save_to_disk()
     
     return {"status": "success"}
@@ -3790,6 +3861,7 @@ async def oauth_callback(provider: str, req: Request):
             code = MFAService.generate_email_code()
             user.mfa.email_code = code
             user.mfa.email_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+            security_state.expiry_sweeper.track("mfa_code", user.id)
             security_state.save_to_disk()
             
             # Send email in background
@@ -3808,6 +3880,7 @@ async def oauth_callback(provider: str, req: Request):
             is_active=False  # Not active until MFA verified
         )
         security_state.sessions[temp_session.id] = temp_session
+        security_state.expiry_sweeper.track("session", temp_session.id)
         
         # Redirect to MFA verification page with session ID
         redirect_url = f"/ui/#mfa-verify?session_id={temp_session.id}&email={user.email}&provider={provider}"
@@ -3818,7 +3891,7 @@ async def oauth_callback(provider: str, req: Request):
     
     # Verify MFA if provided (from query param or separate endpoint)
     if mfa_required and mfa_code:
-        if not MFAService.verify_code(user, mfa_code):
+        if not await verify_mfa_code(user, mfa_code):
             print(f"❌ [OAUTH] Invalid MFA code for {user.email}")
             # Redirect back to login with error
             return Response(
@@ -3834,7 +3907,7 @@ async def oauth_callback(provider: str, req: Request):
         ip_address=req.client.host,
         user_agent=req.headers.get("user-agent", "")
     )
-    security_state.sessions[session.id] = session
+    security_state.session_store.create(session)
     
     access_token = TokenService.create_access_token(user.id, user.org_id, session.id)
     
@@ -3881,6 +3954,7 @@ async def resend_oauth_mfa_code(request: dict):
     code = MFAService.generate_email_code()
     user.mfa.email_code = code
     user.mfa.email_code_expires = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+    security_state.expiry_sweeper.track("mfa_code", user.id)
     security_state.users[user.id] = user
     
     # Save to database
@@ -3926,7 +4000,7 @@ async def verify_oauth_mfa(request: dict):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify MFA code
-    if not MFAService.verify_code(user, mfa_code):
+    if not await verify_mfa_code(user, mfa_code):
         print(f"❌ [OAUTH MFA] Invalid MFA code for {user.email}")
         raise HTTPException(status_code=401, detail="Invalid MFA code")
     
@@ -3951,19 +4025,10 @@ async def verify_oauth_mfa(request: dict):
         ip_address=temp_session.ip_address,
         user_agent=temp_session.user_agent
     )
-    security_state.sessions[session.id] = session
-    
-    # Save session to database
-    try:
-        from database.services import SessionService
-        SessionService.create_session(session)
-    except Exception as e:
-        print(f"⚠️  [OAUTH MFA ERROR] Database save failed for session: {e}")
-        import traceback
-        traceback.print_exc()
+    security_state.session_store.create(session)
     
     # Delete temporary session
-    del security_state.sessions[session_id]
+    security_state.session_store.forget(session_id)
     
     # Create access token
     access_token = TokenService.create_access_token(user.id, user.org_id, session.id)
@@ -4001,50 +4066,70 @@ async def verify_oauth_mfa(request: dict):
 # AUDIT LOG ENDPOINTS
 # ============================================================================
 
+AUDIT_PAGE_MAX = 500
+AUDIT_EXPORT_PAGE = 1000
+
+
+def _encode_audit_cursor(log: AuditLog) -> str:
+    return base64.urlsafe_b64encode(f"{log.timestamp}|{log.id}".encode()).decode()
+
+
+def _decode_audit_cursor(cursor: str):
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return timestamp, log_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/audit-logs")
 async def list_audit_logs(
     user: User = Depends(require_admin),
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = None,
     action: Optional[ActionType] = None,
     resource_type: Optional[ResourceType] = None,
     user_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ):
-    """List audit logs with filtering"""
+    """
+    List audit logs with filtering.
+    
+    Filtering and pagination run in the database. Pass `next_cursor` from the
+    previous response as `cursor` for keyset pagination; `page` still works
+    for direct page access.
+    """
     if not security_state.check_permission(user, Permission.AUDIT_VIEW.value):
         raise HTTPException(status_code=403, detail="Permission denied")
     
-    logs = [l for l in security_state.audit_logs if l.org_id == user.org_id]
-    
-    # Apply filters
-    if action:
-        logs = [l for l in logs if l.action == action]
-    if resource_type:
-        logs = [l for l in logs if l.resource_type == resource_type]
-    if user_id:
-        logs = [l for l in logs if l.user_id == user_id]
-    if start_date:
-        logs = [l for l in logs if l.timestamp >= start_date]
-    if end_date:
-        logs = [l for l in logs if l.timestamp <= end_date]
-    
-    # Sort by timestamp descending
-    logs = sorted(logs, key=lambda x: x.timestamp, reverse=True)
+    limit = max(1, min(limit, AUDIT_PAGE_MAX))
+    page = max(1, page)
+    filters = dict(
+        action=action, resource_type=resource_type, user_id=user_id,
+        start_date=start_date, end_date=end_date
+    )
+    before = _decode_audit_cursor(cursor) if cursor else None
     
-    # Pagination
-    total = len(logs)
-    start = (page - 1) * limit
-    end = start + limit
-    logs = logs[start:end]
+    try:
+        logs = await asyncio.to_thread(
+            security_state.get_audit_logs, user.org_id,
+            limit=limit, offset=(page - 1) * limit, before=before, **filters
+        )
+        total = None if before else await asyncio.to_thread(
+            security_state.count_audit_logs, user.org_id, **filters
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or cursor")
     
     return {
         "logs": [l.dict() for l in logs],
         "total": total,
-        "page": page,
+        "page": None if before else page,
         "limit": limit,
-        "pages": (total + limit - 1) // limit
+        "pages": (total + limit - 1) // limit if total is not None else None,
+        "next_cursor": _encode_audit_cursor(logs[-1]) if len(logs) == limit else None
     }
 
 @router.get("/audit-logs/export")
@@ -4056,56 +4141,74 @@ async def export_audit_logs(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None
 ):
-    """Export audit logs"""
+    """Export audit logs (streamed from the database page by page)"""
     if not security_state.check_permission(user, Permission.AUDIT_EXPORT.value):
         raise HTTPException(status_code=403, detail="Permission denied")
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="Unsupported format")
     
-    logs = [l for l in security_state.audit_logs if l.org_id == user.org_id]
-    
-    # Apply filters
-    if action:
-        logs = [l for l in logs if l.action == action]
-    if resource_type:
-        logs = [l for l in logs if l.resource_type == resource_type]
-    if start_date:
-        logs = [l for l in logs if l.timestamp >= start_date]
-    if end_date:
-        logs = [l for l in logs if l.timestamp <= end_date]
-    
-    logs = sorted(logs, key=lambda x: x.timestamp, reverse=True)
+    filters = dict(action=action, resource_type=resource_type, start_date=start_date, end_date=end_date)
+    try:
+        first_page = await asyncio.to_thread(
+            security_state.get_audit_logs, user.org_id, limit=AUDIT_EXPORT_PAGE, **filters
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date")
+    
+    async def iter_logs():
+        page_logs = first_page
+        while page_logs:
+            for log in page_logs:
+                yield log
+            if len(page_logs) < AUDIT_EXPORT_PAGE:
+                return
+            last = page_logs[-1]
+            page_logs = await asyncio.to_thread(
+                security_state.get_audit_logs, user.org_id, limit=AUDIT_EXPORT_PAGE,
+                before=(last.timestamp, last.id), **filters
+            )
     
     if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["Timestamp", "User", "Action", "Resource Type", "Resource", "IP", "Success", "Details"])
-        
-        for log in logs:
-            writer.writerow([
-                log.timestamp,
-                log.user_email,
-                log.action.value,
-                log.resource_type.value,
-                log.resource_name or log.resource_id,
-                log.ip_address,
-                "Yes" if log.success else "No",
-                json.dumps(log.details) if log.details else ""
-            ])
+        async def csv_rows():
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(["Timestamp", "User", "Action", "Resource Type", "Resource", "IP", "Success", "Details"])
+            async for log in iter_logs():
+                writer.writerow([
+                    log.timestamp,
+                    log.user_email,
+                    log.action.value,
+                    log.resource_type.value,
+                    log.resource_name or log.resource_id,
+                    log.ip_address,
+                    "Yes" if log.success else "No",
+                    json.dumps(log.details) if log.details else ""
+                ])
+                if output.tell() > 65536:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+            yield output.getvalue()
         
-        output.seek(0)
         return StreamingResponse(
-            iter([output.getvalue()]),
+            csv_rows(),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.utcnow().strftime('%Y%m%d')}.csv"}
         )
     
-    elif format == "json":
-        return StreamingResponse(
-            iter([json.dumps([l.dict() for l in logs], indent=2)]),
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.utcnow().strftime('%Y%m%d')}.json"}
-        )
-    
-    raise HTTPException(status_code=400, detail="Unsupported format")
+    async def json_chunks():
+        yield "["
+        first = True
+        async for log in iter_logs():
+            yield ("" if first else ",") + "\n  " + json.dumps(log.dict(), default=str)
+            first = False
+        yield "\n]"
+    
+    return StreamingResponse(
+        json_chunks(),
+        media_type="application/json",
+        headers={"Content-Disposition": f"attachment; filename=audit_logs_{datetime.utcnow().strftime('%Y%m%d')}.json"}
+    )
 
 # ============================================================================
 # STATISTICS & MISC ENDPOINTS
@@ -4119,10 +4222,12 @@ async def get_security_stats(user: User = Depends(require_admin)):
     
     # Calculate login stats for last 7 days
     week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-    recent_logins = [l for l in security_state.audit_logs 
-                    if l.org_id == user.org_id and l.action == ActionType.LOGIN and l.timestamp >= week_ago]
-    failed_logins = [l for l in security_state.audit_logs 
-                    if l.org_id == user.org_id and l.action == ActionType.LOGIN_FAILED and l.timestamp >= week_ago]
+    recent_logins = await asyncio.to_thread(
+        security_state.count_audit_logs, user.org_id, action=ActionType.LOGIN, start_date=week_ago
+    )
+    failed_logins = await asyncio.to_thread(
+        security_state.count_audit_logs, user.org_id, action=ActionType.LOGIN_FAILED, start_date=week_ago
+    )
     
     return {
         "users": {
@@ -4143,9 +4248,11 @@ async def get_security_stats(user: User = Depends(require_admin)):
         "roles": len([r for r in security_state.roles.values() if r.org_id == user.org_id or r.is_system]),
         "policies": len([p for p in security_state.policies.values() if p.org_id == user.org_id]),
         "login_stats": {
-            "successful_7d": len(recent_logins),
-            "failed_7d": len(failed_logins)
-        }
+            "successful_7d": recent_logins,
+            "failed_7d": failed_logins
+        },
+        # Worker-wide: sessions, MFA codes and reset tokens awaiting expiry, and totals expired
+        "expiry": security_state.expiry_sweeper.stats()
     }
 
 @router.get("/permissions")
@@ -0,0 +1,400 @@
+"""
+User Directory Cache
+Per-organization TTL cache of user attributes, org config and the manager graph
+
+Approval routing resolves managers and management chains for every approval
+node. Each get_user() used to re-read the organization's directory config,
+the user row and its department, group and role names, and a management
+chain repeated that once per level. get_org_chart() loaded every user of the
+organization on each call.
+
+Per organization this cache keeps:
+- the directory config (source, LDAP/HR settings)
+- resolved UserAttributes by user ID (handed out as copies)
+- enriched process contexts by user ID (enrich_process_context), refreshed
+  in the background once they are PROCESS_CONTEXT_REFRESH_SECONDS old
+- an OrgDirectory: one lightweight row per user (the columns the org chart
+  needs plus manager_id and department_id) and each department's manager,
+  loaded with one query per table. Management chains and the org chart are
+  computed from it without further queries
+
+Invalidation:
+- User writes made through UserService and UserDirectoryService call
+  user_changed(), which drops the user's cached attributes and process
+  context and makes the next access poll for changes immediately
+- Every DIRECTORY_CACHE_POLL_SECONDS an accessed organization is polled for
+  users and departments updated since the last poll (one small query per
+  table); changed rows are patched into the OrgDirectory and their users'
+  attributes dropped. This also picks up writes from other workers
+- Entries expire after DIRECTORY_CACHE_TTL_SECONDS, which bounds staleness
+  for changes the poll cannot see (deleted rows, renamed roles or groups)
+- Changing an organization's directory source or HR API settings clears
+  the cache, so nothing resolved under the previous config is reused
+
+Configuration (environment variables):
+- DIRECTORY_CACHE_TTL_SECONDS: lifetime of an organization's entry (default 120)
+- DIRECTORY_CACHE_POLL_SECONDS: interval between change polls (default 5)
+- DIRECTORY_CACHE_MAX_USERS: cached attributes per organization before reset (default 20000)
+- PROCESS_CONTEXT_TTL_SECONDS: maximum age of a cached process context (default 60)
+- PROCESS_CONTEXT_REFRESH_SECONDS: age at which it is rebuilt in the background (default 20)
+"""
+
+import copy
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DIRECTORY_CACHE_TTL = _env_float('DIRECTORY_CACHE_TTL_SECONDS', 120)
+DIRECTORY_CACHE_POLL_SECONDS = _env_float('DIRECTORY_CACHE_POLL_SECONDS', 5)
+DIRECTORY_CACHE_MAX_USERS = int(_env_float('DIRECTORY_CACHE_MAX_USERS', 20000))
+PROCESS_CONTEXT_TTL = _env_float('PROCESS_CONTEXT_TTL_SECONDS', 60)
+PROCESS_CONTEXT_REFRESH_SECONDS = _env_float('PROCESS_CONTEXT_REFRESH_SECONDS', 20)
+
+# Re-read changes this far behind the last poll, to tolerate clock skew between workers
+_POLL_OVERLAP = timedelta(seconds=30)
+
+_MISSING = object()
+
+# Columns other users' attributes are derived from (manager name/email, report counts)
+_RELATED_COLUMNS = ('email', 'display_name', 'first_name', 'last_name', 'manager_id', 'status')
+
+
+class DirectoryRow:
+    """The user columns the org chart and manager graph need"""
+
+    __slots__ = ('user_id', 'email', 'display_name', 'first_name', 'last_name', 'job_title',
+                 'employee_id', 'department_id', 'manager_id', 'status', 'updated_at')
+
+    COLUMNS = __slots__
+
+    def __init__(self, user_id, email, display_name, first_name, last_name, job_title,
+                 employee_id, department_id, manager_id, status, updated_at):
+        self.user_id = str(user_id)
+        self.email = email
+        self.display_name = display_name
+        self.first_name = first_name
+        self.last_name = last_name
+        self.job_title = job_title
+        self.employee_id = employee_id
+        self.department_id = str(department_id) if department_id else None
+        self.manager_id = str(manager_id) if manager_id else None
+        self.status = status
+        self.updated_at = updated_at
+
+
+class OrgDirectory:
+    """Users and the manager graph of one organization"""
+
+    def __init__(self, rows: Iterable[DirectoryRow], department_managers: Dict[str, Optional[str]]):
+        self.rows: Dict[str, DirectoryRow] = {row.user_id: row for row in rows}
+        self.department_managers = department_managers
+
+    def manager_of(self, user_id: str) -> Optional[str]:
+        """Direct manager, falling back to the department's manager (as get_manager does)"""
+        row = self.rows.get(user_id)
+        if row is None:
+            return None
+        if row.manager_id:
+            return row.manager_id
+        if row.department_id:
+            return self.department_managers.get(row.department_id)
+        return None
+
+    def management_chain(self, user_id: str, max_depth: int) -> List[str]:
+        """Manager IDs from the direct manager upwards, stopping at cycles"""
+        chain = []
+        current = user_id
+        visited = set()
+        for _ in range(max_depth):
+            if current in visited:
+                break
+            visited.add(current)
+            manager_id = self.manager_of(current)
+            if not manager_id:
+                break
+            chain.append(manager_id)
+            current = manager_id
+        return chain
+
+
+class _OrgEntry:
+    __slots__ = ('expires', 'next_poll', 'poll_stamp', 'config', 'attributes', 'directory', 'seen',
+                 'contexts', 'building', 'generation')
+
+    def __init__(self, now: float):
+        self.expires = now + DIRECTORY_CACHE_TTL
+        self.next_poll = now + DIRECTORY_CACHE_POLL_SECONDS
+        self.poll_stamp = datetime.utcnow()
+        self.config: Any = _MISSING
+        self.attributes: Dict[str, Any] = {}
+        self.directory: Optional[OrgDirectory] = None
+        self.seen: Dict[str, datetime] = {}
+        # user_id -> (built at, enriched process context)
+        self.contexts: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.building: Dict[str, Future] = {}
+        # Bumped on every invalidation, so a context built meanwhile is not stored
+        self.generation = 0
+
+    def forget(self, user_id: str) -> None:
+        self.attributes.pop(user_id, None)
+        self.contexts.pop(user_id, None)
+        self.generation += 1
+
+    def forget_all(self) -> None:
+        self.attributes.clear()
+        self.contexts.clear()
+        self.generation += 1
+
+
+class UserDirectoryCache:
+    """Per-organization cache used by UserDirectoryService"""
+
+    def __init__(
+        self,
+        directory_loader: Callable[[str], OrgDirectory],
+        change_feed: Callable[[str, datetime], Tuple[List[DirectoryRow], List[Tuple[str, Optional[str], Optional[datetime]]]]],
+    ):
+        # directory_loader(org_id) -> OrgDirectory
+        # change_feed(org_id, since) -> (changed user rows, [(department_id, manager_id, updated_at)])
+        self._loader = directory_loader
+        self._change_feed = change_feed
+        self._lock = threading.Lock()
+        self._orgs: Dict[str, _OrgEntry] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get_config(self, org_id: str, load: Callable[[], Any]) -> Any:
+        entry = self._entry(org_id)
+        if entry.config is _MISSING:
+            entry.config = load()
+        return entry.config
+
+    def get_attributes(self, org_id: str, user_id: str, load: Callable[[], Any]) -> Any:
+        entry = self._entry(org_id)
+        attrs = entry.attributes.get(user_id, _MISSING)
+        if attrs is _MISSING:
+            attrs = load()
+            if attrs is None:
+                return None
+            if len(entry.attributes) >= DIRECTORY_CACHE_MAX_USERS:
+                entry.attributes.clear()
+            entry.attributes[user_id] = attrs
+        # Callers annotate the result (source, custom attributes), so hand out copies
+        return attrs.model_copy(deep=True)
+
+    def get_many_attributes(self, org_id: str, user_ids: List[str],
+                            load_many: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Attributes of several users by ID (copies; unknown users are left out).
+        The uncached ones are loaded by a single load_many(user_ids) call
+        returning {user_id: attributes or None}.
+        """
+        entry = self._entry(org_id)
+        found: Dict[str, Any] = {}
+        missing = []
+        for user_id in user_ids:
+            attrs = entry.attributes.get(user_id, _MISSING)
+            if attrs is _MISSING:
+                missing.append(user_id)
+            else:
+                found[user_id] = attrs
+        if missing:
+            for user_id, attrs in load_many(missing).items():
+                if attrs is None:
+                    continue
+                if len(entry.attributes) >= DIRECTORY_CACHE_MAX_USERS:
+                    entry.attributes.clear()
+                entry.attributes[user_id] = attrs
+                found[user_id] = attrs
+        return {user_id: attrs.model_copy(deep=True) for user_id, attrs in found.items()}
+
+    def get_context(self, org_id: str, user_id: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Enriched process context of a user. Fresh contexts are returned as
+        copies; after PROCESS_CONTEXT_REFRESH_SECONDS the cached one is still
+        returned but rebuilt in the background, and after
+        PROCESS_CONTEXT_TTL_SECONDS it is rebuilt before returning. Concurrent
+        callers for the same user share one build.
+        """
+        entry = self._entry(org_id)
+        cached = entry.contexts.get(user_id)
+        if cached is not None:
+            built_at, context = cached
+            age = time.monotonic() - built_at
+            if age < PROCESS_CONTEXT_TTL:
+                if age >= PROCESS_CONTEXT_REFRESH_SECONDS and user_id not in entry.building:
+                    self._refresh_context(entry, user_id, build)
+                return copy.deepcopy(context)
+        return copy.deepcopy(self._build_context(entry, user_id, build))
+
+    def get_directory(self, org_id: str) -> OrgDirectory:
+        entry = self._entry(org_id)
+        if entry.directory is None:
+            entry.directory = self._loader(org_id)
+        return entry.directory
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def user_changed(self, user_id: str, deleted: bool = False) -> None:
+        """Drop a user's cached attributes and poll for the change on next access"""
+        user_id = str(user_id)
+        with self._lock:
+            for entry in self._orgs.values():
+                entry.forget(user_id)
+                directory = entry.directory
+                if deleted and directory is not None and user_id in directory.rows:
+                    rows = dict(directory.rows)
+                    row = rows.pop(user_id)
+                    self._drop_related(entry, rows, row, None)
+                    directory.rows = rows
+                entry.next_poll = 0.0
+
+    def invalidate_org(self, org_id: str) -> None:
+        with self._lock:
+            self._orgs.pop(org_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._orgs.clear()
+
+    # ------------------------------------------------------------------
+
+    def _build_context(self, entry: _OrgEntry, user_id: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            future = entry.building.get(user_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                entry.building[user_id] = future
+                generation = entry.generation
+        if not owner:
+            return future.result()
+        try:
+            started = time.monotonic()
+            context = build()
+            with self._lock:
+                if entry.generation == generation:
+                    if len(entry.contexts) >= DIRECTORY_CACHE_MAX_USERS:
+                        entry.contexts.clear()
+                    entry.contexts[user_id] = (started, context)
+            future.set_result(context)
+            return context
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                entry.building.pop(user_id, None)
+
+    def _refresh_context(self, entry: _OrgEntry, user_id: str, build: Callable[[], Dict[str, Any]]) -> None:
+        def refresh():
+            try:
+                self._build_context(entry, user_id, build)
+            except Exception as e:
+                print(f"⚠️ [DIRECTORY CACHE] Background refresh of process context failed: {e}")
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="directory-refresh")
+            executor = self._executor
+        executor.submit(refresh)
+
+    def _entry(self, org_id: str) -> _OrgEntry:
+        now = time.monotonic()
+        entry = self._orgs.get(org_id)
+        if entry is None or entry.expires <= now:
+            entry = _OrgEntry(now)
+            with self._lock:
+                self._orgs[org_id] = entry
+            return entry
+        if entry.next_poll <= now:
+            self._apply_changes(org_id, entry, now)
+        return entry
+
+    def _apply_changes(self, org_id: str, entry: _OrgEntry, now: float) -> None:
+        with self._lock:
+            if entry.next_poll > now:
+                return
+            entry.next_poll = now + DIRECTORY_CACHE_POLL_SECONDS
+            since = entry.poll_stamp - _POLL_OVERLAP
+        try:
+            rows, departments = self._change_feed(org_id, since)
+        except Exception as e:
+            print(f"⚠️ [DIRECTORY CACHE] Failed to poll directory changes: {e}")
+            return
+
+        loaded = self._loader(org_id) if rows and entry.directory is None else None
+
+        # This runs on request threads and on the directory-refresh executor.
+        # Changes are applied under the lock to copies of the directory dicts,
+        # which are swapped in at the end: readers iterate them without the lock.
+        with self._lock:
+            if loaded is not None and entry.directory is None:
+                # Nothing to compare the changed rows against yet
+                entry.directory = loaded
+                entry.forget_all()
+            newest = entry.poll_stamp
+            directory = entry.directory
+            by_id = dict(directory.rows) if directory is not None else None
+            department_managers = dict(directory.department_managers) if directory is not None else None
+            for row in rows:
+                # Rows in the overlap window come back on every poll; act on each change once
+                seen = entry.seen.get(row.user_id)
+                if row.updated_at is not None and seen is not None and row.updated_at <= seen:
+                    continue
+                if row.updated_at is not None:
+                    entry.seen[row.user_id] = row.updated_at
+                    newest = max(newest, row.updated_at)
+                entry.forget(row.user_id)
+                if by_id is not None:
+                    previous = by_id.get(row.user_id)
+                    by_id[row.user_id] = row
+                    self._drop_related(entry, by_id, row, previous)
+            for department_id, manager_id, updated_at in departments:
+                key = f"department:{department_id}"
+                seen = entry.seen.get(key)
+                if updated_at is not None and seen is not None and updated_at <= seen:
+                    continue
+                if updated_at is not None:
+                    entry.seen[key] = updated_at
+                    newest = max(newest, updated_at)
+                if department_managers is not None:
+                    department_managers[department_id] = manager_id
+                # Department-manager fallbacks and department names live in user attributes
+                entry.forget_all()
+            if directory is not None:
+                directory.rows = by_id
+                directory.department_managers = department_managers
+            entry.poll_stamp = newest
+
+    @staticmethod
+    def _drop_related(entry: _OrgEntry, rows: Dict[str, DirectoryRow], row: DirectoryRow,
+                      previous: Optional[DirectoryRow]) -> None:
+        """Drop attributes derived from this user: its managers' report counts and its reports' manager names"""
+        if previous is not None and all(
+            getattr(previous, column) == getattr(row, column)
+            for column in _RELATED_COLUMNS
+        ):
+            return  # e.g. a login timestamp; only the user's own attributes change
+        for manager_id in {row.manager_id, previous.manager_id if previous else None}:
+            if manager_id:
+                entry.forget(manager_id)
+        for other in rows.values():
+            if other.manager_id == row.user_id:
+                entry.forget(other.user_id)
@@ -0,0 +1,151 @@
+"""
+HR API Client
+Shared, pooled HTTP client for HR system lookups
+
+UserDirectoryService used to open a new urllib connection for every HR API
+call and resolved lists of users one lookup at a time. This client:
+- keeps one httpx.Client (keep-alive connection pool) per process
+- coalesces concurrent requests for the same URL and credentials into one
+  HTTP call (a team listing and its members' manager lookups often ask for
+  the same employee at the same time)
+- runs batches on a bounded thread pool (fetch_many), so hydrating a list of
+  N users takes roughly N / HR_API_MAX_CONCURRENCY round-trips
+
+Configuration (environment variables):
+- HR_API_MAX_CONCURRENCY: concurrent HR requests per batch and pooled connections (default 8)
+- HR_API_TIMEOUT_SECONDS: per-request timeout (default 10)
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+HR_API_MAX_CONCURRENCY = max(1, int(_env_float('HR_API_MAX_CONCURRENCY', 8)))
+HR_API_TIMEOUT_SECONDS = _env_float('HR_API_TIMEOUT_SECONDS', 10)
+
+
+class HRAPIClient:
+    """Pooled HR API client with in-flight request coalescing"""
+
+    def __init__(self, max_concurrency: int = None, timeout: float = None):
+        self.max_concurrency = max_concurrency or HR_API_MAX_CONCURRENCY
+        self.timeout = timeout or HR_API_TIMEOUT_SECONDS
+        self._lock = threading.Lock()
+        self._client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Dict[Tuple, Future] = {}
+
+        # Counters
+        self.requests = 0
+        self.coalesced = 0
+
+    # ------------------------------------------------------------------
+
+    def get_json(self, url: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """GET a JSON document; concurrent calls for the same request share one HTTP call"""
+        key = (url, tuple(sorted(headers.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            result = self._request(url, headers)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def fetch_many(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """Apply fn to every item with bounded concurrency, preserving order"""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._get_executor().map(fn, items))
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            executor, self._executor = self._executor, None
+        if client is not None:
+            client.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------
+
+    def _request(self, url: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        import httpx
+
+        self.requests += 1
+        try:
+            response = self._get_client().get(url, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"HR API call failed: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"HR API call error: {e}")
+            return None
+
+    def _get_client(self):
+        client = self._client
+        if client is None:
+            import httpx
+
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=httpx.Limits(
+                            max_connections=self.max_concurrency,
+                            max_keepalive_connections=self.max_concurrency,
+                        ),
+                    )
+                client = self._client
+        return client
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="hr-api"
+                )
+            return self._executor
+
+
+# Shared by every UserDirectoryService instance in this process
+_hr_api_client: Optional[HRAPIClient] = None
+
+
+def get_hr_api_client() -> HRAPIClient:
+    """Get the process-wide HR API client."""
+    global _hr_api_client
+    if _hr_api_client is None:
+        _hr_api_client = HRAPIClient()
+    return _hr_api_client
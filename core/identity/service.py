@@ -22,6 +22,9 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from core.identity.cache import DirectoryRow, OrgDirectory, UserDirectoryCache
+from core.identity.hr_client import get_hr_api_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -180,6 +183,9 @@ class UserDirectoryService:
         # Get user attributes
         user = await directory.get_user(user_id, org_id)
         
+        # Resolve several users at once (concurrent for HR API sources)
+        users = await directory.get_users(user_ids, org_id)
+        
         # Get user's manager
         manager = await directory.get_manager(user_id, org_id)
         
@@ -208,6 +214,14 @@ class UserDirectoryService:
         Returns:
             UserAttributes or None if not found
         """
+        if not user_id:
+            return None
+        return _directory_cache.get_attributes(
+            org_id, str(user_id), lambda: self._load_user(str(user_id), org_id)
+        )
+    
+    def _load_user(self, user_id: str, org_id: str) -> Optional[UserAttributes]:
+        """Resolve a user from the configured source (uncached)."""
         source = self._get_directory_source(org_id)
         
         if source == "internal":
@@ -226,6 +240,28 @@ class UserDirectoryService:
             logger.warning(f"Unknown directory source '{source}' for org {org_id}, falling back to internal")
             return self._get_user_internal(user_id, org_id)
     
+    def _load_users(self, user_ids: List[str], org_id: str) -> Dict[str, Optional[UserAttributes]]:
+        """Resolve several users (uncached): one query for the internal source, per user otherwise."""
+        if self._get_directory_source(org_id) == "internal":
+            return self._get_users_internal(user_ids, org_id)
+        return {uid: self._load_user(uid, org_id) for uid in user_ids}
+    
+    def get_users(self, user_ids: List[str], org_id: str) -> List[Optional[UserAttributes]]:
+        """
+        Get attributes for several users (same order, None if not found).
+        
+        With an HR API source each uncached user costs HR round-trips, so the
+        lookups run concurrently on the shared HR client (bounded by
+        HR_API_MAX_CONCURRENCY); other sources resolve them in turn.
+        """
+        unique_ids = list(dict.fromkeys(str(uid) for uid in user_ids if uid))
+        if len(unique_ids) > 1 and self._get_directory_source(org_id) in ("hr_api", "hybrid"):
+            resolved = get_hr_api_client().fetch_many(lambda uid: self.get_user(uid, org_id), unique_ids)
+        else:
+            resolved = [self.get_user(uid, org_id) for uid in unique_ids]
+        by_id = dict(zip(unique_ids, resolved))
+        return [by_id.get(str(uid)) if uid else None for uid in user_ids]
+    
     def get_user_by_email(self, email: str, org_id: str) -> Optional[UserAttributes]:
         """Get user attributes by email address."""
         from database.base import get_session
@@ -280,6 +316,11 @@ class UserDirectoryService:
         Returns:
             UserAttributes of the manager, or None
         """
+        directory = self._get_org_directory(user_id, org_id)
+        if directory is not None:
+            manager_id = directory.manager_of(str(user_id))
+            return self.get_user(manager_id, org_id) if manager_id else None
+        
         user = self.get_user(user_id, org_id)
         if not user or not user.manager_id:
             # Try to resolve via department manager
@@ -325,6 +366,22 @@ class UserDirectoryService:
         Returns:
             List from immediate manager up to top-level (ordered)
         """
+        directory = self._get_org_directory(user_id, org_id)
+        if directory is not None:
+            # Walk the cached manager graph, then resolve the managers together
+            # (cached ones from the cache, the rest in one load)
+            manager_ids = directory.management_chain(str(user_id), max_depth)
+            managers = _directory_cache.get_many_attributes(
+                org_id, manager_ids, lambda missing: self._load_users(missing, org_id)
+            )
+            chain = []
+            for manager_id in manager_ids:
+                manager = managers.get(manager_id)
+                if not manager:
+                    break
+                chain.append(manager)
+            return chain
+        
         chain = []
         current_id = user_id
         visited = set()
@@ -553,56 +610,44 @@ class UserDirectoryService:
         Returns:
             List of top-level OrgChartNode with nested direct_reports
         """
-        from database.base import get_session
-        from database.models.user import User
+        directory = _directory_cache.get_directory(org_id)
+        users = [row for row in directory.rows.values() if row.status == "active"]
+        
+        # Build lookup maps
+        user_map = {}
+        children_map = {}  # manager_id -> [rows]
+        
+        for u in users:
+            user_map[u.user_id] = u
+            if u.manager_id:
+                children_map.setdefault(u.manager_id, []).append(u)
+        
+        def build_node(user, depth=0):
+            reports = children_map.get(user.user_id, [])
+            return OrgChartNode(
+                user_id=user.user_id,
+                email=user.email,
+                display_name=user.display_name or f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email,
+                job_title=user.job_title,
+                employee_id=user.employee_id,
+                department_id=user.department_id,
+                manager_id=user.manager_id,
+                direct_reports=[
+                    build_node(r, depth + 1) for r in reports
+                ] if depth < max_depth else [],
+                level=depth,
+            )
         
-        with get_session() as session:
-            # Get all active users in the org
-            users = session.query(User).filter(
-                User.org_id == org_id,
-                User.status == "active"
-            ).all()
-            
-            # Build lookup maps
-            user_map = {}
-            children_map = {}  # manager_id -> [user objects]
-            
-            for u in users:
-                uid = str(u.id)
-                user_map[uid] = u
-                mgr_id = str(u.manager_id) if u.manager_id else None
-                if mgr_id:
-                    if mgr_id not in children_map:
-                        children_map[mgr_id] = []
-                    children_map[mgr_id].append(u)
-            
-            def build_node(user, depth=0):
-                uid = str(user.id)
-                reports = children_map.get(uid, [])
-                return OrgChartNode(
-                    user_id=uid,
-                    email=user.email,
-                    display_name=user.display_name or f"{user.first_name or ''} {user.last_name or ''}".strip() or user.email,
-                    job_title=user.job_title,
-                    employee_id=user.employee_id,
-                    department_id=str(user.department_id) if user.department_id else None,
-                    manager_id=str(user.manager_id) if user.manager_id else None,
-                    direct_reports=[
-                        build_node(r, depth + 1) for r in reports
-                    ] if depth < max_depth else [],
-                    level=depth,
-                )
-            
-            if root_user_id and root_user_id in user_map:
-                return [build_node(user_map[root_user_id])]
-            
-            # Find top-level users (no manager or manager not in org)
-            top_users = [
-                u for u in users
-                if not u.manager_id or str(u.manager_id) not in user_map
-            ]
-            
-            return [build_node(u) for u in top_users]
+        if root_user_id and root_user_id in user_map:
+            return [build_node(user_map[root_user_id])]
+        
+        # Find top-level users (no manager or manager not in org)
+        top_users = [
+            u for u in users
+            if not u.manager_id or u.manager_id not in user_map
+        ]
+        
+        return [build_node(u) for u in top_users]
     
     def update_user_manager(self, user_id: str, manager_id: Optional[str], org_id: str, updated_by: str) -> bool:
         """
@@ -651,6 +696,7 @@ class UserDirectoryService:
             user.manager_id = manager_id
             user.updated_at = datetime.utcnow()
             session.commit()
+            _directory_cache.user_changed(user_id)
             
             # Keep in-memory security cache in sync so save_to_disk() doesn't overwrite
             try:
@@ -681,6 +727,7 @@ class UserDirectoryService:
             user.employee_id = employee_id
             user.updated_at = datetime.utcnow()
             session.commit()
+            _directory_cache.user_changed(user_id)
             
             # Keep in-memory security cache in sync
             try:
@@ -747,6 +794,10 @@ class UserDirectoryService:
                     errors.append({"user_id": user_id, "error": str(e)})
             
             session.commit()
+        
+        for update in (updates or []):
+            if update.get("user_id"):
+                _directory_cache.user_changed(update["user_id"])
 
         # Keep in-memory security cache in sync so subsequent admin UI reads
         # (which rely on security_state) reflect bulk imports immediately.
@@ -1181,6 +1232,15 @@ class UserDirectoryService:
         Returns:
             Dict of ALL user context data for process variables
         """
+        if not user_id:
+            return {"user_id": user_id}
+        # Bursts of runs for the same initiator (e.g. webhook triggers) share one lookup
+        return _directory_cache.get_context(
+            org_id, str(user_id), lambda: self._build_process_context(str(user_id), org_id)
+        )
+    
+    def _build_process_context(self, user_id: str, org_id: str) -> Dict[str, Any]:
+        """Resolve the process context of a user (uncached)."""
         logger.info("[enrich_process_context] Looking up user_id=%s, org_id=%s", user_id, org_id)
         user = self.get_user(user_id, org_id)
         if not user:
@@ -1240,8 +1300,12 @@ class UserDirectoryService:
         try:
             dept_id = context.get("department_id")
             if dept_id:
-                dept = self.get_department_info(str(dept_id), org_id)
-                mgr_id = getattr(dept, "manager_id", None) if dept else None
+                department_managers = _directory_cache.get_directory(org_id).department_managers
+                if str(dept_id) in department_managers:
+                    mgr_id = department_managers[str(dept_id)]
+                else:
+                    dept = self.get_department_info(str(dept_id), org_id)
+                    mgr_id = getattr(dept, "manager_id", None) if dept else None
                 if mgr_id:
                     mgr = self.get_user(str(mgr_id), org_id)
                     context["department_head_id"] = str(mgr_id)
@@ -1319,6 +1383,29 @@ class UserDirectoryService:
             
             return self._user_to_attributes(user, org_id, session=session)
     
+    def _get_users_internal(self, user_ids: List[str], org_id: str) -> Dict[str, Optional[UserAttributes]]:
+        """Resolve several users from the internal database with one user query."""
+        from database.base import get_session
+        from database.models.user import User
+        
+        org_id = _resolve_org_uuid(org_id) or org_id
+        loaded: Dict[str, Optional[UserAttributes]] = {}
+        try:
+            with get_session() as session:
+                users = session.query(User).filter(
+                    User.id.in_([str(uid) for uid in user_ids]),
+                    User.org_id == org_id
+                ).all()
+                for user in users:
+                    loaded[str(user.id)] = self._user_to_attributes(user, org_id, session=session)
+        except Exception as e:
+            logger.warning("[_get_users_internal] Bulk query failed, loading users one by one: %s", e)
+        # Users the bulk query missed (e.g. stored without org_id) take the per-user fallbacks
+        for uid in user_ids:
+            if uid not in loaded:
+                loaded[uid] = self._get_user_internal(uid, org_id)
+        return loaded
+    
     def _user_to_attributes(self, user, org_id: str, session=None) -> UserAttributes:
         """Convert a User DB model to UserAttributes."""
         from database.base import get_session as _get_session
@@ -1464,64 +1551,16 @@ class UserDirectoryService:
         """
         Resolve user from LDAP/Active Directory.
         
-        First looks up the user in internal DB to get the external_id,
-        then queries LDAP for additional attributes.
+        Directory entries are mirrored into the users table by the LDAP sync
+        (core/security/ldap_directory.py), including manager_id resolved from
+        the manager DN, so this reads the local tables only: resolving a
+        manager for approval routing never waits on an LDAP round-trip.
         """
-        from database.base import get_session
-        from database.models.user import User
-        
-        # Get internal user to find LDAP external_id
-        with get_session() as session:
-            user = session.query(User).filter(
-                User.id == user_id,
-                User.org_id == org_id
-            ).first()
-            
-            if not user:
-                return None
-            
-            # Start with internal data
-            attrs = self._user_to_attributes(user, org_id, session=session)
-        
-        # Try to enrich from LDAP
-        try:
-            ldap_attrs = self._query_ldap(user.external_id or user.email, org_id)
-            if ldap_attrs:
-                # Merge LDAP data (LDAP takes precedence for directory attributes)
-                if ldap_attrs.get("manager_dn"):
-                    manager_user = self._resolve_ldap_manager(ldap_attrs["manager_dn"], org_id)
-                    if manager_user:
-                        attrs.manager_id = manager_user.user_id
-                        attrs.manager_email = manager_user.email
-                        attrs.manager_name = manager_user.full_name
-                
-                if ldap_attrs.get("department"):
-                    attrs.department_name = ldap_attrs["department"]
-                if ldap_attrs.get("employee_id"):
-                    attrs.employee_id = ldap_attrs["employee_id"]
-                if ldap_attrs.get("job_title"):
-                    attrs.job_title = ldap_attrs["job_title"]
-                
-                attrs.source = "ldap"
-                attrs.custom_attributes.update(ldap_attrs.get("custom", {}))
-        except Exception as e:
-            logger.warning(f"LDAP lookup failed for user {user_id}: {e}, using internal data")
-        
+        attrs = self._get_user_internal(user_id, org_id)
+        if attrs and attrs.source == "internal":
+            attrs.source = "ldap"
         return attrs
     
-    def _query_ldap(self, identifier: str, org_id: str) -> Optional[Dict[str, Any]]:
-        """Query LDAP server for user attributes."""
-        # TODO: Implement actual LDAP query using LDAPConfig from org
-        # This is a placeholder that should use the existing LDAPService
-        logger.debug(f"LDAP query for {identifier} in org {org_id} (not yet implemented)")
-        return None
-    
-    def _resolve_ldap_manager(self, manager_dn: str, org_id: str) -> Optional[UserAttributes]:
-        """Resolve a manager from LDAP DN to an internal user."""
-        # TODO: Implement LDAP DN resolution
-        logger.debug(f"LDAP manager DN resolution for {manager_dn} (not yet implemented)")
-        return None
-    
     # ========================================================================
     # HR API DIRECTORY PROVIDER
     # ========================================================================
@@ -1595,10 +1634,6 @@ class UserDirectoryService:
         if not config:
             return None
         
-        import urllib.request
-        import urllib.error
-        import json
-        
         base_url = config.get("base_url", "").rstrip("/")
         endpoints = config.get("endpoints", {})
         auth_config = config.get("auth_config", {})
@@ -1612,27 +1647,21 @@ class UserDirectoryService:
         # Build URL
         url = f"{base_url}{endpoint_template}".replace("{employee_id}", str(identifier)).replace("{email}", str(identifier))
         
-        # Build request
-        req = urllib.request.Request(url)
-        req.add_header("Content-Type", "application/json")
-        req.add_header("Accept", "application/json")
+        # Build request headers
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
         
         # Add auth
         if auth_type == "bearer":
-            req.add_header("Authorization", f"Bearer {auth_config.get('token', '')}")
+            headers["Authorization"] = f"Bearer {auth_config.get('token', '')}"
         elif auth_type == "api_key":
             header_name = auth_config.get("header_name", "X-API-Key")
-            req.add_header(header_name, auth_config.get("api_key", ""))
+            headers[header_name] = auth_config.get("api_key", "")
         
-        try:
-            with urllib.request.urlopen(req, timeout=10) as response:
-                return json.loads(response.read().decode())
-        except urllib.error.URLError as e:
-            logger.error(f"HR API call failed: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"HR API call error: {e}")
-            return None
+        # Pooled connections; concurrent lookups of the same record share one call
+        return get_hr_api_client().get_json(url, headers)
     
     def _merge_hr_data(self, attrs: UserAttributes, hr_data: Dict[str, Any], org_id: str) -> UserAttributes:
         """Merge HR API response data into UserAttributes."""
@@ -1673,15 +1702,7 @@ class UserDirectoryService:
         if not config:
             return attrs
         
-        # Try LDAP first if configured
-        if config.get("ldap_config_id"):
-            try:
-                ldap_attrs = self._query_ldap(attrs.email, org_id)
-                if ldap_attrs:
-                    attrs.source = "hybrid"
-                    # Merge LDAP data similar to _get_user_ldap
-            except Exception as e:
-                logger.debug(f"LDAP enrichment failed: {e}")
+        # LDAP attributes are already in the local tables (kept current by the LDAP sync)
         
         # Try HR API if configured
         hr_config = self._get_hr_api_config(org_id)
@@ -1708,7 +1729,10 @@ class UserDirectoryService:
         return "internal"
     
     def _get_org_config(self, org_id: str) -> Optional[Dict[str, Any]]:
-        """Get organization configuration."""
+        """Get organization configuration (cached per organization)."""
+        return _directory_cache.get_config(org_id, lambda: self._load_org_config(org_id))
+    
+    def _load_org_config(self, org_id: str) -> Optional[Dict[str, Any]]:
         from database.base import get_session
         from database.models.organization import Organization
         
@@ -1725,6 +1749,19 @@ class UserDirectoryService:
                 }
         return None
     
+    def _get_org_directory(self, user_id: str, org_id: str) -> Optional[OrgDirectory]:
+        """
+        The cached manager graph, when it can answer hierarchy questions for
+        this user: the internal and LDAP sources keep manager_id in the local
+        users table, HR API sources resolve managers remotely.
+        """
+        if not user_id or self._get_directory_source(org_id) not in ("internal", "ldap"):
+            return None
+        directory = _directory_cache.get_directory(org_id)
+        if str(user_id) not in directory.rows:
+            return None  # e.g. a user stored without org_id; use the per-user lookup
+        return directory
+    
     def _get_hr_api_config(self, org_id: str) -> Optional[Dict[str, Any]]:
         """Get HR API configuration for an organization."""
         config = self._get_org_config(org_id)
@@ -1803,3 +1840,66 @@ class UserDirectoryService:
                 return None
         
         return current
+
+
+# ============================================================================
+# DIRECTORY CACHE
+# ============================================================================
+
+def _load_org_directory(org_id: str) -> OrgDirectory:
+    """Load the lightweight user rows and department managers of an organization."""
+    from database.base import get_session
+    from database.models.user import User
+    from database.models.department import Department
+    
+    resolved_org_id = _resolve_org_uuid(org_id) or org_id
+    columns = [User.id if c == 'user_id' else getattr(User, c) for c in DirectoryRow.COLUMNS]
+    with get_session() as session:
+        rows = [
+            DirectoryRow(*values)
+            for values in session.query(*columns).filter(User.org_id == resolved_org_id).all()
+        ]
+        departments = {
+            str(dept_id): str(manager_id) if manager_id else None
+            for dept_id, manager_id in session.query(Department.id, Department.manager_id).filter(
+                Department.org_id == resolved_org_id
+            ).all()
+        }
+    return OrgDirectory(rows, departments)
+
+
+def _load_directory_changes(org_id: str, since: datetime):
+    """Users and departments of an organization updated after `since`."""
+    from database.base import get_session
+    from database.models.user import User
+    from database.models.department import Department
+    
+    resolved_org_id = _resolve_org_uuid(org_id) or org_id
+    columns = [User.id if c == 'user_id' else getattr(User, c) for c in DirectoryRow.COLUMNS]
+    with get_session() as session:
+        rows = [
+            DirectoryRow(*values)
+            for values in session.query(*columns).filter(
+                User.org_id == resolved_org_id,
+                User.updated_at > since,
+            ).all()
+        ]
+        departments = [
+            (str(dept_id), str(manager_id) if manager_id else None, updated_at)
+            for dept_id, manager_id, updated_at in session.query(
+                Department.id, Department.manager_id, Department.updated_at
+            ).filter(
+                Department.org_id == resolved_org_id,
+                Department.updated_at > since,
+            ).all()
+        ]
+    return rows, departments
+
+
+# Shared by every UserDirectoryService instance in this process
+_directory_cache = UserDirectoryCache(_load_org_directory, _load_directory_changes)
+
+
+def get_directory_cache() -> UserDirectoryCache:
+    """Get the process-wide user directory cache."""
+    return _directory_cache
@@ -37,6 +37,7 @@ from .result import (
 )
 
 from .wizard import ProcessWizard
+from .wizard_cache import WizardCache, get_wizard_cache
 
 __all__ = [
     # Schemas
@@ -61,4 +62,6 @@ __all__ = [
     
     # Wizard
     'ProcessWizard',
+    'WizardCache',
+    'get_wizard_cache',
 ]
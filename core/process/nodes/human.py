@@ -11,6 +11,7 @@ These nodes involve human interaction:
 import asyncio
 import json
 import logging
+import os
 import re
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
@@ -21,6 +22,9 @@ from .base import BaseNodeExecutor, register_executor
 
 logger = logging.getLogger(__name__)
 
+# Default delivery for notification nodes: "sync" or "outbox" (see notification_outbox.py)
+NOTIFICATION_DELIVERY_MODE = os.environ.get('NOTIFICATION_DELIVERY_MODE', 'sync')
+
 _UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
 
 
@@ -387,19 +391,24 @@ class ApprovalNodeExecutor(BaseNodeExecutor):
         # ── Resolve approver details (name + email) for visibility ──
         approver_details: List[Dict[str, str]] = []
         if self.deps and getattr(self.deps, 'user_directory', None):
-            for aid in assignee_ids:
-                try:
-                    attrs = self.deps.user_directory.get_user(str(aid), context.org_id)
-                    if attrs:
-                        approver_details.append({
-                            'id': str(aid),
-                            'name': attrs.display_name or f"{attrs.first_name or ''} {attrs.last_name or ''}".strip() or '(unknown)',
-                            'email': attrs.email or '(no email)',
-                        })
-                    else:
-                        approver_details.append({'id': str(aid), 'name': '(not found)', 'email': '(not found)'})
-                except Exception:
+            try:
+                # One batch (concurrent for HR API sources), same order as assignee_ids
+                users = self.deps.user_directory.get_users([str(aid) for aid in assignee_ids], context.org_id)
+            except Exception:
+                users = None
+            for i, aid in enumerate(assignee_ids):
+                if users is None:
                     approver_details.append({'id': str(aid), 'name': '(error)', 'email': '(error)'})
+                    continue
+                attrs = users[i]
+                if attrs:
+                    approver_details.append({
+                        'id': str(aid),
+                        'name': attrs.display_name or f"{attrs.first_name or ''} {attrs.last_name or ''}".strip() or '(unknown)',
+                        'email': attrs.email or '(no email)',
+                    })
+                else:
+                    approver_details.append({'id': str(aid), 'name': '(not found)', 'email': '(not found)'})
         else:
             for aid in assignee_ids:
                 approver_details.append({'id': str(aid), 'name': '(unknown)', 'email': '(unknown)'})
@@ -1623,6 +1632,8 @@ class NotificationNodeExecutor(BaseNodeExecutor):
         template_data: Data for template
         priority: low, normal, high, urgent
         channel_config: Channel-specific configuration
+        delivery: "sync" (wait for delivery) or "outbox" (complete once queued);
+                  defaults to NOTIFICATION_DELIVERY_MODE
     """
     
     display_name = "Notification"
@@ -1660,6 +1671,7 @@ class NotificationNodeExecutor(BaseNodeExecutor):
         template_data = self.get_config_value(node, 'template_data', {})
         priority = self.get_config_value(node, 'priority', 'normal')
         channel_config = self.get_config_value(node, 'channel_config', {})
+        delivery = self.get_config_value(node, 'delivery', NOTIFICATION_DELIVERY_MODE)
         
         logs = [f"Sending {channel} notification"]
         
@@ -2045,7 +2057,7 @@ class NotificationNodeExecutor(BaseNodeExecutor):
                 node.name, channel, len(interpolated_recipients), interpolated_recipients,
                 len(resolved_attachments),
             )
-            result = await self.deps.notification_service.send(
+            send_kwargs = dict(
                 channel=channel,
                 recipients=interpolated_recipients,
                 title=title,
@@ -2056,12 +2068,20 @@ class NotificationNodeExecutor(BaseNodeExecutor):
                 config=channel_config,
                 attachments=resolved_attachments or None,
             )
+            if delivery == 'outbox' and hasattr(self.deps.notification_service, 'enqueue'):
+                result = await self.deps.notification_service.enqueue(**send_kwargs)
+            else:
+                result = await self.deps.notification_service.send(**send_kwargs)
             logger.info("[NotifNode:%s] Send result: %s", node.name, result)
             
-            logs.append(f"Notification sent successfully")
+            if result.get('queued'):
+                logs.append(f"Notification queued for delivery ({result.get('outbox_id')})")
+            else:
+                logs.append(f"Notification sent successfully")
             
             _out: dict = {
                 'sent': True,
+                'queued': bool(result.get('queued')),
                 'channel': channel,
                 'recipients_count': len(interpolated_recipients),
                 'attachments_sent': len(resolved_attachments),
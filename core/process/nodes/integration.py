@@ -18,6 +18,15 @@ from ..result import NodeResult, ExecutionError, ErrorCategory
 from .base import BaseNodeExecutor, register_executor
 
 
+def _http_stream_threshold() -> int:
+    """Default size above which HTTP responses are streamed to disk"""
+    import os
+    try:
+        return int(os.environ.get('HTTP_STREAM_THRESHOLD_BYTES', 10 * 1024 * 1024))
+    except ValueError:
+        return 10 * 1024 * 1024
+
+
 @register_executor(NodeType.HTTP_REQUEST)
 class HTTPRequestNodeExecutor(BaseNodeExecutor):
     """
@@ -35,9 +44,19 @@ class HTTPRequestNodeExecutor(BaseNodeExecutor):
         response_type: json, text, binary
         success_codes: List of success status codes
         verify_ssl: Whether to verify SSL certificates
+        stream_threshold_bytes: Responses larger than this are streamed to a file
+            instead of being held in memory (default: env HTTP_STREAM_THRESHOLD_BYTES or 10 MB)
+
+    Connections come from the worker-wide HTTPSessionPool (keep-alive, DNS cache,
+    per-host limits). Large responses (or response_type=file) are written to
+    {PROCESS_OUTPUT_PATH}/{execution_id}/ and returned as a file reference:
+        {"kind": "file", "path": ..., "name": ..., "size": ..., "content_type": ...,
+         "download_url": "/process/outputs/<execution_id>/<name>"}
     """
     
     display_name = "HTTP Request"
+
+    STREAM_CHUNK_BYTES = 256 * 1024
     
     async def execute(
         self,
@@ -112,76 +131,82 @@ class HTTPRequestNodeExecutor(BaseNodeExecutor):
         
         # Make HTTP request
         start_time = time.time()
+        stream_threshold = self.get_config_value(node, 'stream_threshold_bytes') or _http_stream_threshold()
         
         try:
             import aiohttp
+            from ..services.http_pool import get_http_session_pool
             
-            async with aiohttp.ClientSession() as session:
-                request_kwargs = {
-                    'method': method,
-                    'url': url,
-                    'headers': interpolated_headers,
-                    'ssl': verify_ssl,
-                    'timeout': aiohttp.ClientTimeout(total=timeout_seconds)
-                }
+            session = get_http_session_pool().get_session(url)
+            request_kwargs = {
+                'method': method,
+                'url': url,
+                'headers': interpolated_headers,
+                'ssl': verify_ssl,
+                'timeout': aiohttp.ClientTimeout(total=timeout_seconds)
+            }
+            
+            if interpolated_body:
+                if isinstance(interpolated_body, dict):
+                    request_kwargs['json'] = interpolated_body
+                else:
+                    request_kwargs['data'] = interpolated_body
+            
+            async with session.request(**request_kwargs) as response:
+                status_code = response.status
                 
-                if interpolated_body:
-                    if isinstance(interpolated_body, dict):
-                        request_kwargs['json'] = interpolated_body
-                    else:
-                        request_kwargs['data'] = interpolated_body
+                # Parse response (large bodies are spooled to disk, never fully buffered)
+                raw_body, file_ref = await self._read_body(
+                    response, url, response_type, int(stream_threshold), context, node, logs
+                )
+                duration_ms = (time.time() - start_time) * 1000
+                logs.append(f"Response: {status_code} in {duration_ms:.0f}ms")
                 
-                async with session.request(**request_kwargs) as response:
-                    duration_ms = (time.time() - start_time) * 1000
-                    status_code = response.status
-                    
-                    logs.append(f"Response: {status_code} in {duration_ms:.0f}ms")
-                    
-                    # Parse response
-                    if response_type == 'json':
-                        try:
-                            response_data = await response.json()
-                        except Exception:
-                            response_data = await response.text()
-                    elif response_type == 'binary':
-                        response_data = await response.read()
-                        # Convert to base64 for JSON storage
-                        import base64
-                        response_data = base64.b64encode(response_data).decode()
-                    else:
-                        response_data = await response.text()
+                if file_ref is not None:
+                    response_data = file_ref
+                elif response_type == 'json':
+                    try:
+                        response_data = json.loads(raw_body.decode(response.charset or 'utf-8'))
+                    except Exception:
+                        response_data = raw_body.decode(response.charset or 'utf-8', errors='replace')
+                elif response_type == 'binary':
+                    # Convert to base64 for JSON storage
+                    import base64
+                    response_data = base64.b64encode(raw_body).decode()
+                else:
+                    response_data = raw_body.decode(response.charset or 'utf-8', errors='replace')
+                
+                # Check success
+                if status_code in success_codes:
+                    variables_update = {}
+                    if node.output_variable:
+                        variables_update[node.output_variable] = response_data
                     
-                    # Check success
-                    if status_code in success_codes:
-                        variables_update = {}
-                        if node.output_variable:
-                            variables_update[node.output_variable] = response_data
-                        
-                        return NodeResult.success(
-                            output={
+                    return NodeResult.success(
+                        output={
+                            'status_code': status_code,
+                            'data': response_data,
+                            'headers': dict(response.headers)
+                        },
+                        variables_update=variables_update,
+                        duration_ms=duration_ms,
+                        logs=logs
+                    )
+                else:
+                    return NodeResult.failure(
+                        error=ExecutionError(
+                            category=ErrorCategory.EXTERNAL,
+                            code=f"HTTP_{status_code}",
+                            message=f"HTTP request failed with status {status_code}",
+                            details={
                                 'status_code': status_code,
-                                'data': response_data,
-                                'headers': dict(response.headers)
+                                'response': response_data[:500] if isinstance(response_data, str) else str(response_data)[:500]
                             },
-                            variables_update=variables_update,
-                            duration_ms=duration_ms,
-                            logs=logs
-                        )
-                    else:
-                        return NodeResult.failure(
-                            error=ExecutionError(
-                                category=ErrorCategory.EXTERNAL,
-                                code=f"HTTP_{status_code}",
-                                message=f"HTTP request failed with status {status_code}",
-                                details={
-                                    'status_code': status_code,
-                                    'response': response_data[:500] if isinstance(response_data, str) else str(response_data)[:500]
-                                },
-                                is_retryable=status_code in [408, 429, 500, 502, 503, 504]
-                            ),
-                            duration_ms=duration_ms,
-                            logs=logs
-                        )
+                            is_retryable=status_code in [408, 429, 500, 502, 503, 504]
+                        ),
+                        duration_ms=duration_ms,
+                        logs=logs
+                    )
                         
         except Exception as e:
             error_type = type(e).__name__
@@ -198,6 +223,84 @@ class HTTPRequestNodeExecutor(BaseNodeExecutor):
                 logs=logs
             )
     
+    async def _read_body(
+        self,
+        response,
+        url: str,
+        response_type: str,
+        threshold: int,
+        context: ProcessContext,
+        node: ProcessNode,
+        logs: list
+    ):
+        """
+        Read the response body.
+
+        Returns (bytes, None) for bodies that fit under the threshold, or
+        (None, file_ref) when the body was streamed to disk. Bodies without a
+        Content-Length are buffered until they cross the threshold, then spilled.
+        """
+        force_file = response_type == 'file'
+        content_length = response.content_length
+        if not force_file and content_length is not None and content_length <= threshold:
+            return await response.read(), None
+
+        buffer = bytearray()
+        handle = None
+        filepath = None
+        size = 0
+        try:
+            if force_file or (content_length is not None and content_length > threshold):
+                filepath, handle = self._open_download_file(url, response, context, node)
+            async for chunk in response.content.iter_chunked(self.STREAM_CHUNK_BYTES):
+                size += len(chunk)
+                if handle is None:
+                    buffer.extend(chunk)
+                    if len(buffer) > threshold:
+                        filepath, handle = self._open_download_file(url, response, context, node)
+                        handle.write(buffer)
+                        buffer = bytearray()
+                else:
+                    handle.write(chunk)
+        finally:
+            if handle is not None:
+                handle.close()
+
+        if handle is None:
+            return bytes(buffer), None
+
+        import os
+        filename = os.path.basename(filepath)
+        logs.append(f"Streamed {size} bytes to {filepath}")
+        return None, {
+            'kind': 'file',
+            'path': filepath,
+            'name': filename,
+            'size': size,
+            'content_type': response.content_type,
+            'download_url': f"/process/outputs/{context.execution_id}/{filename}",
+        }
+
+    @staticmethod
+    def _open_download_file(url: str, response, context: ProcessContext, node: ProcessNode):
+        """Create the on-disk target for a streamed download under the execution output dir"""
+        import os
+        import re
+        import mimetypes
+        from urllib.parse import urlsplit
+
+        base_dir = os.environ.get('PROCESS_OUTPUT_PATH', 'data/process_outputs')
+        exec_dir = os.path.join(base_dir, str(context.execution_id))
+        os.makedirs(exec_dir, exist_ok=True)
+
+        url_name = os.path.basename(urlsplit(url).path) or 'download'
+        stem, ext = os.path.splitext(url_name)
+        if not ext:
+            ext = mimetypes.guess_extension(response.content_type or '') or '.bin'
+        safe_stem = re.sub(r'[^A-Za-z0-9]+', '_', stem).strip('_') or 'download'
+        filepath = os.path.join(exec_dir, f"{safe_stem}_{node.id}{ext}")
+        return filepath, open(filepath, 'wb')
+
     def _add_auth(
         self,
         headers: Dict[str, str],
@@ -607,6 +710,10 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
     
     display_name = "File Operation"
 
+    OCR_IMAGE_EXTENSIONS = (
+        "png", "jpg", "jpeg", "gif", "webp", "bmp", "tiff", "tif", "svg", "ico", "heic", "heif",
+    )
+
     @staticmethod
     def _resolve_uploaded_file_path(file_obj: dict, context=None) -> str:
         """
@@ -860,7 +967,7 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
                     result = await self._execute_extract_text_local(
                         path=path, encoding=encoding, logs=logs,
                     )
-                elif isinstance(source_value, dict) and (source_value.get("kind") == "uploadedFile" or source_value.get("download_url") or source_value.get("id")):
+                elif isinstance(source_value, dict) and (source_value.get("kind") in ("uploadedFile", "file") or source_value.get("download_url") or source_value.get("id")):
                     file_name = source_value.get("name") or "file"
                     logs.append(f"Single uploaded file detected: {file_name}")
                     path = self._resolve_uploaded_file_path(source_value, context)
@@ -1067,6 +1174,28 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
         ext = os.path.splitext(abs_path)[1].lower().lstrip(".")
         logs.append(f"Detected file type: {ext or 'unknown'}")
 
+        # Content-addressed cache: identical bytes + options → reuse the extracted text
+        from ..services.extraction_cache import get_extraction_cache
+        cache = get_extraction_cache()
+        cache_options = {"file_type": ext, "encoding": encoding}
+        if ext in self.OCR_IMAGE_EXTENSIONS:
+            cache_options["ocr_model"] = "gpt-4o"
+        cache_key, cached = await cache.lookup(abs_path, cache_options)
+        if cached and cached.get("text"):
+            text = cached["text"]
+            logs.append(f"Extraction cache hit — reused {len(text)} characters")
+            return {
+                "success": True,
+                "data": text,
+                "meta": {
+                    "path": abs_path,
+                    "file_type": ext,
+                    "chars": len(text),
+                    "preview": text[:800],
+                    "cached": True,
+                }
+            }
+
         try:
             text = ""
             if ext in ("txt", "md", "text", "log", "json"):
@@ -1117,7 +1246,7 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
                     text = "\n".join(chunks)
                 except Exception:
                     return {"success": False, "error": "PowerPoint text extraction failed"}
-            elif ext in ("png", "jpg", "jpeg", "gif", "webp", "bmp", "tiff", "tif", "svg", "ico", "heic", "heif"):
+            elif ext in self.OCR_IMAGE_EXTENSIONS:
                 # Image files — use LLM vision for OCR/content extraction
                 logs.append("Image detected — attempting LLM-based OCR/extraction")
                 try:
@@ -1222,6 +1351,7 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
                     "data": "",
                     "meta": {"path": abs_path, "file_type": ext, "chars": 0}
                 }
+            await cache.store(cache_key, {"text": text, "file_type": ext})
             return {
                 "success": True,
                 "data": text,
@@ -1367,16 +1497,19 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
             target_format=fmt,
         )
 
+        # Rendering is CPU-bound: run it in the document process pool, not on the event loop
+        from ..services.document_pool import run_document_job
+        creators = {
+            'docx': self._create_docx,
+            'pdf': self._create_pdf,
+            'xlsx': self._create_xlsx,
+            'pptx': self._create_pptx,
+        }
+
         actual_format = fmt
         try:
-            if fmt == 'docx':
-                size = self._create_docx(filepath, title, content_md)
-            elif fmt == 'pdf':
-                size = self._create_pdf(filepath, title, content_md)
-            elif fmt == 'xlsx':
-                size = self._create_xlsx(filepath, title, content_md)
-            elif fmt == 'pptx':
-                size = self._create_pptx(filepath, title, content_md)
+            if fmt in creators:
+                size = await run_document_job(creators[fmt], filepath, title, content_md)
             else:
                 actual_format = 'txt'
                 filepath = os.path.join(exec_dir, f"{safe_base}_{node.id}.txt")
@@ -1728,7 +1861,8 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
 
         return f"# {title}\n\n## Overview\n{instructions}\n\n## Notes\n(Generated without LLM)\n"
 
-    def _create_docx(self, filepath: str, title: str, content: str) -> int:
+    @staticmethod
+    def _create_docx(filepath: str, title: str, content: str) -> int:
         """Create a Word document from markdown-ish content."""
         import os
         import re
@@ -1757,9 +1891,15 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
         doc.save(filepath)
         return os.path.getsize(filepath)
 
-    def _create_pdf(self, filepath: str, title: str, content: str) -> int:
+    @staticmethod
+    def _create_pdf(filepath: str, title: str, content: str) -> int:
         """Create a PDF document from markdown-ish content (requires reportlab)."""
         import os
+        from ..services.document_writers import is_large_document, write_pdf_lines
+
+        if is_large_document(content):
+            return write_pdf_lines(filepath, title, (content or "").split('\n'))
+
         from reportlab.lib.pagesizes import A4
         from reportlab.lib.styles import getSampleStyleSheet
         from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
@@ -1795,10 +1935,17 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
         doc.build(story)
         return os.path.getsize(filepath)
 
-    def _create_xlsx(self, filepath: str, title: str, content: str) -> int:
+    @staticmethod
+    def _create_xlsx(filepath: str, title: str, content: str) -> int:
         """Create a professionally formatted Excel workbook from markdown content."""
         import os
         import re
+        from ..services.document_writers import is_large_document, markdown_rows, write_xlsx_rows
+
+        if is_large_document(content):
+            # Large exports: write-only workbook, rows streamed straight to disk
+            return write_xlsx_rows(filepath, title, markdown_rows(content), header=False)
+
         from openpyxl import Workbook
         from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
         from openpyxl.utils import get_column_letter
@@ -2049,7 +2196,8 @@ class FileOperationNodeExecutor(BaseNodeExecutor):
         wb.save(filepath)
         return os.path.getsize(filepath)
 
-    def _create_pptx(self, filepath: str, title: str, content: str) -> int:
+    @staticmethod
+    def _create_pptx(filepath: str, title: str, content: str) -> int:
         """Create a PPTX with a title slide + bullets (requires python-pptx)."""
         import os
         from pptx import Presentation
@@ -2157,7 +2305,14 @@ class MessageQueueNodeExecutor(BaseNodeExecutor):
         queue_type: redis, sqs, webhook
         topic: Topic/queue name
         message: Message to publish
+        messages: Optional list of messages to publish in one run (sent in batches)
         queue_config: Queue-specific configuration
+            max_batch_size: Messages per Redis pipeline / SQS SendMessageBatch
+                (default 100 for Redis, 10 for SQS - the SQS maximum)
+            linger_ms: How long to wait for more messages (from concurrent runs)
+                before flushing a partial batch (default 0 = flush immediately)
+
+    Redis and SQS clients are cached per connection config in QueueClientPool.
     """
     
     display_name = "Message Queue"
@@ -2182,13 +2337,21 @@ class MessageQueueNodeExecutor(BaseNodeExecutor):
         topic = state.interpolate_string(topic)
         logs.append(f"Topic: {topic}")
         
-        if message:
+        messages = self.get_config_value(node, 'messages')
+        if messages:
+            messages = state.interpolate_object(messages)
+            if not isinstance(messages, list):
+                messages = [messages]
+        elif message:
             message = state.interpolate_object(message)
         
         start_time = time.time()
         
         try:
-            if queue_type == 'webhook':
+            if messages:
+                logs.append(f"Publishing {len(messages)} messages")
+                result = await self._publish_many(queue_type, topic, messages, queue_config, logs)
+            elif queue_type == 'webhook':
                 result = await self._publish_webhook(topic, message, queue_config, logs)
             elif queue_type == 'redis':
                 result = await self._publish_redis(topic, message, queue_config, logs)
@@ -2249,32 +2412,34 @@ class MessageQueueNodeExecutor(BaseNodeExecutor):
             headers = config.get('headers', {'Content-Type': 'application/json'})
             timeout = config.get('timeout', 30)
             
+            from ..services.http_pool import get_http_session_pool
+            
             payload = message if isinstance(message, dict) else {'data': message}
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=timeout)
-                ) as response:
-                    status = response.status
-                    body = await response.text()
-                    
-                    logs.append(f"Webhook response: {status}")
+            session = get_http_session_pool().get_session(url)
+            async with session.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                status = response.status
+                body = await response.text()
+                
+                logs.append(f"Webhook response: {status}")
+                
+                if status < 400:
+                    return {
+                        'success': True,
+                        'status_code': status,
+                        'response': body[:500]
+                    }
+                else:
+                    return {
+                        'success': False,
+                        'error': f"Webhook failed with status {status}: {body[:200]}"
+                    }
                     
-                    if status < 400:
-                        return {
-                            'success': True,
-                            'status_code': status,
-                            'response': body[:500]
-                        }
-                    else:
-                        return {
-                            'success': False,
-                            'error': f"Webhook failed with status {status}: {body[:200]}"
-                        }
-                        
         except ImportError:
             return {'success': False, 'error': 'aiohttp not installed'}
         except Exception as e:
@@ -2288,31 +2453,8 @@ class MessageQueueNodeExecutor(BaseNodeExecutor):
         logs: list
     ) -> Dict[str, Any]:
         """Publish message to Redis pub/sub"""
-        try:
-            import aioredis
-            
-            redis_url = config.get('url', 'redis://localhost:6379')
-            
-            redis = await aioredis.from_url(redis_url)
-            
-            msg_str = json.dumps(message) if isinstance(message, dict) else str(message)
-            
-            subscribers = await redis.publish(channel, msg_str)
-            
-            await redis.close()
-            
-            logs.append(f"Published to {subscribers} subscribers")
-            
-            return {
-                'success': True,
-                'channel': channel,
-                'subscribers': subscribers
-            }
-            
-        except ImportError:
-            return {'success': False, 'error': 'aioredis not installed. Run: pip install aioredis'}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        result = await self._publish_many('redis', channel, [message], config, logs)
+        return result['results'][0] if result.get('results') else result
     
     async def _publish_sqs(
         self,
@@ -2322,34 +2464,63 @@ class MessageQueueNodeExecutor(BaseNodeExecutor):
         logs: list
     ) -> Dict[str, Any]:
         """Publish message to AWS SQS"""
+        result = await self._publish_many('sqs', queue_url, [message], config, logs)
+        return result['results'][0] if result.get('results') else result
+    
+    async def _publish_many(
+        self,
+        queue_type: str,
+        topic: str,
+        messages: list,
+        config: Dict[str, Any],
+        logs: list
+    ) -> Dict[str, Any]:
+        """Publish several messages, batched through the shared queue client pool"""
+        import asyncio
+        from ..services.queue_clients import get_queue_client_pool, SQS_MAX_BATCH_SIZE
+        
+        linger_ms = config.get('linger_ms', 0)
+        
         try:
-            import aioboto3
-            
-            session = aioboto3.Session(
-                aws_access_key_id=config.get('access_key'),
-                aws_secret_access_key=config.get('secret_key'),
-                region_name=config.get('region', 'us-east-1')
-            )
-            
-            msg_body = json.dumps(message) if isinstance(message, dict) else str(message)
-            
-            async with session.client('sqs') as sqs:
-                response = await sqs.send_message(
-                    QueueUrl=queue_url,
-                    MessageBody=msg_body,
-                    MessageAttributes=config.get('attributes', {})
-                )
-                
-                message_id = response.get('MessageId')
-                logs.append(f"SQS message ID: {message_id}")
-                
-                return {
-                    'success': True,
-                    'message_id': message_id,
-                    'queue_url': queue_url
-                }
-                
-        except ImportError:
-            return {'success': False, 'error': 'aioboto3 not installed. Run: pip install aioboto3'}
+            if queue_type == 'webhook':
+                results = await asyncio.gather(*[
+                    self._publish_webhook(topic, m, config, logs) for m in messages
+                ])
+            else:
+                bodies = [json.dumps(m) if isinstance(m, dict) else str(m) for m in messages]
+                pool = get_queue_client_pool()
+                if queue_type == 'redis':
+                    results = await pool.publish_redis(
+                        config.get('url', 'redis://localhost:6379'), topic, bodies,
+                        max_batch_size=config.get('max_batch_size', 100),
+                        linger_ms=linger_ms,
+                    )
+                elif queue_type == 'sqs':
+                    results = await pool.publish_sqs(
+                        topic, bodies, config,
+                        max_batch_size=config.get('max_batch_size', SQS_MAX_BATCH_SIZE),
+                        linger_ms=linger_ms,
+                    )
+                else:
+                    return {'success': False, 'error': f"Queue type '{queue_type}' not supported"}
+        except ImportError as e:
+            missing = 'redis' if queue_type == 'redis' else 'aioboto3'
+            return {'success': False, 'error': f'{e}. Run: pip install {missing}'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
+        
+        failed = [r for r in results if not r.get('success')]
+        if queue_type == 'redis':
+            logs.append(f"Published {len(results) - len(failed)} messages to {topic}")
+        elif queue_type == 'sqs':
+            logs.append(f"SQS message IDs: {[r.get('message_id') for r in results if r.get('success')]}")
+        
+        result = {
+            'success': not failed,
+            'published': len(results) - len(failed),
+            'failed': len(failed),
+            'results': list(results),
+        }
+        if failed:
+            result['error'] = failed[0].get('error', 'Message queue operation failed')
+        return result
@@ -14,6 +14,7 @@ Later, this can be swapped with a real vector store retriever.
 from __future__ import annotations
 
 import glob
+import hashlib
 import math
 import os
 import re
@@ -163,14 +164,10 @@ def clear_kb_cache():
     Call this after KB files are added, updated, or when tools change."""
     load_platform_kb_chunks.cache_clear()
     load_safe_taxonomies.cache_clear()
+    platform_kb_version.cache_clear()
 
 
-@lru_cache(maxsize=1)
-def load_platform_kb_chunks() -> List[KBChunk]:
-    """
-    Load curated KB docs from docs/ and chunk them.
-    Cached for process lifetime.
-    """
+def _kb_files() -> List[str]:
     root = _repo_root()
     patterns = [
         os.path.join(root, "docs", "PROCESS_BUILDER_KB_*.md"),
@@ -178,7 +175,35 @@ def load_platform_kb_chunks() -> List[KBChunk]:
     files: List[str] = []
     for p in patterns:
         files.extend(glob.glob(p))
-    files = sorted(set(files))
+    return sorted(set(files))
+
+
+@lru_cache(maxsize=1)
+def platform_kb_version() -> str:
+    """
+    Short fingerprint of the KB docs (names, sizes, modification times).
+    Changes whenever a KB file is added, removed or edited; cleared with
+    clear_kb_cache(). Used to key caches of KB-grounded LLM output.
+    """
+    root = _repo_root()
+    digest = hashlib.sha256()
+    for path in _kb_files():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{os.path.relpath(path, root)}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=1)
+def load_platform_kb_chunks() -> List[KBChunk]:
+    """
+    Load curated KB docs from docs/ and chunk them.
+    Cached for process lifetime.
+    """
+    root = _repo_root()
+    files = _kb_files()
 
     chunks: List[KBChunk] = []
     for path in files:
@@ -5,5 +5,19 @@ Support services for process execution
 
 from .notification import NotificationService
 from .approval import ApprovalService
+from .http_pool import HTTPSessionPool, get_http_session_pool
+from .queue_clients import QueueClientPool, MessageBatcher, get_queue_client_pool
+from .extraction_cache import ExtractionCache, get_extraction_cache
+from .document_pool import DocumentPool, get_document_pool, run_document_job
+from .smtp_pool import SMTPConnectionPool, get_smtp_pool
+from .notification_outbox import NotificationOutbox, get_notification_outbox
 
-__all__ = ['NotificationService', 'ApprovalService']
+__all__ = [
+    'NotificationService', 'ApprovalService',
+    'HTTPSessionPool', 'get_http_session_pool',
+    'QueueClientPool', 'MessageBatcher', 'get_queue_client_pool',
+    'ExtractionCache', 'get_extraction_cache',
+    'DocumentPool', 'get_document_pool', 'run_document_job',
+    'SMTPConnectionPool', 'get_smtp_pool',
+    'NotificationOutbox', 'get_notification_outbox',
+]
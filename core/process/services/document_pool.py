@@ -0,0 +1,128 @@
+"""
+Document Generation Pool
+Bounded process pool for CPU-heavy document rendering
+
+python-docx, openpyxl, reportlab and python-pptx are pure-Python and hold the
+GIL while building a document. Running them on the event loop (or in a thread)
+freezes every in-flight request while a large report is written. Jobs are
+sent to a small ProcessPoolExecutor instead; a semaphore bounds how many jobs
+can be queued so a burst of generations applies backpressure rather than
+piling up unbounded work.
+
+Job callables must be importable (module-level functions, staticmethods or
+classmethods) so they can be pickled to the worker process. If the pool is
+unavailable (e.g. a restricted environment) jobs fall back to a thread.
+
+Configuration (environment variables):
+- DOCUMENT_POOL_WORKERS: worker processes (default min(4, CPU count))
+- DOCUMENT_POOL_MAX_PENDING: jobs queued or running before callers wait (default workers * 4)
+- DOCUMENT_POOL_START_METHOD: multiprocessing start method (default spawn)
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class DocumentPool:
+    """Bounded process pool for document generation jobs"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None, start_method: str = None):
+        self.max_workers = max_workers or _env_int('DOCUMENT_POOL_WORKERS', min(4, os.cpu_count() or 1))
+        self.max_pending = max_pending or _env_int('DOCUMENT_POOL_MAX_PENDING', self.max_workers * 4)
+        self.start_method = start_method or os.environ.get('DOCUMENT_POOL_START_METHOD', 'spawn')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots: Dict[int, asyncio.Semaphore] = {}
+        self._disabled = False
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._disabled:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                try:
+                    import multiprocessing
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context(self.start_method),
+                    )
+                except (OSError, ValueError, NotImplementedError) as e:
+                    logger.warning("Document process pool unavailable, using threads: %s", e)
+                    self._disabled = True
+                    return None
+            return self._executor
+
+    def _slot(self) -> asyncio.Semaphore:
+        loop_id = id(asyncio.get_running_loop())
+        sem = self._slots.get(loop_id)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_pending)
+            self._slots[loop_id] = sem
+        return sem
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) in a worker process and return its result"""
+        async with self._slot():
+            executor = self._get_executor()
+            if executor is None:
+                return await asyncio.to_thread(fn, *args)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM-killed, crashed) - replace the pool and retry once
+                logger.warning("Document process pool broken, restarting")
+                self._reset(executor)
+                executor = self._get_executor()
+                if executor is None:
+                    return await asyncio.to_thread(fn, *args)
+                return await loop.run_in_executor(executor, fn, *args)
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                if 'pickle' not in str(e).lower():
+                    raise
+                logger.warning("Document job %r is not picklable, running in a thread", fn)
+                return await asyncio.to_thread(fn, *args)
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._executor_lock:
+            # Concurrent jobs may all see the same failure; only replace it once
+            if self._executor is broken:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+_document_pool: Optional[DocumentPool] = None
+
+
+def get_document_pool() -> DocumentPool:
+    """Get the worker-wide document generation pool"""
+    global _document_pool
+    if _document_pool is None:
+        _document_pool = DocumentPool()
+    return _document_pool
+
+
+async def run_document_job(fn: Callable[..., Any], *args: Any) -> Any:
+    """Render a document off the event loop in the shared process pool"""
+    return await get_document_pool().run(fn, *args)
@@ -0,0 +1,184 @@
+"""
+Streaming Document Writers
+Constant-memory writers for large spreadsheets and PDFs
+
+The regular generators build a full in-memory model (an openpyxl Workbook with
+a Cell object per value, or a reportlab story of Paragraph flowables) before
+saving. That is fine for a one-page report but a 50k-row export allocates
+hundreds of MB. These writers stream instead:
+- write_xlsx_rows: openpyxl write-only mode, rows are serialized as appended
+- write_pdf_lines: reportlab canvas, each page is emitted (and compressed)
+  as soon as it is full
+
+Both are plain module-level functions so they can run in the document pool.
+"""
+
+import os
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+# Markdown documents with more lines than this use the streaming writers
+STREAMING_LINE_THRESHOLD = int(os.environ.get('DOCUMENT_STREAMING_LINE_THRESHOLD', 5000))
+
+_WIDTH_SAMPLE_ROWS = 200
+_TABLE_SEP_RE = re.compile(r'^\|?[\s\-:|]+\|?$')
+_MD_INLINE_RE = [
+    (re.compile(r'<br\s*/?>', re.I), ' '),
+    (re.compile(r'<[^>]+>'), ''),
+    (re.compile(r'\*\*(.+?)\*\*'), r'\1'),
+    (re.compile(r'\*(.+?)\*'), r'\1'),
+    (re.compile(r'`(.+?)`'), r'\1'),
+    (re.compile(r'\[([^\]]+)\]\([^)]+\)'), r'\1'),
+]
+
+
+def clean_markdown(text: str) -> str:
+    """Strip inline markdown/HTML markup from a cell or line"""
+    t = str(text or '')
+    for pattern, repl in _MD_INLINE_RE:
+        t = pattern.sub(repl, t)
+    return t.strip()
+
+
+def markdown_rows(content: str) -> Iterator[List[str]]:
+    """Yield spreadsheet rows from markdown: table rows become cells, other lines one cell"""
+    for raw in (content or '').split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if '|' in line and not line.startswith('-'):
+            if _TABLE_SEP_RE.match(line):
+                continue
+            yield [clean_markdown(c) for c in line.strip('|').split('|')]
+        elif line.startswith('#'):
+            yield [clean_markdown(line.lstrip('#'))]
+        elif line.startswith(('- ', '* ', '• ')):
+            yield [f"•  {clean_markdown(line[2:])}"]
+        else:
+            yield [clean_markdown(line)]
+
+
+def write_xlsx_rows(
+    filepath: str,
+    title: str,
+    rows: Iterable[Sequence],
+    header: bool = True,
+    coerce=None,
+) -> int:
+    """
+    Write rows to an .xlsx file in openpyxl write-only mode.
+
+    Column widths are estimated from the first rows (write-only sheets must
+    set dimensions before any row is written). The first row is styled as a
+    header and frozen when `header` is true. `coerce` optionally converts each
+    value before it is written (e.g. numeric strings to numbers).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    rows = iter(rows)
+    sample = [list(r) if isinstance(r, (list, tuple)) else [r] for r in islice(rows, _WIDTH_SAMPLE_ROWS)]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=(title or 'Sheet')[:31])
+
+    widths = {}
+    for r in sample:
+        for ci, val in enumerate(r, 1):
+            widths[ci] = max(widths.get(ci, 10), min(len(str(val if val is not None else '')) + 2, 60))
+    for ci, width in widths.items():
+        ws.column_dimensions[get_column_letter(ci)].width = width
+    if header and len(sample) > 1:
+        ws.freeze_panes = 'A2'
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill('solid', fgColor='1B3A5C')
+    header_align = Alignment(horizontal='center', vertical='center')
+
+    def _value(v):
+        return coerce(v) if coerce is not None else v
+
+    for ri, r in enumerate(sample):
+        if ri == 0 and header:
+            cells = []
+            for val in r:
+                cell = WriteOnlyCell(ws, value=_value(val))
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = header_align
+                cells.append(cell)
+            ws.append(cells)
+        else:
+            ws.append([_value(v) for v in r])
+
+    for r in rows:
+        r = r if isinstance(r, (list, tuple)) else [r]
+        ws.append([_value(v) for v in r])
+
+    wb.save(filepath)
+    return os.path.getsize(filepath)
+
+
+def write_pdf_lines(filepath: str, title: str, lines: Iterable[str]) -> int:
+    """
+    Write markdown-ish lines to a PDF, emitting each page as soon as it fills.
+
+    Headings (#, ##, ###) are rendered bold at larger sizes; everything else is
+    wrapped body text. Layout is intentionally simple: this path is used for
+    very long documents where platypus flowables would not fit in memory.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    page_w, page_h = A4
+    margin = 50
+    usable_w = page_w - 2 * margin
+
+    c = canvas.Canvas(filepath, pagesize=A4, pageCompression=1)
+    c.setTitle(title or 'Document')
+    y = page_h - margin
+
+    def _emit(text: str, font: str, size: float, space_after: float) -> None:
+        nonlocal y
+        leading = size * 1.3
+        for part in simpleSplit(text, font, size, usable_w) or ['']:
+            if y - leading < margin:
+                c.showPage()
+                y = page_h - margin
+            c.setFont(font, size)
+            c.drawString(margin, y - size, part)
+            y -= leading
+        y -= space_after
+
+    if title:
+        _emit(title, 'Helvetica-Bold', 20, 12)
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            y -= 6
+            continue
+        if line.startswith('### '):
+            _emit(clean_markdown(line[4:]), 'Helvetica-Bold', 12, 4)
+        elif line.startswith('## '):
+            _emit(clean_markdown(line[3:]), 'Helvetica-Bold', 14, 6)
+        elif line.startswith('# '):
+            _emit(clean_markdown(line[2:]), 'Helvetica-Bold', 16, 8)
+        elif '|' in line and _TABLE_SEP_RE.match(line):
+            continue
+        elif '|' in line:
+            _emit('   '.join(clean_markdown(p) for p in line.strip('|').split('|')), 'Helvetica', 9, 2)
+        else:
+            _emit(clean_markdown(line), 'Helvetica', 10, 2)
+
+    c.save()
+    return os.path.getsize(filepath)
+
+
+def is_large_document(content: Optional[str]) -> bool:
+    """True when markdown content is long enough to need the streaming writers"""
+    return (content or '').count('\n') >= STREAMING_LINE_THRESHOLD
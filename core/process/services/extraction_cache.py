@@ -0,0 +1,184 @@
+"""
+Extraction Cache
+Content-addressed cache for document text extraction and LLM OCR
+
+Re-processing the same upload (e.g. an invoice submitted twice, or a process
+re-run) should not re-parse the PDF or pay for another OCR call. Entries are
+keyed by SHA-256 of the file bytes plus the extraction options, so a renamed
+or re-uploaded copy of the same file still hits, while a change of encoding,
+OCR model or extractor version misses.
+
+Entries are stored as JSON files on local disk and evicted least-recently-used
+once the cache grows beyond its size budget.
+
+Configuration (environment variables):
+- EXTRACTION_CACHE_PATH: cache directory (default data/extraction_cache)
+- EXTRACTION_CACHE_MAX_BYTES: size budget (default 512 MB, 0 disables the cache)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes so stale entries stop matching
+EXTRACTOR_VERSION = 1
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Size-bounded LRU cache of extraction results on local disk"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or os.environ.get('EXTRACTION_CACHE_PATH', 'data/extraction_cache')
+        if max_bytes is None:
+            try:
+                max_bytes = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+            except ValueError:
+                max_bytes = 512 * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional[OrderedDict] = None  # key -> size, oldest first
+        self._total_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(content_hash: str, options: Dict[str, Any]) -> str:
+        opts = dict(options or {})
+        opts['_v'] = EXTRACTOR_VERSION
+        opts_hash = hashlib.sha256(json.dumps(opts, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{content_hash}_{opts_hash[:16]}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self) -> None:
+        """Build the LRU index from disk once, ordered by last access (mtime)"""
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, name[:-5], st.st_size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(self._index.values())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        path = self._entry_path(key)
+        with self._lock:
+            self._load_index()
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if key in self._index:
+                self._index.move_to_end(key)
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        path = self._entry_path(key)
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+            self._total_bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    async def lookup(self, path: str, options: Dict[str, Any]):
+        """
+        Hash the file (off the event loop) and look up a cached result.
+
+        Returns (key, entry_or_None). The key is returned so the caller can
+        store a fresh result without hashing the file twice.
+        """
+        if not self.enabled:
+            return None, None
+        try:
+            content_hash = await asyncio.to_thread(hash_file, path)
+        except OSError as e:
+            logger.warning("Extraction cache: could not hash %s: %s", path, e)
+            return None, None
+        key = self.make_key(content_hash, options)
+        return key, await asyncio.to_thread(self.get, key)
+
+    async def store(self, key: Optional[str], entry: Dict[str, Any]) -> None:
+        if not key or not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self.put, key, entry)
+        except OSError as e:
+            logger.warning("Extraction cache: could not store entry: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_index()
+            return {
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the worker-wide extraction cache"""
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache()
+    return _extraction_cache
@@ -0,0 +1,115 @@
+"""
+HTTP Session Pool
+Shared aiohttp sessions for process integration nodes
+
+Opening a new ClientSession per request throws away the TCP/TLS connection,
+the DNS lookup and the connector on every call. This pool keeps one session
+per (event loop, base URL) for the lifetime of the worker, with:
+- keep-alive connections reused across node runs
+- DNS caching on the connector
+- a per-host connection limit so one slow API cannot exhaust the pool
+
+Tuning (environment variables):
+- HTTP_POOL_LIMIT: total connections per session (default 100)
+- HTTP_POOL_LIMIT_PER_HOST: connections per host (default 20)
+- HTTP_POOL_DNS_TTL: DNS cache TTL in seconds (default 300)
+- HTTP_POOL_KEEPALIVE: idle keep-alive timeout in seconds (default 30)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Tuple, Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class HTTPSessionPool:
+    """
+    Per-worker pool of aiohttp ClientSessions keyed by base URL.
+
+    aiohttp sessions are bound to the event loop that created them, so the
+    running loop is part of the key. Closed sessions are replaced lazily.
+    """
+
+    def __init__(
+        self,
+        limit: int = None,
+        limit_per_host: int = None,
+        dns_ttl: int = None,
+        keepalive_timeout: int = None,
+    ):
+        self.limit = limit if limit is not None else _env_int('HTTP_POOL_LIMIT', 100)
+        self.limit_per_host = (
+            limit_per_host if limit_per_host is not None else _env_int('HTTP_POOL_LIMIT_PER_HOST', 20)
+        )
+        self.dns_ttl = dns_ttl if dns_ttl is not None else _env_int('HTTP_POOL_DNS_TTL', 300)
+        self.keepalive_timeout = (
+            keepalive_timeout if keepalive_timeout is not None else _env_int('HTTP_POOL_KEEPALIVE', 30)
+        )
+        self._sessions: Dict[Tuple[int, str], Any] = {}
+
+    @staticmethod
+    def base_url(url: str) -> str:
+        """Return scheme://host[:port] for a URL (the pool key)"""
+        parts = urlsplit(url or '')
+        return f"{(parts.scheme or 'http').lower()}://{(parts.netloc or '').lower()}"
+
+    def get_session(self, url: str):
+        """Return a shared ClientSession for the URL's base, creating it on first use"""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        key = (id(loop), self.base_url(url))
+
+        session = self._sessions.get(key)
+        if session is not None and not session.closed:
+            return session
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        self._sessions[key] = session
+        logger.debug("Opened pooled HTTP session for %s", key[1])
+        return session
+
+    async def close_all(self) -> None:
+        """Close every session owned by the running event loop (call on shutdown)"""
+        loop_id = id(asyncio.get_running_loop())
+        for key in [k for k in self._sessions if k[0] == loop_id]:
+            session = self._sessions.pop(key)
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning("Failed to close HTTP session for %s: %s", key[1], e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions': sum(1 for s in self._sessions.values() if not s.closed),
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+        }
+
+
+_http_session_pool: HTTPSessionPool = None
+
+
+def get_http_session_pool() -> HTTPSessionPool:
+    """Get the worker-wide HTTP session pool"""
+    global _http_session_pool
+    if _http_session_pool is None:
+        _http_session_pool = HTTPSessionPool()
+    return _http_session_pool
@@ -7,13 +7,21 @@ Supported channels:
 - slack: Send to Slack channel/user
 - webhook: Send HTTP webhook
 - in_app: Create in-app notification
+
+Recipients of a channel are sent to concurrently, capped per channel
+(NOTIFY_CONCURRENCY_EMAIL / _WEBHOOK / _SMS, defaults 10 / 10 / 5). SMTP email
+goes over pooled connections (see smtp_pool.py). enqueue() hands a
+notification to the background outbox (see notification_outbox.py) instead
+of waiting for delivery.
 """
 
+import asyncio
 import logging
 import json
 import html
+import os
 import re
-from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from typing import Dict, Any, List, Optional, Callable, Awaitable, TYPE_CHECKING
 from datetime import datetime
 
 if TYPE_CHECKING:
@@ -22,6 +30,38 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Concurrent sends per channel within one notification
+CHANNEL_CONCURRENCY = {
+    'email': _env_int('NOTIFY_CONCURRENCY_EMAIL', 10),
+    'webhook': _env_int('NOTIFY_CONCURRENCY_WEBHOOK', 10),
+    'sms': _env_int('NOTIFY_CONCURRENCY_SMS', 5),
+}
+
+# Channels that write through the request's database session, which is not
+# safe to share between concurrent sends or to use after the request ends
+_SESSION_BOUND_CHANNELS = {'in_app'}
+
+
+async def _fan_out(channel: str, items: List[Any], send_one: Callable[[Any], Awaitable[Any]]) -> List[Any]:
+    """Run send_one for every item, at most CHANNEL_CONCURRENCY[channel] at a time; results in order"""
+    if len(items) <= 1:
+        return [await send_one(item) for item in items]
+    semaphore = asyncio.Semaphore(max(1, CHANNEL_CONCURRENCY.get(channel, 1)))
+
+    async def limited(item):
+        async with semaphore:
+            return await send_one(item)
+
+    return await asyncio.gather(*(limited(item) for item in items))
+
+
 class NotificationService:
     """
     Service for sending notifications.
@@ -120,6 +160,31 @@ class NotificationService:
                 'error': str(e)
             }
     
+    async def enqueue(self, channel: str, recipients: List[str], **kwargs) -> Dict[str, Any]:
+        """
+        Queue a notification for background delivery and return at once.
+        
+        Takes the same arguments as send(). Channels bound to the request's
+        database session (in_app), and notifications arriving while the
+        outbox is full, are sent synchronously instead.
+        """
+        from .notification_outbox import OutboxFull, get_notification_outbox
+        
+        if channel in _SESSION_BOUND_CHANNELS:
+            return await self.send(channel=channel, recipients=recipients, **kwargs)
+        try:
+            outbox_id = get_notification_outbox().enqueue(self, channel=channel, recipients=recipients, **kwargs)
+        except OutboxFull as e:
+            logger.warning(f"{e}; sending synchronously")
+            return await self.send(channel=channel, recipients=recipients, **kwargs)
+        return {
+            'success': True,
+            'queued': True,
+            'channel': channel,
+            'recipients_count': len(recipients),
+            'outbox_id': outbox_id,
+        }
+    
     async def _send_email(
         self,
         recipients: List[str],
@@ -155,28 +220,36 @@ class NotificationService:
 <p style="color: #999; font-size: 12px;">AgentForge</p>
 </div>"""
                 email_subject = (title or 'Notification').strip() or 'Notification'
-                sent = 0
-                failed = []
+                clean_emails = []
                 for to_email in recipients:
                     if not to_email or not str(to_email).strip():
                         logger.warning("[_send_email] Skipping empty recipient")
                         continue
-                    clean_email = str(to_email).strip()
+                    clean_emails.append(str(to_email).strip())
+
+                async def send_one(clean_email):
                     logger.info("[_send_email] Sending to %s …", clean_email)
-                    ok = await self.platform_email_service.send_email(
-                        clean_email,
-                        email_subject,
-                        html_content,
-                        text_content=text_content,
-                        attachments=attachments,
-                        org_id=self.org_id,
-                    )
+                    try:
+                        ok = await self.platform_email_service.send_email(
+                            clean_email,
+                            email_subject,
+                            html_content,
+                            text_content=text_content,
+                            attachments=attachments,
+                            org_id=self.org_id,
+                        )
+                    except Exception as e:
+                        logger.warning("[_send_email] Error sending to %s: %s", clean_email, e)
+                        ok = False
                     if ok:
-                        sent += 1
                         logger.info("[_send_email] ✅ Sent to %s", clean_email)
                     else:
-                        failed.append(clean_email)
                         logger.warning("[_send_email] ❌ Failed to send to %s", clean_email)
+                    return ok
+
+                outcomes = await _fan_out('email', clean_emails, send_one)
+                sent = sum(1 for ok in outcomes if ok)
+                failed = [e for e, ok in zip(clean_emails, outcomes) if not ok]
                 result = {
                     'success': sent > 0,
                     'channel': 'email',
@@ -206,60 +279,70 @@ class NotificationService:
                 'reason': 'Email sending is not configured yet. Please set up Email Notifications in Settings.'
             }
         
-        # Send via SMTP (with attachment support)
+        # Send via SMTP (pooled connections, with attachment support)
         try:
-            import aiosmtplib
+            import aiosmtplib  # noqa: F401 - required by the SMTP pool
             from email.mime.text import MIMEText
             from email.mime.multipart import MIMEMultipart
             from email.mime.base import MIMEBase
             from email import encoders
             import mimetypes
-            import os
-            
-            smtp = aiosmtplib.SMTP(
-                hostname=smtp_config['smtp_host'],
-                port=smtp_config.get('smtp_port', 587),
-                use_tls=smtp_config.get('use_tls', True)
-            )
+            from .smtp_pool import get_smtp_pool
             
-            await smtp.connect()
+            # Read attachments once for all recipients
+            attachment_parts = []
+            for att in (attachments or []):
+                fpath = att.get("path", "")
+                fname = att.get("filename", "")
+                if not fpath or not os.path.isfile(fpath):
+                    continue
+                mime = att.get("mime_type") or mimetypes.guess_type(fname or fpath)[0] or "application/octet-stream"
+                maintype, subtype = mime.split("/", 1) if "/" in mime else ("application", "octet-stream")
+                with open(fpath, "rb") as fp:
+                    attachment_parts.append((maintype, subtype, fp.read(), fname or os.path.basename(fpath)))
             
-            if smtp_config.get('username'):
-                await smtp.login(
-                    smtp_config['username'],
-                    smtp_config['password']
-                )
+            smtp_pool = get_smtp_pool()
             
-            for recipient in recipients:
+            async def send_one(recipient):
                 msg = MIMEMultipart()
                 msg['From'] = smtp_config.get('from_email', 'noreply@agentforge.io')
                 msg['To'] = recipient
                 msg['Subject'] = title
                 msg.attach(MIMEText(message, 'html'))
 
-                for att in (attachments or []):
-                    fpath = att.get("path", "")
-                    fname = att.get("filename", "")
-                    if not fpath or not os.path.isfile(fpath):
-                        continue
-                    mime = att.get("mime_type") or mimetypes.guess_type(fname or fpath)[0] or "application/octet-stream"
-                    maintype, subtype = mime.split("/", 1) if "/" in mime else ("application", "octet-stream")
+                for maintype, subtype, payload, filename in attachment_parts:
                     part = MIMEBase(maintype, subtype)
-                    with open(fpath, "rb") as fp:
-                        part.set_payload(fp.read())
+                    part.set_payload(payload)
                     encoders.encode_base64(part)
-                    part.add_header("Content-Disposition", "attachment", filename=fname or os.path.basename(fpath))
+                    part.add_header("Content-Disposition", "attachment", filename=filename)
                     msg.attach(part)
 
-                await smtp.send_message(msg)
+                try:
+                    await smtp_pool.send_message(
+                        msg,
+                        hostname=smtp_config['smtp_host'],
+                        port=smtp_config.get('smtp_port', 587),
+                        use_tls=smtp_config.get('use_tls', True),
+                        username=smtp_config.get('username'),
+                        password=smtp_config.get('password'),
+                    )
+                    return None
+                except Exception as e:
+                    logger.warning(f"SMTP send to {recipient} failed: {e}")
+                    return str(e)
             
-            await smtp.quit()
+            errors = await _fan_out('email', list(recipients), send_one)
+            failed = [r for r, err in zip(recipients, errors) if err]
             
-            return {
-                'success': True,
+            result = {
+                'success': len(failed) < len(recipients),
                 'channel': 'email',
                 'recipients_count': len(recipients)
             }
+            if failed:
+                result['failed_recipients'] = failed
+                result['error'] = next(err for err in errors if err)
+            return result
             
         except ImportError:
             logger.warning("aiosmtplib not installed - email notification logged only")
@@ -360,7 +443,7 @@ class NotificationService:
             import aiohttp
             
             async with aiohttp.ClientSession() as session:
-                for url in recipients:
+                async def send_one(url):
                     payload = {
                         'title': title,
                         'message': message,
@@ -376,17 +459,19 @@ class NotificationService:
                             headers=config.get('headers', {}),
                             timeout=aiohttp.ClientTimeout(total=10)
                         ) as resp:
-                            results.append({
+                            return {
                                 'url': url,
                                 'status': resp.status,
                                 'success': resp.status < 400
-                            })
+                            }
                     except Exception as e:
-                        results.append({
+                        return {
                             'url': url,
                             'success': False,
                             'error': str(e)
-                        })
+                        }
+                
+                results = await _fan_out('webhook', list(recipients), send_one)
             
             success_count = sum(1 for r in results if r.get('success'))
             
@@ -520,12 +605,10 @@ class NotificationService:
             if len(sms_body) > 1600:  # Twilio allows concatenated messages
                 sms_body = sms_body[:1597] + "..."
             
-            results = []
-            
             async with aiohttp.ClientSession() as session:
                 auth = aiohttp.BasicAuth(account_sid, auth_token)
                 
-                for to_number in recipients:
+                async def send_one(to_number):
                     try:
                         data = {
                             'To': to_number,
@@ -542,24 +625,26 @@ class NotificationService:
                             response_data = await resp.json()
                             
                             if resp.status in (200, 201):
-                                results.append({
+                                return {
                                     'to': to_number,
                                     'success': True,
                                     'message_sid': response_data.get('sid')
-                                })
+                                }
                             else:
-                                results.append({
+                                return {
                                     'to': to_number,
                                     'success': False,
                                     'error': response_data.get('message', 'Unknown error')
-                                })
+                                }
                                 
                     except Exception as e:
-                        results.append({
+                        return {
                             'to': to_number,
                             'success': False,
                             'error': str(e)
-                        })
+                        }
+                
+                results = await _fan_out('sms', list(recipients), send_one)
             
             success_count = sum(1 for r in results if r.get('success'))
             
@@ -0,0 +1,135 @@
+"""
+Notification Outbox
+Background delivery for notification nodes
+
+With `delivery: outbox` on a notification node (or
+NOTIFICATION_DELIVERY_MODE=outbox for all of them), the node completes as
+soon as the notification is queued, and worker tasks on the same event loop
+send it through NotificationService.send(). A 200-recipient email then no
+longer holds up the rest of the process.
+
+The outbox lives in the worker process: queued notifications are delivered
+in order of arrival, drained for up to NOTIFICATION_OUTBOX_DRAIN_SECONDS on
+shutdown, and lost if the process dies first. Processes that must not lose a
+notification keep the default synchronous delivery.
+
+Tuning (environment variables):
+- NOTIFICATION_OUTBOX_WORKERS: concurrent deliveries (default 4)
+- NOTIFICATION_OUTBOX_MAX_SIZE: queued notifications before enqueue fails (default 1000)
+- NOTIFICATION_OUTBOX_DRAIN_SECONDS: time allowed to deliver queued items on shutdown (default 10)
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class OutboxFull(Exception):
+    """The outbox has NOTIFICATION_OUTBOX_MAX_SIZE undelivered notifications"""
+
+
+class NotificationOutbox:
+    """In-process queue of notifications delivered by background workers"""
+
+    def __init__(self, workers: int = None, max_size: int = None, drain_seconds: int = None):
+        self.workers = max(1, workers if workers is not None else _env_int('NOTIFICATION_OUTBOX_WORKERS', 4))
+        self.max_size = max_size if max_size is not None else _env_int('NOTIFICATION_OUTBOX_MAX_SIZE', 1000)
+        self.drain_seconds = (
+            drain_seconds if drain_seconds is not None else _env_int('NOTIFICATION_OUTBOX_DRAIN_SECONDS', 10)
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Counters
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    def enqueue(self, service, **send_kwargs) -> str:
+        """Queue a NotificationService.send(**send_kwargs) call; returns the outbox ID"""
+        self._ensure_started()
+        outbox_id = str(uuid.uuid4())
+        try:
+            self._queue.put_nowait((outbox_id, service, send_kwargs))
+        except asyncio.QueueFull:
+            raise OutboxFull(f"Notification outbox is full ({self.max_size} pending)")
+        self.enqueued += 1
+        return outbox_id
+
+    async def stop(self) -> None:
+        """Deliver what is queued (up to drain_seconds), then stop the workers"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Notification outbox stopped with %d undelivered notification(s)", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'enqueued': self.enqueued,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'last_error': self.last_error,
+            'workers': len(self._tasks),
+        }
+
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(
+                self._worker(), name=f"notification-outbox-{len(self._tasks)}"
+            ))
+
+    async def _worker(self) -> None:
+        while True:
+            outbox_id, service, send_kwargs = await self._queue.get()
+            try:
+                result = await service.send(**send_kwargs)
+                if result.get('success'):
+                    self.delivered += 1
+                else:
+                    self.failed += 1
+                    self.last_error = f"{datetime.utcnow().isoformat()} {result.get('error') or result.get('reason')}"
+                logger.info("[NotificationOutbox] %s delivered via %s: %s",
+                            outbox_id, send_kwargs.get('channel'), result)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"{datetime.utcnow().isoformat()} {e}"
+                logger.error("[NotificationOutbox] %s failed: %s", outbox_id, e)
+            finally:
+                self._queue.task_done()
+
+
+_notification_outbox: NotificationOutbox = None
+
+
+def get_notification_outbox() -> NotificationOutbox:
+    """Get the worker-wide notification outbox"""
+    global _notification_outbox
+    if _notification_outbox is None:
+        _notification_outbox = NotificationOutbox()
+    return _notification_outbox
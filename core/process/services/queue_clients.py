@@ -0,0 +1,324 @@
+"""
+Message Queue Client Pool
+Cached Redis/SQS clients and publish batching for MESSAGE_QUEUE nodes
+
+Creating a Redis connection or an aioboto3 session/client per publish costs a
+TCP (and often TLS) handshake plus credential resolution on every message.
+This module keeps one client per connection config for the worker lifetime:
+- Redis clients are health-checked with PING at most every
+  `health_check_interval` seconds and transparently recreated when broken
+- SQS clients are evicted after a send error so the next publish reconnects
+
+Publishes go through a MessageBatcher per (client, target): messages sent in
+one node run - and, with linger_ms > 0, by concurrent node runs - are grouped
+into Redis pipelines or SQS SendMessageBatch calls of at most max_batch_size.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SendMessageBatch accepts at most 10 entries per call
+SQS_MAX_BATCH_SIZE = 10
+
+
+class MessageBatcher:
+    """
+    Groups individual messages into batched sends.
+
+    `sender` receives a list of serialized messages and must return one result
+    dict per message, in order. With linger_ms == 0 every submit() is flushed
+    immediately (still batched within the submit); otherwise pending messages
+    wait up to linger_ms for more to arrive, or until max_batch_size is reached.
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+        max_batch_size: int = 10,
+        linger_ms: int = 0,
+    ):
+        self._sender = sender
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.linger_ms = max(0, int(linger_ms))
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+
+    async def submit(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """Queue messages for sending and wait for their individual results"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for msg in messages:
+            fut = loop.create_future()
+            self._pending.append((msg, fut))
+            futures.append(fut)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+
+        if self._pending:
+            if self.linger_ms == 0:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.linger_ms / 1000.0, self._flush)
+
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await self._sender([msg for msg, _ in batch])
+        except Exception as e:
+            # One dict per message: callers annotate their results
+            results = [{'success': False, 'error': str(e)} for _ in batch]
+        results = list(results) + [
+            {'success': False, 'error': 'No result returned for message'}
+            for _ in range(len(batch) - len(results))
+        ]
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+
+class QueueClientPool:
+    """Per-worker cache of message queue clients and their batchers"""
+
+    def __init__(self, health_check_interval: float = 30.0):
+        self.health_check_interval = health_check_interval
+        self._redis: Dict[str, Any] = {}
+        self._redis_checked: Dict[str, float] = {}
+        self._sqs: Dict[Tuple, Tuple[Any, Any]] = {}
+        self._batchers: Dict[Tuple, MessageBatcher] = {}
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+
+    async def get_redis(self, url: str):
+        """Return a cached Redis client for the URL, reconnecting if its health check fails"""
+        async with self._lock:
+            client = self._redis.get(url)
+            if client is not None:
+                if time.monotonic() - self._redis_checked.get(url, 0) < self.health_check_interval:
+                    return client
+                try:
+                    await client.ping()
+                    self._redis_checked[url] = time.monotonic()
+                    return client
+                except Exception as e:
+                    logger.warning("Redis health check failed for cached client, reconnecting: %s", e)
+                    await self._close_quietly(client)
+                    self._redis.pop(url, None)
+
+            client = await self._create_redis(url)
+            self._redis[url] = client
+            self._redis_checked[url] = time.monotonic()
+            return client
+
+    @staticmethod
+    async def _create_redis(url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+            client = redis_asyncio.from_url(url)
+        except ImportError:
+            import aioredis
+            client = aioredis.from_url(url)
+        if inspect.isawaitable(client):
+            client = await client
+        return client
+
+    async def publish_redis(
+        self,
+        url: str,
+        channel: str,
+        messages: List[str],
+        max_batch_size: int = 100,
+        linger_ms: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Publish messages to a Redis channel using pipelined PUBLISH commands"""
+
+        async def sender(batch: List[str]) -> List[Dict[str, Any]]:
+            client = await self.get_redis(url)
+            try:
+                pipe = client.pipeline(transaction=False)
+                for msg in batch:
+                    pipe.publish(channel, msg)
+                counts = await pipe.execute()
+            except Exception:
+                # Force a reconnect on the next publish
+                self._redis_checked.pop(url, None)
+                raise
+            return [
+                {'success': True, 'channel': channel, 'subscribers': count}
+                for count in counts
+            ]
+
+        batcher = self._get_batcher(('redis', url, channel), sender, max_batch_size, linger_ms)
+        return await batcher.submit(messages)
+
+    # ------------------------------------------------------------------
+    # SQS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _sqs_key(config: Dict[str, Any]) -> Tuple:
+        return (
+            config.get('access_key'),
+            config.get('secret_key'),
+            config.get('region', 'us-east-1'),
+            config.get('endpoint_url'),
+        )
+
+    async def get_sqs(self, config: Dict[str, Any]):
+        """Return a cached aioboto3 SQS client for the credentials/region in config"""
+        key = self._sqs_key(config)
+        async with self._lock:
+            cached = self._sqs.get(key)
+            if cached is not None:
+                return cached[1]
+
+            import aioboto3
+            session = aioboto3.Session(
+                aws_access_key_id=key[0],
+                aws_secret_access_key=key[1],
+                region_name=key[2],
+            )
+            client_kwargs = {'endpoint_url': key[3]} if key[3] else {}
+            ctx = session.client('sqs', **client_kwargs)
+            client = await ctx.__aenter__()
+            self._sqs[key] = (ctx, client)
+            return client
+
+    async def _evict_sqs(self, config: Dict[str, Any]) -> None:
+        async with self._lock:
+            cached = self._sqs.pop(self._sqs_key(config), None)
+        if cached is not None:
+            try:
+                await cached[0].__aexit__(None, None, None)
+            except Exception:
+                pass
+
+    async def publish_sqs(
+        self,
+        queue_url: str,
+        messages: List[str],
+        config: Dict[str, Any],
+        max_batch_size: int = SQS_MAX_BATCH_SIZE,
+        linger_ms: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Send messages to an SQS queue using SendMessageBatch"""
+        attributes = config.get('attributes', {})
+
+        async def sender(batch: List[str]) -> List[Dict[str, Any]]:
+            sqs = await self.get_sqs(config)
+            try:
+                if len(batch) == 1:
+                    response = await sqs.send_message(
+                        QueueUrl=queue_url,
+                        MessageBody=batch[0],
+                        MessageAttributes=attributes,
+                    )
+                    return [{
+                        'success': True,
+                        'message_id': response.get('MessageId'),
+                        'queue_url': queue_url,
+                    }]
+                response = await sqs.send_message_batch(
+                    QueueUrl=queue_url,
+                    Entries=[
+                        {'Id': str(i), 'MessageBody': body, 'MessageAttributes': attributes}
+                        for i, body in enumerate(batch)
+                    ],
+                )
+            except Exception:
+                await self._evict_sqs(config)
+                raise
+
+            results: List[Dict[str, Any]] = [
+                {'success': False, 'error': 'No result returned for message'} for _ in batch
+            ]
+            for entry in response.get('Successful', []):
+                results[int(entry['Id'])] = {
+                    'success': True,
+                    'message_id': entry.get('MessageId'),
+                    'queue_url': queue_url,
+                }
+            for entry in response.get('Failed', []):
+                results[int(entry['Id'])] = {
+                    'success': False,
+                    'error': f"{entry.get('Code')}: {entry.get('Message')}",
+                }
+            return results
+
+        batch_size = min(int(max_batch_size), SQS_MAX_BATCH_SIZE)
+        batcher = self._get_batcher(
+            ('sqs', self._sqs_key(config), queue_url, json.dumps(attributes, sort_keys=True, default=str)),
+            sender, batch_size, linger_ms,
+        )
+        return await batcher.submit(messages)
+
+    # ------------------------------------------------------------------
+    # Shared
+    # ------------------------------------------------------------------
+
+    def _get_batcher(self, key: Tuple, sender, max_batch_size: int, linger_ms: int) -> MessageBatcher:
+        full_key = key + (int(max_batch_size), int(linger_ms))
+        batcher = self._batchers.get(full_key)
+        if batcher is None:
+            batcher = MessageBatcher(sender, max_batch_size=max_batch_size, linger_ms=linger_ms)
+            self._batchers[full_key] = batcher
+        else:
+            # Pick up the freshest closure (same key => same target/config)
+            batcher._sender = sender
+        return batcher
+
+    @staticmethod
+    async def _close_quietly(client) -> None:
+        try:
+            close = getattr(client, 'aclose', None) or getattr(client, 'close')
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            pass
+
+    async def close_all(self) -> None:
+        """Close all cached clients (call on shutdown)"""
+        for client in list(self._redis.values()):
+            await self._close_quietly(client)
+        self._redis.clear()
+        self._redis_checked.clear()
+        for ctx, _ in list(self._sqs.values()):
+            try:
+                await ctx.__aexit__(None, None, None)
+            except Exception:
+                pass
+        self._sqs.clear()
+        self._batchers.clear()
+
+
+_queue_client_pool: Optional[QueueClientPool] = None
+
+
+def get_queue_client_pool() -> QueueClientPool:
+    """Get the worker-wide message queue client pool"""
+    global _queue_client_pool
+    if _queue_client_pool is None:
+        _queue_client_pool = QueueClientPool()
+    return _queue_client_pool
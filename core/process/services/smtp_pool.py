@@ -0,0 +1,193 @@
+"""
+SMTP Connection Pool
+Reusable SMTP connections for notification and platform email
+
+Opening an SMTP connection costs a TCP (and usually TLS) handshake, EHLO,
+STARTTLS and AUTH before the first message, and email was sent over a fresh
+connection per message. This pool keeps logged-in aiosmtplib connections per
+(event loop, server, account) and sends many messages over each:
+- at most SMTP_POOL_SIZE connections per server and account; further
+  senders wait for a free connection
+- a connection is retired after SMTP_POOL_MAX_MESSAGES messages (servers
+  commonly cap messages per session) or SMTP_POOL_IDLE_SECONDS idle
+- a message that fails because a reused connection was dropped by the server
+  is retried once on a new connection
+
+Tuning (environment variables):
+- SMTP_POOL_SIZE: connections per server and account (default 4)
+- SMTP_POOL_MAX_MESSAGES: messages per connection before reconnecting (default 100)
+- SMTP_POOL_IDLE_SECONDS: idle time after which a connection is not reused (default 60)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _PooledConnection:
+    __slots__ = ('smtp', 'sent', 'last_used')
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class _ServerSlot:
+    __slots__ = ('semaphore', 'idle')
+
+    def __init__(self, size: int):
+        self.semaphore = asyncio.Semaphore(size)
+        self.idle: List[_PooledConnection] = []
+
+
+class SMTPConnectionPool:
+    """
+    Per-worker pool of logged-in SMTP connections.
+
+    aiosmtplib connections belong to the event loop that opened them, so the
+    running loop is part of the key, as in HTTPSessionPool.
+    """
+
+    def __init__(self, size: int = None, max_messages: int = None, idle_seconds: int = None):
+        self.size = max(1, size if size is not None else _env_int('SMTP_POOL_SIZE', 4))
+        self.max_messages = max(1, max_messages if max_messages is not None else _env_int('SMTP_POOL_MAX_MESSAGES', 100))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else _env_int('SMTP_POOL_IDLE_SECONDS', 60)
+        self._slots: Dict[Tuple, _ServerSlot] = {}
+
+        # Counters
+        self.opened = 0
+        self.sent = 0
+        self.retried = 0
+
+    async def send_message(
+        self,
+        message,
+        hostname: str,
+        port: int = 587,
+        use_tls: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: float = 15,
+    ) -> None:
+        """Send one email.message.Message over a pooled connection (raises on failure)"""
+        import aiosmtplib
+
+        key = (id(asyncio.get_running_loop()), hostname, int(port), bool(use_tls), username or '')
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _ServerSlot(self.size)
+        params = dict(hostname=hostname, port=int(port), use_tls=use_tls,
+                      username=username, password=password, timeout=timeout)
+
+        async with slot.semaphore:
+            conn, reused = self._checkout(slot), True
+            if conn is None:
+                conn, reused = await self._open(params), False
+            try:
+                await conn.smtp.send_message(message)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                await self._discard(conn)
+                if not reused:
+                    raise
+                # The server closed an idle connection; one retry on a new one
+                logger.debug("Pooled SMTP connection to %s:%s dropped (%s), reconnecting", hostname, port, e)
+                self.retried += 1
+                conn = await self._open(params)
+                try:
+                    await conn.smtp.send_message(message)
+                except Exception:
+                    await self._discard(conn)
+                    raise
+            except Exception:
+                # Leave no half-finished transaction on a reused connection
+                await self._discard(conn)
+                raise
+
+            self.sent += 1
+            conn.sent += 1
+            conn.last_used = time.monotonic()
+            if conn.sent >= self.max_messages:
+                await self._discard(conn)
+            else:
+                slot.idle.append(conn)
+
+    async def close_all(self) -> None:
+        """Close every connection owned by the running event loop (call on shutdown)"""
+        loop_id = id(asyncio.get_running_loop())
+        for key in [k for k in self._slots if k[0] == loop_id]:
+            slot = self._slots.pop(key)
+            while slot.idle:
+                await self._discard(slot.idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'servers': len(self._slots),
+            'idle_connections': sum(len(s.idle) for s in self._slots.values()),
+            'opened': self.opened,
+            'sent': self.sent,
+            'retried': self.retried,
+            'size': self.size,
+        }
+
+    # ------------------------------------------------------------------
+
+    def _checkout(self, slot: _ServerSlot) -> Optional[_PooledConnection]:
+        now = time.monotonic()
+        while slot.idle:
+            conn = slot.idle.pop()
+            if conn.smtp.is_connected and now - conn.last_used < self.idle_seconds:
+                return conn
+            # Too old to trust; close it without waiting for the server
+            conn.smtp.close()
+        return None
+
+    async def _open(self, params: Dict[str, Any]) -> _PooledConnection:
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(
+            hostname=params['hostname'],
+            port=params['port'],
+            use_tls=params['use_tls'],
+            timeout=params['timeout'],
+        )
+        await smtp.connect()
+        try:
+            if params['username']:
+                await smtp.login(params['username'], params['password'] or '')
+        except Exception:
+            smtp.close()
+            raise
+        self.opened += 1
+        logger.debug("Opened pooled SMTP connection to %s:%s", params['hostname'], params['port'])
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    async def _discard(conn: _PooledConnection) -> None:
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+
+_smtp_pool: SMTPConnectionPool = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Get the worker-wide SMTP connection pool"""
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPConnectionPool()
+    return _smtp_pool
@@ -14,13 +14,21 @@ Usage:
         goal="Create an approval workflow for expense reports",
         context={"org_settings": {...}}
     )
+
+Generation reports its stages (analyzing, generating, reviewing, draft,
+validating, cached) to an optional `progress(stage, data)` callback, runs
+the LLM review pass concurrently with validation of the draft, and reuses
+earlier results from the wizard cache (see wizard_cache.py).
 """
 
+import asyncio
+import copy
+import inspect
 import json
 import logging
 import os
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -33,7 +41,8 @@ def _is_truthy_env(name: str) -> bool:
 
 _DEBUG_CONDITIONS = _is_truthy_env("PROCESS_DEBUG_CONDITIONS") or _is_truthy_env("PROCESS_DEBUG")
 
-from .platform_knowledge import retrieve_platform_knowledge, load_safe_taxonomies
+from .platform_knowledge import retrieve_platform_knowledge, load_safe_taxonomies, platform_kb_version
+from .wizard_cache import get_wizard_cache, make_key, model_key
 
 try:
     # Prefer the platform LLM interface (chat-based)
@@ -938,6 +947,65 @@ class ProcessWizard:
         response = await self.llm.chat(messages=messages, temperature=temperature, max_tokens=max_tokens)
         content = getattr(response, "content", None)
         return self._extract_json(content or "")
+
+    # -------------------------------------------------------------------------
+    # Progress, cache and review helpers
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    async def _emit(progress: Optional[Callable], stage: str, **data) -> None:
+        """Report a generation stage to the optional progress callback (never raises)."""
+        if progress is None:
+            return
+        try:
+            result = progress(stage, data)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.debug("[Wizard] progress callback failed at %s: %s", stage, e)
+
+    def _cache_key(self, goal: str, **inputs) -> str:
+        return make_key(
+            goal, model_key(self.llm), platform_kb_version(),
+            org_settings=self.org_settings, **inputs,
+        )
+
+    async def _review_and_validate(
+        self,
+        draft: Dict[str, Any],
+        goal: str,
+        analysis: Dict[str, Any],
+        progress: Optional[Callable] = None,
+        finish: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Review pass and draft validation, concurrently.
+
+        The LLM review of the draft and the deterministic validation of the
+        same draft do not depend on each other, so validation runs in a
+        thread while the review call is in flight. The validated draft is
+        reported as the "draft" stage and is the result when the review
+        fails or returns nothing usable; otherwise the reviewed definition
+        is validated in turn. `finish` is applied after each validation.
+        """
+        finish = finish or (lambda d: d)
+        await self._emit(progress, "reviewing")
+        review = asyncio.create_task(self._review_and_fix_process(draft, goal))
+        try:
+            validated_draft = finish(await asyncio.to_thread(
+                self._validate_and_enhance_visual_builder, copy.deepcopy(draft), analysis
+            ))
+        except BaseException:
+            review.cancel()
+            raise
+        await self._emit(progress, "draft", workflow=copy.deepcopy(validated_draft))
+
+        reviewed = await review
+        if reviewed is draft:
+            # Review failed or was skipped: the validated draft is final
+            return validated_draft
+        await self._emit(progress, "validating")
+        return finish(await asyncio.to_thread(self._validate_and_enhance_visual_builder, reviewed, analysis))
     
     async def analyze_goal_to_tasks(self, goal: str) -> List[Dict[str, Any]]:
         """
@@ -1174,16 +1242,27 @@ class ProcessWizard:
         goal: str,
         tasks: List[Dict[str, Any]],
         additional_context: Dict[str, Any] = None,
+        progress: Optional[Callable] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Generate a process from explicitly defined tasks (structured wizard mode).
         Each task in `tasks` has: name, type, instructions (list of strings).
         The AI strictly follows the provided instructions — no inference about structure.
+        `progress` and `use_cache` are as for generate_from_goal.
         """
         if not self.llm:
             synthesized_goal = self._build_structured_goal_summary(goal, tasks)
             return self._generate_visual_from_template(synthesized_goal)
 
+        cache = get_wizard_cache()
+        cache_key = self._cache_key(goal, mode="structured", tasks=tasks, context=additional_context)
+        if use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                await self._emit(progress, "cached")
+                return cached
+
         # Build tools/org context (same as generate_from_goal)
         tools = []
         org_context_text = ""
@@ -1240,18 +1319,21 @@ class ProcessWizard:
         )
 
         try:
+            await self._emit(progress, "generating")
             process_def = await self._chat_json(
                 system_prompt, user_prompt, temperature=0.1, max_tokens=6000
             )
             if not isinstance(process_def, dict):
                 raise ValueError("Expected dict")
-            # Run the same review + validate passes as the standard wizard
-            process_def = await self._review_and_fix_process(process_def, goal)
-            process_def = self._validate_and_enhance_visual_builder(process_def, {})
-            # Deterministic safety net: the user's explicit task types are
-            # authoritative — enforce them and repair broken condition fields
-            # even if the LLM passes drifted (form demoted to ai, empty rule field).
-            process_def = self._reconcile_structured_nodes(process_def, tasks)
+            # Run the same review + validate passes as the standard wizard.
+            # Deterministic safety net after each validation: the user's explicit
+            # task types are authoritative — enforce them and repair broken condition
+            # fields even if the LLM passes drifted (form demoted to ai, empty rule field).
+            process_def = await self._review_and_validate(
+                process_def, goal, {}, progress,
+                finish=lambda d: self._reconcile_structured_nodes(d, tasks),
+            )
+            cache.put(cache_key, process_def)
             return process_def
         except Exception as e:
             logger.error("[Wizard] generate_from_structured_goal failed: %s", e)
@@ -1261,6 +1343,8 @@ class ProcessWizard:
                     goal=synthesized_goal,
                     additional_context=additional_context,
                     output_format="visual_builder",
+                    progress=progress,
+                    use_cache=use_cache,
                 )
             except Exception as fallback_error:
                 logger.error(
@@ -1297,6 +1381,8 @@ class ProcessWizard:
         goal: str,
         additional_context: Dict[str, Any] = None,
         output_format: str = "visual_builder",
+        progress: Optional[Callable] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Generate a complete process definition from a user's goal
@@ -1304,6 +1390,10 @@ class ProcessWizard:
         Args:
             goal: Natural language description of what the process should do
             additional_context: Additional context (existing tools, integrations, etc.)
+            progress: Optional callback(stage, data), sync or async, called as
+                generation moves through its stages; the "draft" stage carries
+                the validated draft as data["workflow"]
+            use_cache: Return a cached result for the same inputs when available
             
         Returns:
             Complete process definition
@@ -1314,16 +1404,26 @@ class ProcessWizard:
                 return self._generate_visual_from_template(goal)
             return self._generate_from_template(goal)
         
+        cache = get_wizard_cache()
+        cache_key = self._cache_key(goal, mode="goal", output_format=output_format, context=additional_context)
+        if use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                await self._emit(progress, "cached")
+                return cached
+        
         try:
             # Step 1: Analyze the goal
+            await self._emit(progress, "analyzing")
             analysis = await self._analyze_goal(goal)
             
             # Step 2: Generate process definition
+            await self._emit(progress, "generating")
             if output_format == "visual_builder":
                 process_def = await self._generate_visual_builder_process(goal, analysis, additional_context)
-                # Step 2.5: LLM Review Pass — focused self-check for common mistakes
-                process_def = await self._review_and_fix_process(process_def, goal)
-                process_def = self._validate_and_enhance_visual_builder(process_def, analysis)
+                # Step 2.5: LLM Review Pass — focused self-check for common mistakes,
+                # concurrent with validation of the draft
+                process_def = await self._review_and_validate(process_def, goal, analysis, progress)
             else:
                 process_def = await self._generate_process(goal, analysis)
                 process_def = self._validate_and_enhance(process_def)
@@ -1378,6 +1478,7 @@ class ProcessWizard:
                     }
                     cfg = n["config"]
             
+            cache.put(cache_key, process_def)
             return process_def
             
         except Exception as e:
@@ -0,0 +1,128 @@
+"""
+Process Wizard Cache
+Reuse generated workflows for repeated wizard requests
+
+Generating a workflow takes several LLM calls (30-60 s), and the same goal is
+often submitted again: a user re-opens the wizard, a page is refreshed, or a
+team tries the same template. Results are kept in memory, keyed by:
+- a SHA-256 of the goal and everything else that shapes the prompt (tasks,
+  output format, tools, departments, identity context, ...)
+- the model (LLM config ID and model name)
+- the platform KB version (platform_kb_version()), so editing the KB docs
+  stops old answers from matching
+
+Only successful LLM generations are stored; template fallbacks are not.
+Entries are evicted least-recently-used beyond the entry budget and expire
+after the TTL. The wizard's `regenerate` option skips the lookup (and stores
+the fresh result).
+
+Configuration (environment variables):
+- PROCESS_WIZARD_CACHE_TTL_SECONDS: entry lifetime (default 3600, 0 disables the cache)
+- PROCESS_WIZARD_CACHE_MAX_ENTRIES: entries kept per worker (default 128)
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def model_key(llm) -> str:
+    """Identify the model behind an LLM instance (config ID and model name)"""
+    config = getattr(llm, "config", None)
+    if config is None:
+        return type(llm).__name__
+    return f"{getattr(config, 'id', '')}:{getattr(config, 'model_id', '')}"
+
+
+def make_key(goal: str, model: str, kb_version: str, **inputs: Any) -> str:
+    """Cache key for a wizard generation; inputs are the other prompt inputs"""
+    goal_hash = hashlib.sha256((goal or "").strip().encode("utf-8")).hexdigest()
+    inputs_hash = hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{goal_hash}:{model}:{kb_version}:{inputs_hash}"
+
+
+class WizardCache:
+    """In-memory LRU cache of generated process definitions"""
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_int('PROCESS_WIZARD_CACHE_TTL_SECONDS', 3600)
+        self.max_entries = max_entries if max_entries is not None else _env_int('PROCESS_WIZARD_CACHE_MAX_ENTRIES', 128)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, value)
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached definition, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+        # Callers edit the definition (positions, node configs); never hand out the stored one
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled or not isinstance(value, dict):
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+        }
+
+
+_wizard_cache: WizardCache = None
+
+
+def get_wizard_cache() -> WizardCache:
+    """Get the worker-wide wizard cache"""
+    global _wizard_cache
+    if _wizard_cache is None:
+        _wizard_cache = WizardCache()
+    return _wizard_cache
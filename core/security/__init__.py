@@ -44,6 +44,8 @@ from .models import (
 
 from .services import (
     PasswordService,
+    PasswordHashBusyError,
+    get_password_hash_pool,
     MFAService,
     TokenService,
     EmailService,
@@ -85,7 +87,8 @@ __all__ = [
     'SecuritySettings',
     
     # Services
-    'PasswordService', 'MFAService', 'TokenService',
+    'PasswordService', 'PasswordHashBusyError', 'get_password_hash_pool',
+    'MFAService', 'TokenService',
     'EmailService', 'LDAPService', 'OAuthService',
     
     # Engine & State
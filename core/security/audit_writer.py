@@ -0,0 +1,181 @@
+"""
+AgentForge Audit Log Writer - Batched background persistence
+=============================================================
+Audit events are recorded on login, chat, tool and admin paths. Writing each
+one in its own DB transaction put a commit on every such request; instead
+add_audit_log hands the entry to this writer, which queues it and returns.
+A background thread drains the queue and bulk-inserts batches.
+
+- The queue is bounded. When it is full the caller waits briefly for room
+  (backpressure); if the writer is still behind, the entry is written inline
+  so it is never dropped
+- A batch is written when it reaches AUDIT_BATCH_SIZE entries or
+  AUDIT_FLUSH_INTERVAL_SECONDS after its first entry, whichever comes first
+- shutdown() (called from the app lifespan) flushes everything still queued
+
+A thread is used rather than an asyncio task because add_audit_log is
+synchronous and is also called from worker threads.
+
+Configuration (environment variables):
+- AUDIT_QUEUE_SIZE: entries queued before callers wait (default 10000)
+- AUDIT_BATCH_SIZE: maximum entries per insert (default 200)
+- AUDIT_FLUSH_INTERVAL_SECONDS: maximum time an entry waits in a batch (default 0.5)
+- AUDIT_ENQUEUE_TIMEOUT_SECONDS: how long a caller waits for room (default 0.05)
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Bounded queue of audit logs drained by a background bulk writer"""
+
+    def __init__(self, queue_size: int = None, batch_size: int = None, flush_interval: float = None):
+        self.batch_size = batch_size or _env_int('AUDIT_BATCH_SIZE', 200)
+        self.flush_interval = flush_interval or _env_float('AUDIT_FLUSH_INTERVAL_SECONDS', 0.5)
+        self.enqueue_timeout = _env_float('AUDIT_ENQUEUE_TIMEOUT_SECONDS', 0.05)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or _env_int('AUDIT_QUEUE_SIZE', 10000))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters (for diagnostics)
+        self.written = 0
+        self.failed = 0
+        self.inline_writes = 0
+
+    def submit(self, log: AuditLog) -> None:
+        """Queue an audit log for persistence"""
+        if self._closed or not self._ensure_started():
+            self._write([log])
+            return
+        try:
+            self._queue.put_nowait(log)
+            return
+        except queue.Full:
+            pass
+        # Backpressure: give the writer a moment to make room, then write inline
+        try:
+            self._queue.put(log, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.inline_writes += 1
+            self._write([log])
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop the writer after flushing everything queued so far"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        # Anything left (writer did not start or timed out) is written here
+        leftover = self._drain_nowait()
+        if leftover:
+            self._write(leftover)
+
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> bool:
+        if self._thread is not None:
+            return True
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                try:
+                    thread.start()
+                except RuntimeError as e:  # interpreter shutting down
+                    logger.warning("Audit writer thread unavailable, writing inline: %s", e)
+                    return False
+                self._thread = thread
+        return True
+
+    def _drain_nowait(self) -> List[AuditLog]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not _STOP:
+                items.append(item)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[AuditLog]) -> None:
+        try:
+            from database.services import AuditService
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning("Audit log persistence unavailable: %s", e)
+            return
+        try:
+            AuditService.save_audit_logs(batch)
+            self.written += len(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.failed += 1
+                logger.warning("Failed to persist audit log: %s", e)
+                return
+            logger.warning("Bulk audit insert of %d entries failed, retrying one by one: %s", len(batch), e)
+
+        # One bad row must not lose the whole batch
+        for log in batch:
+            try:
+                AuditService.save_audit_logs([log])
+                self.written += 1
+            except Exception:
+                self.failed += 1
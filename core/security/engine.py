@@ -7,14 +7,14 @@ Evaluates access policies using:
 - Resource-specific permissions
 """
 
-import re
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Set, Tuple, TYPE_CHECKING
+from typing import Dict, FrozenSet, List, Optional, Any, Tuple, TYPE_CHECKING
 
 from .models import (
-    User, UserStatus, Role, Policy, PolicyRule, PolicyCondition,
+    User, UserStatus, Role,
     ResourceType, Permission, ToolPermission, KnowledgeBasePermission, DatabasePermission
 )
+from .policy_index import PolicyIndex
 
 if TYPE_CHECKING:
     from .state import SecurityState
@@ -28,6 +28,17 @@ class PolicyEngine:
     
     def __init__(self, security_state: 'SecurityState'):
         self.state = security_state
+        
+        # RBAC caches, rebuilt when the roles/groups collections change version
+        self._closure_stamp: Optional[Tuple[int, int]] = None
+        self._role_closure: Dict[str, FrozenSet[str]] = {}
+        self._group_permissions: Dict[str, FrozenSet[str]] = {}
+        # user_id -> (assignment stamp, effective permissions)
+        self._user_permissions: Dict[str, Tuple[Tuple, FrozenSet[str]]] = {}
+        
+        # ABAC: compiled deny policies, rebuilt when the policies collection changes
+        self._policy_index: Optional[PolicyIndex] = None
+        self._policy_index_version: Optional[int] = None
     
     def evaluate_access(
         self,
@@ -56,13 +67,13 @@ class PolicyEngine:
         if user.status != UserStatus.ACTIVE:
             return False, f"User account is {user.status.value}"
         
-        # 2. Super admin bypass - has all permissions
-        if Permission.SYSTEM_ADMIN.value in self._get_user_permissions(user):
-            return True, None
-        
-        # 3. Get all user permissions from roles, groups, and direct assignments
+        # 2. Get all user permissions from roles, groups, and direct assignments
         user_permissions = self._get_user_permissions(user)
         
+        # 3. Super admin bypass - has all permissions
+        if Permission.SYSTEM_ADMIN.value in user_permissions:
+            return True, None
+        
         # 4. Check basic permission requirement
         required_permission = f"{resource_type.value}:{action}"
         has_base_permission = required_permission in user_permissions
@@ -74,22 +85,12 @@ class PolicyEngine:
             if wildcard_perm not in user_permissions:
                 return False, f"Missing permission: {required_permission}"
         
-        # 5. Get and evaluate ABAC policies
-        policies = self._get_applicable_policies(user, action, resource_type, resource_id)
-        
-        # Sort by priority (lower = higher priority)
-        policies = sorted(policies, key=lambda p: p.priority)
-        
-        # Evaluate policies - explicit deny takes precedence
-        for policy in policies:
-            if not policy.is_active:
-                continue
-            
-            matches = self._evaluate_policy(policy, user, context)
-            if matches:
-                if policy.effect == "deny":
-                    return False, f"Denied by policy: {policy.name}"
-                # Allow policies just confirm access, continue checking for denies
+        # 5. Evaluate ABAC policies - explicit deny takes precedence.
+        #    Allow policies only confirm access RBAC already granted, so the
+        #    compiled index holds deny policies only, sorted by priority.
+        denied_by = self._get_policy_index().find_deny(user, action, resource_type, resource_id, context)
+        if denied_by is not None:
+            return False, f"Denied by policy: {denied_by.name}"
         
         # 6. Check resource-specific permissions if resource_id provided
         if resource_id:
@@ -102,285 +103,92 @@ class PolicyEngine:
         # 7. All checks passed
         return True, None
     
-    def _get_user_permissions(self, user: User) -> Set[str]:
+    def _refresh_role_closure(self) -> None:
+        """
+        Precompute each role's permissions including inherited parent roles,
+        and each group's permissions from its roles. Rebuilt only when the
+        roles or groups collection changes; drops all cached user permissions.
+        """
+        roles = self.state.roles
+        groups = self.state.groups
+        stamp = (getattr(roles, 'version', None), getattr(groups, 'version', None))
+        if stamp == self._closure_stamp and None not in stamp:
+            return
+        
+        closure: Dict[str, FrozenSet[str]] = {}
+        for role_id, role in roles.items():
+            permissions = set(role.permissions)
+            parent_id = role.parent_id
+            visited = set()  # Prevent infinite loops
+            while parent_id and parent_id not in visited:
+                visited.add(parent_id)
+                parent_role = roles.get(parent_id)
+                if not parent_role:
+                    break
+                permissions.update(parent_role.permissions)
+                parent_id = parent_role.parent_id
+            closure[role_id] = frozenset(permissions)
+        
+        group_permissions: Dict[str, FrozenSet[str]] = {}
+        for group_id, group in groups.items():
+            permissions = set()
+            # Groups grant their roles' own permissions (no parent inheritance)
+            for role_id in group.role_ids:
+                role = roles.get(role_id)
+                if role:
+                    permissions.update(role.permissions)
+            group_permissions[group_id] = frozenset(permissions)
+        
+        self._role_closure = closure
+        self._group_permissions = group_permissions
+        self._user_permissions = {}
+        self._closure_stamp = stamp
+    
+    def invalidate_cache(self, user_id: Optional[str] = None) -> None:
+        """Drop cached permissions for one user, or rebuild everything"""
+        if user_id:
+            self._user_permissions.pop(user_id, None)
+        else:
+            self._closure_stamp = None
+            self._policy_index = None
+    
+    def _get_user_permissions(self, user: User) -> FrozenSet[str]:
         """
         Get all permissions for a user from:
         - Direct permissions assigned to user
         - Permissions from assigned roles
         - Permissions from role inheritance (parent roles)
         - Permissions from group memberships
+        
+        Cached per user; the cache key includes the user's role, group and
+        direct-permission assignments, so changing any of them (even in place)
+        recomputes the set.
         """
-        permissions = set(user.direct_permissions)
+        self._refresh_role_closure()
         
-        # Add permissions from directly assigned roles
+        stamp = (tuple(user.role_ids), tuple(user.group_ids), tuple(user.direct_permissions))
+        cached = self._user_permissions.get(user.id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        permissions = set(user.direct_permissions)
         for role_id in user.role_ids:
-            role = self.state.roles.get(role_id)
-            if role:
-                permissions.update(role.permissions)
-                
-                # Add inherited permissions from parent roles
-                parent_id = role.parent_id
-                visited = set()  # Prevent infinite loops
-                while parent_id and parent_id not in visited:
-                    visited.add(parent_id)
-                    parent_role = self.state.roles.get(parent_id)
-                    if parent_role:
-                        permissions.update(parent_role.permissions)
-                        parent_id = parent_role.parent_id
-                    else:
-                        break
-        
-        # Add permissions from group memberships
+            permissions.update(self._role_closure.get(role_id, ()))
         for group_id in user.group_ids:
-            group = self.state.groups.get(group_id)
-            if group:
-                # Groups can have roles assigned
-                for role_id in group.role_ids:
-                    role = self.state.roles.get(role_id)
-                    if role:
-                        permissions.update(role.permissions)
-        
-        return permissions
-    
-    def _get_applicable_policies(
-        self,
-        user: User,
-        action: str,
-        resource_type: ResourceType,
-        resource_id: Optional[str]
-    ) -> List[Policy]:
-        """Get all policies that might apply to this access request"""
-        applicable = []
-        
-        for policy in self.state.policies.values():
-            # Must be same org
-            if policy.org_id != user.org_id:
-                continue
-            
-            # Check resource type matches
-            if policy.resource_type != resource_type:
-                continue
-            
-            # Check action matches (empty = all actions)
-            if policy.actions and action not in policy.actions:
-                continue
-            
-            # Check resource ID matches (if policy specifies resources)
-            if policy.resource_ids and resource_id:
-                if resource_id not in policy.resource_ids:
-                    continue
-            
-            # Check if policy applies to this user
-            applies_to_user = self._policy_applies_to_user(policy, user)
-            
-            if applies_to_user:
-                applicable.append(policy)
-        
-        return applicable
-    
-    def _policy_applies_to_user(self, policy: Policy, user: User) -> bool:
-        """Check if a policy applies to a specific user"""
-        # If no specific targets, policy applies to everyone (uses conditions)
-        if not policy.user_ids and not policy.role_ids and not policy.group_ids:
-            return True
-        
-        # Check direct user assignment
-        if user.id in policy.user_ids:
-            return True
-        
-        # Check role assignment
-        if any(role_id in policy.role_ids for role_id in user.role_ids):
-            return True
-        
-        # Check group assignment
-        if any(group_id in policy.group_ids for group_id in user.group_ids):
-            return True
-        
-        return False
-    
-    def _evaluate_policy(
-        self,
-        policy: Policy,
-        user: User,
-        context: Dict[str, Any]
-    ) -> bool:
-        """Evaluate if a policy's conditions are met"""
-        # If no rules, policy always applies (to its targets)
-        if not policy.rules:
-            return True
-        
-        # Evaluate each rule - any matching rule is enough
-        for rule in policy.rules:
-            if self._evaluate_rule(rule, user, context):
-                return True
-        
-        return False
-    
-    def _evaluate_rule(
-        self,
-        rule: PolicyRule,
-        user: User,
-        context: Dict[str, Any]
-    ) -> bool:
-        """Evaluate a single policy rule"""
-        results = []
-        
-        for condition in rule.conditions:
-            result = self._evaluate_condition(condition, user, context)
-            results.append(result)
-        
-        if rule.logic.upper() == "AND":
-            return all(results) if results else True
-        else:  # OR
-            return any(results) if results else True
-    
-    def _evaluate_condition(
-        self,
-        condition: PolicyCondition,
-        user: User,
-        context: Dict[str, Any]
-    ) -> bool:
-        """Evaluate a single condition"""
-        # Get the attribute value
-        value = self._get_attribute_value(condition.attribute, user, context)
-        target = condition.value
-        
-        # Handle None values
-        if value is None:
-            return condition.operator in ["eq", "is"] and target is None
-        
-        # Compare based on operator
-        op = condition.operator.lower()
-        
-        try:
-            if op == "eq" or op == "equals" or op == "==":
-                return value == target
-            elif op == "ne" or op == "not_equals" or op == "!=":
-                return value != target
-            elif op == "in":
-                return value in target if isinstance(target, (list, set, tuple)) else str(value) in str(target)
-            elif op == "not_in":
-                return value not in target if isinstance(target, (list, set, tuple)) else str(value) not in str(target)
-            elif op == "gt" or op == ">":
-                return value > target
-            elif op == "lt" or op == "<":
-                return value < target
-            elif op == "gte" or op == ">=":
-                return value >= target
-            elif op == "lte" or op == "<=":
-                return value <= target
-            elif op == "contains":
-                return str(target).lower() in str(value).lower()
-            elif op == "not_contains":
-                return str(target).lower() not in str(value).lower()
-            elif op == "starts_with":
-                return str(value).lower().startswith(str(target).lower())
-            elif op == "ends_with":
-                return str(value).lower().endswith(str(target).lower())
-            elif op == "regex" or op == "matches":
-                return bool(re.match(str(target), str(value), re.IGNORECASE))
-            elif op == "is_empty":
-                return not value or (isinstance(value, (list, dict, str)) and len(value) == 0)
-            elif op == "is_not_empty":
-                return value and (not isinstance(value, (list, dict, str)) or len(value) > 0)
-            elif op == "between":
-                if isinstance(target, (list, tuple)) and len(target) >= 2:
-                    return target[0] <= value <= target[1]
-        except (TypeError, ValueError):
-            pass
-        
-        return False
-    
-    def _get_attribute_value(
-        self,
-        attribute: str,
-        user: User,
-        context: Dict[str, Any]
-    ) -> Any:
-        """Get an attribute value from user, context, or environment"""
-        parts = attribute.split('.')
-        
-        if not parts:
-            return None
-        
-        root = parts[0].lower()
-        path = parts[1:] if len(parts) > 1 else []
-        
-        if root == "user":
-            return self._get_nested_value(user, path)
-        
-        elif root == "profile":
-            return self._get_nested_value(user.profile, path)
-        
-        elif root == "context":
-            return self._get_nested_value(context, path)
-        
-        elif root == "request":
-            return self._get_nested_value(context.get('request', {}), path)
-        
-        elif root == "resource":
-            return self._get_nested_value(context.get('resource', {}), path)
-        
-        elif root == "time" or root == "datetime":
-            return self._get_time_value(path)
-        
-        elif root == "env" or root == "environment":
-            import os
-            return os.environ.get('.'.join(path), None) if path else None
-        
-        # Try direct context lookup
-        return context.get(attribute)
-    
-    def _get_nested_value(self, obj: Any, path: List[str]) -> Any:
-        """Get a nested value from an object or dict"""
-        current = obj
-        
-        for part in path:
-            if current is None:
-                return None
-            
-            if hasattr(current, part):
-                current = getattr(current, part)
-            elif isinstance(current, dict):
-                current = current.get(part)
-            else:
-                return None
+            permissions.update(self._group_permissions.get(group_id, ()))
         
-        return current
+        result = frozenset(permissions)
+        self._user_permissions[user.id] = (stamp, result)
+        return result
     
-    def _get_time_value(self, path: List[str]) -> Any:
-        """Get time-based values for conditions"""
-        now = datetime.utcnow()
-        
-        if not path:
-            return now.isoformat()
-        
-        attr = path[0].lower()
-        
-        if attr == "hour":
-            return now.hour
-        elif attr == "minute":
-            return now.minute
-        elif attr == "day" or attr == "weekday":
-            return now.weekday()  # 0=Monday, 6=Sunday
-        elif attr == "day_of_month":
-            return now.day
-        elif attr == "month":
-            return now.month
-        elif attr == "year":
-            return now.year
-        elif attr == "date":
-            return now.date().isoformat()
-        elif attr == "time":
-            return now.time().isoformat()
-        elif attr == "timestamp":
-            return now.timestamp()
-        elif attr == "is_weekend":
-            return now.weekday() >= 5
-        elif attr == "is_business_hours":
-            return 9 <= now.hour < 17 and now.weekday() < 5
-        
-        return None
+    def _get_policy_index(self) -> PolicyIndex:
+        """Compiled ABAC policies, rebuilt when the policies collection changes"""
+        policies = self.state.policies
+        version = getattr(policies, 'version', None)
+        if self._policy_index is None or version is None or version != self._policy_index_version:
+            self._policy_index = PolicyIndex(list(policies.values()))
+            self._policy_index_version = version
+        return self._policy_index
     
     def _check_resource_permission(
         self,
@@ -0,0 +1,288 @@
+"""
+AgentForge Expiry Sweeper - Background expiry of sessions and one-time codes
+============================================================================
+Sessions, MFA challenge codes and password-reset tokens carry an expiry but
+were only checked when used, so expired entries stayed in memory until the
+process restarted. The sweeper keeps a min-heap of (deadline, kind, key) and
+every SECURITY_SWEEP_INTERVAL_SECONDS pops only the entries that are due:
+
+- Deadlines are recomputed from the live object when an entry is popped.
+  Activity that pushed the deadline back re-schedules the entry instead of
+  expiring it, so heap entries never need updating in place
+- Each (kind, key) is scheduled once; tracking it again only matters when
+  the new deadline is earlier
+- The background task sweeps on the event loop, like every other change to
+  SecurityState; only the session revocation writes run in a thread
+
+Expiry actions:
+- session: revoked on every worker and dropped from this worker's cache
+  (kept, inactive, if the revocation could not be written)
+- mfa_code: expired email/SMS codes are cleared from the user
+- reset_token: an expired password-reset token is cleared from the user
+
+Configuration (environment variables):
+- SECURITY_SWEEP_INTERVAL_SECONDS: time between sweeps (default 30)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+SECURITY_SWEEP_INTERVAL_SECONDS = _env_float('SECURITY_SWEEP_INTERVAL_SECONDS', 30)
+
+# Lifetime of an inactive session created for a pending MFA step (matches the code lifetime)
+PENDING_SESSION_SECONDS = 10 * 60
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """Seconds since the epoch for a naive-UTC ISO timestamp (None if absent or malformed)"""
+    if not value:
+        return None
+    try:
+        return (datetime.fromisoformat(value) - _EPOCH).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def _utc_now() -> float:
+    return (datetime.utcnow() - _EPOCH).total_seconds()
+
+
+class ExpirySweeper:
+    """Min-heap of expiry deadlines for SecurityState's sessions, MFA codes and reset tokens"""
+
+    KINDS = ("session", "mfa_code", "reset_token")
+
+    def __init__(self, state, interval: float = None):
+        self.state = state
+        self.interval = interval or SECURITY_SWEEP_INTERVAL_SECONDS
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._scheduled: Dict[Tuple[str, str], float] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Dict[str, Tuple[Callable[[str], Optional[float]], Callable[[str], None]]] = {
+            "session": (self._session_deadline, self._expire_session),
+            "mfa_code": (self._mfa_code_deadline, self._expire_mfa_code),
+            "reset_token": (self._reset_token_deadline, self._expire_reset_token),
+        }
+
+        # Counters (reported by the security stats endpoint)
+        self.expired: Dict[str, int] = {kind: 0 for kind in self.KINDS}
+        self.last_sweep: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def track(self, kind: str, key: str) -> None:
+        """Schedule (or move earlier) the expiry of one entry"""
+        if not key:
+            return
+        try:
+            deadline = self._handlers[kind][0](key)
+        except Exception as e:
+            logger.debug("Expiry deadline for %s %s unavailable: %s", kind, key, e)
+            return
+        if deadline is None:
+            return
+        with self._lock:
+            self._schedule(kind, key, deadline)
+
+    def track_all(self) -> None:
+        """Schedule everything currently held in memory (after loading state)"""
+        for session_id in list(self.state.sessions):
+            self.track("session", session_id)
+        for user in list(self.state.users.values()):
+            if user.mfa and (user.mfa.email_code or user.mfa.sms_code):
+                self.track("mfa_code", user.id)
+            if user.reset_password_token:
+                self.track("reset_token", user.id)
+
+    def sweep(self, now: float = None) -> Dict[str, int]:
+        """Expire the entries that are due; returns the number expired per kind"""
+        expired = {kind: 0 for kind in self.KINDS}
+        for kind, key in self._due(now):
+            try:
+                self._handlers[kind][1](key)
+                expired[kind] += 1
+            except Exception as e:
+                logger.warning("Failed to expire %s %s: %s", kind, key, e)
+        return self._record(expired)
+
+    async def sweep_async(self, now: float = None) -> Dict[str, int]:
+        """sweep() on the event loop, with the session revocation writes in a thread"""
+        expired = {kind: 0 for kind in self.KINDS}
+        for kind, key in self._due(now):
+            try:
+                if kind == "session":
+                    await self._expire_session_async(key)
+                else:
+                    self._handlers[kind][1](key)
+                expired[kind] += 1
+            except Exception as e:
+                logger.warning("Failed to expire %s %s: %s", kind, key, e)
+        return self._record(expired)
+
+    def _due(self, now: float = None):
+        """Pop the entries whose live deadline has passed; yields (kind, key)"""
+        now = _utc_now() if now is None else now
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return
+                deadline, _, kind, key = heapq.heappop(self._heap)
+                if self._scheduled.get((kind, key)) != deadline:
+                    continue  # superseded by an earlier deadline
+                del self._scheduled[(kind, key)]
+            try:
+                current = self._handlers[kind][0](key)
+            except Exception as e:
+                logger.warning("Failed to expire %s %s: %s", kind, key, e)
+                continue
+            if current is None:
+                continue
+            if current > now:
+                with self._lock:
+                    self._schedule(kind, key, current)
+                continue
+            yield kind, key
+
+    def _record(self, expired: Dict[str, int]) -> Dict[str, int]:
+        for kind, count in expired.items():
+            self.expired[kind] += count
+        self.last_sweep = datetime.utcnow().isoformat()
+        return expired
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            tracked = {kind: 0 for kind in self.KINDS}
+            for kind, _ in self._scheduled:
+                tracked[kind] += 1
+        return {
+            "tracked": tracked,
+            "expired_total": dict(self.expired),
+            "sessions_in_memory": len(self.state.sessions),
+            "last_sweep": self.last_sweep,
+        }
+
+    def _schedule(self, kind: str, key: str, deadline: float) -> None:
+        current = self._scheduled.get((kind, key))
+        if current is not None and current <= deadline:
+            return
+        self._scheduled[(kind, key)] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), kind, key))
+
+    # ------------------------------------------------------------------
+    # Background task
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="security-expiry-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep_async()
+            except Exception as e:
+                logger.warning("Security expiry sweep failed: %s", e)
+
+    # ------------------------------------------------------------------
+    # Deadlines and expiry actions
+    # ------------------------------------------------------------------
+
+    def _session_deadline(self, session_id: str) -> Optional[float]:
+        session = self.state.sessions.get(session_id)
+        if session is None:
+            return None
+        if not session.is_active:
+            # Revoked, or an OAuth login still waiting for its MFA code (created
+            # inactive); keep the latter for as long as its code is valid
+            created = _timestamp(session.created_at) or 0.0
+            return created + PENDING_SESSION_SECONDS
+        deadlines = []
+        settings = self.state.get_settings(session.org_id)
+        if settings.session_timeout_minutes > 0:
+            last_activity = _timestamp(session.last_activity)
+            if last_activity is not None:
+                deadlines.append(last_activity + settings.session_timeout_minutes * 60)
+        if session.remember_me:
+            expires_at = _timestamp(session.expires_at)
+            if expires_at is not None:
+                deadlines.append(expires_at)
+        return min(deadlines) if deadlines else None
+
+    def _expire_session(self, session_id: str) -> None:
+        if not self.state.session_store.expire(session_id):
+            self._retry_session(session_id)
+
+    async def _expire_session_async(self, session_id: str) -> None:
+        if not await self.state.session_store.expire_async(session_id):
+            self._retry_session(session_id)
+
+    def _retry_session(self, session_id: str) -> None:
+        # Revocation not written (database unavailable) - retry on a later sweep
+        with self._lock:
+            self._schedule("session", session_id, _utc_now() + self.interval)
+
+    def _mfa_code_deadline(self, user_id: str) -> Optional[float]:
+        user = self.state.users.get(user_id)
+        if user is None or not user.mfa:
+            return None
+        deadlines = []
+        if user.mfa.email_code:
+            deadlines.append(_timestamp(user.mfa.email_code_expires) or 0.0)
+        if user.mfa.sms_code:
+            deadlines.append(_timestamp(user.mfa.sms_code_expires) or 0.0)
+        return min(deadlines) if deadlines else None
+
+    def _expire_mfa_code(self, user_id: str) -> None:
+        user = self.state.users.get(user_id)
+        now = _utc_now()
+        if (_timestamp(user.mfa.email_code_expires) or 0.0) <= now:
+            user.mfa.email_code = None
+            user.mfa.email_code_expires = None
+        if (_timestamp(user.mfa.sms_code_expires) or 0.0) <= now:
+            user.mfa.sms_code = None
+            user.mfa.sms_code_expires = None
+        # The other code may still be pending
+        self.track("mfa_code", user_id)
+
+    def _reset_token_deadline(self, user_id: str) -> Optional[float]:
+        user = self.state.users.get(user_id)
+        if user is None or not user.reset_password_token:
+            return None
+        return _timestamp(user.reset_password_expires) or 0.0
+
+    def _expire_reset_token(self, user_id: str) -> None:
+        user = self.state.users.get(user_id)
+        user.reset_password_token = None
+        user.reset_password_expires = None
@@ -0,0 +1,549 @@
+"""
+AgentForge LDAP Directory - Pooled connections and incremental sync
+===================================================================
+LDAP authentication and lookups used to open, bind and tear down a new
+connection each time. Connections are now kept in a small pool per LDAP
+configuration, bound as the service account:
+
+- A pool holds at most LDAP_POOL_SIZE connections; callers wait up to
+  LDAP_POOL_ACQUIRE_TIMEOUT_SECONDS for one to be free
+- User password checks rebind a pooled connection as the user and then
+  rebind it back to the service account. A connection that is not bound as
+  the service account when it is returned is closed instead of reused
+- Idle connections are replaced after LDAP_POOL_IDLE_SECONDS, and an
+  operation that fails with a connection error is retried once on a fresh
+  connection (servers drop idle binds)
+
+Directory data is mirrored into the local user tables by sync_directory():
+
+- An incremental sync asks only for entries changed since the last run,
+  using the config's sync_cursor_attribute (modifyTimestamp, or uSNChanged
+  for Active Directory) and the highest value seen so far (sync_cursor)
+- A full sync (first run, every sync_interval_hours, or on demand from the
+  admin API) re-reads every entry
+- Manager DNs are resolved to user IDs during sync and stored in manager_id,
+  so approval routing by manager reads the local tables and never waits on LDAP
+- Only the paged directory search runs in a worker thread; the entries are
+  applied to SecurityState and saved on the event loop, like every other
+  change to the security state
+
+LDAPSyncScheduler runs the syncs in the background (started from the app
+lifespan).
+
+Configuration (environment variables):
+- LDAP_POOL_SIZE: connections per LDAP configuration (default 4)
+- LDAP_POOL_ACQUIRE_TIMEOUT_SECONDS: wait for a free connection (default 10)
+- LDAP_POOL_IDLE_SECONDS: reuse window for an idle connection (default 300)
+- LDAP_SYNC_INTERVAL_SECONDS: interval between incremental syncs (default 300)
+- LDAP_SYNC_PAGE_SIZE: entries per paged search request (default 500)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from ldap3 import Server, Connection, SUBTREE, AUTO_BIND_TLS_BEFORE_BIND, AUTO_BIND_NO_TLS
+    from ldap3.core.exceptions import LDAPBindError, LDAPCommunicationError
+    LDAP_AVAILABLE = True
+except ImportError:
+    LDAP_AVAILABLE = False
+
+    class LDAPBindError(Exception):
+        pass
+
+    class LDAPCommunicationError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+LDAP_POOL_SIZE = _env_int('LDAP_POOL_SIZE', 4)
+LDAP_POOL_ACQUIRE_TIMEOUT = _env_float('LDAP_POOL_ACQUIRE_TIMEOUT_SECONDS', 10)
+LDAP_POOL_IDLE_SECONDS = _env_float('LDAP_POOL_IDLE_SECONDS', 300)
+LDAP_SYNC_INTERVAL_SECONDS = _env_float('LDAP_SYNC_INTERVAL_SECONDS', 300)
+LDAP_SYNC_PAGE_SIZE = _env_int('LDAP_SYNC_PAGE_SIZE', 500)
+
+_PAGED_RESULTS_OID = '1.2.840.113556.1.4.319'
+
+
+class LDAPPoolExhaustedError(Exception):
+    """Raised when no pooled LDAP connection became free in time"""
+
+
+def _open_connection(config) -> Any:
+    """Open a connection bound as the configured service account"""
+    server = Server(config.server_url, use_ssl=config.use_ssl, connect_timeout=config.connection_timeout)
+    return Connection(
+        server,
+        user=config.bind_dn,
+        password=config.bind_password,
+        auto_bind=AUTO_BIND_TLS_BEFORE_BIND if (config.use_tls and not config.use_ssl) else AUTO_BIND_NO_TLS,
+        receive_timeout=config.connection_timeout,
+    )
+
+
+# ============================================================================
+# CONNECTION POOL
+# ============================================================================
+
+class LDAPConnectionPool:
+    """Bounded pool of service-account connections for one LDAP configuration"""
+
+    def __init__(self, config, size: int = None, connection_factory: Callable[[Any], Any] = None):
+        self.config = config
+        self.size = size or LDAP_POOL_SIZE
+        self._factory = connection_factory or _open_connection
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: "deque[Tuple[Any, float]]" = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters (for diagnostics)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection bound as the service account"""
+        if not self._slots.acquire(timeout=LDAP_POOL_ACQUIRE_TIMEOUT):
+            raise LDAPPoolExhaustedError(f"No free LDAP connection for {self.config.server_url}")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def run(self, operation: Callable[[Any], Any]) -> Any:
+        """Run operation(conn), retrying once on a fresh connection after a connection error"""
+        try:
+            with self.connection() as conn:
+                return operation(conn)
+        except LDAPCommunicationError as e:
+            logger.info("LDAP connection to %s failed (%s), retrying on a new connection", self.config.server_url, e)
+        with self.connection() as conn:
+            return operation(conn)
+
+    def verify_credentials(self, user_dn: str, password: str) -> bool:
+        """Check a user's password by rebinding a pooled connection as that user"""
+        if not user_dn or not password:
+            # An empty password would be an unauthenticated bind, which servers accept
+            return False
+        with self.connection() as conn:
+            try:
+                ok = bool(conn.rebind(user=user_dn, password=password))
+            except LDAPBindError:
+                ok = False
+            # Return to the service account; _checkin closes the connection if this failed
+            try:
+                conn.rebind(user=self.config.bind_dn, password=self.config.bind_password)
+            except Exception as e:
+                logger.warning("LDAP rebind to service account failed: %s", e)
+            return ok
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._unbind(conn)
+
+    # ------------------------------------------------------------------
+
+    def _checkout(self) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, stamp = self._idle.pop()
+                if now - stamp < LDAP_POOL_IDLE_SECONDS and not getattr(conn, 'closed', False):
+                    self.reused += 1
+                    return conn
+                self._unbind(conn)
+        conn = self._factory(self.config)
+        self.opened += 1
+        return conn
+
+    def _checkin(self, conn: Any) -> None:
+        bound_as_service = getattr(conn, 'bound', False) and getattr(conn, 'user', None) == self.config.bind_dn
+        with self._lock:
+            if not self._closed and bound_as_service and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._discard(conn)
+
+    def _discard(self, conn: Any) -> None:
+        if conn is None:
+            return
+        self.discarded += 1
+        self._unbind(conn)
+
+    @staticmethod
+    def _unbind(conn: Any) -> None:
+        try:
+            conn.unbind()
+        except Exception:
+            pass
+
+
+_pools: Dict[str, Tuple[tuple, LDAPConnectionPool]] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_fingerprint(config) -> tuple:
+    return (config.server_url, config.use_ssl, config.use_tls, config.connection_timeout,
+            config.bind_dn, config.bind_password)
+
+
+def get_ldap_pool(config) -> LDAPConnectionPool:
+    """Pool for an LDAP configuration (replaced when its connection settings change)"""
+    fingerprint = _pool_fingerprint(config)
+    with _pools_lock:
+        entry = _pools.get(config.id)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        pool = LDAPConnectionPool(config)
+        _pools[config.id] = (fingerprint, pool)
+    if entry is not None:
+        entry[1].close()
+    return pool
+
+
+def discard_ldap_pool(config_id: str) -> None:
+    with _pools_lock:
+        entry = _pools.pop(config_id, None)
+    if entry is not None:
+        entry[1].close()
+
+
+def close_ldap_pools() -> None:
+    with _pools_lock:
+        entries = list(_pools.values())
+        _pools.clear()
+    for _, pool in entries:
+        pool.close()
+
+
+# ============================================================================
+# SEARCH HELPERS
+# ============================================================================
+
+def _first(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _to_text(value: Any) -> Optional[str]:
+    value = _first(value)
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        # ldap3 decodes GeneralizedTime when the schema is known
+        return value.strftime('%Y%m%d%H%M%SZ')
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return str(value)
+
+
+def paged_search(conn, search_base: str, search_filter: str, attributes: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """All (dn, attributes) matching a filter, fetched with the paged results control"""
+    entries = []
+    cookie = None
+    while True:
+        conn.search(search_base, search_filter, search_scope=SUBTREE, attributes=attributes,
+                    paged_size=LDAP_SYNC_PAGE_SIZE, paged_cookie=cookie)
+        for item in conn.response or []:
+            if item.get('type') == 'searchResEntry':
+                entries.append((item['dn'], item.get('attributes') or {}))
+        control = (conn.result or {}).get('controls', {}).get(_PAGED_RESULTS_OID)
+        cookie = control['value']['cookie'] if control else None
+        if not cookie:
+            return entries
+
+
+def find_user_entry(conn, config, username: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """The directory entry matching the config's user_search_filter for a username"""
+    from ldap3.utils.conv import escape_filter_chars
+    search_base = config.user_search_base or config.base_dn
+    search_filter = config.user_search_filter.replace('{username}', escape_filter_chars(username))
+    conn.search(search_base, search_filter, search_scope=SUBTREE,
+                attributes=list(config.attribute_mapping.values()), size_limit=1)
+    for item in conn.response or []:
+        if item.get('type') == 'searchResEntry':
+            return item['dn'], item.get('attributes') or {}
+    return None
+
+
+def map_attributes(config, dn: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Directory attributes renamed to AgentForge fields via config.attribute_mapping"""
+    lowered = {k.lower(): v for k, v in attributes.items()}
+    user_data = {"dn": dn}
+    for our_field, ldap_attr in config.attribute_mapping.items():
+        value = _to_text(lowered.get(ldap_attr.lower()))
+        if value:
+            user_data[our_field] = value
+    return user_data
+
+
+# ============================================================================
+# INCREMENTAL SYNC
+# ============================================================================
+
+_sync_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _cursor_newer(attribute: str, value: str, current: Optional[str]) -> bool:
+    if current is None:
+        return True
+    if attribute.lower() == 'usnchanged':
+        try:
+            return int(value) > int(current)
+        except ValueError:
+            return False
+    # GeneralizedTime values in the same format compare correctly as strings
+    return value > current
+
+
+def _sync_filter(config, full: bool) -> str:
+    base = f"(objectClass={config.user_object_class})"
+    if full or not config.sync_cursor:
+        return base
+    # >= rather than >: entries written in the same second as the cursor are re-read (updates are idempotent)
+    return f"(&{base}({config.sync_cursor_attribute}>={config.sync_cursor}))"
+
+
+def _resolve_manager_ids(manager_dns: List[str], org_id: str, state) -> Dict[str, str]:
+    """Map manager DNs (lower-cased) to local user IDs"""
+    wanted = {dn.lower() for dn in manager_dns}
+    resolved = {}
+    for user in state.users.values():
+        if user.external_id and user.org_id == org_id and user.external_id.lower() in wanted:
+            resolved[user.external_id.lower()] = user.id
+    missing = [dn for dn in manager_dns if dn.lower() not in resolved]
+    if missing:
+        try:
+            from database.base import get_session
+            from database.models.user import User as DBUser
+            with get_session() as session:
+                rows = session.query(DBUser.id, DBUser.external_id).filter(
+                    DBUser.external_id.in_(missing)
+                ).all()
+                for user_id, external_id in rows:
+                    resolved[external_id.lower()] = str(user_id)
+        except Exception as e:
+            logger.warning("Could not resolve LDAP manager DNs from the database: %s", e)
+    return resolved
+
+
+async def sync_directory(config, state, full: bool = False, pool: LDAPConnectionPool = None) -> Dict[str, Any]:
+    """
+    Mirror directory users into the local user tables.
+    Incremental unless `full` is set or no cursor has been recorded yet.
+    Must be awaited on the event loop that owns `state`.
+    """
+    if not LDAP_AVAILABLE:
+        return {"success": False, "error": "ldap3 not installed"}
+
+    lock = _sync_locks.setdefault(config.id, asyncio.Lock())
+    async with lock:
+        full = full or not config.sync_cursor
+        pool = pool or get_ldap_pool(config)
+        try:
+            entries = await asyncio.to_thread(_search_entries, config, full, pool)
+        except Exception as e:
+            config.last_sync = datetime.utcnow().isoformat()
+            config.last_sync_status = "error"
+            config.last_error = str(e)
+            return {"success": False, "error": str(e)}
+        return _apply_entries(config, state, entries, full)
+
+
+def _search_entries(config, full: bool, pool: LDAPConnectionPool) -> List[Tuple[str, Dict[str, Any]]]:
+    """The directory search (blocking network I/O, run in a thread)"""
+    search_base = config.user_search_base or config.base_dn
+    attributes = list(dict.fromkeys(
+        list(config.attribute_mapping.values()) + ['memberOf', config.sync_cursor_attribute]
+    ))
+    return pool.run(lambda conn: paged_search(conn, search_base, _sync_filter(config, full), attributes))
+
+
+def _apply_entries(config, state, entries, full: bool) -> Dict[str, Any]:
+    """Apply searched entries to SecurityState and save it (on the event loop)"""
+    from .models import User, UserProfile, UserStatus, AuthProvider
+
+    result = {"synced": 0, "created": 0, "updated": 0, "errors": [], "mode": "full" if full else "incremental"}
+    cursor_attr = config.sync_cursor_attribute
+    cursor = config.sync_cursor
+    manager_links: List[Tuple[Any, str]] = []
+    for dn, attrs in entries:
+        try:
+            user_data = map_attributes(config, dn, attrs)
+            value = _to_text({k.lower(): v for k, v in attrs.items()}.get(cursor_attr.lower()))
+            if value and _cursor_newer(cursor_attr, value, cursor):
+                cursor = value
+
+            if 'email' not in user_data:
+                continue
+
+            # Determine roles from group membership
+            role_ids = [config.default_role_id]
+            if config.group_role_mapping:
+                member_of = next((v for k, v in attrs.items() if k.lower() == 'memberof'), None)
+                for group_dn in _as_list(member_of):
+                    role_id = config.group_role_mapping.get(_to_text(group_dn))
+                    if role_id and role_id not in role_ids:
+                        role_ids.append(role_id)
+
+            user = state.get_user_by_email(user_data['email'], config.org_id)
+            if user:
+                if not config.sync_update_existing:
+                    result['synced'] += 1
+                    continue
+                if user_data.get('first_name'):
+                    user.profile.first_name = user_data['first_name']
+                if user_data.get('last_name'):
+                    user.profile.last_name = user_data['last_name']
+                if user_data.get('display_name'):
+                    user.profile.display_name = user_data['display_name']
+                if user_data.get('phone'):
+                    user.profile.phone = user_data['phone']
+                if user_data.get('job_title'):
+                    user.profile.job_title = user_data['job_title']
+                user.role_ids = role_ids
+                user.external_id = dn
+                result['updated'] += 1
+            else:
+                user = User(
+                    org_id=config.org_id,
+                    email=user_data['email'].lower(),
+                    auth_provider=AuthProvider.LDAP,
+                    external_id=dn,
+                    profile=UserProfile(
+                        first_name=user_data.get('first_name', ''),
+                        last_name=user_data.get('last_name', ''),
+                        display_name=user_data.get('display_name'),
+                        phone=user_data.get('phone'),
+                        job_title=user_data.get('job_title')
+                    ),
+                    role_ids=role_ids,
+                    status=UserStatus.ACTIVE,
+                    email_verified=True
+                )
+                state.users[user.id] = user
+                result['created'] += 1
+
+            if user_data.get('employee_id'):
+                user.employee_id = user_data['employee_id']
+            if user_data.get('department'):
+                user.profile.custom_attributes['department'] = user_data['department']
+            if user_data.get('manager'):
+                manager_links.append((user, user_data['manager']))
+            result['synced'] += 1
+        except Exception as e:
+            result['errors'].append(f"Error syncing {dn}: {str(e)}")
+
+    # Resolved after all entries are applied, so managers created in this batch are found
+    if manager_links:
+        manager_ids = _resolve_manager_ids(list({dn for _, dn in manager_links}), config.org_id, state)
+        for user, manager_dn in manager_links:
+            manager_id = manager_ids.get(manager_dn.lower())
+            if manager_id and manager_id != user.id:
+                user.manager_id = manager_id
+
+    now = datetime.utcnow().isoformat()
+    config.sync_cursor = cursor
+    config.last_sync = now
+    if full:
+        config.last_full_sync = now
+    config.last_sync_status = "success"
+    config.last_sync_users_synced = result['synced']
+
+    state.save_to_disk()
+
+    result['success'] = True
+    return result
+
+
+class LDAPSyncScheduler:
+    """Background task running incremental (and periodic full) syncs for active LDAP configs"""
+
+    def __init__(self, state, interval: float = None):
+        self.state = state
+        self.interval = interval or LDAP_SYNC_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ldap-directory-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for config in list(self.state.ldap_configs.values()):
+            if not (config.is_active and config.sync_enabled):
+                continue
+            try:
+                results[config.id] = await sync_directory(config, self.state, self._full_sync_due(config))
+            except Exception as e:
+                logger.warning("LDAP sync for %s failed: %s", config.id, e)
+        return results
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    def _full_sync_due(config) -> bool:
+        if not config.sync_cursor or not config.last_full_sync:
+            return True
+        try:
+            last_full = datetime.fromisoformat(config.last_full_sync)
+        except ValueError:
+            return True
+        return datetime.utcnow() - last_full >= timedelta(hours=config.sync_interval_hours)
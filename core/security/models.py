@@ -841,7 +841,12 @@ class LDAPConfig(BaseModel):
     sync_interval_hours: int = 24
     sync_delete_removed: bool = False  # Delete users removed from LDAP
     sync_update_existing: bool = True
+    # Incremental sync reads entries whose cursor attribute is >= sync_cursor
+    # (modifyTimestamp for most servers, uSNChanged for Active Directory)
+    sync_cursor_attribute: str = "modifyTimestamp"
+    sync_cursor: Optional[str] = None
     last_sync: Optional[str] = None
+    last_full_sync: Optional[str] = None
     last_sync_status: Optional[str] = None
     last_sync_users_synced: int = 0
     
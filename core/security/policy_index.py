@@ -0,0 +1,354 @@
+"""
+AgentForge Policy Index - Compiled ABAC Policies
+================================================
+ABAC policies are compiled once (when the policy collection changes) instead
+of being re-interpreted on every access check:
+- Policies are bucketed by (org, resource type) and pre-indexed by action
+- Each bucket is pre-sorted by priority
+- Conditions become predicate closures: attribute paths are split, operators
+  resolved and regexes compiled ahead of time
+
+Only active deny policies are indexed. In evaluate_access an allow policy
+never changes the outcome (it "confirms" access that RBAC already granted),
+so the check reduces to: find the highest-priority matching deny, if any.
+"""
+
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .models import User, Policy, PolicyRule, PolicyCondition
+
+logger = logging.getLogger(__name__)
+
+# (user, context) -> bool
+Predicate = Callable[[User, Dict[str, Any]], bool]
+
+
+# ============================================================================
+# ATTRIBUTE ACCESS
+# ============================================================================
+
+def get_nested_value(obj: Any, path: List[str]) -> Any:
+    """Get a nested value from an object or dict"""
+    current = obj
+
+    for part in path:
+        if current is None:
+            return None
+
+        if hasattr(current, part):
+            current = getattr(current, part)
+        elif isinstance(current, dict):
+            current = current.get(part)
+        else:
+            return None
+
+    return current
+
+
+def get_time_value(path: List[str]) -> Any:
+    """Get time-based values for conditions"""
+    now = datetime.utcnow()
+
+    if not path:
+        return now.isoformat()
+
+    attr = path[0].lower()
+
+    if attr == "hour":
+        return now.hour
+    elif attr == "minute":
+        return now.minute
+    elif attr == "day" or attr == "weekday":
+        return now.weekday()  # 0=Monday, 6=Sunday
+    elif attr == "day_of_month":
+        return now.day
+    elif attr == "month":
+        return now.month
+    elif attr == "year":
+        return now.year
+    elif attr == "date":
+        return now.date().isoformat()
+    elif attr == "time":
+        return now.time().isoformat()
+    elif attr == "timestamp":
+        return now.timestamp()
+    elif attr == "is_weekend":
+        return now.weekday() >= 5
+    elif attr == "is_business_hours":
+        return 9 <= now.hour < 17 and now.weekday() < 5
+
+    return None
+
+
+def compile_attribute(attribute: str) -> Callable[[User, Dict[str, Any]], Any]:
+    """Resolve an attribute path (user.*, profile.*, context.*, time.*, ...) to a getter"""
+    parts = attribute.split('.')
+    root = parts[0].lower()
+    path = parts[1:]
+
+    if root == "user":
+        return lambda user, context: get_nested_value(user, path)
+    elif root == "profile":
+        return lambda user, context: get_nested_value(user.profile, path)
+    elif root == "context":
+        return lambda user, context: get_nested_value(context, path)
+    elif root == "request":
+        return lambda user, context: get_nested_value(context.get('request', {}), path)
+    elif root == "resource":
+        return lambda user, context: get_nested_value(context.get('resource', {}), path)
+    elif root == "time" or root == "datetime":
+        return lambda user, context: get_time_value(path)
+    elif root == "env" or root == "environment":
+        name = '.'.join(path)
+        return lambda user, context: os.environ.get(name, None) if name else None
+
+    # Direct context lookup
+    return lambda user, context: context.get(attribute)
+
+
+# ============================================================================
+# CONDITION COMPILATION
+# ============================================================================
+
+def _compile_operator(op: str, target: Any) -> Optional[Callable[[Any], Any]]:
+    """Return a test for a non-None attribute value, or None for unknown operators"""
+    if op in ("eq", "equals", "=="):
+        return lambda v: v == target
+    if op in ("ne", "not_equals", "!="):
+        return lambda v: v != target
+    if op == "in":
+        if isinstance(target, (list, set, tuple)):
+            return lambda v: v in target
+        text = str(target)
+        return lambda v: str(v) in text
+    if op == "not_in":
+        if isinstance(target, (list, set, tuple)):
+            return lambda v: v not in target
+        text = str(target)
+        return lambda v: str(v) not in text
+    if op in ("gt", ">"):
+        return lambda v: v > target
+    if op in ("lt", "<"):
+        return lambda v: v < target
+    if op in ("gte", ">="):
+        return lambda v: v >= target
+    if op in ("lte", "<="):
+        return lambda v: v <= target
+    if op == "contains":
+        needle = str(target).lower()
+        return lambda v: needle in str(v).lower()
+    if op == "not_contains":
+        needle = str(target).lower()
+        return lambda v: needle not in str(v).lower()
+    if op == "starts_with":
+        prefix = str(target).lower()
+        return lambda v: str(v).lower().startswith(prefix)
+    if op == "ends_with":
+        suffix = str(target).lower()
+        return lambda v: str(v).lower().endswith(suffix)
+    if op in ("regex", "matches"):
+        try:
+            pattern = re.compile(str(target), re.IGNORECASE)
+        except re.error as e:
+            logger.warning("Invalid regex in policy condition %r: %s", target, e)
+            return lambda v: False
+        return lambda v: pattern.match(str(v)) is not None
+    if op == "is_empty":
+        return lambda v: not v or (isinstance(v, (list, dict, str)) and len(v) == 0)
+    if op == "is_not_empty":
+        return lambda v: bool(v) and (not isinstance(v, (list, dict, str)) or len(v) > 0)
+    if op == "between":
+        if isinstance(target, (list, tuple)) and len(target) >= 2:
+            low, high = target[0], target[1]
+            return lambda v: low <= v <= high
+        return lambda v: False
+    return None
+
+
+def compile_condition(condition: PolicyCondition) -> Predicate:
+    """Compile a single condition into a predicate closure"""
+    get_value = compile_attribute(condition.attribute)
+    target = condition.value
+    none_result = condition.operator in ["eq", "is"] and target is None
+    test = _compile_operator(condition.operator.lower(), target)
+
+    if test is None:
+        return lambda user, context: none_result if get_value(user, context) is None else False
+
+    def predicate(user: User, context: Dict[str, Any]) -> bool:
+        value = get_value(user, context)
+        if value is None:
+            return none_result
+        try:
+            return bool(test(value))
+        except (TypeError, ValueError):
+            return False
+
+    return predicate
+
+
+def compile_rule(rule: PolicyRule) -> Predicate:
+    """Compile a rule (AND/OR over conditions) into a short-circuiting predicate"""
+    predicates = [compile_condition(c) for c in rule.conditions]
+    if not predicates:
+        return lambda user, context: True
+    if rule.logic.upper() == "AND":
+        return lambda user, context: all(p(user, context) for p in predicates)
+    return lambda user, context: any(p(user, context) for p in predicates)
+
+
+def compile_rules(rules: List[PolicyRule]) -> Predicate:
+    """A policy matches when it has no rules, or any of its rules matches"""
+    predicates = [compile_rule(r) for r in rules]
+    if not predicates:
+        return lambda user, context: True
+    return lambda user, context: any(p(user, context) for p in predicates)
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+_EQ_OPERATORS = ("eq", "equals", "==")
+
+
+def _discriminator(policy: Policy) -> Optional[Tuple[str, Any]]:
+    """
+    An (attribute, value) pair that must be equal for the policy to match:
+    the first hashable `eq` condition of a policy with a single AND rule.
+    Such policies are looked up by value instead of being evaluated one by one.
+    """
+    if len(policy.rules) != 1 or policy.rules[0].logic.upper() != "AND":
+        return None
+    for condition in policy.rules[0].conditions:
+        if condition.operator.lower() in _EQ_OPERATORS and condition.value is not None:
+            try:
+                hash(condition.value)
+            except TypeError:
+                continue
+            return condition.attribute, condition.value
+    return None
+
+
+class CompiledPolicy:
+    """A policy with its targets as sets and its rules compiled to a predicate"""
+
+    __slots__ = ('policy', 'order', 'actions', 'resource_ids', 'user_ids',
+                 'role_ids', 'group_ids', 'targets_everyone', 'discriminator', 'matches')
+
+    def __init__(self, policy: Policy, seq: int):
+        self.policy = policy
+        # Lower priority value wins; load order breaks ties (as a stable sort would)
+        self.order = (policy.priority, seq)
+        self.actions: FrozenSet[str] = frozenset(policy.actions)
+        self.resource_ids: FrozenSet[str] = frozenset(policy.resource_ids)
+        self.user_ids: FrozenSet[str] = frozenset(policy.user_ids)
+        self.role_ids: FrozenSet[str] = frozenset(policy.role_ids)
+        self.group_ids: FrozenSet[str] = frozenset(policy.group_ids)
+        self.targets_everyone = not (self.user_ids or self.role_ids or self.group_ids)
+        self.discriminator = _discriminator(policy)
+        self.matches: Predicate = compile_rules(policy.rules)
+
+    def applies_to(self, user: User, resource_id: Optional[str]) -> bool:
+        if self.resource_ids and resource_id and resource_id not in self.resource_ids:
+            return False
+        if self.targets_everyone or user.id in self.user_ids:
+            return True
+        return (
+            any(r in self.role_ids for r in user.role_ids) or
+            any(g in self.group_ids for g in user.group_ids)
+        )
+
+
+class _Bucket:
+    """Candidate deny policies for one (org, resource type, action)"""
+
+    __slots__ = ('unkeyed', 'keyed')
+
+    def __init__(self, policies: List[CompiledPolicy]):
+        policies = sorted(policies, key=lambda c: c.order)
+        self.unkeyed = [c for c in policies if c.discriminator is None]
+        # attribute -> (getter, value -> policies sorted by order)
+        self.keyed: Dict[str, Tuple[Callable, Dict[Any, List[CompiledPolicy]]]] = {}
+        for c in policies:
+            if c.discriminator is None:
+                continue
+            attribute, value = c.discriminator
+            if attribute not in self.keyed:
+                self.keyed[attribute] = (compile_attribute(attribute), {})
+            self.keyed[attribute][1].setdefault(value, []).append(c)
+
+    def find(self, user: User, resource_id: Optional[str], context: Dict[str, Any]) -> Optional[CompiledPolicy]:
+        best: Optional[CompiledPolicy] = None
+        for getter, by_value in self.keyed.values():
+            try:
+                candidates = by_value.get(getter(user, context), ())
+            except TypeError:  # unhashable attribute value cannot equal a hashable target
+                continue
+            best = self._first_match(candidates, best, user, resource_id, context)
+        return self._first_match(self.unkeyed, best, user, resource_id, context)
+
+    @staticmethod
+    def _first_match(candidates, best, user, resource_id, context):
+        for c in candidates:
+            if best is not None and c.order >= best.order:
+                break
+            if c.applies_to(user, resource_id) and c.matches(user, context):
+                return c
+        return best
+
+
+class PolicyIndex:
+    """Deny policies bucketed by (org, resource type, action), sorted by priority"""
+
+    def __init__(self, policies: Iterable[Policy]):
+        # (org_id, resource_type) -> bucket of policies with no action filter
+        self._any_action: Dict[Tuple[str, Any], _Bucket] = {}
+        # (org_id, resource_type) -> action -> bucket of any-action + action-specific policies
+        self._by_action: Dict[Tuple[str, Any], Dict[str, _Bucket]] = {}
+        self.size = 0
+
+        grouped: Dict[Tuple[str, Any], List[CompiledPolicy]] = {}
+        for seq, policy in enumerate(policies):
+            if not policy.is_active or policy.effect != "deny":
+                continue
+            try:
+                compiled = CompiledPolicy(policy, seq)
+            except Exception as e:
+                logger.warning("Skipping policy %s: failed to compile: %s", policy.id, e)
+                continue
+            grouped.setdefault((policy.org_id, policy.resource_type), []).append(compiled)
+            self.size += 1
+
+        for key, compiled_policies in grouped.items():
+            self._any_action[key] = _Bucket([c for c in compiled_policies if not c.actions])
+            actions = set()
+            for c in compiled_policies:
+                actions.update(c.actions)
+            self._by_action[key] = {
+                action: _Bucket([c for c in compiled_policies if not c.actions or action in c.actions])
+                for action in actions
+            }
+
+    def find_deny(
+        self,
+        user: User,
+        action: str,
+        resource_type: Any,
+        resource_id: Optional[str],
+        context: Dict[str, Any]
+    ) -> Optional[Policy]:
+        """Return the highest-priority deny policy matching the request, if any"""
+        key = (user.org_id, resource_type)
+        by_action = self._by_action.get(key)
+        if by_action is None:
+            return None
+        bucket = by_action.get(action) or self._any_action.get(key)
+        if bucket is None:
+            return None
+        match = bucket.find(user, resource_id, context)
+        return match.policy if match is not None else None
@@ -12,12 +12,16 @@ All security services including:
 
 import os
 import json
+import asyncio
 import hashlib
 import secrets
 import base64
 import hmac
 import time
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any, Tuple
 from urllib.parse import urlencode, quote
@@ -46,13 +50,157 @@ except ImportError:
     print("⚠️ httpx not installed. OAuth will not work.")
 
 try:
-    from ldap3 import Server, Connection, ALL, SUBTREE
+    from ldap3 import Server, Connection, ALL
     LDAP_AVAILABLE = True
 except ImportError:
     LDAP_AVAILABLE = False
     print("⚠️ ldap3 not installed. LDAP authentication will not work.")
 
 
+# ============================================================================
+# PASSWORD HASHING POOL
+# ============================================================================
+
+# PBKDF2 work factor for new hashes; existing hashes with fewer iterations are
+# upgraded on the next successful login (see PasswordService.needs_rehash)
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 100000))
+
+
+class PasswordHashBusyError(Exception):
+    """Raised when too many password hashes are already queued (shed load, e.g. HTTP 429)"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Password hashing is at capacity, retry shortly")
+        self.retry_after = retry_after
+
+
+def _pbkdf2_hex(password: str, salt: str, iterations: int) -> str:
+    """PBKDF2-SHA256 digest (hex)"""
+    return hashlib.pbkdf2_hmac(
+        'sha256',
+        password.encode('utf-8'),
+        salt.encode('utf-8'),
+        iterations
+    ).hex()
+
+
+class PasswordHashPool:
+    """
+    Bounded process pool for PBKDF2.
+
+    A 100k-iteration hash takes ~50-100 ms of pure CPU. Running it inside an
+    async handler blocks the event loop; running it in a thread still holds
+    the GIL for most of that time. Hashes run in a small process pool instead,
+    and once `max_pending` hashes are queued or running, new requests fail
+    fast with PasswordHashBusyError rather than piling up behind a burst.
+    A batch (backup codes, password history) holds a single pending slot and
+    hashes one item after another, so one request cannot fill the queue.
+
+    Configuration (environment variables):
+    - PASSWORD_HASH_WORKERS: worker processes (default min(2, CPU count))
+    - PASSWORD_HASH_MAX_PENDING: hashes queued or running before shedding (default workers * 8)
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max_workers or int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+        self.max_pending = max_pending or int(os.environ.get('PASSWORD_HASH_MAX_PENDING', self.max_workers * 8))
+        self._executor = None
+        self._disabled = False
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self):
+        if self._disabled:
+            return None
+        with self._lock:
+            if self._executor is None:
+                try:
+                    import multiprocessing
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                except (OSError, ValueError, NotImplementedError) as e:
+                    print(f"⚠️ Password hash process pool unavailable, using threads: {e}")
+                    self._disabled = True
+                    return None
+            return self._executor
+
+    async def pbkdf2_hex(self, password: str, salt: str, iterations: int) -> str:
+        self._reserve()
+        try:
+            return await self._run(password, salt, iterations)
+        finally:
+            self._release()
+
+    async def pbkdf2_hex_many(self, items: List[Tuple[str, str, int]], stop_when=None) -> List[str]:
+        """
+        Hash (password, salt, iterations) items sequentially under one pending
+        slot. If stop_when(index, digest) returns True, the remaining items are
+        skipped and only the digests computed so far are returned.
+        """
+        self._reserve()
+        try:
+            digests = []
+            for index, (password, salt, iterations) in enumerate(items):
+                digest = await self._run(password, salt, iterations)
+                digests.append(digest)
+                if stop_when is not None and stop_when(index, digest):
+                    break
+            return digests
+        finally:
+            self._release()
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashBusyError()
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, password: str, salt: str, iterations: int) -> str:
+        # Workers get hashlib.pbkdf2_hmac itself (not a function from this
+        # package) so they never import core.security and its global state
+        args = ('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+        executor = self._get_executor()
+        if executor is None:
+            return (await asyncio.to_thread(hashlib.pbkdf2_hmac, *args)).hex()
+        loop = asyncio.get_running_loop()
+        try:
+            digest = await loop.run_in_executor(executor, hashlib.pbkdf2_hmac, *args)
+        except BrokenProcessPool:
+            # A worker died - replace the pool and retry once
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = self._get_executor()
+            if executor is None:
+                return (await asyncio.to_thread(hashlib.pbkdf2_hmac, *args)).hex()
+            digest = await loop.run_in_executor(executor, hashlib.pbkdf2_hmac, *args)
+        return digest.hex()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+_password_hash_pool: Optional[PasswordHashPool] = None
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    """Get the worker-wide password hashing pool"""
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        _password_hash_pool = PasswordHashPool()
+    return _password_hash_pool
+
+
 class PasswordService:
     """Password hashing, validation, and management"""
     
@@ -63,39 +211,66 @@ class PasswordService:
         'password1', 'password!', 'p@ssword', 'p@ssw0rd', 'Password1', 'Password1!'
     }
     
+    @staticmethod
+    def _parse_hash(password_hash: str) -> Tuple[str, int, str]:
+        parts = password_hash.split('$')
+        if len(parts) == 2:
+            # Old format without iterations
+            salt, hash_hex = parts
+            return salt, 100000, hash_hex
+        salt, iterations, hash_hex = parts
+        return salt, int(iterations), hash_hex
+    
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using PBKDF2-SHA256 with random salt"""
         salt = secrets.token_hex(32)
-        iterations = 100000
-        hash_bytes = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            iterations
-        )
-        return f"{salt}${iterations}${hash_bytes.hex()}"
+        iterations = PASSWORD_HASH_ITERATIONS
+        return f"{salt}${iterations}${_pbkdf2_hex(password, salt, iterations)}"
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
         """Verify a password against its hash"""
+        try:
+            salt, iterations, hash_hex = PasswordService._parse_hash(password_hash)
+            return hmac.compare_digest(_pbkdf2_hex(password, salt, iterations), hash_hex)
+        except Exception:
+            return False
+    
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """hash_password in the password hashing pool (raises PasswordHashBusyError when saturated)"""
+        salt = secrets.token_hex(32)
+        iterations = PASSWORD_HASH_ITERATIONS
+        digest = await get_password_hash_pool().pbkdf2_hex(password, salt, iterations)
+        return f"{salt}${iterations}${digest}"
+    
+    @staticmethod
+    async def hash_passwords_async(passwords: List[str]) -> List[str]:
+        """hash_password for several passwords as one hashing pool job (e.g. backup codes)"""
+        iterations = PASSWORD_HASH_ITERATIONS
+        salts = [secrets.token_hex(32) for _ in passwords]
+        digests = await get_password_hash_pool().pbkdf2_hex_many(
+            [(password, salt, iterations) for password, salt in zip(passwords, salts)]
+        )
+        return [f"{salt}${iterations}${digest}" for salt, digest in zip(salts, digests)]
+    
+    @staticmethod
+    async def verify_password_async(password: str, password_hash: str) -> bool:
+        """verify_password in the password hashing pool (raises PasswordHashBusyError when saturated)"""
+        try:
+            salt, iterations, hash_hex = PasswordService._parse_hash(password_hash)
+        except Exception:
+            return False
+        digest = await get_password_hash_pool().pbkdf2_hex(password, salt, iterations)
+        return hmac.compare_digest(digest, hash_hex)
+    
+    @staticmethod
+    def needs_rehash(password_hash: str) -> bool:
+        """True when a hash uses the old format or fewer iterations than currently configured"""
         try:
             parts = password_hash.split('$')
-            if len(parts) == 2:
-                # Old format without iterations
-                salt, hash_hex = parts
-                iterations = 100000
-            else:
-                salt, iterations, hash_hex = parts
-                iterations = int(iterations)
-            
-            hash_bytes = hashlib.pbkdf2_hmac(
-                'sha256',
-                password.encode('utf-8'),
-                salt.encode('utf-8'),
-                iterations
-            )
-            return hmac.compare_digest(hash_bytes.hex(), hash_hex)
+            return len(parts) == 2 or int(parts[1]) < PASSWORD_HASH_ITERATIONS
         except Exception:
             return False
     
@@ -141,6 +316,29 @@ class PasswordService:
                 return True
         return False
     
+    @staticmethod
+    async def is_password_in_history_async(password: str, user) -> bool:
+        """is_password_in_history as one hashing pool job, stopping at the first match"""
+        if not hasattr(user, 'password_history') or not user.password_history:
+            return False
+        
+        items, expected = [], []
+        for old_hash in user.password_history:
+            try:
+                salt, iterations, hash_hex = PasswordService._parse_hash(old_hash)
+            except Exception:
+                continue
+            items.append((password, salt, iterations))
+            expected.append(hash_hex)
+        if not items:
+            return False
+        
+        def matches(index: int, digest: str) -> bool:
+            return hmac.compare_digest(digest, expected[index])
+        
+        digests = await get_password_hash_pool().pbkdf2_hex_many(items, stop_when=matches)
+        return any(matches(i, digest) for i, digest in enumerate(digests))
+    
     @staticmethod
     def generate_temp_password(length: int = 16) -> str:
         """Generate a secure temporary password"""
@@ -276,6 +474,36 @@ class MFAService:
                 return True
         return False
     
+    @staticmethod
+    async def verify_backup_code_async(code: str, user) -> bool:
+        """verify_backup_code as one hashing pool job (raises PasswordHashBusyError when saturated)"""
+        code_upper = code.upper().replace('-', '').replace(' ', '')
+        
+        hashed_codes, items, expected = [], [], []
+        for hashed_code in user.mfa.backup_codes:
+            try:
+                salt, iterations, hash_hex = PasswordService._parse_hash(hashed_code)
+            except Exception:
+                continue
+            hashed_codes.append(hashed_code)
+            items.append((code_upper, salt, iterations))
+            expected.append(hash_hex)
+        if not items:
+            return False
+        
+        def matches(index: int, digest: str) -> bool:
+            return hmac.compare_digest(digest, expected[index])
+        
+        digests = await get_password_hash_pool().pbkdf2_hex_many(items, stop_when=matches)
+        for index, digest in enumerate(digests):
+            if matches(index, digest):
+                # Remove used code, unless a concurrent login consumed it meanwhile
+                if hashed_codes[index] not in user.mfa.backup_codes:
+                    return False
+                user.mfa.backup_codes.remove(hashed_codes[index])
+                return True
+        return False
+    
     @staticmethod
     def generate_email_code() -> str:
         """Generate a 6-digit email verification code"""
@@ -288,19 +516,35 @@ class MFAService:
     
     @staticmethod
     def verify_code(user, code: str) -> bool:
-        """Verify any MFA code (TOTP, backup, email, SMS)"""
+        """Verify any MFA code (TOTP, email, SMS, backup)"""
         code_clean = code.strip().replace('-', '').replace(' ', '')
+        if MFAService._verify_one_time_code(user, code_clean):
+            return True
         
+        # Backup codes last: each one costs a password hash
+        if user.mfa.backup_codes:
+            return MFAService.verify_backup_code(code_clean, user)
+        return False
+    
+    @staticmethod
+    async def verify_code_async(user, code: str) -> bool:
+        """verify_code with the backup codes hashed in the hashing pool (raises PasswordHashBusyError when saturated)"""
+        code_clean = code.strip().replace('-', '').replace(' ', '')
+        if MFAService._verify_one_time_code(user, code_clean):
+            return True
+        
+        if user.mfa.backup_codes:
+            return await MFAService.verify_backup_code_async(code_clean, user)
+        return False
+    
+    @staticmethod
+    def _verify_one_time_code(user, code_clean: str) -> bool:
+        """The cheap checks: TOTP, then email and SMS codes"""
         # Try TOTP first
         if user.mfa.totp_secret and user.mfa.totp_verified:
             if MFAService.verify_totp(user.mfa.totp_secret, code_clean):
                 return True
         
-        # Try backup code
-        if user.mfa.backup_codes:
-            if MFAService.verify_backup_code(code_clean, user):
-                return True
-        
         # Try email code
         if user.mfa.email_code:
             if user.mfa.email_code == code_clean:
@@ -596,7 +840,7 @@ class EmailService:
             # Fallback to SMTP when configured
             if smtp_host and smtp_user and smtp_pass:
                 try:
-                    import aiosmtplib
+                    import aiosmtplib  # noqa: F401 - required by the SMTP pool
                     from email.mime.text import MIMEText
                     from email.mime.multipart import MIMEMultipart
                     from email.mime.base import MIMEBase
@@ -637,19 +881,21 @@ class EmailService:
                     elif smtp_port == 465:
                         ports_to_try.append(587)
                     
+                    # Logged-in connections are pooled and reused across emails
+                    from core.process.services.smtp_pool import get_smtp_pool
+                    smtp_pool = get_smtp_pool()
                     for port in ports_to_try:
                         try:
-                            print(f"📧 [SMTP] Trying {smtp_host}:{port}...")
-                            if port == 465:
-                                smtp = aiosmtplib.SMTP(hostname=smtp_host, port=port, use_tls=True, timeout=15)
-                            else:
-                                smtp = aiosmtplib.SMTP(hostname=smtp_host, port=port, timeout=15)
-                            await smtp.connect()
-                            print(f"📧 [SMTP] Connected on port {port}, logging in...")
-                            await smtp.login(smtp_user, smtp_pass)
-                            print(f"📧 [SMTP] Logged in, sending...")
-                            await smtp.send_message(msg)
-                            await smtp.quit()
+                            print(f"📧 [SMTP] Sending via {smtp_host}:{port}...")
+                            await smtp_pool.send_message(
+                                msg,
+                                hostname=smtp_host,
+                                port=port,
+                                use_tls=(port == 465),
+                                username=smtp_user,
+                                password=smtp_pass,
+                                timeout=15,
+                            )
                             print(f"✅ Email sent to {to_email} via SMTP ({smtp_host}:{port})")
                             return True
                         except Exception as port_err:
@@ -935,170 +1181,40 @@ class LDAPService:
     
     @staticmethod
     async def authenticate_user(config, username: str, password: str) -> Optional[Dict[str, Any]]:
-        """Authenticate user against LDAP"""
+        """Authenticate user against LDAP (pooled service-account connection, rebind as the user)"""
         if not LDAP_AVAILABLE:
             return None
         
-        try:
-            server = Server(config.server_url, get_info=ALL)
-            
-            # First bind with service account to find user
-            conn = Connection(server, user=config.bind_dn, password=config.bind_password, auto_bind=True)
-            
-            if config.use_tls and not config.use_ssl:
-                conn.start_tls()
-            
+        from .ldap_directory import get_ldap_pool, find_user_entry, map_attributes
+        
+        def authenticate() -> Optional[Dict[str, Any]]:
+            pool = get_ldap_pool(config)
             # Search for user
-            search_base = config.user_search_base or config.base_dn
-            search_filter = config.user_search_filter.replace('{username}', username)
-            
-            conn.search(
-                search_base,
-                search_filter,
-                search_scope=SUBTREE,
-                attributes=list(config.attribute_mapping.values())
-            )
-            
-            if not conn.entries:
-                conn.unbind()
+            found = pool.run(lambda conn: find_user_entry(conn, config, username))
+            if not found:
                 return None
-            
-            user_entry = conn.entries[0]
-            user_dn = user_entry.entry_dn
-            
-            conn.unbind()
+            user_dn, attributes = found
             
             # Authenticate with user's credentials
-            user_conn = Connection(server, user=user_dn, password=password)
-            if not user_conn.bind():
+            if not pool.verify_credentials(user_dn, password):
                 return None
             
-            user_conn.unbind()
-            
-            # Map attributes
-            user_info = {"dn": user_dn}
-            for our_field, ldap_attr in config.attribute_mapping.items():
-                if hasattr(user_entry, ldap_attr):
-                    value = getattr(user_entry, ldap_attr)
-                    if value:
-                        user_info[our_field] = str(value.value) if hasattr(value, 'value') else str(value)
-            
-            return user_info
-            
+            return map_attributes(config, user_dn, attributes)
+        
+        try:
+            return await asyncio.to_thread(authenticate)
         except Exception as e:
             print(f"LDAP auth error: {e}")
             return None
     
     @staticmethod
     async def sync_users(config, security_state) -> Dict[str, Any]:
-        """Sync users from LDAP"""
+        """Full sync of users from LDAP (incremental syncs run in the background, see ldap_directory)"""
         if not LDAP_AVAILABLE:
             return {"success": False, "error": "ldap3 not installed"}
         
-        result = {"synced": 0, "created": 0, "updated": 0, "errors": []}
-        
-        try:
-            server = Server(config.server_url, get_info=ALL)
-            conn = Connection(server, user=config.bind_dn, password=config.bind_password, auto_bind=True)
-            
-            if config.use_tls and not config.use_ssl:
-                conn.start_tls()
-            
-            # Search all users
-            search_base = config.user_search_base or config.base_dn
-            search_filter = f"(objectClass={config.user_object_class})"
-            
-            conn.search(
-                search_base,
-                search_filter,
-                search_scope=SUBTREE,
-                attributes=list(config.attribute_mapping.values()) + ['memberOf']
-            )
-            
-            from .models import User, UserProfile, UserStatus, AuthProvider
-            
-            for entry in conn.entries:
-                try:
-                    # Map attributes
-                    user_data = {"dn": entry.entry_dn}
-                    for our_field, ldap_attr in config.attribute_mapping.items():
-                        if hasattr(entry, ldap_attr):
-                            value = getattr(entry, ldap_attr)
-                            if value:
-                                user_data[our_field] = str(value.value) if hasattr(value, 'value') else str(value)
-                    
-                    if 'email' not in user_data:
-                        continue
-                    
-                    # Find or create user
-                    existing_user = security_state.get_user_by_email(user_data['email'], config.org_id)
-                    
-                    # Determine roles from group membership
-                    role_ids = [config.default_role_id]
-                    if hasattr(entry, 'memberOf') and config.group_role_mapping:
-                        for group_dn in entry.memberOf:
-                            group_str = str(group_dn.value) if hasattr(group_dn, 'value') else str(group_dn)
-                            if group_str in config.group_role_mapping:
-                                role_id = config.group_role_mapping[group_str]
-                                if role_id not in role_ids:
-                                    role_ids.append(role_id)
-                    
-                    if existing_user:
-                        if config.sync_update_existing:
-                            # Update existing user
-                            if user_data.get('first_name'):
-                                existing_user.profile.first_name = user_data['first_name']
-                            if user_data.get('last_name'):
-                                existing_user.profile.last_name = user_data['last_name']
-                            if user_data.get('phone'):
-                                existing_user.profile.phone = user_data['phone']
-                            if user_data.get('job_title'):
-                                existing_user.profile.job_title = user_data['job_title']
-                            existing_user.role_ids = role_ids
-                            existing_user.external_id = entry.entry_dn
-                            result['updated'] += 1
-                    else:
-                        # Create new user
-                        new_user = User(
-                            org_id=config.org_id,
-                            email=user_data['email'].lower(),
-                            auth_provider=AuthProvider.LDAP,
-                            external_id=entry.entry_dn,
-                            profile=UserProfile(
-                                first_name=user_data.get('first_name', ''),
-                                last_name=user_data.get('last_name', ''),
-                                phone=user_data.get('phone'),
-                                job_title=user_data.get('job_title')
-                            ),
-                            role_ids=role_ids,
-                            status=UserStatus.ACTIVE,
-                            email_verified=True
-                        )
-                        security_state.users[new_user.id] = new_user
-                        result['created'] += 1
-                    
-                    result['synced'] += 1
-                    
-                except Exception as e:
-                    result['errors'].append(f"Error syncing {entry.entry_dn}: {str(e)}")
-            
-            conn.unbind()
-            
-            # Update sync status
-            config.last_sync = datetime.utcnow().isoformat()
-            config.last_sync_status = "success"
-            config.last_sync_users_synced = result['synced']
-            
-            security_state.save_to_disk()
-            
-            result['success'] = True
-            return result
-            
-        except Exception as e:
-            config.last_sync = datetime.utcnow().isoformat()
-            config.last_sync_status = "error"
-            config.last_error = str(e)
-            return {"success": False, "error": str(e)}
+        from .ldap_directory import sync_directory
+        return await sync_directory(config, security_state, True)
 
 
 class OAuthService:
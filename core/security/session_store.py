@@ -0,0 +1,225 @@
+"""
+AgentForge Session Store - DB-backed sessions with a per-worker cache
+=====================================================================
+Sessions are persisted in the user_sessions table so they survive restarts
+and are shared by every worker. Each worker keeps the sessions it has seen in
+SecurityState.sessions, which acts as a TTL cache in front of the table:
+- A cached session is trusted for SESSION_CACHE_TTL_SECONDS before it is
+  re-read from the database
+- Revocations (logout, admin revoke, password change) are written to the
+  table with a revoked_at timestamp. Every SESSION_REVOCATION_POLL_SECONDS
+  each worker fetches the sessions revoked since its last stamp, so a logout
+  on one worker is honoured by all of them without a per-request DB read
+- last_activity is written back at most once per SESSION_ACTIVITY_WRITE_SECONDS
+- A session expired without a database row (e.g. a token issued before
+  sessions were persisted) is recorded as a revoked row, or, if that insert
+  fails, kept as a tombstone until its access token has expired, so it cannot
+  be rehydrated as active from the token
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from .models import Session
+
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get('SESSION_CACHE_TTL_SECONDS', 300))
+SESSION_REVOCATION_POLL_SECONDS = float(os.environ.get('SESSION_REVOCATION_POLL_SECONDS', 5))
+SESSION_ACTIVITY_WRITE_SECONDS = float(os.environ.get('SESSION_ACTIVITY_WRITE_SECONDS', 60))
+
+# Re-read revocations this far behind the newest stamp seen, to tolerate
+# clock skew between workers writing revoked_at
+_REVOCATION_OVERLAP = timedelta(seconds=30)
+
+
+class SessionStore:
+    """Session persistence and validation for SecurityState"""
+
+    def __init__(self, sessions: Dict[str, Session], on_cached: Optional[Callable[[str], None]] = None):
+        # Shared with SecurityState.sessions - the in-memory tier
+        self.sessions = sessions
+        # Called with the session id whenever a session is cached or revoked (expiry scheduling)
+        self._on_cached = on_cached or (lambda session_id: None)
+        self._validated_at: Dict[str, float] = {}
+        self._activity_written_at: Dict[str, float] = {}
+        # session_id -> (monotonic time the tombstone can go, revoked session)
+        self._tombstones: Dict[str, Tuple[float, Session]] = {}
+        self._revocation_stamp = datetime.utcnow()
+        self._next_revocation_poll = 0.0
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return the session (active or not), or None if it is unknown"""
+        if not session_id:
+            return None
+        self.sync_revocations()
+
+        now = time.monotonic()
+        tombstone = self._tombstones.get(session_id)
+        if tombstone is not None:
+            if now < tombstone[0]:
+                return tombstone[1]
+            del self._tombstones[session_id]
+        session = self.sessions.get(session_id)
+        if session is not None and now - self._validated_at.get(session_id, 0) < SESSION_CACHE_TTL_SECONDS:
+            return session
+
+        # Cache miss or stale entry - read through to the database
+        self._validated_at[session_id] = now
+        try:
+            from database.services import SessionService
+            db_session = SessionService.get_session(session_id)
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to load session from database: {e}")
+            return session
+
+        if db_session is None:
+            return session
+        if session is not None:
+            # Keep this worker's fresher activity timestamp
+            db_session.last_activity = max(session.last_activity or "", db_session.last_activity or "")
+            db_session.is_active = db_session.is_active and session.is_active
+        self.sessions[session_id] = db_session
+        self._on_cached(session_id)
+        return db_session
+
+    def sync_revocations(self, force: bool = False) -> None:
+        """Apply sessions revoked by any worker since the last poll"""
+        now = time.monotonic()
+        if not force and now < self._next_revocation_poll:
+            return
+        self._next_revocation_poll = now + SESSION_REVOCATION_POLL_SECONDS
+        try:
+            from database.services import SessionService
+            revoked = SessionService.get_revoked_since(self._revocation_stamp - _REVOCATION_OVERLAP)
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to poll session revocations: {e}")
+            return
+
+        for session_id, revoked_at in revoked:
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.is_active = False
+            if revoked_at and revoked_at > self._revocation_stamp:
+                self._revocation_stamp = revoked_at
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def create(self, session: Session) -> Session:
+        """Register a new session in memory and persist it"""
+        self.sessions[session.id] = session
+        self._validated_at[session.id] = time.monotonic()
+        self._activity_written_at[session.id] = time.monotonic()
+        try:
+            from database.services import SessionService
+            SessionService.create_session(session)
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to persist session: {e}")
+        self._on_cached(session.id)
+        return session
+
+    def record_activity(self, session: Session) -> None:
+        """Update last_activity; written to the database at most once per interval"""
+        session.last_activity = datetime.utcnow().isoformat()
+        now = time.monotonic()
+        if now - self._activity_written_at.get(session.id, 0) < SESSION_ACTIVITY_WRITE_SECONDS:
+            return
+        self._activity_written_at[session.id] = now
+        try:
+            from database.services import SessionService
+            # Activity only: never writes revoked, which another worker may have just set
+            SessionService.touch_session(session.id, session.last_activity)
+        except Exception:
+            # Not persisted (e.g. created before sessions were stored) - activity is advisory
+            pass
+
+    def revoke(self, session_id: str) -> None:
+        """Revoke one session on every worker"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.is_active = False
+            self._on_cached(session_id)
+        try:
+            from database.services import SessionService
+            SessionService.deactivate_session(session_id)
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to revoke session in database: {e}")
+
+    def revoke_user(self, user_id: str) -> None:
+        """Revoke all sessions of a user on every worker"""
+        for session in list(self.sessions.values()):
+            if session.user_id == user_id:
+                session.is_active = False
+                self._on_cached(session.id)
+        try:
+            from database.services import SessionService
+            SessionService.deactivate_user_sessions(user_id)
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to revoke user sessions in database: {e}")
+
+    def forget(self, session_id: str) -> None:
+        """Drop a session from this worker's cache (it stays in the database)"""
+        self.sessions.pop(session_id, None)
+        self._validated_at.pop(session_id, None)
+        self._activity_written_at.pop(session_id, None)
+
+    def expire(self, session_id: str) -> bool:
+        """
+        Revoke an expired or revoked session and drop it from this worker's cache.
+        If the revocation cannot be written it stays cached (inactive), so the
+        session cannot be rehydrated as active from its token.
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            return True
+        session.is_active = False
+        return self._finish_expire(session, self._write_expiry(session))
+
+    async def expire_async(self, session_id: str) -> bool:
+        """expire() for the event loop: only the database writes run in a thread"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            return True
+        session.is_active = False
+        return self._finish_expire(session, await asyncio.to_thread(self._write_expiry, session))
+
+    @staticmethod
+    def _write_expiry(session: Session) -> Optional[bool]:
+        """
+        Revoke the session's row, inserting a revoked row if it has none.
+        Returns True when written, False when no row could be recorded, and
+        None when the database is unavailable.
+        """
+        from database.services import SessionService
+        try:
+            if SessionService.deactivate_session(session.id):
+                return True
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to expire session in database: {e}")
+            return None
+        try:
+            SessionService.create_session(session)
+            SessionService.deactivate_session(session.id)
+            return True
+        except Exception as e:
+            print(f"⚠️  [SESSIONS] Failed to record revoked session, keeping a tombstone: {e}")
+            return False
+
+    def _finish_expire(self, session: Session, written: Optional[bool]) -> bool:
+        if written is None:
+            return False
+        if not written:
+            from .services import TokenService
+            now = time.monotonic()
+            for session_id in [k for k, (until, _) in self._tombstones.items() if until <= now]:
+                del self._tombstones[session_id]
+            self._tombstones[session.id] = (now + TokenService.ACCESS_TOKEN_EXPIRE_HOURS * 3600, session)
+        self.forget(session.id)
+        return True
@@ -8,8 +8,11 @@ Main security state container with:
 - Helper methods
 """
 
+import json
+import os
+import time
 import traceback
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable, Set, Tuple
 from datetime import datetime
 
 from .models import (
@@ -24,6 +27,233 @@ from .models import (
     DEFAULT_ROLES
 )
 from .engine import PolicyEngine
+from .session_store import SessionStore
+from .audit_writer import AuditLogWriter
+from .ldap_directory import LDAPSyncScheduler
+from .expiry_sweeper import ExpirySweeper
+
+
+# How long a DB lookup that found no user is remembered (seconds)
+USER_LOOKUP_NEGATIVE_TTL = float(os.environ.get('SECURITY_USER_NEGATIVE_TTL', 30))
+
+# Recent audit logs kept in memory; queries are served from the audit table
+AUDIT_MEMORY_LIMIT = int(os.environ.get('SECURITY_AUDIT_MEMORY_LIMIT', 1000))
+
+
+def _fingerprint(obj: Any) -> int:
+    """Hash of a model's JSON form, used to detect modified entities"""
+    try:
+        return hash(obj.model_dump_json())
+    except Exception:
+        return hash(repr(obj))
+
+
+class PersistenceTracker:
+    """
+    Fingerprints of entities as last written to (or read from) the database.
+
+    save_to_disk() upserts only entities whose fingerprint changed, so one
+    edit costs one write instead of one per entity in the tenant. Comparing
+    fingerprints (rather than flagging assignments) also catches the in-place
+    edits most call sites make (user.status = ..., role.permissions.append(...)).
+    """
+
+    def __init__(self):
+        self._saved: Dict[str, Dict[str, int]] = {}
+
+    def changed(self, kind: str, items: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """(key, entity) pairs that are new or modified since last saved"""
+        saved = self._saved.setdefault(kind, {})
+        for key in [k for k in saved if k not in items]:
+            del saved[key]
+        return [(key, obj) for key, obj in list(items.items()) if saved.get(key) != _fingerprint(obj)]
+
+    def mark_saved(self, kind: str, key: str, obj: Any) -> None:
+        self._saved.setdefault(kind, {})[key] = _fingerprint(obj)
+
+    def blob_changed(self, kind: str, value: Any) -> bool:
+        """Whether a whole serialized collection differs from what was last saved"""
+        return self._saved.setdefault('_blobs', {}).get(kind) != hash(json.dumps(value, sort_keys=True, default=str))
+
+    def mark_blob_saved(self, kind: str, value: Any) -> None:
+        self._saved.setdefault('_blobs', {})[kind] = hash(json.dumps(value, sort_keys=True, default=str))
+
+
+def _serialize_collection(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize a collection stored as a single JSON system setting"""
+    serialized = {}
+    for k, v in data.items():
+        if hasattr(v, 'dict'):
+            serialized[k] = v.dict()
+        elif hasattr(v, '__dict__'):
+            serialized[k] = v.__dict__
+        else:
+            serialized[k] = v
+    return serialized
+
+
+class VersionedMap(dict):
+    """
+    dict whose `version` increases on every assignment or removal.
+
+    Used for collections that feed derived caches (e.g. the PolicyEngine role
+    closure). Call touch() after mutating a stored object in place.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def touch(self) -> None:
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, key, *default):
+        self.version += 1
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+class IndexedUserMap(dict):
+    """
+    users dict (user_id -> User) with case-insensitive email/username indices.
+
+    Every assignment/removal re-indexes the user, so callers keep using the
+    plain dict API (security_state.users[user.id] = user, del ..., pop ...).
+    Index hits are re-checked against the user's current values, so a user
+    mutated in place without being re-assigned is never returned for a stale
+    key. Also holds the negative cache for DB lookups that found nothing;
+    adding a user with a matching email/username clears the entry.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._by_email: Dict[str, Set[str]] = {}
+        self._by_username: Dict[str, Set[str]] = {}
+        self._indexed_keys: Dict[str, Tuple[str, str]] = {}
+        self._misses: Dict[Tuple[str, str], Dict[Optional[str], float]] = {}
+        self.update(*args, **kwargs)
+
+    @staticmethod
+    def _norm(value) -> str:
+        return str(value or "").strip().lower()
+
+    def _index(self, user_id: str, user: User) -> None:
+        self._unindex(user_id)
+        email = self._norm(getattr(user, "email", None))
+        username = self._norm(getattr(user, "username", None))
+        if email:
+            self._by_email.setdefault(email, set()).add(user_id)
+            self._misses.pop(("email", email), None)
+        if username:
+            self._by_username.setdefault(username, set()).add(user_id)
+            self._misses.pop(("username", username), None)
+        self._indexed_keys[user_id] = (email, username)
+
+    def _unindex(self, user_id: str) -> None:
+        email, username = self._indexed_keys.pop(user_id, ("", ""))
+        for index, key in ((self._by_email, email), (self._by_username, username)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del index[key]
+
+    # --- dict API ---
+
+    def __setitem__(self, user_id, user):
+        super().__setitem__(user_id, user)
+        self._index(user_id, user)
+
+    def __delitem__(self, user_id):
+        super().__delitem__(user_id)
+        self._unindex(user_id)
+
+    def pop(self, user_id, *default):
+        self._unindex(user_id)
+        return super().pop(user_id, *default)
+
+    def popitem(self):
+        user_id, user = super().popitem()
+        self._unindex(user_id)
+        return user_id, user
+
+    def clear(self):
+        super().clear()
+        self._by_email.clear()
+        self._by_username.clear()
+        self._indexed_keys.clear()
+        self._misses.clear()
+
+    def update(self, *args, **kwargs):
+        for user_id, user in dict(*args, **kwargs).items():
+            self[user_id] = user
+
+    def setdefault(self, user_id, user=None):
+        if user_id not in self:
+            self[user_id] = user
+        return self[user_id]
+
+    # --- lookups ---
+
+    def find_by_email(self, email: str, org_id: Optional[str] = None) -> List[User]:
+        key = self._norm(email)
+        return self._find(self._by_email.get(key, ()), "email", key, org_id)
+
+    def find_by_username(self, username: str, org_id: Optional[str] = None) -> List[User]:
+        key = self._norm(username)
+        return self._find(self._by_username.get(key, ()), "username", key, org_id)
+
+    def _find(self, ids: Iterable[str], field: str, key: str, org_id: Optional[str]) -> List[User]:
+        matches = []
+        for user_id in list(ids):
+            user = self.get(user_id)
+            if user is None or self._norm(getattr(user, field, None)) != key:
+                continue
+            if org_id is None or user.org_id == org_id:
+                matches.append(user)
+        return matches
+
+    # --- negative cache ---
+
+    def is_known_miss(self, field: str, value: str, org_id: Optional[str]) -> bool:
+        expires = self._misses.get((field, self._norm(value)), {}).get(org_id)
+        return expires is not None and expires > time.monotonic()
+
+    def remember_miss(self, field: str, value: str, org_id: Optional[str]) -> None:
+        if USER_LOOKUP_NEGATIVE_TTL <= 0:
+            return
+        now = time.monotonic()
+        if len(self._misses) > 10000:
+            # Drop expired entries so unknown-email probes cannot grow this forever
+            self._misses = {
+                k: orgs for k, orgs in self._misses.items()
+                if any(exp > now for exp in orgs.values())
+            }
+        self._misses.setdefault((field, self._norm(value)), {})[org_id] = now + USER_LOOKUP_NEGATIVE_TTL
 
 
 class SecurityState:
@@ -38,19 +268,23 @@ class SecurityState:
         self.organizations: Dict[str, Organization] = {}
         
         # Users & Groups
-        self.users: Dict[str, User] = {}
+        self.users: Dict[str, User] = IndexedUserMap()
         self.departments: Dict[str, Department] = {}
-        self.groups: Dict[str, UserGroup] = {}
+        self.groups: Dict[str, UserGroup] = VersionedMap()
         
         # Sessions & Invitations
         self.sessions: Dict[str, Session] = {}
+        self.session_store = SessionStore(
+            self.sessions, on_cached=lambda session_id: self.expiry_sweeper.track("session", session_id)
+        )
+        self.expiry_sweeper = ExpirySweeper(self)
         self.invitations: Dict[str, Invitation] = {}
         
         # RBAC
-        self.roles: Dict[str, Role] = {}
+        self.roles: Dict[str, Role] = VersionedMap()
         
         # ABAC
-        self.policies: Dict[str, Policy] = {}
+        self.policies: Dict[str, Policy] = VersionedMap()
         
         # Resource Permissions
         self.tool_permissions: Dict[str, ToolPermission] = {}
@@ -60,12 +294,24 @@ class SecurityState:
         # External Auth
         self.ldap_configs: Dict[str, LDAPConfig] = {}
         self.oauth_configs: Dict[str, OAuthConfig] = {}
+        self.ldap_sync = LDAPSyncScheduler(self)
         
         # Settings
         self.settings: Dict[str, SecuritySettings] = {}
         
         # Audit
         self.audit_logs: List[AuditLog] = []
+        self.audit_writer = AuditLogWriter()
+        
+        # What was last persisted, so saves write only modified entities
+        self._persisted = PersistenceTracker()
+        
+        # org id/slug -> UUID used by DB user lookups
+        self._org_uuid_cache: Dict[str, Any] = {}
+        
+        # Reverse group membership (user_id -> group_ids), rebuilt when groups change
+        self._user_groups: Dict[str, List[str]] = {}
+        self._user_groups_version: Optional[int] = None
         
         # Policy Engine
         self.policy_engine: PolicyEngine = PolicyEngine(self)
@@ -136,37 +382,42 @@ class SecurityState:
         Save security state to database (primary) and disk (backup).
         Database is now the primary storage, disk is backup only.
         """
-        # Save to database first (primary storage)
+        # Save to database first (primary storage). Only entities that changed
+        # since they were last saved or loaded are written.
         try:
             # Save organizations
             from database.services import OrganizationService
-            for org in self.organizations.values():
+            for key, org in self._persisted.changed('organizations', self.organizations):
                 try:
                     OrganizationService.save_organization(org)
+                    self._persisted.mark_saved('organizations', key, org)
                 except Exception as e:
                     print(f"⚠️ Error saving organization {org.id} to database: {e}")
             
             # Save users
             from database.services import UserService
-            for user in self.users.values():
+            for key, user in self._persisted.changed('users', self.users):
                 try:
                     UserService.save_user(user)
+                    self._persisted.mark_saved('users', key, user)
                 except Exception as e:
                     print(f"⚠️ Error saving user {user.id} to database: {e}")
             
             # Save roles
             from database.services import RoleService
-            for role in self.roles.values():
+            for key, role in self._persisted.changed('roles', self.roles):
                 try:
                     RoleService.save_role(role)
+                    self._persisted.mark_saved('roles', key, role)
                 except Exception as e:
                     print(f"⚠️ Error saving role {role.id} to database: {e}")
             
             # Save invitations
             from database.services import InvitationService
-            for invitation in self.invitations.values():
+            for key, invitation in self._persisted.changed('invitations', self.invitations):
                 try:
                     InvitationService.save_invitation(invitation)
+                    self._persisted.mark_saved('invitations', key, invitation)
                 except Exception as e:
                     print(f"⚠️ Error saving invitation {invitation.id} to database: {e}")
             
@@ -183,17 +434,19 @@ class SecurityState:
             
             # Save user groups
             from database.services import UserGroupService
-            for group in self.groups.values():
+            for key, group in self._persisted.changed('groups', self.groups):
                 try:
                     UserGroupService.save_group(group)
+                    self._persisted.mark_saved('groups', key, group)
                 except Exception as e:
                     print(f"⚠️ Error saving group {group.id} to database: {e}")
             
             # Save security settings
             from database.services import SecuritySettingsService
-            for org_id, settings in self.settings.items():
+            for org_id, settings in self._persisted.changed('settings', self.settings):
                 try:
                     SecuritySettingsService.save_settings(settings)
+                    self._persisted.mark_saved('settings', org_id, settings)
                 except Exception as e:
                     print(f"⚠️ Error saving security settings for {org_id} to database: {e}")
             
@@ -204,7 +457,7 @@ class SecurityState:
             traceback.print_exc()
         
         # Save remaining collections that don't have dedicated DB services yet
-        # Using SystemSettingsService as a key-value store
+        # Using SystemSettingsService as a key-value store (rewritten only when changed)
         try:
             from database.services import SystemSettingsService
             remaining = {
@@ -217,33 +470,32 @@ class SecurityState:
             }
             for key, data in remaining.items():
                 try:
-                    serialized = {}
-                    for k, v in data.items():
-                        if hasattr(v, 'dict'):
-                            serialized[k] = v.dict()
-                        elif hasattr(v, '__dict__'):
-                            serialized[k] = v.__dict__
-                        else:
-                            serialized[k] = v
+                    serialized = _serialize_collection(data)
+                    if not self._persisted.blob_changed(key, serialized):
+                        continue
                     SystemSettingsService.set_system_setting(
                         key, serialized, value_type='json', category='security'
                     )
+                    self._persisted.mark_blob_saved(key, serialized)
                 except Exception as e:
                     print(f"⚠️ Error saving {key} to database: {e}")
             
-            # Save audit logs (keep last 10k)
+            # Save audit logs (keep last 10k) if new entries arrived
             try:
                 logs = self.audit_logs[-10000:]
-                serialized_logs = []
-                for log in logs:
-                    if hasattr(log, 'dict'):
-                        serialized_logs.append(log.dict())
-                    else:
-                        serialized_logs.append(str(log))
-                SystemSettingsService.set_system_setting(
-                    "security_audit_logs_backup", serialized_logs,
-                    value_type='json', category='security'
-                )
+                marker = [len(logs), logs[-1].id if logs else None]
+                if self._persisted.blob_changed("security_audit_logs_backup", marker):
+                    serialized_logs = []
+                    for log in logs:
+                        if hasattr(log, 'dict'):
+                            serialized_logs.append(log.dict())
+                        else:
+                            serialized_logs.append(str(log))
+                    SystemSettingsService.set_system_setting(
+                        "security_audit_logs_backup", serialized_logs,
+                        value_type='json', category='security'
+                    )
+                    self._persisted.mark_blob_saved("security_audit_logs_backup", marker)
             except Exception as e:
                 print(f"⚠️ Error saving audit logs backup: {e}")
             
@@ -267,6 +519,7 @@ class SecurityState:
             if db_users:
                 for user in db_users:
                     self.users[user.id] = user
+                    self._persisted.mark_saved('users', user.id, user)
                 db_users_loaded = True
                 
         except Exception as db_error:
@@ -289,6 +542,7 @@ class SecurityState:
                 # Load fresh from database
                 for role in db_roles:
                     self.roles[role.id] = role
+                    self._persisted.mark_saved('roles', role.id, role)
                 db_roles_loaded = True
         except Exception as db_error:
             print(f"❌ [DATABASE ERROR] Failed to load roles: {type(db_error).__name__}: {str(db_error)}")
@@ -304,6 +558,7 @@ class SecurityState:
             if db_orgs:
                 for org in db_orgs:
                     self.organizations[org.id] = org
+                    self._persisted.mark_saved('organizations', org.id, org)
                 db_orgs_loaded = True
         except Exception as db_error:
             error_msg = str(db_error)
@@ -321,6 +576,7 @@ class SecurityState:
             if db_invitations:
                 for inv in db_invitations:
                     self.invitations[inv.id] = inv
+                    self._persisted.mark_saved('invitations', inv.id, inv)
                 db_invitations_loaded = True
         except Exception as db_error:
             print(f"❌ [DATABASE ERROR] Failed to load invitations: {type(db_error).__name__}: {str(db_error)}")
@@ -347,6 +603,7 @@ class SecurityState:
             if db_groups:
                 for group in db_groups:
                     self.groups[group.id] = group
+                    self._persisted.mark_saved('groups', group.id, group)
                 db_groups_loaded = True
         except Exception as db_error:
             print(f"❌ [DATABASE ERROR] Failed to load user groups: {type(db_error).__name__}: {str(db_error)}")
@@ -356,9 +613,10 @@ class SecurityState:
         db_audit_loaded = False
         try:
             from database.services import AuditService
-            db_audit_logs = AuditService.get_all_audit_logs(limit=1000)
+            db_audit_logs = AuditService.get_all_audit_logs(limit=AUDIT_MEMORY_LIMIT)
             if db_audit_logs:
-                self.audit_logs = db_audit_logs
+                # Newest first from the DB; the buffer is kept oldest first
+                self.audit_logs = list(reversed(db_audit_logs))
                 db_audit_loaded = True
             else:
                 if not hasattr(self, 'audit_logs') or self.audit_logs is None:
@@ -381,6 +639,7 @@ class SecurityState:
             
             default_settings = SecuritySettingsService.get_settings(org_id)
             self.settings["org_default"] = default_settings
+            self._persisted.mark_saved('settings', "org_default", default_settings)
             db_settings_loaded = True
         except Exception as db_error:
             print(f"❌ [DATABASE ERROR] Failed to load security settings: {type(db_error).__name__}: {str(db_error)}")
@@ -406,6 +665,7 @@ class SecurityState:
                                 container[k] = cls(**v)
                             except Exception as item_error:
                                 print(f"  ⚠️ Error loading item {k} from {key}: {item_error}")
+                        self._persisted.mark_blob_saved(key, _serialize_collection(container))
                 except Exception as e:
                     print(f"⚠️ Error loading {key} from database: {e}")
         except Exception as e:
@@ -515,197 +775,101 @@ class SecurityState:
             request_method=request_method
         )
         self.audit_logs.append(log)
+        # Keep only recent entries in memory (trimmed in chunks, not per append)
+        if len(self.audit_logs) > AUDIT_MEMORY_LIMIT + AUDIT_MEMORY_LIMIT // 10:
+            del self.audit_logs[:len(self.audit_logs) - AUDIT_MEMORY_LIMIT]
         
-        # Save to database immediately
-        try:
-            from database.services import AuditService
-            AuditService.save_audit_log(log)
-        except Exception as e:
-            # Fallback: keep in memory, will be saved to disk on next save_to_disk()
-            pass
-        
-        # Auto-save periodically (for disk backup)
-        if len(self.audit_logs) % 100 == 0:
-            self.save_to_disk()
+        # Persisted in batches by the background writer (flushed on shutdown)
+        self.audit_writer.submit(log)
         
         return log
     
-    def get_user_by_email(self, email: str, org_id: Optional[str] = None) -> Optional[User]:
-        """Find user by email - checks security_state first, then database"""
-        email_lower = email.lower()
-        
-        # First, check in-memory cache (security_state)
-        for user in self.users.values():
-            if user.email.lower() == email_lower:
-                if org_id is None or user.org_id == org_id:
-                    return user
-        
-        # If not found in cache, try to load from database
+    def _resolve_org_uuid(self, org_id: Optional[str]):
+        """Resolve an org id/slug (e.g. "org_default") to the UUID stored on DB users"""
+        if not org_id:
+            return None
+        import uuid as uuid_lib
         try:
-            from database.services import UserService
-            import uuid as uuid_lib
-            
-            # Convert org_id to UUID if needed
-            org_uuid = None
-            if org_id:
+            return uuid_lib.UUID(str(org_id))
+        except ValueError:
+            pass
+
+        cached = self._org_uuid_cache.get(org_id)
+        if cached is not None:
+            return cached
+
+        resolved = None
+        for org in self.organizations.values():
+            if org.id == org_id or org.slug == org_id:
                 try:
-                    org_uuid = uuid_lib.UUID(org_id) if isinstance(org_id, str) else org_id
+                    resolved = uuid_lib.UUID(str(org.id))
+                    break
                 except ValueError:
-                    # If org_id is not a valid UUID (e.g., "org_default"), try to find org by slug
-                    from database.services import OrganizationService
-                    orgs = OrganizationService.get_all_organizations()
-                    org_obj = next((o for o in orgs if o.slug == org_id or o.id == org_id), None)
-                    if org_obj:
-                        org_uuid = uuid_lib.UUID(org_obj.id)
-            
-            db_users = UserService.get_all_users()
-            for db_user in db_users:
-                if db_user.email.lower() == email_lower:
-                    # Compare org_id (handle both UUID and string like "org_default")
-                    try:
-                        db_org_uuid = uuid_lib.UUID(db_user.org_id) if isinstance(db_user.org_id, str) else db_user.org_id
-                    except (ValueError, AttributeError):
-                        # If org_id is not a valid UUID, try to resolve it
-                        from database.services import OrganizationService
-                        orgs = OrganizationService.get_all_organizations()
-                        db_org_obj = next((o for o in orgs if o.slug == db_user.org_id or o.id == db_user.org_id), None)
-                        if db_org_obj:
-                            db_org_uuid = uuid_lib.UUID(db_org_obj.id)
-                        else:
-                            db_org_uuid = None
-                    
-                    if org_uuid is None or db_org_uuid == org_uuid:
-                        # Add to security_state cache
-                        self.users[db_user.id] = db_user
-                        return db_user
-        except Exception as e:
-            print(f"⚠️  [SECURITY_STATE] Failed to load user from database: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        return None
+                    continue
+        if resolved is None:
+            try:
+                from database.services import UserService
+                resolved = UserService._resolve_org_uuid(org_id)
+            except Exception as e:
+                print(f"⚠️  [SECURITY_STATE] Failed to resolve org '{org_id}': {e}")
+        if resolved is not None:
+            self._org_uuid_cache[org_id] = resolved
+        return resolved
 
-    def get_users_by_email(self, email: str, org_id: Optional[str] = None) -> List[User]:
+    def _load_users_from_db(self, field: str, value: str, org_id: Optional[str]) -> List[User]:
         """
-        Find all users matching an email (optionally scoped to org).
-        This is required when shared emails are enabled.
+        Single indexed query for users not yet in memory (e.g. created by another
+        worker). Empty results are remembered briefly so repeated unknown logins
+        do not hit the database every time.
         """
-        email_lower = email.lower()
-        matches: List[User] = []
-        seen_ids = set()
-
-        # In-memory cache first
-        for user in self.users.values():
-            if user.email and user.email.lower() == email_lower:
-                if org_id is None or user.org_id == org_id:
-                    if user.id not in seen_ids:
-                        matches.append(user)
-                        seen_ids.add(user.id)
-
-        # Then database (avoid duplicating any already in cache)
+        if self.users.is_known_miss(field, value, org_id):
+            return []
         try:
             from database.services import UserService
-            import uuid as uuid_lib
-
-            # Resolve org UUID similarly to get_user_by_email()
-            org_uuid = None
-            if org_id:
-                try:
-                    org_uuid = uuid_lib.UUID(org_id) if isinstance(org_id, str) else org_id
-                except ValueError:
-                    from database.services import OrganizationService
-                    orgs = OrganizationService.get_all_organizations()
-                    org_obj = next((o for o in orgs if o.slug == org_id or o.id == org_id), None)
-                    if org_obj:
-                        org_uuid = uuid_lib.UUID(org_obj.id)
-
-            db_users = UserService.get_all_users()
-            for db_user in db_users:
-                if not db_user.email or db_user.email.lower() != email_lower:
-                    continue
+            org_uuid = self._resolve_org_uuid(org_id)
+            db_users = UserService.find_users(org_uuid=org_uuid, **{field: value})
+        except Exception as e:
+            print(f"⚠️  [SECURITY_STATE] Failed to load user by {field} from database: {e}")
+            traceback.print_exc()
+            return []
 
-                if org_uuid is not None:
-                    try:
-                        db_org_uuid = uuid_lib.UUID(db_user.org_id) if isinstance(db_user.org_id, str) else db_user.org_id
-                    except (ValueError, AttributeError):
-                        from database.services import OrganizationService
-                        orgs = OrganizationService.get_all_organizations()
-                        db_org_obj = next((o for o in orgs if o.slug == db_user.org_id or o.id == db_user.org_id), None)
-                        if db_org_obj:
-                            db_org_uuid = uuid_lib.UUID(db_org_obj.id)
-                        else:
-                            db_org_uuid = None
+        if not db_users:
+            self.users.remember_miss(field, value, org_id)
+            return []
+        for db_user in db_users:
+            self.cache_db_user(db_user)
+        return db_users
 
-                    if db_org_uuid != org_uuid:
-                        continue
+    def cache_db_user(self, user: User) -> None:
+        """Add a user just read from the database (already persisted, so not re-saved)"""
+        self.users[user.id] = user
+        self._persisted.mark_saved('users', user.id, user)
 
-                # Cache it and add to results
-                self.users[db_user.id] = db_user
-                if db_user.id not in seen_ids:
-                    matches.append(db_user)
-                    seen_ids.add(db_user.id)
-        except Exception as e:
-            print(f"⚠️  [SECURITY_STATE] Failed to load users by email from database: {e}")
-            import traceback
-            traceback.print_exc()
+    def get_user_by_email(self, email: str, org_id: Optional[str] = None) -> Optional[User]:
+        """Find user by email - checks security_state first, then database"""
+        matches = self.get_users_by_email(email, org_id)
+        return matches[0] if matches else None
 
-        return matches
+    def get_users_by_email(self, email: str, org_id: Optional[str] = None) -> List[User]:
+        """
+        Find all users matching an email (optionally scoped to org).
+        This is required when shared emails are enabled.
+        """
+        if not (email or "").strip():
+            return []
+        matches = self.users.find_by_email(email, org_id)
+        if matches:
+            return matches
+        return self._load_users_from_db("email", email, org_id)
 
     def get_user_by_username(self, username: str, org_id: Optional[str] = None) -> Optional[User]:
         """Find a user by username (org-scoped)."""
-        uname = (username or "").strip().lower()
-        if not uname:
+        if not (username or "").strip():
             return None
-
-        for user in self.users.values():
-            if getattr(user, "username", None) and str(getattr(user, "username")).lower() == uname:
-                if org_id is None or user.org_id == org_id:
-                    return user
-
-        try:
-            from database.services import UserService
-            import uuid as uuid_lib
-
-            org_uuid = None
-            if org_id:
-                try:
-                    org_uuid = uuid_lib.UUID(org_id) if isinstance(org_id, str) else org_id
-                except ValueError:
-                    from database.services import OrganizationService
-                    orgs = OrganizationService.get_all_organizations()
-                    org_obj = next((o for o in orgs if o.slug == org_id or o.id == org_id), None)
-                    if org_obj:
-                        org_uuid = uuid_lib.UUID(org_obj.id)
-
-            db_users = UserService.get_all_users()
-            for db_user in db_users:
-                if not getattr(db_user, "username", None):
-                    continue
-                if str(getattr(db_user, "username")).lower() != uname:
-                    continue
-
-                if org_uuid is not None:
-                    try:
-                        db_org_uuid = uuid_lib.UUID(db_user.org_id) if isinstance(db_user.org_id, str) else db_user.org_id
-                    except (ValueError, AttributeError):
-                        from database.services import OrganizationService
-                        orgs = OrganizationService.get_all_organizations()
-                        db_org_obj = next((o for o in orgs if o.slug == db_user.org_id or o.id == db_user.org_id), None)
-                        if db_org_obj:
-                            db_org_uuid = uuid_lib.UUID(db_org_obj.id)
-                        else:
-                            db_org_uuid = None
-                    if db_org_uuid != org_uuid:
-                        continue
-
-                self.users[db_user.id] = db_user
-                return db_user
-        except Exception as e:
-            print(f"⚠️  [SECURITY_STATE] Failed to load user by username from database: {e}")
-            import traceback
-            traceback.print_exc()
-
-        return None
+        matches = self.users.find_by_username(username, org_id)
+        if not matches:
+            matches = self._load_users_from_db("username", username, org_id)
+        return matches[0] if matches else None
     
     def get_user_by_external_id(self, external_id: str, provider: AuthProvider, org_id: Optional[str] = None) -> Optional[User]:
         """Find user by external provider ID"""
@@ -735,6 +899,26 @@ class SecurityState:
         """Get all users in a department"""
         return [u for u in self.users.values() if u.department_id == department_id]
     
+    def get_user_group_ids(self, user_id: str) -> List[str]:
+        """
+        Group IDs whose member lists (member_ids / user_ids) contain the user.
+        Group membership is the source of truth since user.group_ids may not be
+        in sync. The reverse index is rebuilt after any group change and swapped
+        in whole, so readers never see a half-built index.
+        """
+        if not user_id:
+            return []
+        version = getattr(self.groups, "version", None)
+        if version is None or version != self._user_groups_version:
+            index: Dict[str, List[str]] = {}
+            for group in list(self.groups.values()):
+                members = set(getattr(group, "member_ids", []) or []) | set(getattr(group, "user_ids", []) or [])
+                for member in members:
+                    index.setdefault(str(member), []).append(group.id)
+            self._user_groups = index
+            self._user_groups_version = version
+        return list(self._user_groups.get(str(user_id), ()))
+    
     def get_users_by_group(self, group_id: str) -> List[User]:
         """Get all users in a group"""
         return [u for u in self.users.values() if group_id in u.group_ids]
@@ -747,30 +931,14 @@ class SecurityState:
         return sessions
     
     def invalidate_user_sessions(self, user_id: str):
-        """Invalidate all sessions for a user"""
-        for session in self.sessions.values():
-            if session.user_id == user_id:
-                session.is_active = False
+        """Invalidate all sessions for a user (on every worker)"""
+        self.session_store.revoke_user(user_id)
     
     def cleanup_expired_sessions(self):
-        """Remove expired sessions"""
-        now = datetime.utcnow()
-        settings = self.get_settings()
-        
-        for session_id, session in list(self.sessions.items()):
-            if not session.is_active:
-                continue
-            
-            # Check session timeout
-            if settings.session_timeout_minutes > 0:
-                last_activity = datetime.fromisoformat(session.last_activity)
-                if (now - last_activity).total_seconds() > settings.session_timeout_minutes * 60:
-                    session.is_active = False
-            
-            # Check remember me expiry
-            if session.remember_me and session.expires_at:
-                if datetime.fromisoformat(session.expires_at) < now:
-                    session.is_active = False
+        """Expire timed-out and revoked sessions now (normally done by the background sweeper)"""
+        for session_id in list(self.sessions):
+            self.expiry_sweeper.track("session", session_id)
+        return self.expiry_sweeper.sweep()
     
     def cleanup_expired_invitations(self):
         """Remove expired invitations"""
@@ -793,11 +961,38 @@ class SecurityState:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        before: Optional[Tuple[str, str]] = None
     ) -> List[AuditLog]:
-        """Get filtered audit logs"""
-        logs = [l for l in self.audit_logs if l.org_id == org_id]
+        """
+        Get filtered audit logs, newest first.
         
+        Served from the audit table (filtered and paginated in the database);
+        `before` is the (timestamp, id) of the last log of the previous page.
+        Falls back to the in-memory buffer of recent logs if the DB is unavailable.
+        """
+        import uuid as uuid_lib
+        # Invalid dates/cursors raise ValueError to the caller
+        start_dt = datetime.fromisoformat(start_date) if start_date else None
+        end_dt = datetime.fromisoformat(end_date) if end_date else None
+        before_key = (datetime.fromisoformat(before[0]), uuid_lib.UUID(before[1])) if before else None
+        try:
+            from database.services import AuditService
+            return AuditService.query_audit_logs(
+                self._resolve_org_uuid(org_id) or org_id,
+                action=self._audit_enum_value(action),
+                resource_type=self._audit_enum_value(resource_type),
+                user_id=user_id,
+                start_date=start_dt,
+                end_date=end_dt,
+                before=before_key,
+                limit=limit,
+                offset=offset
+            )
+        except Exception as e:
+            print(f"⚠️  [AUDIT] Querying audit logs from database failed, using recent logs: {e}")
+        
+        logs = [l for l in self.audit_logs if l.org_id == org_id]
         if action:
             logs = [l for l in logs if l.action == action]
         if resource_type:
@@ -809,12 +1004,53 @@ class SecurityState:
         if end_date:
             logs = [l for l in logs if l.timestamp <= end_date]
         
-        # Sort by timestamp descending
-        logs = sorted(logs, key=lambda x: x.timestamp, reverse=True)
-        
-        # Apply pagination
+        logs = sorted(logs, key=lambda x: (x.timestamp, x.id), reverse=True)
+        if before:
+            logs = [l for l in logs if (l.timestamp, l.id) < tuple(before)]
+            return logs[:limit]
         return logs[offset:offset + limit]
     
+    def count_audit_logs(
+        self,
+        org_id: str,
+        action: Optional[ActionType] = None,
+        resource_type: Optional[ResourceType] = None,
+        user_id: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> int:
+        """Count audit logs matching the filters (DB, or recent logs as fallback)"""
+        start_dt = datetime.fromisoformat(start_date) if start_date else None
+        end_dt = datetime.fromisoformat(end_date) if end_date else None
+        try:
+            from database.services import AuditService
+            return AuditService.count_audit_logs(
+                self._resolve_org_uuid(org_id) or org_id,
+                action=self._audit_enum_value(action),
+                resource_type=self._audit_enum_value(resource_type),
+                user_id=user_id,
+                start_date=start_dt,
+                end_date=end_dt
+            )
+        except Exception as e:
+            print(f"⚠️  [AUDIT] Counting audit logs in database failed, using recent logs: {e}")
+        
+        return len([
+            l for l in self.audit_logs
+            if l.org_id == org_id
+            and (not action or l.action == action)
+            and (not resource_type or l.resource_type == resource_type)
+            and (not user_id or l.user_id == user_id)
+            and (not start_date or l.timestamp >= start_date)
+            and (not end_date or l.timestamp <= end_date)
+        ])
+    
+    @staticmethod
+    def _audit_enum_value(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        return value.value if hasattr(value, 'value') else str(value)
+    
     def get_stats(self, org_id: str) -> Dict[str, Any]:
         """Get security statistics for an organization"""
         org_users = [u for u in self.users.values() if u.org_id == org_id]
@@ -33,7 +33,8 @@ from .knowledge_base import (
 
 # Process/Workflow Execution
 from .process_execution import (
-    ProcessExecution, ProcessNodeExecution, ProcessApprovalRequest
+    ProcessExecution, ProcessNodeExecution, ProcessApprovalRequest,
+    ProcessWebhookDelivery
 )
 
 # Configuration
@@ -75,6 +76,7 @@ __all__ = [
     
     # Process/Workflow Execution
     'ProcessExecution', 'ProcessNodeExecution', 'ProcessApprovalRequest',
+    'ProcessWebhookDelivery',
     
     # Configuration
     'SystemSetting', 'OrganizationSetting',
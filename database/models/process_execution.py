@@ -521,6 +521,67 @@ class ProcessApprovalRequest(Base):
         }
 
 
+class ProcessWebhookDelivery(Base):
+    """
+    Webhook Delivery (ingestion queue)
+    
+    A webhook that started (or will start) a process. The webhook endpoint
+    stores the payload here and answers 202 with the row's ID, which becomes
+    the execution ID; the webhook queue drains rows into executions.
+    
+    Status values (String, not native enum):
+    - queued: stored, waiting for a free slot
+    - running: claimed by a worker, execution starting or running
+    - completed: execution created and handed to the engine
+    - failed: the execution could not be started (see error)
+    """
+    __tablename__ = "process_webhook_deliveries"
+    
+    # Primary Key (also the ID of the execution it starts)
+    id = Column(UUID, primary_key=True, default=uuid.uuid4)
+    
+    # Multi-tenancy
+    org_id = Column(UUID, nullable=False)
+    
+    # References
+    agent_id = Column(UUID, ForeignKey('agents.id', ondelete='CASCADE'), nullable=False)
+    
+    # Sender-supplied deduplication key (Idempotency-Key header), unique per agent
+    idempotency_key = Column(String(255), nullable=True)
+    correlation_id = Column(String(100))
+    
+    # Request body as received
+    payload = Column(JSONB, default=dict)
+    
+    # Status: queued, running, completed, failed
+    status = Column(String(20), default="queued", nullable=False)
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<ProcessWebhookDelivery {self.id} agent={self.agent_id} status={self.status}>"
+    
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'execution_id': str(self.id),
+            'agent_id': str(self.agent_id),
+            'idempotency_key': self.idempotency_key,
+            'correlation_id': self.correlation_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
 # =============================================================================
 # COMPOSITE INDEXES
 # =============================================================================
@@ -537,3 +598,8 @@ Index('idx_node_exec_process_status', ProcessNodeExecution.process_execution_id,
 # Approval Request indexes
 Index('idx_approval_org_status', ProcessApprovalRequest.org_id, ProcessApprovalRequest.status)
 Index('idx_approval_pending_deadline', ProcessApprovalRequest.status, ProcessApprovalRequest.deadline_at)
+
+# Webhook delivery indexes
+Index('uq_webhook_delivery_idempotency', ProcessWebhookDelivery.agent_id, ProcessWebhookDelivery.idempotency_key, unique=True)
+Index('idx_webhook_delivery_agent_status', ProcessWebhookDelivery.agent_id, ProcessWebhookDelivery.status)
+Index('idx_webhook_delivery_status_created', ProcessWebhookDelivery.status, ProcessWebhookDelivery.created_at)
@@ -131,7 +131,7 @@ class UserSession(Base):
     # Expiry
     expires_at = Column(DateTime, nullable=False)
     revoked = Column(Boolean, default=False)
-    revoked_at = Column(DateTime)
+    revoked_at = Column(DateTime, index=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,8 +1,9 @@
 """
 Audit Service - Database Operations for Audit Logs
 """
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
+from sqlalchemy import and_, or_, func
 from ..base import get_db_session
 from ..models.audit import AuditLog as DBAuditLog
 from core.security import AuditLog as CoreAuditLog, ActionType, ResourceType
@@ -18,40 +19,128 @@ class AuditService:
             db_logs = session.query(DBAuditLog).order_by(DBAuditLog.timestamp.desc()).limit(limit).all()
             return [AuditService._db_to_core_log(db_log) for db_log in db_logs]
     
+    @staticmethod
+    def _filtered_query(
+        session,
+        org_id,
+        action: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        user_id=None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        """Audit log query with server-side filters (served by the *_time composite indexes)"""
+        query = session.query(DBAuditLog).filter(DBAuditLog.org_id == org_id)
+        if action:
+            query = query.filter(DBAuditLog.action == action)
+        if resource_type:
+            query = query.filter(DBAuditLog.resource_type == resource_type)
+        if user_id:
+            query = query.filter(DBAuditLog.user_id == user_id)
+        if start_date:
+            query = query.filter(DBAuditLog.timestamp >= start_date)
+        if end_date:
+            query = query.filter(DBAuditLog.timestamp <= end_date)
+        return query
+    
+    @staticmethod
+    def query_audit_logs(
+        org_id,
+        action: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        user_id=None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[CoreAuditLog]:
+        """
+        Get audit logs newest first.
+        
+        Pass `before` (timestamp, id) of the last row of the previous page for
+        keyset pagination; `offset` is only used when no cursor is given.
+        """
+        with get_db_session() as session:
+            query = AuditService._filtered_query(
+                session, org_id, action, resource_type, user_id, start_date, end_date
+            )
+            if before:
+                before_ts, before_id = before
+                query = query.filter(or_(
+                    DBAuditLog.timestamp < before_ts,
+                    and_(DBAuditLog.timestamp == before_ts, DBAuditLog.id < before_id)
+                ))
+            elif offset:
+                query = query.offset(offset)
+            db_logs = query.order_by(DBAuditLog.timestamp.desc(), DBAuditLog.id.desc()).limit(limit).all()
+            return [AuditService._db_to_core_log(db_log) for db_log in db_logs]
+    
+    @staticmethod
+    def count_audit_logs(
+        org_id,
+        action: Optional[str] = None,
+        resource_type: Optional[str] = None,
+        user_id=None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """Count audit logs matching the filters"""
+        with get_db_session() as session:
+            query = AuditService._filtered_query(
+                session, org_id, action, resource_type, user_id, start_date, end_date
+            )
+            return query.with_entities(func.count(DBAuditLog.id)).scalar() or 0
+    
     @staticmethod
     def save_audit_log(log: CoreAuditLog) -> CoreAuditLog:
         """Save audit log to database"""
         with get_db_session() as session:
-            action_str = log.action.value if isinstance(log.action, ActionType) else str(log.action)
-            resource_str = log.resource_type.value if isinstance(log.resource_type, ResourceType) else str(log.resource_type)
-            db_log = DBAuditLog(
-                id=log.id,
-                org_id=log.org_id,
-                user_id=log.user_id,
-                user_email=log.user_email,
-                user_name=log.user_name,
-                session_id=log.session_id,
-                action=action_str,
-                resource_type=resource_str,
-                resource_id=log.resource_id,
-                resource_name=log.resource_name,
-                description=log.details.get('description', '') if log.details else '',
-                changes=log.changes,
-                extra_metadata=log.details,
-                success=log.success,
-                error_message=log.error_message,
-                http_method=log.request_method,
-                http_path=log.request_path,
-                http_status_code=None,  # Not in core model
-                ip_address=log.ip_address or '',
-                user_agent=log.user_agent,
-                timestamp=datetime.fromisoformat(log.timestamp) if isinstance(log.timestamp, str) else log.timestamp if isinstance(log.timestamp, datetime) else datetime.utcnow()
-            )
+            db_log = AuditService._core_to_db_log(log)
             session.add(db_log)
             session.commit()
             session.refresh(db_log)
             return AuditService._db_to_core_log(db_log)
     
+    @staticmethod
+    def save_audit_logs(logs: List[CoreAuditLog]) -> int:
+        """Bulk insert audit logs in a single transaction; returns the number written"""
+        if not logs:
+            return 0
+        with get_db_session() as session:
+            session.add_all([AuditService._core_to_db_log(log) for log in logs])
+            session.commit()
+            return len(logs)
+    
+    @staticmethod
+    def _core_to_db_log(log: CoreAuditLog) -> DBAuditLog:
+        """Convert core AuditLog model to database AuditLog"""
+        action_str = log.action.value if isinstance(log.action, ActionType) else str(log.action)
+        resource_str = log.resource_type.value if isinstance(log.resource_type, ResourceType) else str(log.resource_type)
+        return DBAuditLog(
+            id=log.id,
+            org_id=log.org_id,
+            user_id=log.user_id,
+            user_email=log.user_email,
+            user_name=log.user_name,
+            session_id=log.session_id,
+            action=action_str,
+            resource_type=resource_str,
+            resource_id=log.resource_id,
+            resource_name=log.resource_name,
+            description=log.details.get('description', '') if log.details else '',
+            changes=log.changes,
+            extra_metadata=log.details,
+            success=log.success,
+            error_message=log.error_message,
+            http_method=log.request_method,
+            http_path=log.request_path,
+            http_status_code=None,  # Not in core model
+            ip_address=log.ip_address or '',
+            user_agent=log.user_agent,
+            timestamp=datetime.fromisoformat(log.timestamp) if isinstance(log.timestamp, str) else log.timestamp if isinstance(log.timestamp, datetime) else datetime.utcnow()
+        )
+    
     @staticmethod
     def _db_to_core_log(db_log: DBAuditLog) -> CoreAuditLog:
         """Convert database AuditLog to core AuditLog model"""
@@ -70,7 +70,8 @@ class ProcessExecutionService:
         trigger_input: Dict[str, Any] = None,
         conversation_id: str = None,
         correlation_id: str = None,
-        process_definition_snapshot: Dict[str, Any] = None
+        process_definition_snapshot: Dict[str, Any] = None,
+        execution_id: str = None
     ) -> ProcessExecution:
         """
         Create a new process execution
@@ -84,6 +85,7 @@ class ProcessExecutionService:
             conversation_id: Optional linked conversation
             correlation_id: Optional correlation ID for tracking
             process_definition_snapshot: Snapshot of process definition
+            execution_id: Optional pre-assigned ID (e.g. returned by the webhook queue)
             
         Returns:
             Created ProcessExecution
@@ -93,7 +95,7 @@ class ProcessExecutionService:
         resolved_org_id = self._resolve_org_id(str(org_id)) if org_id else self._resolve_org_id("org_default")
 
         execution = ProcessExecution(
-            id=uuid.uuid4(),
+            id=uuid.UUID(execution_id) if execution_id else uuid.uuid4(),
             org_id=uuid.UUID(resolved_org_id),
             agent_id=uuid.UUID(agent_id) if isinstance(agent_id, str) else agent_id,
             conversation_id=uuid.UUID(conversation_id) if conversation_id else None,
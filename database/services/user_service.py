@@ -66,7 +66,25 @@ class UserService:
             ).all()
 
             return [UserService._db_to_core_user(u) for u in db_users] if db_users else []
-    
+
+    @staticmethod
+    def find_users(email: Optional[str] = None, username: Optional[str] = None, org_uuid=None) -> List[User]:
+        """
+        Targeted lookup by email or username (optionally scoped to an org UUID).
+        Uses the indexed email/username columns - values are stored lowercase.
+        """
+        if not email and not username:
+            return []
+        with get_db_session() as db:
+            query = db.query(DBUser)
+            if email:
+                query = query.filter(DBUser.email == email.strip().lower())
+            if username:
+                query = query.filter(DBUser.username == username.strip().lower())
+            if org_uuid is not None:
+                query = query.filter(DBUser.org_id == org_uuid)
+            return [UserService._db_to_core_user(u) for u in query.all()]
+
     @staticmethod
     def get_user_by_id(user_id: str, org_id: str) -> Optional[User]:
         """Get user by ID"""
@@ -171,6 +189,15 @@ class UserService:
         print(f"⚠️ [UserService._resolve_org_uuid] Could not resolve org_id '{org_id_str}' to a UUID!")
         return None
     
+    @staticmethod
+    def _directory_changed(user_id: str, deleted: bool = False):
+        """Invalidate the user directory cache (approval routing, org chart) for this user"""
+        try:
+            from core.identity.service import get_directory_cache
+            get_directory_cache().user_changed(user_id, deleted=deleted)
+        except Exception as e:
+            print(f"⚠️ [UserService] Failed to invalidate directory cache: {e}")
+    
     @staticmethod
     def create_user(user: User) -> User:
         """Create new user in database"""
@@ -264,6 +291,7 @@ class UserService:
             db.add(db_user)
             db.commit()
             db.refresh(db_user)
+            UserService._directory_changed(db_user.id)
             
             return UserService._db_to_core_user(db_user)
     
@@ -441,6 +469,7 @@ class UserService:
             
             db.commit()
             db.refresh(db_user)
+            UserService._directory_changed(db_user.id)
             
             return UserService._db_to_core_user(db_user)
     
@@ -735,17 +764,62 @@ class SessionService:
             return session
     
     @staticmethod
-    def deactivate_session(session_id: str):
-        """Deactivate session (logout)"""
+    def touch_session(session_id: str, last_activity_at) -> bool:
+        """
+        Record activity on a live session. Only last_activity_at is written, and
+        only while the session is not revoked, so a worker holding a stale
+        cached copy can never undo a logout. Returns True if a row was updated.
+        """
+        if isinstance(last_activity_at, str):
+            last_activity_at = datetime.fromisoformat(last_activity_at)
+        with get_db_session() as db:
+            count = db.query(UserSession).filter(
+                UserSession.id == session_id,
+                UserSession.revoked == False  # noqa: E712
+            ).update({
+                UserSession.last_activity_at: last_activity_at
+            }, synchronize_session=False)
+            db.commit()
+            return count > 0
+    
+    @staticmethod
+    def deactivate_session(session_id: str) -> bool:
+        """Deactivate session (logout). Returns False if the session has no row."""
         with get_db_session() as db:
             db_session = db.query(UserSession).filter(
                 UserSession.id == session_id
             ).first()
             
-            if db_session:
-                db_session.is_active = False
-                db_session.expires_at = datetime.utcnow()
+            if db_session is None:
+                return False
+            if not db_session.revoked:
+                db_session.revoked = True
+                db_session.revoked_at = datetime.utcnow()
                 db.commit()
+            return True
+    
+    @staticmethod
+    def deactivate_user_sessions(user_id: str) -> int:
+        """Revoke every active session of a user. Returns the number revoked."""
+        with get_db_session() as db:
+            count = db.query(UserSession).filter(
+                UserSession.user_id == user_id,
+                UserSession.revoked == False  # noqa: E712
+            ).update({
+                UserSession.revoked: True,
+                UserSession.revoked_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.commit()
+            return count
+    
+    @staticmethod
+    def get_revoked_since(since: datetime) -> List[tuple]:
+        """(session_id, revoked_at) for sessions revoked after `since` (uses ix_user_sessions_revoked_at)"""
+        with get_db_session() as db:
+            rows = db.query(UserSession.id, UserSession.revoked_at).filter(
+                UserSession.revoked_at > since
+            ).all()
+            return [(str(row[0]), row[1]) for row in rows]
     
     @staticmethod
     def delete_user(user_id: str, org_id: str):
@@ -756,6 +830,7 @@ class SessionService:
                 email = db_user.email
                 db.delete(db_user)
                 db.commit()
+                UserService._directory_changed(user_id, deleted=True)
                 print(f"🗑️  [DATABASE] Deleted user from database: {email} (ID: {user_id[:8]}...)")
             else:
                 print(f"⚠️  [DATABASE] User {user_id[:8]}... not found in database for deletion")
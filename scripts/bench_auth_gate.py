@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Auth gate benchmark — per-request overhead of AuthGateMiddleware.
+
+Calls a small Starlette app directly over ASGI (no server or sockets), with:
+- no middleware (baseline)
+- the previous BaseHTTPMiddleware gate (reproduced below for comparison)
+- the current pure-ASGI gate (api/auth_gate.py)
+
+Measured for a JSON endpoint and an SSE-style streaming endpoint on the
+public allowlist, and for a non-/api asset path.
+
+USAGE (from the repo root):
+    python scripts/bench_auth_gate.py                  # 5,000 requests per case
+    python scripts/bench_auth_gate.py --requests 20000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+with contextlib.redirect_stdout(io.StringIO()):
+    from api import auth_gate
+
+logging.getLogger("agentforge.auth_gate").setLevel(logging.ERROR)
+
+STREAM_CHUNKS = 50
+
+
+class LegacyAuthGateMiddleware(BaseHTTPMiddleware):
+    """The gate as it was before the pure-ASGI rewrite"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.mode = "monitor"
+        self.debug_enabled = False
+
+    @staticmethod
+    def _is_public(path):
+        if path in auth_gate.PUBLIC_API_PATHS:
+            return True
+        for prefix in auth_gate.PUBLIC_API_PREFIXES:
+            if path == prefix.rstrip("/") or path.startswith(prefix):
+                return True
+        return False
+
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        method = request.method.upper()
+        if not path.startswith("/api/"):
+            return await call_next(request)
+        if method == "OPTIONS":
+            return await call_next(request)
+        if path.startswith("/api/debug/") and not self.debug_enabled:
+            return await call_next(request)
+        if self._is_public(path):
+            return await call_next(request)
+        return await call_next(request)
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def stream(request):
+    async def events():
+        for i in range(STREAM_CHUNKS):
+            yield f"data: chunk {i}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def asset(request):
+    return PlainTextResponse("x" * 1024)
+
+
+def build_app(middleware):
+    app = Starlette(routes=[
+        Route("/api/health", health),
+        Route("/api/public/stream", stream),
+        Route("/ui/app.js", asset),
+    ])
+    return middleware(app) if middleware else app
+
+
+async def call(app, path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def measure(app, path, requests):
+    for _ in range(200):  # warm up
+        await call(app, path)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def main_async(requests):
+    variants = [
+        ("no middleware", build_app(None)),
+        ("BaseHTTPMiddleware (before)", build_app(LegacyAuthGateMiddleware)),
+        ("pure ASGI (after)", build_app(auth_gate.AuthGateMiddleware)),
+    ]
+    cases = [("JSON /api/health", "/api/health"),
+             (f"SSE /api/public/stream ({STREAM_CHUNKS} events)", "/api/public/stream"),
+             ("asset /ui/app.js", "/ui/app.js")]
+    for label, path in cases:
+        print(label)
+        baseline = None
+        for name, app in variants:
+            micros = await measure(app, path, requests)
+            if baseline is None:
+                baseline = micros
+                print(f"  {name:<30} {micros:8.1f} us/request")
+            else:
+                print(f"  {name:<30} {micros:8.1f} us/request  ({micros - baseline:+.1f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AuthGateMiddleware per-request overhead")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
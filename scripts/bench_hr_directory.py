@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+HR directory benchmark — resolving a list of users against an HR API.
+
+Runs against a throwaway SQLite database (DB_TYPE=sqlite) and a local mock
+HR server that adds a fixed latency per request. Resolves a team of users
+(who all report to the same manager) from cold caches:
+- one get_user() at a time
+- UserDirectoryService.get_users() (concurrent, shared pooled client,
+  concurrent requests for the same employee coalesced)
+
+USAGE (from the repo root):
+    python scripts/bench_hr_directory.py
+    python scripts/bench_hr_directory.py --users 100 --latency-ms 80
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MANAGER_EMPLOYEE_ID = "E0000"
+
+
+class MockHRHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with MockHRHandler.lock:
+            MockHRHandler.hits += 1
+        time.sleep(self.latency)
+        employee_id = self.path.rsplit("/", 1)[-1]
+        body = json.dumps({
+            "employeeId": employee_id,
+            "managerId": MANAGER_EMPLOYEE_ID if employee_id != MANAGER_EMPLOYEE_ID else None,
+            "department": "Engineering",
+            "jobTitle": "Engineer",
+            "costCenter": "CC-42",
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark resolving users against an HR API")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_hr_")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ.pop("DATABASE_URL", None)
+    logging.disable(logging.CRITICAL)
+
+    MockHRHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockHRHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database.base import init_db, get_session
+        init_db()
+        from database.models.organization import Organization
+        from database.models.user import User
+        from core.identity.service import UserDirectoryService, get_directory_cache
+        from core.identity.hr_client import get_hr_api_client
+
+    org_id = str(uuid.uuid4())
+    user_ids = []
+    with get_session() as session:
+        session.add(Organization(
+            id=org_id, name="Bench", slug="bench", directory_source="hr_api",
+            hr_api_config={
+                "base_url": f"http://127.0.0.1:{server.server_port}",
+                "endpoints": {"get_user": "/employees/{employee_id}"},
+                "auth_type": "bearer", "auth_config": {"token": "bench"},
+                "attribute_mapping": {"manager_id": "managerId", "department": "department",
+                                      "job_title": "jobTitle", "employee_id": "employeeId"},
+            },
+        ))
+        manager_id = str(uuid.uuid4())
+        session.add(User(id=manager_id, org_id=org_id, email="manager@example.com",
+                         employee_id=MANAGER_EMPLOYEE_ID, status="active"))
+        for i in range(1, args.users + 1):
+            user_id = str(uuid.uuid4())
+            user_ids.append(user_id)
+            session.add(User(id=user_id, org_id=org_id, email=f"user{i}@example.com",
+                             employee_id=f"E{i:04d}", manager_id=manager_id, status="active"))
+        session.commit()
+
+    directory = UserDirectoryService()
+    client = get_hr_api_client()
+
+    def run(label, resolve):
+        get_directory_cache().clear()
+        MockHRHandler.hits = 0
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            users = resolve()
+        elapsed = (time.perf_counter() - started) * 1000
+        assert all(u and u.source == "hr_api" and u.manager_id == manager_id for u in users), "unresolved users"
+        print(f"{label:<24} {elapsed:8,.0f} ms   {MockHRHandler.hits:4d} HR requests")
+        return elapsed
+
+    print(f"{args.users} users, {args.latency_ms:.0f} ms HR latency")
+    sequential = run("one at a time", lambda: [directory.get_user(uid, org_id) for uid in user_ids])
+    batched = run("get_users (batched)", lambda: directory.get_users(user_ids, org_id))
+    print(f"speedup: {sequential / batched:.1f}x   coalesced requests: {client.coalesced}")
+    client.close()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
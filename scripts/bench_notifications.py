@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Notification fan-out benchmark — email to a large group over SMTP.
+
+Runs an in-process SMTP sink (asyncio, no external server) that adds a fixed
+delay to each new connection (standing in for TCP/TLS setup and AUTH) and to
+each message. Sends one notification to N recipients:
+- one fresh SMTP connection per email, one email at a time (previous behaviour)
+- NotificationService.send(): pooled connections, concurrent recipients
+- NotificationService.enqueue(): returns once queued; the outbox delivers
+
+USAGE (from the repo root):
+    python scripts/bench_notifications.py
+    python scripts/bench_notifications.py --recipients 500 --connect-ms 80 --message-ms 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from email.mime.text import MIMEText
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SMTPSink:
+    """Minimal SMTP server that accepts and counts every message"""
+
+    def __init__(self, connect_delay: float, message_delay: float):
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.messages = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.connect_delay)
+        writer.write(b"220 sink ESMTP\r\n")
+        in_data = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    await asyncio.sleep(self.message_delay)
+                    self.messages += 1
+                    writer.write(b"250 OK queued\r\n")
+                continue
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+async def main_async(args):
+    import aiosmtplib
+    from core.process.services.notification import NotificationService
+    from core.process.services.notification_outbox import get_notification_outbox
+    from core.process.services.smtp_pool import get_smtp_pool
+
+    sink = SMTPSink(args.connect_ms / 1000, args.message_ms / 1000)
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    recipients = [f"user{i}@example.com" for i in range(args.recipients)]
+
+    def report(label, started, connections_before, messages_before):
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{label:<36} {elapsed:9,.0f} ms   {sink.connections - connections_before:4d} connections"
+              f"   {sink.messages - messages_before:4d} messages")
+
+    # Previous behaviour: a new connection per email, sequentially
+    started, c0, m0 = time.perf_counter(), sink.connections, sink.messages
+    for recipient in recipients:
+        msg = MIMEText("Quarterly report is ready", "html")
+        msg["From"], msg["To"], msg["Subject"] = "noreply@example.com", recipient, "Report"
+        smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, use_tls=False, start_tls=False, timeout=15)
+        await smtp.connect()
+        await smtp.send_message(msg)
+        await smtp.quit()
+    report("fresh connection per email", started, c0, m0)
+
+    service = NotificationService(config={"email": {
+        "smtp_host": "127.0.0.1", "smtp_port": port, "use_tls": False,
+    }})
+    send_kwargs = dict(channel="email", recipients=recipients, title="Report",
+                       message="<p>Quarterly report is ready</p>")
+
+    started, c0, m0 = time.perf_counter(), sink.connections, sink.messages
+    result = await service.send(**send_kwargs)
+    assert result["success"] and "failed_recipients" not in result, result
+    report("pooled + concurrent (send)", started, c0, m0)
+
+    outbox = get_notification_outbox()
+    started, c0, m0 = time.perf_counter(), sink.connections, sink.messages
+    result = await service.enqueue(**send_kwargs)
+    assert result["queued"], result
+    report("outbox (enqueue returns)", started, c0, m0)
+    await outbox.stop()
+    report("outbox (delivered)", started, c0, m0)
+    assert outbox.delivered == 1, outbox.stats()
+
+    await get_smtp_pool().close_all()
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark notification email fan-out over SMTP")
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--connect-ms", type=float, default=50, help="delay per new SMTP connection")
+    parser.add_argument("--message-ms", type=float, default=5, help="delay per message")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    print(f"{args.recipients} recipients, {args.connect_ms:.0f} ms per connection, {args.message_ms:.0f} ms per message")
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
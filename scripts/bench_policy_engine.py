@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+PolicyEngine micro-benchmark — cost of one evaluate_access() call with many ABAC policies.
+
+Builds an in-memory security state (no database) with N policies spread over
+organizations, resource types and actions - a mix of allow and deny policies
+with attribute conditions - and times access checks that must consult them.
+
+USAGE (from the repo root):
+    python scripts/bench_policy_engine.py                 # 5,000 policies
+    python scripts/bench_policy_engine.py --policies 20000 --checks 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.security.engine import PolicyEngine  # noqa: E402
+from core.security.models import (  # noqa: E402
+    Policy, PolicyCondition, PolicyRule, ResourceType, Role, User, UserGroup, UserProfile, UserStatus,
+)
+from core.security.state import VersionedMap  # noqa: E402
+
+ORGS = [f"org_{i}" for i in range(10)]
+RESOURCE_TYPES = [ResourceType.AGENT, ResourceType.TOOL, ResourceType.KNOWLEDGE_BASE]
+ACTIONS = ["view", "edit", "delete", "execute"]
+
+
+class BenchState:
+    """Just the collections PolicyEngine reads"""
+
+    def __init__(self):
+        self.roles = VersionedMap()
+        self.groups = VersionedMap()
+        self.policies = VersionedMap()
+        self.tool_permissions = {}
+        self.kb_permissions = {}
+        self.db_permissions = {}
+
+
+def build_state(policy_count: int, seed: int = 7) -> BenchState:
+    rng = random.Random(seed)
+    state = BenchState()
+    for org in ORGS:
+        state.roles[f"{org}_member"] = Role(
+            id=f"{org}_member", org_id=org, name="Member",
+            permissions=[f"{rt.value}:*" for rt in RESOURCE_TYPES],
+        )
+        state.groups[f"{org}_staff"] = UserGroup(id=f"{org}_staff", org_id=org, name="Staff", role_ids=[f"{org}_member"])
+
+    for i in range(policy_count):
+        org = rng.choice(ORGS)
+        deny = rng.random() < 0.3
+        state.policies[f"pol_{i}"] = Policy(
+            id=f"pol_{i}", org_id=org, name=f"Policy {i}",
+            resource_type=rng.choice(RESOURCE_TYPES),
+            actions=rng.sample(ACTIONS, rng.randint(0, 2)),
+            role_ids=[f"{org}_member"] if rng.random() < 0.5 else [],
+            rules=[PolicyRule(logic="AND", conditions=[
+                PolicyCondition(attribute="user.department_id", operator="eq", value=f"dept_{rng.randint(0, 50)}"),
+                PolicyCondition(attribute="context.ip", operator="starts_with", value=f"10.{rng.randint(0, 255)}."),
+            ])],
+            effect="deny" if deny else "allow",
+            priority=rng.randint(1, 200),
+        )
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PolicyEngine.evaluate_access")
+    parser.add_argument("--policies", type=int, default=5000)
+    parser.add_argument("--checks", type=int, default=20000)
+    args = parser.parse_args()
+
+    state = build_state(args.policies)
+    engine = PolicyEngine(state)
+    users = [
+        User(id=f"user_{i}", org_id=ORGS[i % len(ORGS)], email=f"u{i}@example.com",
+             role_ids=[f"{ORGS[i % len(ORGS)]}_member"], department_id=f"dept_{i % 60}", status=UserStatus.ACTIVE,
+             profile=UserProfile(first_name="Bench", last_name=str(i)))
+        for i in range(100)
+    ]
+    rng = random.Random(1)
+    requests = [
+        (rng.choice(users), rng.choice(ACTIONS), rng.choice(RESOURCE_TYPES), {"ip": f"10.{rng.randint(0, 255)}.0.1"})
+        for _ in range(args.checks)
+    ]
+
+    started = time.perf_counter()
+    engine.evaluate_access(*requests[0][:3], context=requests[0][3])
+    build_ms = (time.perf_counter() - started) * 1000
+
+    denied = 0
+    started = time.perf_counter()
+    for user, action, resource_type, context in requests:
+        allowed, _ = engine.evaluate_access(user, action, resource_type, context=context)
+        denied += not allowed
+    elapsed = time.perf_counter() - started
+
+    print(f"policies:          {args.policies} ({engine._get_policy_index().size} active deny indexed)")
+    print(f"index build:       {build_ms:.1f} ms (first check)")
+    print(f"checks:            {args.checks} ({denied} denied)")
+    print(f"per check:         {elapsed / args.checks * 1e6:.1f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
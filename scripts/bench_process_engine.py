@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+ProcessEngine benchmark — measures engine throughput on synthetic process definitions.
+
+No database, LLM or network needed: task nodes are backed by a no-op executor (pure
+engine/state/schema overhead) or a mock-latency executor (simulated I/O). Control-flow
+nodes (start, end, condition, parallel) use the real executors.
+
+Scenarios:
+    linear_1k        START -> 1,000 task nodes -> END
+    linear_latency   START -> 200 task nodes with 1 ms simulated I/O -> END
+    wide_parallel    PARALLEL fan-out to 50 branches x 10 nodes, converging on a merge node
+    deep_conditions  balanced decision tree of depth 10 (2k+ nodes), one path walked per run
+    heavy_loop       counter loop through a decision node, 2,000 iterations (4k node runs)
+
+Reported per scenario: nodes/sec, per-node engine overhead (µs, time spent in the
+simulated I/O excluded), peak traced memory (KB) and final checkpoint size (bytes).
+Timings are the median of --repeat runs.
+
+--check gates every scenario on nodes/sec, except linear_latency: its throughput is
+set by the event loop's timer granularity rather than by the engine, so it is gated
+on per-node overhead instead. Memory and checkpoint size are gated everywhere.
+
+USAGE (from the repo root):
+    python scripts/bench_process_engine.py                   # print results
+    python scripts/bench_process_engine.py --check           # compare with the baseline, exit 1 on regression
+    python scripts/bench_process_engine.py --update-baseline # record results as the new baseline
+
+The baseline lives in scripts/bench_baselines/process_engine.json. Throughput is
+machine-dependent: refresh the baseline on the machine that runs --check.
+
+Exit codes:
+    0 = no regression (or no --check)
+    1 = at least one metric regressed beyond its tolerance
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.process.engine import ProcessEngine  # noqa: E402
+from core.process.nodes.base import BaseNodeExecutor, ExecutorDependencies  # noqa: E402
+from core.process.result import NodeResult  # noqa: E402
+from core.process.schemas import (  # noqa: E402
+    NodeConfig, NodeType, ProcessDefinition, ProcessEdge, ProcessNode, ProcessSettings,
+)
+from core.process.state import ProcessContext  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "scripts", "bench_baselines", "process_engine.json")
+
+# Allowed drift before --check fails. Timing is noisy; memory and checkpoint size are not.
+TOLERANCE = {
+    "nodes_per_sec": 0.30,      # may drop by 30%
+    "overhead_us_per_node": 0.30,  # may grow by 30%
+    "peak_memory_kb": 0.25,     # may grow by 25%
+    "checkpoint_bytes": 0.10,   # may grow by 10%
+}
+
+TASK_TYPE = NodeType.SCRIPT
+
+
+# =============================================================================
+# Synthetic executors
+# =============================================================================
+
+class NoOpExecutor(BaseNodeExecutor):
+    """Returns immediately; optionally increments a counter variable"""
+
+    display_name = "NoOp"
+
+    async def execute(self, node, state, context):
+        counter = node.config.type_config.get("increment")
+        if counter:
+            return NodeResult.success(
+                output={"ok": True},
+                variables_update={counter: (state.get(counter) or 0) + 1},
+            )
+        return NodeResult.success(output={"ok": True})
+
+
+class MockLatencyExecutor(BaseNodeExecutor):
+    """Simulates an I/O-bound step (HTTP call, DB query) with a fixed sleep.
+
+    The time actually slept is added to `slept_s`, so the overhead figure does not
+    depend on how late the event loop wakes the sleep up.
+    """
+
+    display_name = "MockLatency"
+    slept_s = 0.0
+
+    async def execute(self, node, state, context):
+        started = time.perf_counter()
+        await asyncio.sleep(node.config.type_config.get("latency_ms", 1) / 1000.0)
+        MockLatencyExecutor.slept_s += time.perf_counter() - started
+        return NodeResult.success(output={"ok": True})
+
+
+class BenchEngine(ProcessEngine):
+    """ProcessEngine with task nodes routed to the synthetic executors"""
+
+    def _get_executor(self, node_type):
+        if node_type == TASK_TYPE:
+            if TASK_TYPE not in self._executors:
+                self._executors[TASK_TYPE] = _TaskDispatcher(self.deps)
+            return self._executors[TASK_TYPE]
+        return super()._get_executor(node_type)
+
+
+class _TaskDispatcher(BaseNodeExecutor):
+    display_name = "Task"
+
+    def __init__(self, deps):
+        super().__init__(deps)
+        self._noop = NoOpExecutor(deps)
+        self._latency = MockLatencyExecutor(deps)
+
+    async def execute(self, node, state, context):
+        if node.config.type_config.get("latency_ms"):
+            return await self._latency.execute(node, state, context)
+        return await self._noop.execute(node, state, context)
+
+
+# =============================================================================
+# Synthetic definitions
+# =============================================================================
+
+def _node(node_id, node_type=TASK_TYPE, **type_config):
+    return ProcessNode(
+        id=node_id, type=node_type, name=node_id,
+        config=NodeConfig(type_config=type_config),
+    )
+
+
+def _edge(source, target):
+    return ProcessEdge(id=f"e_{source}_{target}", source=source, target=target)
+
+
+def _definition(name, nodes, edges):
+    return ProcessDefinition(
+        name=name, nodes=nodes, edges=edges,
+        settings=ProcessSettings(max_node_executions=10 ** 6, max_execution_time_seconds=3600),
+    )
+
+
+def build_linear(count=1000, latency_ms=0):
+    nodes = [_node("start", NodeType.START)]
+    edges = []
+    prev = "start"
+    for i in range(count):
+        nid = f"t{i}"
+        nodes.append(_node(nid, latency_ms=latency_ms) if latency_ms else _node(nid))
+        edges.append(_edge(prev, nid))
+        prev = nid
+    nodes.append(_node("end", NodeType.END))
+    edges.append(_edge(prev, "end"))
+    return _definition(f"linear_{count}", nodes, edges)
+
+
+def build_wide_parallel(branches=50, depth=10):
+    nodes = [_node("start", NodeType.START), _node("fanout", NodeType.PARALLEL)]
+    edges = [_edge("start", "fanout")]
+    branch_lists = []
+    for b in range(branches):
+        chain = [f"b{b}_{d}" for d in range(depth)]
+        branch_lists.append(chain)
+        edges.append(_edge("fanout", chain[0]))
+        for d, nid in enumerate(chain):
+            nodes.append(_node(nid))
+            edges.append(_edge(nid, chain[d + 1] if d + 1 < depth else "merge"))
+    nodes[1] = _node("fanout", NodeType.PARALLEL, branches=branch_lists)
+    nodes += [_node("merge"), _node("end", NodeType.END)]
+    edges.append(_edge("merge", "end"))
+    return _definition("wide_parallel", nodes, edges)
+
+
+def build_condition_tree(depth=10):
+    nodes = [_node("start", NodeType.START), _node("end", NodeType.END)]
+    edges = [_edge("start", "c_1")]
+    leaves = 2 ** depth
+    for i in range(1, leaves):
+        level = i.bit_length() - 1
+        left, right = 2 * i, 2 * i + 1
+        left_id = f"c_{left}" if left < leaves else f"leaf_{left}"
+        right_id = f"c_{right}" if right < leaves else f"leaf_{right}"
+        nodes.append(_node(
+            f"c_{i}", NodeType.CONDITION,
+            expression=f"{{{{bit_{level}}}}} == 1",
+            true_branch=right_id, false_branch=left_id,
+        ))
+        edges += [_edge(f"c_{i}", left_id), _edge(f"c_{i}", right_id)]
+    for i in range(leaves, 2 * leaves):
+        nodes.append(_node(f"leaf_{i}"))
+        edges.append(_edge(f"leaf_{i}", "end"))
+    return _definition(f"condition_tree_{depth}", nodes, edges)
+
+
+def build_loop(iterations=2000):
+    nodes = [
+        _node("start", NodeType.START),
+        _node("body", increment="i"),
+        _node("check", NodeType.CONDITION,
+              expression=f"{{{{i}}}} < {iterations}", true_branch="body", false_branch="end"),
+        _node("end", NodeType.END),
+    ]
+    edges = [_edge("start", "body"), _edge("body", "check"),
+             _edge("check", "body"), _edge("check", "end")]
+    return _definition(f"loop_{iterations}", nodes, edges)
+
+
+def _tree_inputs(depth, runs):
+    return [{f"bit_{lvl}": (r >> lvl) & 1 for lvl in range(depth)} for r in range(runs)]
+
+
+SCENARIOS = {
+    "linear_1k": lambda: (build_linear(1000), [{}]),
+    "linear_latency": lambda: (build_linear(200, latency_ms=1), [{}]),
+    "wide_parallel": lambda: (build_wide_parallel(50, 10), [{}]),
+    "deep_conditions": lambda: (build_condition_tree(10), _tree_inputs(10, 50)),
+    "heavy_loop": lambda: (build_loop(2000), [{"i": 0}]),
+}
+
+# Timing metric --check compares per scenario (default: nodes_per_sec)
+GATE_METRIC = {
+    "linear_latency": "overhead_us_per_node",
+}
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def _context():
+    return ProcessContext(
+        execution_id="bench", agent_id="bench", org_id="bench",
+        trigger_type="manual", user_id="bench",
+    )
+
+
+async def _run_once(definition, trigger_input):
+    engine = BenchEngine(definition, _context(), ExecutorDependencies())
+    result = await engine.execute(dict(trigger_input))
+    if not result.is_success:
+        raise RuntimeError(f"{definition.name} failed: {result.error}")
+    return engine
+
+
+async def run_scenario(name, repeat=3):
+    definition, inputs = SCENARIOS[name]()
+
+    # Timing runs (median of `repeat`, no tracemalloc overhead)
+    timings = []
+    nodes = 0
+    engine = None
+    for _ in range(max(repeat, 1)):
+        nodes = 0
+        MockLatencyExecutor.slept_s = 0.0
+        started = time.perf_counter()
+        for trigger_input in inputs:
+            engine = await _run_once(definition, trigger_input)
+            nodes += engine.nodes_executed
+        elapsed = time.perf_counter() - started
+        timings.append((elapsed, max(elapsed - MockLatencyExecutor.slept_s, 0)))
+
+    seconds = statistics.median(t for t, _ in timings)
+    overhead_us = statistics.median(o for _, o in timings) / max(nodes, 1) * 1e6
+
+    # Memory run
+    tracemalloc.start()
+    for trigger_input in inputs:
+        await _run_once(definition, trigger_input)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    checkpoint_bytes = len(json.dumps(engine.get_checkpoint(), default=str))
+
+    return {
+        "nodes": nodes,
+        "seconds": round(seconds, 4),
+        "nodes_per_sec": round(nodes / seconds, 1),
+        "overhead_us_per_node": round(overhead_us, 1),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "checkpoint_bytes": checkpoint_bytes,
+    }
+
+
+def compare(results, baseline):
+    """Return a list of regression messages (empty when within tolerance)"""
+    problems = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if GATE_METRIC.get(name) == "overhead_us_per_node":
+            limit = base["overhead_us_per_node"] * (1 + TOLERANCE["overhead_us_per_node"])
+            if res["overhead_us_per_node"] > limit:
+                problems.append(f"{name}: µs/node {res['overhead_us_per_node']} > baseline {base['overhead_us_per_node']}")
+        elif res["nodes_per_sec"] < base["nodes_per_sec"] * (1 - TOLERANCE["nodes_per_sec"]):
+            problems.append(f"{name}: nodes/sec {res['nodes_per_sec']} < baseline {base['nodes_per_sec']}")
+        for metric in ("peak_memory_kb", "checkpoint_bytes"):
+            if res[metric] > base[metric] * (1 + TOLERANCE[metric]):
+                problems.append(f"{name}: {metric} {res[metric]} > baseline {base[metric]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ProcessEngine on synthetic definitions")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only this scenario (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per scenario (median is kept)")
+    parser.add_argument("--check", action="store_true", help="Fail if results regress against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    names = args.scenario or list(SCENARIOS)
+    results = {name: asyncio.run(run_scenario(name, args.repeat)) for name in names}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<18}{'nodes':>8}{'nodes/s':>12}{'µs/node':>10}{'peak KB':>11}{'ckpt B':>10}")
+        for name, r in results.items():
+            print(f"{name:<18}{r['nodes']:>8}{r['nodes_per_sec']:>12}{r['overhead_us_per_node']:>10}"
+                  f"{r['peak_memory_kb']:>11}{r['checkpoint_bytes']:>10}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline updated: {BASELINE_PATH}")
+
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            print(f"No baseline at {BASELINE_PATH}; run with --update-baseline first")
+            return 1
+        with open(BASELINE_PATH) as f:
+            problems = compare(results, json.load(f))
+        for p in problems:
+            print(f"[REGRESSION] {p}")
+        print("PASS" if not problems else f"FAIL ({len(problems)} regression(s))")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+SecurityState persistence benchmark — latency of save_to_disk() after a single user update.
+
+Runs against a throwaway SQLite database (DB_TYPE=sqlite) so it needs no
+server. Creates N users, saves them once, then edits one user and times:
+- the incremental save (only modified entities are written)
+- a full re-save of every entity (the behaviour before dirty tracking),
+  forced by clearing the persistence tracker
+
+USAGE (from the repo root):
+    python scripts/bench_security_persistence.py              # 10,000 users
+    python scripts/bench_security_persistence.py --users 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed_save(state) -> float:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        state.save_to_disk()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SecurityState.save_to_disk after one user update")
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_security_")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ.pop("DATABASE_URL", None)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database.base import init_db
+        init_db()
+        from core.security.models import User, UserProfile, UserStatus
+        from core.security.state import PersistenceTracker, security_state as state
+
+    org_id = next(iter(state.organizations))
+    for i in range(args.users):
+        user = User(
+            id=str(uuid.uuid4()), org_id=org_id, email=f"user{i}@example.com",
+            profile=UserProfile(first_name="Bench", last_name=str(i)), status=UserStatus.ACTIVE,
+        )
+        state.users[user.id] = user
+
+    initial_ms = timed_save(state)
+    target = next(u for u in state.users.values() if u.email == "user0@example.com")
+
+    target.profile.job_title = "Engineer"
+    incremental_ms = timed_save(state)
+
+    target.profile.job_title = "Senior Engineer"
+    state._persisted = PersistenceTracker()
+    full_ms = timed_save(state)
+
+    print(f"users:                     {len(state.users)}")
+    print(f"initial save (all new):    {initial_ms:,.0f} ms")
+    print(f"one user update, full:     {full_ms:,.0f} ms")
+    print(f"one user update, dirty:    {incremental_ms:,.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Process webhook queue benchmark — a partner burst against /process/webhook/{agent_id}.
+
+Runs against a throwaway SQLite database (DB_TYPE=sqlite) with the process
+router mounted on a bare FastAPI app. A published process (start -> end) gets
+a burst of webhooks, a share of them retried with the same Idempotency-Key:
+- request latency until the 202 acknowledgement (payload stored)
+- time for the webhook queue to start every execution, and the most
+  executions seen running at once for the process
+- a second process filled past WEBHOOK_QUEUE_MAX_PENDING_PER_AGENT gets 429
+
+USAGE (from the repo root):
+    python scripts/bench_webhook_queue.py
+    python scripts/bench_webhook_queue.py --webhooks 1000 --duplicates 0.2 --agent-concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFINITION = {
+    "name": "Webhook bench",
+    "nodes": [
+        {"id": "start", "type": "start", "name": "Start", "config": {}},
+        {"id": "end", "type": "end", "name": "End", "config": {}},
+    ],
+    "edges": [{"id": "e1", "source": "start", "target": "end"}],
+}
+
+
+async def main_async(args, org_id, owner_id, report):
+    import httpx
+    from fastapi import FastAPI
+    from database.base import get_session
+    from database.models import Agent, ProcessExecution, ProcessWebhookDelivery
+    from api.modules.process.router import router
+    from api.modules.process.webhook_queue import WebhookQueue
+    import api.modules.process.webhook_queue as webhook_queue
+
+    def add_agent(name):
+        agent_id = str(uuid.uuid4())
+        with get_session() as session:
+            session.add(Agent(
+                id=agent_id, org_id=org_id, name=name, goal="bench", model_id="none",
+                agent_type="process", process_definition=DEFINITION, is_published=True,
+                owner_id=owner_id, created_by=owner_id,
+            ))
+            session.commit()
+        return agent_id
+
+    queue = webhook_queue._webhook_queue = WebhookQueue(
+        agent_concurrency=args.agent_concurrency, max_pending_per_agent=args.webhooks * 2
+    )
+    app = FastAPI()
+    app.include_router(router)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    agent_id = add_agent("Bench")
+
+    # Burst: every webhook acknowledged before anything is drained
+    keys = [f"evt-{i}" for i in range(args.webhooks)]
+    retried = keys[:int(args.webhooks * args.duplicates)]
+    latencies, execution_ids, statuses = [], {}, {}
+    started = time.perf_counter()
+    for key in keys + retried:
+        t0 = time.perf_counter()
+        resp = await client.post(f"/process/webhook/{agent_id}", json={"event": key},
+                                 headers={"Idempotency-Key": key})
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        body = resp.json()
+        assert execution_ids.setdefault(key, body["execution_id"]) == body["execution_id"], body
+    burst = (time.perf_counter() - started) * 1000
+    latencies.sort()
+    report(f"{len(latencies)} webhooks ({len(retried)} retried) acknowledged in {burst:,.0f} ms   "
+          f"p50 {statistics.median(latencies):.1f} ms   p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms   "
+          f"responses {dict(sorted(statuses.items()))}")
+
+    # Drain
+    peak = 0
+    started = time.perf_counter()
+    queue.start()
+    while True:
+        with get_session() as session:
+            rows = session.query(ProcessWebhookDelivery.status).filter(
+                ProcessWebhookDelivery.agent_id == agent_id).all()
+        counts = {}
+        for (status,) in rows:
+            counts[status] = counts.get(status, 0) + 1
+        peak = max(peak, counts.get("running", 0))
+        if not counts.get("queued") and not counts.get("running"):
+            break
+        await asyncio.sleep(0.02)
+    drain = (time.perf_counter() - started) * 1000
+    with get_session() as session:
+        executions = session.query(ProcessExecution).filter(ProcessExecution.agent_id == agent_id).count()
+    report(f"drained in {drain:,.0f} ms   deliveries {counts}   executions {executions}   "
+          f"peak running {peak} (limit {queue.agent_concurrency})")
+    if executions != len(keys):
+        report(f"last error: {queue.last_error}")
+    assert executions == len(keys), "one execution per distinct Idempotency-Key"
+    await queue.stop()
+
+    # Overflow: a full process is refused with 429 + Retry-After
+    full_agent = add_agent("Full")
+    queue.max_pending_per_agent = 5
+    codes = []
+    for i in range(8):
+        resp = await client.post(f"/process/webhook/{full_agent}", json={"n": i})
+        codes.append(resp.status_code)
+    report(f"overflow (limit 5): {codes}   Retry-After {resp.headers.get('retry-after')}")
+    assert codes.count(202) == 5 and codes.count(429) == 3, codes
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the process webhook ingestion queue")
+    parser.add_argument("--webhooks", type=int, default=500)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of webhooks sent twice")
+    parser.add_argument("--agent-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_webhook_")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ.pop("DATABASE_URL", None)
+    logging.disable(logging.CRITICAL)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database.base import init_db, get_session
+        import database.models  # noqa: F401 (process tables are not in init_db's list)
+        import database.models.process_settings  # noqa: F401
+        init_db()
+        from database.models.organization import Organization
+        from database.models.user import User
+
+    org_id, owner_id = str(uuid.uuid4()), str(uuid.uuid4())
+    with get_session() as session:
+        session.add(Organization(id=org_id, name="Bench", slug="bench"))
+        session.add(User(id=owner_id, org_id=org_id, email="owner@example.com", status="active"))
+        session.commit()
+
+    # The process engine prints progress; keep only the report on stdout
+    lines = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(main_async(args, org_id, owner_id, lines.append))
+    finally:
+        for line in lines:
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
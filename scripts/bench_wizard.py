@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Process wizard benchmark — time to first draft and to the final workflow.
+
+No LLM provider needed: a stand-in LLM answers each wizard call (goal analysis,
+generation, review) after a fixed latency, returning the wizard's own template
+workflow as the generated/reviewed JSON. Runs generate_from_goal() three ways:
+- sequential passes (previous behaviour): analyze -> generate -> review -> validate
+- generate_from_goal() with a progress callback: time of each stage, including
+  the "draft" stage that carries the validated draft graph
+- the same request again: answered from the wizard cache
+
+USAGE (from the repo root):
+    python scripts/bench_wizard.py
+    python scripts/bench_wizard.py --llm-ms 8000 --runs 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GOAL = (
+    "Employees submit expense reports with receipts. Reports under 500 are "
+    "auto-approved, larger ones go to the employee's manager, and finance is "
+    "notified of every approved report."
+)
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class StandInLLM:
+    """Answers wizard prompts after a fixed delay"""
+
+    def __init__(self, latency: float, workflow: dict):
+        self.latency = latency
+        self.workflow = workflow
+        self.calls = 0
+
+    async def chat(self, messages, temperature=0.2, max_tokens=2500):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        system = getattr(messages[0], "content", None) or messages[0]["content"]
+        if "QA reviewer" in system:
+            return _Response(json.dumps(self.workflow))
+        user = getattr(messages[1], "content", None) or messages[1]["content"]
+        if "determine the best process pattern" in user:
+            return _Response(json.dumps({"pattern": "approval_workflow", "summary": GOAL,
+                                         "suggested_nodes": [], "considerations": []}))
+        return _Response(json.dumps(self.workflow))
+
+
+async def main_async(args):
+    from core.process.wizard import ProcessWizard
+    from core.process.wizard_cache import get_wizard_cache
+
+    template = ProcessWizard()._generate_visual_from_template(GOAL)
+    llm = StandInLLM(args.llm_ms / 1000, template)
+    wizard = ProcessWizard(llm=llm)
+
+    # Previous behaviour: every pass after the one before, nothing shown until the end
+    sequential = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        analysis = await wizard._analyze_goal(GOAL)
+        draft = await wizard._generate_visual_builder_process(GOAL, analysis, {})
+        reviewed = await wizard._review_and_fix_process(draft, GOAL)
+        wizard._validate_and_enhance_visual_builder(reviewed, analysis)
+        sequential.append((time.perf_counter() - started) * 1000)
+
+    staged, draft_at, calls = [], [], []
+    for _ in range(args.runs):
+        stages = {}
+        started = time.perf_counter()
+
+        def progress(stage, data):
+            stages[stage] = (time.perf_counter() - started) * 1000
+
+        before = llm.calls
+        result = await wizard.generate_from_goal(GOAL, progress=progress, use_cache=False)
+        assert result.get("nodes"), "no workflow generated"
+        staged.append((time.perf_counter() - started) * 1000)
+        draft_at.append(stages["draft"])
+        calls.append(llm.calls - before)
+    print("stages: " + "  ".join(f"{k} {v:,.0f} ms" for k, v in stages.items()))
+
+    cache = get_wizard_cache()
+    cache.clear()
+    await wizard.generate_from_goal(GOAL)  # miss: generates and stores
+    started = time.perf_counter()
+    before = llm.calls
+    await wizard.generate_from_goal(GOAL)
+    cached = (time.perf_counter() - started) * 1000
+
+    def avg(values):
+        return sum(values) / len(values)
+
+    print(f"{'sequential passes':<30} {avg(sequential):9,.0f} ms to the workflow (nothing earlier)")
+    print(f"{'generate_from_goal':<30} {avg(staged):9,.0f} ms to the workflow, "
+          f"{avg(draft_at):,.0f} ms to the draft   ({avg(calls):.0f} LLM calls)")
+    print(f"{'same goal again (cached)':<30} {cached:9,.2f} ms   ({llm.calls - before} LLM calls)   "
+          f"cache hits {cache.hits}, misses {cache.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ProcessWizard generation stages and caching")
+    parser.add_argument("--llm-ms", type=float, default=1500, help="latency of each LLM call")
+    parser.add_argument("--runs", type=int, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    print(f"{args.llm_ms:.0f} ms per LLM call, {args.runs} run(s) per mode")
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
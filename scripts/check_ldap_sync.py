@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+LDAP pool and incremental sync check — against an in-memory directory (ldap3 MOCK_SYNC).
+
+Runs against a throwaway SQLite database (DB_TYPE=sqlite) and a mock LDAP
+server, so it needs no directory or database server. Checks that:
+- pooled connections are reused, and password checks leave them bound as
+  the service account
+- the first sync is full, later syncs only read entries modified since the
+  cursor, and manager DNs are resolved to local manager_id values
+
+USAGE (from the repo root):
+    python scripts/check_ldap_sync.py
+    python scripts/check_ldap_sync.py --users 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASE_DN = "ou=people,dc=example,dc=com"
+SERVICE_DN = "cn=svc,dc=example,dc=com"
+
+
+def user_dn(i: int) -> str:
+    return f"uid=user{i},{BASE_DN}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check pooled LDAP connections and incremental directory sync")
+    parser.add_argument("--users", type=int, default=200, help="directory size (at least 10)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="check_ldap_")
+    os.environ["DB_TYPE"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "check.db")
+    os.environ.pop("DATABASE_URL", None)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from database.base import init_db
+        init_db()
+        from ldap3 import Server, Connection, MOCK_SYNC
+        from core.security.models import LDAPConfig
+        from core.security.state import security_state as state
+        from core.security.ldap_directory import LDAPConnectionPool, sync_directory
+
+    server = Server("mock_directory")
+    directory = Connection(server, client_strategy=MOCK_SYNC)
+    directory.strategy.add_entry(SERVICE_DN, {"objectClass": "person", "userPassword": "svc-secret"})
+    for i in range(args.users):
+        directory.strategy.add_entry(user_dn(i), {
+            "objectClass": "person", "uid": f"user{i}", "mail": f"user{i}@example.com",
+            "givenName": "User", "sn": str(i), "userPassword": f"pw{i}",
+            # Everyone reports to user0
+            "manager": user_dn(0) if i else [],
+            "modifyTimestamp": f"20260101{i // 3600:02d}{i // 60 % 60:02d}{i % 60:02d}Z",
+        })
+
+    def connect(config):
+        conn = Connection(server, user=config.bind_dn, password=config.bind_password, client_strategy=MOCK_SYNC)
+        conn.bind()
+        return conn
+
+    org_id = next(iter(state.organizations))
+    config = LDAPConfig(org_id=org_id, server_url="ldap://mock", bind_dn=SERVICE_DN,
+                        bind_password="svc-secret", base_dn=BASE_DN)
+    pool = LDAPConnectionPool(config, size=2, connection_factory=connect)
+
+    # Pooled connections and rebinds
+    assert pool.verify_credentials(user_dn(1), "pw1")
+    assert not pool.verify_credentials(user_dn(1), "wrong")
+    assert not pool.verify_credentials(user_dn(1), "")
+    for _ in range(20):
+        pool.run(lambda conn: conn.search(BASE_DN, "(uid=user1)", attributes=["mail"]))
+    print(f"pool:        opened={pool.opened} reused={pool.reused} discarded={pool.discarded}")
+    assert pool.opened == 1, "connections should be reused"
+
+    def timed_sync():
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(sync_directory(config, state, pool=pool))
+        return result, (time.perf_counter() - started) * 1000
+
+    first, first_ms = timed_sync()
+    assert first["success"] and first["mode"] == "full" and first["created"] == args.users, first
+    manager = state.get_user_by_email("user0@example.com", org_id)
+    report = state.get_user_by_email("user5@example.com", org_id)
+    assert report.manager_id == manager.id, "manager DN should resolve to a local user id"
+
+    # Two entries change after the first sync
+    for i in (3, 7):
+        directory.strategy.entries[user_dn(i)]["title"] = [b"Engineer"]
+        directory.strategy.entries[user_dn(i)]["modifyTimestamp"] = [b"20260301000000Z"]
+
+    second, second_ms = timed_sync()
+    # The entry stamped exactly at the cursor is read again (the filter is >=)
+    assert second["mode"] == "incremental" and second["synced"] == 3, second
+    assert state.get_user_by_email("user3@example.com", org_id).profile.job_title == "Engineer"
+
+    print(f"full sync:   {first['synced']} entries in {first_ms:,.0f} ms")
+    print(f"incremental: {second['synced']} entries in {second_ms:,.1f} ms (cursor {config.sync_cursor})")
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Message queue batching check — MessageBatcher and QueueClientPool against in-process fakes.
+
+Needs no Redis or SQS: a fake Redis client (PING, pipelined PUBLISH) and a
+fake SQS client (SendMessage / SendMessageBatch) are placed in the pool's
+client cache, and record every call. Checks that:
+- messages are split into pipelines / SendMessageBatch calls of at most
+  max_batch_size, and single messages use SendMessage
+- with linger_ms > 0, concurrent publishes share one batch, flushed when the
+  linger expires or as soon as max_batch_size messages are waiting
+- every message gets its own result dict, in order, including per-entry SQS
+  failures and a batch whose send raised
+
+USAGE (from the repo root):
+    python scripts/check_queue_batching.py
+    python scripts/check_queue_batching.py --messages 1000 --linger-ms 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REDIS_URL = "redis://fake:6379/0"
+SQS_CONFIG = {"access_key": "fake", "secret_key": "fake", "region": "us-east-1"}
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/000000000000/check"
+
+
+class FakeRedis:
+    """PING and non-transactional pipelines of PUBLISH; records each pipeline size"""
+
+    def __init__(self):
+        self.pipelines = []
+        self.fail_next = False
+
+    async def ping(self):
+        return True
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def publish(self, channel, message):
+        self.commands.append((channel, message))
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        if self.client.fail_next:
+            self.client.fail_next = False
+            raise ConnectionError("connection reset by fake redis")
+        self.client.pipelines.append(len(self.commands))
+        # Subscriber count: the message's position in the pipeline, to check ordering
+        return list(range(len(self.commands)))
+
+
+class FakeSQS:
+    """SendMessage / SendMessageBatch; bodies listed in `reject` come back as Failed entries"""
+
+    def __init__(self):
+        self.calls = []
+        self.reject = set()
+
+    async def send_message(self, QueueUrl, MessageBody, MessageAttributes):
+        self.calls.append(("send_message", 1))
+        return {"MessageId": f"id-{MessageBody}"}
+
+    async def send_message_batch(self, QueueUrl, Entries):
+        self.calls.append(("send_message_batch", len(Entries)))
+        response = {"Successful": [], "Failed": []}
+        for entry in Entries:
+            if entry["MessageBody"] in self.reject:
+                response["Failed"].append({"Id": entry["Id"], "Code": "InvalidMessageContents",
+                                           "Message": "rejected by fake sqs"})
+            else:
+                response["Successful"].append({"Id": entry["Id"], "MessageId": f"id-{entry['MessageBody']}"})
+        return response
+
+
+class _FakeSQSContext:
+    async def __aexit__(self, *exc):
+        return False
+
+
+def distinct(results):
+    return len({id(result) for result in results}) == len(results)
+
+
+async def check_redis(pool, redis, args):
+    messages = [f"m{i}" for i in range(args.messages)]
+    results = await pool.publish_redis(REDIS_URL, "events", messages, max_batch_size=100)
+    expected = [min(100, args.messages - i) for i in range(0, args.messages, 100)]
+    assert redis.pipelines == expected, redis.pipelines
+    assert len(results) == len(messages) and all(r["success"] for r in results)
+    assert [r["subscribers"] for r in results] == [i % 100 for i in range(args.messages)], "results out of order"
+    assert distinct(results)
+    print(f"redis:       {len(messages)} messages -> pipelines {redis.pipelines}")
+
+    # A failed pipeline: every message gets its own error result
+    redis.pipelines.clear()
+    redis.fail_next = True
+    results = await pool.publish_redis(REDIS_URL, "events", ["a", "b", "c"], max_batch_size=100)
+    assert [r["success"] for r in results] == [False] * 3 and distinct(results), results
+    results[0]["annotated"] = True
+    assert "annotated" not in results[1], "results must not share one dict"
+    print(f"redis error: 3 messages -> 3 separate error results ({results[1]['error']})")
+
+
+async def check_linger(pool, redis, args):
+    # Concurrent node runs publishing 3 messages each share one pipeline
+    redis.pipelines.clear()
+    started = time.perf_counter()
+    runs = await asyncio.gather(*[
+        pool.publish_redis(REDIS_URL, "linger", [f"r{run}-{i}" for i in range(3)],
+                           max_batch_size=100, linger_ms=args.linger_ms)
+        for run in range(5)
+    ])
+    waited = (time.perf_counter() - started) * 1000
+    assert redis.pipelines == [15], redis.pipelines
+    assert all(len(run) == 3 and all(r["success"] for r in run) for run in runs)
+    assert waited >= args.linger_ms * 0.9, f"flushed after {waited:.0f} ms, before the linger expired"
+    print(f"linger:      5 concurrent publishes of 3 -> pipelines {redis.pipelines} after {waited:.0f} ms")
+
+    # A full batch goes out at once; only the remainder waits for the linger
+    redis.pipelines.clear()
+    started = time.perf_counter()
+    first = asyncio.ensure_future(pool.publish_redis(REDIS_URL, "full", [f"f{i}" for i in range(20)],
+                                                     max_batch_size=10, linger_ms=args.linger_ms * 10))
+    while len(redis.pipelines) < 2:
+        await asyncio.sleep(0.001)
+    full_at = (time.perf_counter() - started) * 1000
+    assert redis.pipelines == [10, 10] and full_at < args.linger_ms * 10, (redis.pipelines, full_at)
+    await first
+    rest = await pool.publish_redis(REDIS_URL, "full", [f"g{i}" for i in range(5)],
+                                    max_batch_size=10, linger_ms=args.linger_ms)
+    assert redis.pipelines == [10, 10, 5] and len(rest) == 5, redis.pipelines
+    print(f"full batch:  20 + 5 messages (max 10) -> pipelines {redis.pipelines}, "
+          f"full batches sent after {full_at:.1f} ms")
+
+
+async def check_sqs(pool, sqs, args):
+    messages = [f"s{i}" for i in range(23)]
+    sqs.reject = {"s4", "s17"}
+    results = await pool.publish_sqs(QUEUE_URL, messages, SQS_CONFIG)
+    assert sqs.calls == [("send_message_batch", 10), ("send_message_batch", 10), ("send_message_batch", 3)], sqs.calls
+    assert [r["success"] for r in results] == [m not in sqs.reject for m in messages], results
+    assert [r.get("message_id") for r in results if r["success"]] == [f"id-{m}" for m in messages if m not in sqs.reject]
+    assert "InvalidMessageContents" in results[4]["error"] and distinct(results)
+    print(f"sqs:         23 messages -> {[size for _, size in sqs.calls]} per SendMessageBatch, "
+          f"{sum(not r['success'] for r in results)} per-entry failures reported")
+
+    sqs.calls.clear()
+    single = await pool.publish_sqs(QUEUE_URL, ["only"], SQS_CONFIG)
+    assert sqs.calls == [("send_message", 1)] and single[0]["message_id"] == "id-only", sqs.calls
+    print("sqs single:  1 message -> SendMessage")
+
+
+async def main_async(args):
+    from core.process.services.queue_clients import QueueClientPool
+
+    pool = QueueClientPool()
+    redis = FakeRedis()
+    pool._redis[REDIS_URL] = redis
+    pool._redis_checked[REDIS_URL] = time.monotonic()
+    sqs = FakeSQS()
+    pool._sqs[pool._sqs_key(SQS_CONFIG)] = (_FakeSQSContext(), sqs)
+
+    await check_redis(pool, redis, args)
+    await check_linger(pool, redis, args)
+    await check_sqs(pool, sqs, args)
+    await pool.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check message queue publish batching against fake clients")
+    parser.add_argument("--messages", type=int, default=250)
+    parser.add_argument("--linger-ms", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main_async(args))
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())